@@ -1,15 +1,15 @@
 #/bin/bash
 
+# Converts the prior month's JSON datafiles into one Parquet datafile per exchange,
+# datafiles/<exchange>_full_tickers-<YYYY-MM>.parquet, and deletes the JSON files once
+# every date has been verified to rebuild its original file byte for byte.
+# The older monthly zip archives can be converted the same way with
+# 'python -m artha_data convert --month YYYY-MM --remove'.
+
 # Get date as YYYY-MM for the prior month
 PRIOR_MONTH=$(date -d "1 month ago" +%Y-%m)
 
-cd ./datafiles
-zip -r amex_full_tickers-${PRIOR_MONTH}.zip amex/*$PRIOR_MONTH*
-zip -r nasdaq_full_tickers-${PRIOR_MONTH}.zip nasdaq/*$PRIOR_MONTH*
-zip -r nyse_full_tickers-${PRIOR_MONTH}.zip nyse/*$PRIOR_MONTH*
-
-rm -fv amex/*$PRIOR_MONTH*
-rm -fv nasdaq/*$PRIOR_MONTH*
-rm -fv nyse/*$PRIOR_MONTH*
+export PYTHONPATH="$(dirname "$0")/../src${PYTHONPATH:+:$PYTHONPATH}"
+python -m artha_data convert --month ${PRIOR_MONTH} --remove
 
-exit 0
+exit $?
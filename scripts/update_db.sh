@@ -4,8 +4,19 @@
 # executes the python batch load_ticker_data.py to insert data from the
 # datafile for that date into the artha.db database.
 # This will be called from a github actions workflow on a schedule.
+# The batch modules import each other, so they run as modules with src on the PYTHONPATH.
 #
-echo "Running command: python src/artha_data/batch/load_ticker_data.py $1"
-python src/artha_data/batch/load_ticker_data.py $1
-echo "Exit status: $?"
-exit $?
+export PYTHONPATH="$(dirname "$0")/../src${PYTHONPATH:+:$PYTHONPATH}"
+# Bring an older database to the current schema first, the loader refuses to write into it otherwise
+echo "Running command: python -m artha_data migrate"
+python -m artha_data migrate
+status=$?
+if [ $status -ne 0 ]; then
+    echo "Exit status: $status"
+    exit $status
+fi
+echo "Running command: python -m artha_data load $1"
+python -m artha_data load $1
+status=$?
+echo "Exit status: $status"
+exit $status
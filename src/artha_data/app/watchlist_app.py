@@ -1,14 +1,29 @@
 import os
+import queue
 import re
+from typing import Any, Callable
 
+import duckdb
+from textual import work
 from textual.app import App, ComposeResult
 from textual.containers import Horizontal
 from textual.widgets import Button, DataTable, Footer, Input, Label, Select
+from textual.worker import get_current_worker
 
 # Use below method of relative import by exporting PYTHONPATH=<...>/src and
 # executing the program as a module with python -m artha_data.app.watchlist_app
+from ..utils.db_helper import DbHelper
 from ..utils.watchlist_helper import WatchlistHelper
 
+# (label, key) of the symbols table columns
+SYMBOL_COLUMNS = [
+    ("Symbol", "symbol"),
+    ("Last", "lastsale"),
+    ("% Chg", "pctchange"),
+    ("Volume", "volume"),
+    ("Adv/Dec", "adv_dec"),
+]
+
 
 # --- Textual App ---
 class WatchlistApp(App):
@@ -39,15 +54,45 @@ class WatchlistApp(App):
 
     def on_mount(self) -> None:
         """Called when the app is mounted."""
-        self.update_watchlist_select()
+        # The app edits watchlists, so its worker threads share a read-write connection from the start
+        DbHelper.open_for_writing()
+        self._changes: queue.Queue[tuple[Callable[..., Any], tuple]] = queue.Queue()
+        self._apply_changes()
         table = self.query_one(DataTable)
-        table.add_column("Symbol")
+        for label, key in SYMBOL_COLUMNS:
+            table.add_column(label, key=key)
+        self.update_watchlist_select()
+
+    def _submit(self, change: Callable[..., Any], *args: Any) -> None:
+        """Queues a watchlist change for the _apply_changes worker."""
+        self._changes.put((change, args))
 
+    @work(thread=True, exclusive=True, group="db")
+    def _apply_changes(self) -> None:
+        """Applies the queued watchlist changes one at a time, in the order
+        they were made, so e.g. deleting a symbol never overtakes adding it.
+        Runs in a background thread for the lifetime of the app. A change that
+        fails is reported and the next ones are still applied."""
+        worker = get_current_worker()
+        while not worker.is_cancelled:
+            try:
+                change, args = self._changes.get(timeout=0.2)
+            except queue.Empty:
+                continue
+            try:
+                change(*args)
+            except duckdb.Error as e:
+                self.call_from_thread(self.notify, f"The change was not saved: {e}", title="Error", severity="error")
+
+    @work(thread=True, exclusive=True, group="watchlists")
     def update_watchlist_select(self):
-        """Updates the watchlist select widget with the latest data."""
-        watchlist_select = self.query_one(Select)
+        """Updates the watchlist select widget with the latest data. Runs in a
+        background thread, the widget is updated on the UI thread."""
         watchlists = WatchlistHelper.get_watchlists()
-        watchlist_select.set_options([(wl[0], wl[0]) for wl in watchlists])
+        self.call_from_thread(self._set_watchlist_options, [(wl[0], wl[0]) for wl in watchlists])
+
+    def _set_watchlist_options(self, options: list[tuple[str, str]]) -> None:
+        self.query_one(Select).set_options(options)
 
     def add_watchlist_handler(self) -> None:
         """Handles functionality for adding a new watchlist from the user
@@ -55,12 +100,20 @@ class WatchlistApp(App):
         new_watchlist_name_input = self.query_one("#new_watchlist_name", Input)
         new_watchlist_name = new_watchlist_name_input.value
         if new_watchlist_name:
-            if WatchlistHelper.watchlist_exists(new_watchlist_name):
-                self.notify(f"Watchlist '{new_watchlist_name}' already exists.", title="Error", severity="error")
-            else:
-                WatchlistHelper.add_watchlist(new_watchlist_name)
-                new_watchlist_name_input.value = ""
-                self.update_watchlist_select()
+            self._submit(self._add_watchlist, new_watchlist_name)
+
+    def _add_watchlist(self, new_watchlist_name: str) -> None:
+        if WatchlistHelper.watchlist_exists(new_watchlist_name):
+            self.call_from_thread(
+                self.notify, f"Watchlist '{new_watchlist_name}' already exists.", title="Error", severity="error"
+            )
+            return
+        WatchlistHelper.add_watchlist(new_watchlist_name)
+        self.call_from_thread(self._watchlist_added)
+
+    def _watchlist_added(self) -> None:
+        self.query_one("#new_watchlist_name", Input).value = ""
+        self.update_watchlist_select()
 
     def add_symbols_handler(self) -> None:
         """Handles the adding of new symbols entered by the user in the Input
@@ -71,30 +124,34 @@ class WatchlistApp(App):
         symbols_str = new_symbol_input.value
         if selected_watchlist and symbols_str:
             symbols = self._process_symbols(symbols_str)
+            new_symbol_input.value = ""
+            self._submit(self._add_symbols, selected_watchlist, symbols)
 
-            new_symbols = []
-            duplicate_symbols = []
+    def _add_symbols(self, selected_watchlist: str, symbols: list[str]) -> None:
+        new_symbols, duplicate_symbols, unknown_symbols = WatchlistHelper.add_symbols_to_watchlist(
+            selected_watchlist, symbols
+        )
 
-            for symbol in symbols:
-                if WatchlistHelper.symbol_exists_in_watchlist(selected_watchlist, symbol):
-                    duplicate_symbols.append(symbol)
-                else:
-                    new_symbols.append(symbol)
+        if duplicate_symbols:
+            self.call_from_thread(
+                self.notify,
+                f"Symbols already exist in watchlist: {', '.join(duplicate_symbols)}",
+                title="Error",
+                severity="error",
+            )
 
-            if duplicate_symbols:
-                self.notify(
-                    f"Symbols already exist in watchlist: {', '.join(duplicate_symbols)}",
-                    title="Error",
-                    severity="error",
-                )
+        if unknown_symbols:
+            self.call_from_thread(
+                self.notify,
+                f"Unknown symbols not added: {', '.join(unknown_symbols)}",
+                title="Error",
+                severity="error",
+            )
 
-            if new_symbols:
-                for symbol in new_symbols:
-                    WatchlistHelper.add_symbol_to_watchlist(selected_watchlist, symbol)
-                self.notify(f"Added symbols: {', '.join(new_symbols)}")
+        if new_symbols:
+            self.call_from_thread(self.notify, f"Added symbols: {', '.join(new_symbols)}")
 
-            new_symbol_input.value = ""
-            self.update_symbols_table(selected_watchlist)
+        self.call_from_thread(self.update_symbols_table, selected_watchlist)
 
     def delete_symbols_handler(self) -> None:
         """Handles the deletion of symbols entered by the user or selected in the table."""
@@ -119,41 +176,44 @@ class WatchlistApp(App):
             self.notify("No symbols to delete.", title="Info", severity="information")
             return
 
-        existent_symbols = []
-        non_existent_symbols = []
+        symbols = list(self.symbols_to_delete)
+        self.symbols_to_delete.clear()
+        symbol_input.value = ""
+        self._submit(self._delete_symbols, selected_watchlist, symbols)
 
-        for symbol in self.symbols_to_delete:
-            if WatchlistHelper.symbol_exists_in_watchlist(selected_watchlist, symbol):
-                existent_symbols.append(symbol)
-            else:
-                non_existent_symbols.append(symbol)
+    def _delete_symbols(self, selected_watchlist: str, symbols: list[str]) -> None:
+        existent_symbols, non_existent_symbols = WatchlistHelper.remove_symbols_from_watchlist(
+            selected_watchlist, symbols
+        )
 
         if non_existent_symbols:
-            self.notify(
+            self.call_from_thread(
+                self.notify,
                 f"Symbols not found in watchlist: {', '.join(non_existent_symbols)}",
                 title="Error",
                 severity="error",
             )
 
         if existent_symbols:
-            WatchlistHelper.delete_symbols_from_watchlist(selected_watchlist, existent_symbols)
-            self.notify(f"Deleted symbols: {', '.join(existent_symbols)}")
-            self.symbols_to_delete.clear()
-        symbol_input.value = ""
-        self.update_symbols_table(selected_watchlist)
+            self.call_from_thread(self.notify, f"Deleted symbols: {', '.join(existent_symbols)}")
+        self.call_from_thread(self.update_symbols_table, selected_watchlist)
 
     def delete_watchlist_handler(self) -> None:
         """Handles deletion of select watchlist"""
         watchlist_select = self.query_one(Select)
         selected_watchlist = watchlist_select.value
         if selected_watchlist:
-            WatchlistHelper.delete_symbols_from_watchlist(selected_watchlist)
-            WatchlistHelper.delete_watchlist(selected_watchlist)
-            # self.update_watchlist_select()
             self.query_one(DataTable).clear()
-            self.notify(f"Watchlist '{selected_watchlist}' deleted.")
             watchlist_select.clear()
-            self.update_watchlist_select()
+            self._submit(self._delete_watchlist, selected_watchlist)
+
+    def _delete_watchlist(self, selected_watchlist: str) -> None:
+        # Not one transaction: DuckDB checks the foreign key against the
+        # committed stocks_lists rows, so the child rows go first
+        WatchlistHelper.delete_all_symbols_from_watchlist(selected_watchlist)
+        WatchlistHelper.delete_watchlist(selected_watchlist)
+        self.call_from_thread(self.notify, f"Watchlist '{selected_watchlist}' deleted.")
+        self.call_from_thread(self.update_watchlist_select)
 
     async def on_button_pressed(self, event: Button.Pressed) -> None:
         """Event handler called when a button is pressed."""
@@ -180,20 +240,47 @@ class WatchlistApp(App):
         symbol. Each click appends to the list.
         TODO - implement multiple row selection.
         """
-        data_table = self.query_one(DataTable)
-        selected_row_key = event.row_key
-        row_data = data_table.get_row(selected_row_key)
-        for s in row_data:
-            self.symbols_to_delete.append(s)
+        # The rows are keyed by symbol
+        self.symbols_to_delete.append(event.row_key.value)
 
+    @work(thread=True, exclusive=True, group="symbols")
     def update_symbols_table(self, watchlist_name):
-        """Updates the symbols table with data for the given watchlist."""
+        """Updates the symbols table with data for the given watchlist. The
+        symbols and their latest prices are fetched with one query in a
+        background thread, a newer request cancels an older one."""
+        rows = WatchlistHelper.get_watchlist_quotes(watchlist_name) if watchlist_name else []
+        if not get_current_worker().is_cancelled:
+            self.call_from_thread(self._apply_symbols_table, [_format_quote(row) for row in rows])
+
+    def _apply_symbols_table(self, rows: list[tuple]) -> None:
+        """Applies the fetched rows to the symbols table, only touching rows
+        and cells that changed."""
         table = self.query_one(DataTable)
-        table.clear()
-        if watchlist_name:
-            symbols = WatchlistHelper.get_symbols_for_watchlist(watchlist_name)
-            for symbol in symbols:
-                table.add_row(symbol[0])
+        wanted = {row[0]: row for row in rows}
+        for row_key in list(table.rows):
+            if row_key.value not in wanted:
+                table.remove_row(row_key)
+        for symbol, row in wanted.items():
+            if symbol not in table.rows:
+                table.add_row(*row, key=symbol)
+                continue
+            current = table.get_row(symbol)
+            for (_, column_key), old, new in zip(SYMBOL_COLUMNS, current, row):
+                if old != new:
+                    table.update_cell(symbol, column_key, new)
+        table.sort("symbol")
+
+
+def _format_quote(row: tuple) -> tuple[str, str, str, str, str]:
+    """Formats a (symbol, lastsale, pctchange, volume, adv_dec) row for the symbols table."""
+    symbol, lastsale, pctchange, volume, adv_dec = row
+    return (
+        symbol,
+        "" if lastsale is None else f"{lastsale:,.2f}",
+        "" if pctchange is None else f"{pctchange:+.2f}%",
+        "" if volume is None else f"{volume:,}",
+        "" if adv_dec is None else {1: "▲", -1: "▼"}.get(adv_dec, "="),
+    )
 
 
 if __name__ == "__main__":
@@ -0,0 +1,413 @@
+import argparse
+import contextlib
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from collections.abc import Iterable, Sequence
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Optional
+
+import duckdb
+import numpy as np
+
+from ..utils.price_history import load_price_history
+from ..utils.settings import get_settings
+from . import calculate_exchange_adv_dec as adv_dec_report
+from .db_init import create_table_if_missing
+from .load_metrics import peak_rss_mb
+from .load_ticker_data import (
+    EXCHANGES,
+    load_data,
+    load_stock_master_data,
+    load_ticker_tape_data,
+    load_ticker_tape_data_bulk,
+)
+
+# Construct a robust, absolute path to the project root.
+_PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", ".."))
+
+# Tables a scratch database needs for the loader and the reports
+_SCRATCH_TABLES = [
+    "stock_master",
+    "industry",
+    "ticker_tape",
+    "load_manifest",
+    "market_breadth",
+    "sector_breadth",
+    "latest_quote",
+]
+_INDUSTRIES = [
+    ("Publishing", "Consumer Discretionary"),
+    ("Industrial Machinery/Components", "Industrials"),
+    ("Semiconductors", "Technology"),
+    ("Major Banks", "Finance"),
+    ("Biotechnology: Pharmaceutical Preparations", "Health Care"),
+    ("Oil & Gas Production", "Energy"),
+    ("Real Estate Investment Trusts", "Real Estate"),
+    ("Electric Utilities: Central", "Utilities"),
+]
+
+
+# 10/18/26 - Reproducible benchmark of the daily load and the breadth report against a scratch database.
+# The datafiles are synthetic but shaped like the NASDAQ screener files, so the same cleaning paths run.
+def trading_days(start: str, days: int) -> list[str]:
+    """Returns the first `days` weekdays from start as 'YYYY-MM-DD' strings."""
+    result: list[str] = []
+    day = datetime.strptime(start, "%Y-%m-%d").date()
+    while len(result) < days:
+        if day.weekday() < 5:
+            result.append(day.isoformat())
+        day += timedelta(days=1)
+    return result
+
+
+def generate_datafiles(
+    root: str,
+    symbols: int = 1000,
+    days: int = 5,
+    exchanges: Sequence[str] = tuple(EXCHANGES),
+    start: str = "2025-01-02",
+    seed: int = 0,
+) -> list[tuple[str, str, str]]:
+    """
+    Writes synthetic exchange datafiles in the datafiles directory layout.
+
+    Every exchange gets `symbols` symbols whose prices follow a random walk over
+    `days` trading days. A few rows per file have empty values, and a few
+    symbols change their name each day so the stock_master merge has updates
+    to apply. The same seed always writes the same files.
+
+    Args:
+        root: Directory to write '<exchange>/<exchange>_full_tickers-YYYY-MM-DD.json' under.
+        symbols: Number of symbols per exchange.
+        days: Number of trading days.
+        exchanges: Exchange names to write files for.
+        start: First load date, 'YYYY-MM-DD'.
+        seed: Seed of the random generator.
+
+    Returns:
+        A list of (load_date, exchange, path) tuples in load order.
+    """
+    rng = np.random.default_rng(seed)
+    jobs = []
+    universe: dict[str, tuple] = {}
+    for exchange in exchanges:
+        # Distinct per exchange, a symbol is listed on one exchange only
+        tickers = [f"{EXCHANGES[exchange][:2].upper()}{i:05d}" for i in range(symbols)]
+        prices = rng.lognormal(3.0, 1.0, symbols).round(2)
+        shares = rng.integers(1_000_000, 2_000_000_000, symbols)
+        industries = rng.integers(0, len(_INDUSTRIES), symbols)
+        ipoyears = np.where(rng.random(symbols) < 0.3, 0, rng.integers(1970, 2025, symbols))
+        universe[exchange] = (tickers, prices, shares, industries, ipoyears)
+
+    for day_number, load_date in enumerate(trading_days(start, days)):
+        for exchange in exchanges:
+            tickers, prices, shares, industries, ipoyears = universe[exchange]
+            previous = prices.copy()
+            prices[:] = np.maximum(0.01, (prices * rng.normal(1.0, 0.02, symbols)).round(2))
+            netchange = (prices - previous).round(2)
+            volume = rng.integers(0, 10_000_000, symbols)
+            blank = rng.random(symbols) < 0.01
+            renamed = rng.random(symbols) < 0.005
+            records = []
+            for i, symbol in enumerate(tickers):
+                industry, sector = _INDUSTRIES[industries[i]]
+                records.append({
+                    "symbol": symbol,
+                    "name": f"{symbol} Holdings {'Corp' if renamed[i] and day_number % 2 else 'Inc'}. Common Stock",
+                    "lastsale": f"${prices[i]:.2f}",
+                    "netchange": "" if blank[i] else f"{netchange[i]:.2f}",
+                    "pctchange": "" if blank[i] else f"{netchange[i] / previous[i] * 100:.3f}%",
+                    "volume": str(volume[i]),
+                    "marketCap": "" if blank[i] else f"{prices[i] * shares[i]:.2f}",
+                    "country": "United States",
+                    "ipoyear": str(ipoyears[i]) if ipoyears[i] else "",
+                    "industry": industry,
+                    "sector": sector,
+                    "url": f"/market-activity/stocks/{symbol.lower()}",
+                })
+            prefix = EXCHANGES[exchange]
+            os.makedirs(os.path.join(root, prefix), exist_ok=True)
+            path = os.path.join(root, prefix, f"{prefix}_full_tickers-{load_date}.json")
+            with open(path, "w") as f:
+                json.dump(records, f)
+            jobs.append((load_date, exchange, path))
+    return jobs
+
+
+def create_scratch_db(db_file: str) -> duckdb.DuckDBPyConnection:
+    """Creates a database with the loader's tables from the schema files and returns a connection to it."""
+    con = duckdb.connect(database=db_file, read_only=False)
+    for table in _SCRATCH_TABLES:
+        create_table_if_missing(con, table)
+    return con
+
+
+def summarize(latencies: Sequence[float], rows: int) -> dict:
+    """
+    Returns the statistics of one benchmark.
+
+    Args:
+        latencies: Seconds taken by each call.
+        rows: Total number of rows processed by the calls.
+
+    Returns:
+        A dict with the call count, rows, total seconds, rows/sec, p50/p95/max
+        latencies in milliseconds and the peak RSS so far in MB.
+    """
+    seconds = float(sum(latencies))
+    ms = np.asarray(latencies) * 1000
+    return {
+        "calls": len(latencies),
+        "rows": int(rows),
+        "seconds": round(seconds, 4),
+        "rows_per_sec": round(rows / seconds, 1) if seconds else 0.0,
+        "p50_ms": round(float(np.percentile(ms, 50)), 3),
+        "p95_ms": round(float(np.percentile(ms, 95)), 3),
+        "max_ms": round(float(ms.max()), 3),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def timed(fn: Callable[..., Any], *args: Any, **kwargs: Any) -> tuple[float, Any]:
+    """Calls fn with the loader's progress output discarded and returns (seconds, result)."""
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        started = time.perf_counter()
+        result = fn(*args, **kwargs)
+        return time.perf_counter() - started, result
+
+
+def read_datafiles(jobs: Iterable[tuple[str, str, str]]) -> list[tuple[str, str, list]]:
+    """Returns the parsed records of every job, so parsing is not part of the component timings."""
+    parsed = []
+    for load_date, exchange, path in jobs:
+        with open(path) as f:
+            parsed.append((load_date, exchange, json.load(f)))
+    return parsed
+
+
+def _time_tape_loads(
+    con: duckdb.DuckDBPyConnection, parsed: list[tuple[str, str, list]], load: Callable[..., int]
+) -> tuple[list[float], int]:
+    # Times load(con, load_date, data, exchange) for every file in a transaction of its own
+    latencies: list[float] = []
+    rows = 0
+    for load_date, exchange, data in parsed:
+        con.begin()
+        seconds, inserted = timed(load, con, load_date, data, exchange)
+        con.commit()
+        latencies.append(seconds)
+        rows += inserted
+    return latencies, rows
+
+
+def bench_components(db_file: str, jobs: list[tuple[str, str, str]]) -> dict:
+    """
+    Times load_stock_master_data, then the per-row load_ticker_tape_data and
+    the bulk load_ticker_tape_data_bulk on the same files, one call per file.
+    """
+    parsed = read_datafiles(jobs)
+    con = create_scratch_db(db_file)
+    try:
+        master = []
+        for _, exchange, data in parsed:
+            con.begin()
+            master.append(timed(load_stock_master_data, con, data, exchange)[0])
+            con.commit()
+        tape, rows = _time_tape_loads(con, parsed, load_ticker_tape_data)
+        # The bulk path loads the same rows again into an empty ticker_tape
+        con.execute("DELETE FROM ticker_tape")
+        bulk, bulk_rows = _time_tape_loads(con, parsed, load_ticker_tape_data_bulk)
+    finally:
+        con.close()
+    return {
+        "load_stock_master_data": summarize(master, sum(len(data) for _, _, data in parsed)),
+        "load_ticker_tape_data": summarize(tape, rows),
+        "load_ticker_tape_data_bulk": summarize(bulk, bulk_rows),
+    }
+
+
+def bench_load_data(db_file: str, jobs: list[tuple[str, str, str]]) -> dict:
+    """Times load_data, one call per file, including the manifest and breadth refreshes."""
+    con = create_scratch_db(db_file)
+    try:
+        latencies, rows = [], 0
+        for load_date, exchange, path in jobs:
+            seconds, inserted = timed(load_data, con, load_date, path, exchange)
+            latencies.append(seconds)
+            rows += inserted or 0
+    finally:
+        con.close()
+    return {"load_data": summarize(latencies, rows)}
+
+
+def bench_adv_dec(db_file: str, repeat: int) -> dict:
+    """Times calculate_exchange_adv_dec against a loaded database."""
+    saved = adv_dec_report.DB_FILE
+    adv_dec_report.DB_FILE = db_file
+    try:
+        latencies, rows = [], 0
+        for _ in range(repeat):
+            seconds, df = timed(adv_dec_report.calculate_exchange_adv_dec)
+            latencies.append(seconds)
+            rows += len(df)
+    finally:
+        adv_dec_report.DB_FILE = saved
+    return {"calculate_exchange_adv_dec": summarize(latencies, rows)}
+
+
+def bench_screen(db_file: str, repeat: int) -> dict:
+    """Times reading the whole ticker_tape history and screening every symbol on the last day."""
+    con = duckdb.connect(database=db_file, read_only=True)
+    try:
+        latencies, rows = [], 0
+        for _ in range(repeat):
+            started = time.perf_counter()
+            screen = load_price_history(con=con).screen()
+            latencies.append(time.perf_counter() - started)
+            rows += len(screen["symbol"])
+    finally:
+        con.close()
+    return {"price_history_screen": summarize(latencies, rows)}
+
+
+def git_commit() -> Optional[str]:
+    """Returns the commit the benchmark runs on, or None outside a git checkout or without git."""
+    git = shutil.which("git")
+    if git is None:
+        return None
+    try:
+        return subprocess.run(  # noqa: S603 - fixed arguments, git resolved from PATH
+            [git, "rev-parse", "--short", "HEAD"], cwd=_PROJECT_ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(
+    symbols: int = 1000,
+    days: int = 5,
+    exchanges: Sequence[str] = tuple(EXCHANGES),
+    repeat: int = 20,
+    seed: int = 0,
+    workdir: Optional[str] = None,
+) -> dict:
+    """
+    Generates the datafiles and runs every benchmark in a scratch directory.
+
+    Args:
+        symbols: Number of symbols per exchange.
+        days: Number of trading days.
+        exchanges: Exchange names to generate files for.
+        repeat: Number of calculate_exchange_adv_dec calls and screens.
+        seed: Seed of the datafile generator.
+        workdir: Directory for the datafiles and scratch databases. Defaults to
+            a temporary directory in the scratch directory (ARTHA_SCRATCH_DIR)
+            that is removed afterwards.
+
+    Returns:
+        A dict with the 'meta' data of the run and the 'results' per benchmark.
+    """
+    with contextlib.ExitStack() as stack:
+        if workdir is None:
+            workdir = stack.enter_context(
+                tempfile.TemporaryDirectory(prefix="artha-bench-", dir=get_settings().scratch_dir)
+            )
+        jobs = generate_datafiles(os.path.join(workdir, "datafiles"), symbols, days, exchanges, seed=seed)
+
+        results: dict = {}
+        results.update(bench_components(os.path.join(workdir, "components.db"), jobs))
+        loaded_db = os.path.join(workdir, "load_data.db")
+        results.update(bench_load_data(loaded_db, jobs))
+        results.update(bench_adv_dec(loaded_db, repeat))
+        results.update(bench_screen(loaded_db, repeat))
+
+    meta = {
+        "commit": git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "duckdb": duckdb.__version__,
+        "platform": platform.platform(),
+        "symbols": symbols,
+        "days": days,
+        "exchanges": list(exchanges),
+        "files": len(jobs),
+        "repeat": repeat,
+        "seed": seed,
+    }
+    return {"meta": meta, "results": results}
+
+
+def compare(baseline: dict, current: dict) -> dict:
+    """
+    Compares two benchmark reports.
+
+    Returns:
+        A dict of benchmark -> {'rows_per_sec': ratio, 'p95_ms': ratio} of
+        current over baseline, for the benchmarks present in both. A
+        rows_per_sec ratio below 1 or a p95_ms ratio above 1 is a regression.
+    """
+    ratios = {}
+    for name, stats in current["results"].items():
+        base = baseline["results"].get(name)
+        if not base:
+            continue
+        ratios[name] = {
+            key: round(stats[key] / base[key], 3) if base[key] else None for key in ("rows_per_sec", "p95_ms")
+        }
+    return ratios
+
+
+def main() -> int:
+    """
+    Main entry point of the benchmark.
+
+    Writes the report as JSON to --output (default: stdout). With --compare the
+    rows/sec and p95 ratios against an earlier report are printed as well.
+    """
+    parser = argparse.ArgumentParser(prog="artha_data.batch.benchmark", description=main.__doc__)
+    parser.add_argument("--symbols", type=int, default=1000, help="symbols per exchange (default: 1000)")
+    parser.add_argument("--days", type=int, default=5, help="trading days (default: 5)")
+    parser.add_argument(
+        "--exchanges", default=",".join(EXCHANGES), help="comma separated exchanges (default: NASDAQ,AMEX,NYSE)"
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=20, help="calculate_exchange_adv_dec calls and screens (default: 20)"
+    )
+    parser.add_argument("--seed", type=int, default=0, help="seed of the synthetic datafiles (default: 0)")
+    parser.add_argument("--workdir", help="keep the datafiles and scratch databases in this directory")
+    parser.add_argument("--output", help="write the JSON report to this file")
+    parser.add_argument("--compare", help="earlier JSON report to compare against")
+    args = parser.parse_args()
+
+    exchanges = [e.strip().upper() for e in args.exchanges.split(",") if e.strip()]
+    unknown = [e for e in exchanges if e not in EXCHANGES]
+    if unknown:
+        print(f"Unknown exchanges: {', '.join(unknown)}")
+        return 2
+
+    report = run_benchmarks(args.symbols, args.days, exchanges, args.repeat, args.seed, args.workdir)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+        print(f"Wrote benchmark report to {args.output}")
+    else:
+        print(text)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        print(f"Compared to {baseline['meta'].get('commit')} (ratio current/baseline):")
+        for name, ratios in compare(baseline, report).items():
+            print(f"  {name:<28} rows/sec x{ratios['rows_per_sec']}  p95 x{ratios['p95_ms']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
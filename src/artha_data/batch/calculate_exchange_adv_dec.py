@@ -1,58 +1,149 @@
-import os
-import duckdb
+import argparse
+import sys
+from typing import Any, Optional
+
 import pandas as pd
-import seaborn as sns
-import matplotlib.pyplot as plt
-import matplotlib.dates as mdates
 
-# Construct a robust, absolute path to the database file.
-_PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", ".."))
-_DB_DIR = os.path.join(_PROJECT_ROOT, "data")
-DB_FILE = os.path.join(_DB_DIR, "artha.db")
+from ..utils.settings import get_settings
+from .load_metrics import current_metrics, enable_json_logs, load_run
+
+# The report reads the replica when there is one (ARTHA_REPORT_DB_FILE), so
+# it can run while the loader writes the primary database
+DB_FILE = get_settings().report_db_file
+
 
 def calculate_exchange_adv_dec():
     """
     Calculates the sum of adv_dec for each exchange for each load_date and returns a DataFrame.
+
+    The sums are read from the precomputed market_breadth table. Databases that
+    do not have that table yet fall back to aggregating the whole ticker_tape.
     """
-    con = duckdb.connect(database=DB_FILE, read_only=True)
-    query = """
+    metrics = current_metrics()
+    con = get_settings().connect(DB_FILE, read_only=True)
+    has_breadth = con.execute("SELECT 1 FROM information_schema.tables WHERE table_name = 'market_breadth'").fetchone()
+    if has_breadth:
+        query = """
+            SELECT
+                load_date,
+                exchange,
+                advancers - decliners AS total_adv_dec
+            FROM
+                market_breadth
+            ORDER BY
+                load_date,
+                exchange;
+        """
+    else:
+        query = """
+            SELECT
+                tt.load_date,
+                sm.exchange,
+                SUM(tt.adv_dec) AS total_adv_dec
+            FROM
+                ticker_tape tt
+            JOIN
+                stock_master sm ON tt.symbol = sm.symbol
+            GROUP BY
+                tt.load_date,
+                sm.exchange
+            ORDER BY
+                tt.load_date,
+                sm.exchange;
+        """
+    with metrics.phase("query"):
+        df = con.execute(query).fetchdf()
+    con.close()
+    with metrics.phase("transform"):
+        df["load_date"] = pd.to_datetime(df["load_date"])
+    metrics.count("rows_accepted", len(df))
+    return df
+
+
+def calculate_breadth_metrics() -> Any:
+    """
+    Returns the daily breadth per exchange from the market_breadth table, with
+    the net advances, the up/down volume ratio and the McClellan oscillator
+    (19-day EMA minus 39-day EMA of the net advances) added as columns.
+    """
+    con = get_settings().connect(DB_FILE, read_only=True)
+    df = con.execute(
+        """
         SELECT
-            tt.load_date,
-            sm.exchange,
-            SUM(tt.adv_dec) AS total_adv_dec
+            load_date, exchange, advancers, decliners, unchanged,
+            total_volume, up_volume, down_volume, ad_line
         FROM
-            ticker_tape tt
-        JOIN
-            stock_master sm ON tt.symbol = sm.symbol
-        GROUP BY
-            tt.load_date,
-            sm.exchange
+            market_breadth
         ORDER BY
-            tt.load_date,
-            sm.exchange;
-    """
-    df = con.execute(query).fetchdf()
-    df['load_date'] = pd.to_datetime(df['load_date'])
+            exchange,
+            load_date;
+        """
+    ).fetchdf()
     con.close()
-    return df
+    df["load_date"] = pd.to_datetime(df["load_date"])
+    df["net_advances"] = df["advancers"] - df["decliners"]
+    df["up_down_volume_ratio"] = df["up_volume"] / df["down_volume"].where(df["down_volume"] != 0)
+    by_exchange = df.groupby("exchange")["net_advances"]
+    ema19 = by_exchange.transform(lambda s: s.ewm(span=19, adjust=False).mean())
+    ema39 = by_exchange.transform(lambda s: s.ewm(span=39, adjust=False).mean())
+    df["mcclellan_oscillator"] = ema19 - ema39
+    return df.sort_values(["load_date", "exchange"]).reset_index(drop=True)
+
 
-def plot_adv_dec_by_exchange(df):
+def plot_adv_dec_by_exchange(df: Any, output: Optional[str] = None) -> None:
     """
     Plots the total adv_dec by exchange over time.
+
+    Args:
+        df: The DataFrame returned by calculate_exchange_adv_dec.
+        output: Path of an image file to write the chart to instead of showing
+            it, e.g. 'breadth.png' or 'breadth.svg'. Writing a file needs no
+            display, so it works on CI runners.
     """
+    # Imported here, matplotlib and seaborn take longer to import than the report takes to run
+    import matplotlib
+
+    if output:
+        matplotlib.use("Agg")
+    import matplotlib.dates as mdates
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
     plt.figure(figsize=(12, 6))
-    ax = sns.lineplot(data=df, x='load_date', y='total_adv_dec', hue='exchange')
-    plt.title('Advance/Decline by Exchange')
-    plt.xlabel('Date')
-    plt.ylabel('Total Advance/Decline')
+    ax = sns.lineplot(data=df, x="load_date", y="total_adv_dec", hue="exchange")
+    plt.title("Advance/Decline by Exchange")
+    plt.xlabel("Date")
+    plt.ylabel("Total Advance/Decline")
     plt.grid(True)
 
     # Add minor ticks for each day
     ax.xaxis.set_minor_locator(mdates.DayLocator())
-    plt.grid(which='minor', axis='x', linestyle='--')
+    plt.grid(which="minor", axis="x", linestyle="--")
+
+    if output:
+        plt.savefig(output, bbox_inches="tight")
+        plt.close()
+        print(f"Wrote the advance/decline chart to {output}")
+    else:
+        plt.show()
+
+
+def main(argv: Optional[list] = None) -> int:
+    """
+    Main entry point of the advance/decline report. Plots the chart, or with
+    --output writes it to a PNG/SVG file without a display.
+    """
+    parser = argparse.ArgumentParser(prog="artha_data.batch.calculate_exchange_adv_dec", description=main.__doc__)
+    parser.add_argument("--output", help="image file to write the chart to, e.g. breadth.png or breadth.svg")
+    args = parser.parse_args(argv)
+
+    enable_json_logs()
+    with load_run(None, "calculate_exchange_adv_dec") as metrics:
+        adv_dec_df = calculate_exchange_adv_dec()
+        with metrics.phase("plot"):
+            plot_adv_dec_by_exchange(adv_dec_df, args.output)
+    return 0
 
-    plt.show()
 
 if __name__ == "__main__":
-    adv_dec_df = calculate_exchange_adv_dec()
-    plot_adv_dec_by_exchange(adv_dec_df)
+    sys.exit(main())
@@ -0,0 +1,313 @@
+import argparse
+import hashlib
+import json
+import os
+import re
+import sys
+import zipfile
+from collections import namedtuple
+from collections.abc import Iterable
+from typing import Any, Optional, Union
+
+import duckdb
+import pandas as pd  # type: ignore[import-untyped]
+
+from ..utils.settings import get_settings
+from .load_ticker_data import (
+    EXCHANGES,
+    datafile_fingerprint,
+    datafile_name,
+    find_datafiles,
+    is_parquet_datafile,
+    open_datafile,
+)
+from .parquet_datafiles import (
+    FIELDS,
+    SOURCE_FORMATS,
+    parquet_datafile_path,
+    read_parquet_datafile,
+    rebuild_datafile,
+    write_parquet_datafile,
+)
+
+# The load date in the name of a datafile or zip archive member
+_LOAD_DATE_RE = re.compile(r"_full_tickers-(\d{4}-\d{2}-\d{2})\.json")
+
+# The outcome of converting one exchange-month: the JSON sources converted, the
+# dates in the Parquet datafile and the bytes before and after
+ConvertResult = namedtuple("ConvertResult", ["path", "sources", "dates", "rows", "source_bytes", "parquet_bytes"])
+
+
+def source_format(content: bytes, records: Any) -> str:
+    """
+    Returns the name of the SOURCE_FORMATS layout that gives back the exact
+    bytes of a JSON datafile from its records.
+
+    Raises:
+        TypeError: if the records are not a list.
+        ValueError: if the records are not all made of the FIELDS as strings,
+            or no layout reproduces the bytes, i.e. the file cannot be
+            converted losslessly.
+    """
+    if not isinstance(records, list):
+        msg = "the datafile is not a JSON array of records"
+        raise TypeError(msg)
+    if not records:
+        # A date is stored as its rows, an empty file would be lost
+        msg = "the datafile has no records"
+        raise ValueError(msg)
+    for record in records:
+        if not isinstance(record, dict) or tuple(record) != FIELDS:
+            msg = f"unexpected record keys: {record!r:.200}"
+            raise ValueError(msg)
+        if not all(isinstance(value, str) for value in record.values()):
+            msg = f"unexpected non-text value: {record!r:.200}"
+            raise ValueError(msg)
+    for name, dump in SOURCE_FORMATS.items():
+        if dump(records) == content:
+            return name
+    msg = "no known JSON layout reproduces the datafile's bytes"
+    raise ValueError(msg)
+
+
+def _source_frame(load_date: str, records: list, fingerprint: tuple, format_name: str) -> Any:
+    # The raw text of a day's records with the columns typed_select expects
+    frame = pd.DataFrame.from_records(records, columns=list(FIELDS)).astype("string")
+    frame.insert(0, "pos", range(len(frame)))
+    frame.insert(0, "load_date", load_date)
+    frame["source_size"] = fingerprint[0]
+    frame["source_hash"] = fingerprint[1]
+    frame["source_format"] = format_name
+    return frame
+
+
+def read_source(load_date: str, datafile: Union[str, tuple]) -> tuple:
+    """
+    Reads one date to convert, either from a JSON datafile or from the
+    existing Parquet datafile of its month.
+
+    Returns:
+        A (frame, fingerprint) tuple, frame holding the columns typed_select
+        expects and fingerprint the (size, sha256) of the original JSON file.
+    Raises:
+        ValueError: if a JSON datafile cannot be converted losslessly.
+    """
+    if is_parquet_datafile(datafile):
+        frame, source = read_parquet_datafile(*datafile)
+        return _source_frame(load_date, frame.to_dict("records"), source[:2], source[2]), source[:2]
+    with open_datafile(datafile) as f:
+        content = f.read()
+    fingerprint = len(content), hashlib.sha256(content).hexdigest()
+    try:
+        records = json.loads(content)
+        format_name = source_format(content, records)
+    except (TypeError, ValueError) as e:
+        msg = f"{datafile_name(datafile)} cannot be converted: {e}"
+        raise ValueError(msg) from e
+    return _source_frame(load_date, records, fingerprint, format_name), fingerprint
+
+
+def verify_parquet_datafile(path: str, fingerprints: dict) -> None:
+    """
+    Checks that every date of a Parquet datafile rebuilds the exact bytes of
+    the JSON file it was converted from.
+
+    Args:
+        path: The Parquet datafile.
+        fingerprints: A dictionary of load date -> (size, sha256) of the
+            original JSON files.
+
+    Raises:
+        ValueError: on the first date that does not round-trip.
+    """
+    for load_date, fingerprint in fingerprints.items():
+        frame, source = read_parquet_datafile(path, load_date)
+        content = rebuild_datafile(frame, source[2])
+        if (len(content), hashlib.sha256(content).hexdigest()) != tuple(fingerprint):
+            msg = f"{load_date} does not round-trip through {os.path.basename(path)}"
+            raise ValueError(msg)
+
+
+def convert_month(datafiles: list, prefix: str, month: str, datafile_dir: Optional[str] = None) -> ConvertResult:
+    """
+    Converts an exchange's datafiles of one month into its Parquet datafile.
+
+    The dates already in the month's Parquet datafile are kept unless a JSON
+    datafile of the same date replaces them. The new file is written next to
+    the old one and only moved into place once every date has been read back
+    and rebuilt into the exact bytes of its JSON file.
+
+    Args:
+        datafiles: The month's (load_date, datafile) pairs as found by
+            find_datafiles.
+        prefix: The exchange's datafile prefix, e.g. 'nasdaq'.
+        month: The month as 'YYYY-MM'.
+        datafile_dir: Root directory of the datafiles (default: the
+            datafiles_dir setting).
+
+    Returns:
+        A ConvertResult.
+    Raises:
+        ValueError: if a datafile cannot be converted losslessly, the Parquet
+            datafile is then left as it was.
+    """
+    path = parquet_datafile_path(datafile_dir or get_settings().datafiles_dir, prefix, month)
+    frames = []
+    fingerprints: dict[str, tuple] = {}
+    sources = []
+    source_bytes = 0
+    for load_date, datafile in datafiles:
+        frame, fingerprint = read_source(load_date, datafile)
+        frames.append(frame)
+        fingerprints[load_date] = fingerprint
+        source_bytes += fingerprint[0]
+        if not is_parquet_datafile(datafile):
+            sources.append(datafile)
+
+    tmp_path = path + ".tmp"
+    con = duckdb.connect()
+    try:
+        con.register("raw_datafiles", pd.concat(frames, ignore_index=True))
+        write_parquet_datafile(con, "raw_datafiles", tmp_path)
+        verify_parquet_datafile(tmp_path, fingerprints)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    finally:
+        con.close()
+    os.replace(tmp_path, path)
+    rows = sum(len(frame) for frame in frames)
+    return ConvertResult(path, sources, sorted(fingerprints), rows, source_bytes, os.path.getsize(path))
+
+
+def remove_sources(result: ConvertResult) -> int:
+    """
+    Deletes the JSON datafiles converted into a Parquet datafile.
+
+    Daily files are deleted. A zip archive is deleted only when each of its
+    members was converted or has the same content as the converted date, any
+    other archive is kept.
+
+    Returns:
+        The number of files deleted.
+    """
+    fingerprints: dict = {}
+    archives: dict[str, set] = {}
+    removed = 0
+    for datafile in result.sources:
+        if isinstance(datafile, str):
+            os.remove(datafile)
+            removed += 1
+        else:
+            archives.setdefault(datafile[0], set()).add(datafile[1])
+    for archive, converted in archives.items():
+        with zipfile.ZipFile(archive) as zf:
+            members = [name for name in zf.namelist() if not name.endswith("/")]
+        for member in set(members) - converted:
+            match = _LOAD_DATE_RE.search(member)
+            load_date = match and match.group(1)
+            if load_date not in result.dates:
+                break
+            if load_date not in fingerprints:
+                fingerprints[load_date] = datafile_fingerprint((result.path, load_date))
+            if datafile_fingerprint((archive, member)) != fingerprints[load_date]:
+                break
+        else:
+            os.remove(archive)
+            removed += 1
+            continue
+        print(f"Keeping {os.path.basename(archive)}, it has files that were not converted.")
+    return removed
+
+
+def convert_datafiles(
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    exchanges: Optional[Iterable[str]] = None,
+    datafile_dir: Optional[str] = None,
+    remove: bool = False,
+) -> list:
+    """
+    Converts the JSON datafiles, daily and archived, into monthly Parquet datafiles.
+
+    Each exchange-month gets one Parquet datafile with the load date as a
+    column, see parquet_datafiles. Months whose dates are all in their
+    Parquet datafile already are skipped.
+
+    Args:
+        start_date: First load date to convert as 'YYYY-MM-DD', or None.
+        end_date: Last load date to convert as 'YYYY-MM-DD', or None.
+        exchanges: Exchange names to convert (default: all).
+        datafile_dir: Root directory of the datafiles (default: the
+            datafiles_dir setting).
+        remove: Delete the converted JSON datafiles and zip archives.
+
+    Returns:
+        A list of ConvertResult, one per converted exchange-month.
+    Raises:
+        ValueError: if a datafile cannot be converted losslessly.
+    """
+    datafile_dir = datafile_dir or get_settings().datafiles_dir
+    months: dict[tuple, list] = {}
+    for load_date, exchange, datafile in find_datafiles(start_date, end_date, datafile_dir=datafile_dir):
+        if exchanges and exchange not in exchanges:
+            continue
+        months.setdefault((EXCHANGES[exchange], load_date[:7]), []).append((load_date, datafile))
+
+    results = []
+    for (prefix, month), datafiles in sorted(months.items()):
+        if all(is_parquet_datafile(datafile) for _, datafile in datafiles):
+            continue
+        print(f"Converting {len(datafiles)} {prefix} datafiles of {month}...")
+        result = convert_month(datafiles, prefix, month, datafile_dir)
+        print(
+            f"Wrote {os.path.basename(result.path)}: {result.rows} rows, "
+            f"{result.source_bytes / 1e6:.1f} MB of JSON in {result.parquet_bytes / 1e6:.1f} MB"
+        )
+        if remove:
+            print(f"Removed {remove_sources(result)} converted files.")
+        results.append(result)
+    return results
+
+
+def main(argv: Optional[list] = None) -> int:
+    """
+    Main entry point to convert the JSON datafiles into monthly Parquet datafiles.
+
+    Every date is verified to rebuild its original JSON file byte for byte
+    before the Parquet datafile replaces anything. With --remove the converted
+    JSON files and zip archives are deleted afterwards.
+    """
+    parser = argparse.ArgumentParser(prog="artha_data.batch.convert_datafiles", description=main.__doc__)
+    parser.add_argument("--from", dest="start_date", metavar="DATE", help="first load date, YYYY-MM-DD")
+    parser.add_argument("--to", dest="end_date", metavar="DATE", help="last load date, YYYY-MM-DD")
+    parser.add_argument("--month", help="only this month, YYYY-MM")
+    parser.add_argument(
+        "--exchange", dest="exchanges", action="append", choices=list(EXCHANGES), help="exchange to convert, repeatable"
+    )
+    parser.add_argument("--remove", action="store_true", help="delete the converted JSON datafiles and zip archives")
+    args = parser.parse_args(sys.argv[1:] if argv is None else argv)
+
+    start_date, end_date = args.start_date, args.end_date
+    if args.month:
+        start_date, end_date = f"{args.month}-01", f"{args.month}-31"
+    try:
+        results = convert_datafiles(start_date, end_date, args.exchanges, remove=args.remove)
+    except (OSError, ValueError) as e:
+        print(f"Conversion was unsuccessful: {e}")
+        return 1
+    if not results:
+        print("No datafiles to convert.")
+        return 0
+    source_bytes = sum(result.source_bytes for result in results)
+    parquet_bytes = sum(result.parquet_bytes for result in results)
+    print(
+        f"Converted {len(results)} exchange-months, {sum(result.rows for result in results)} rows: "
+        f"{source_bytes / 1e6:.1f} MB of JSON in {parquet_bytes / 1e6:.1f} MB of Parquet."
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
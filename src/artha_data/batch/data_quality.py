@@ -0,0 +1,255 @@
+import sys
+from datetime import datetime
+from typing import Any, Optional
+
+import duckdb
+
+from ..utils.settings import get_settings
+from .db_init import create_table_if_missing, execute_count
+from .load_metrics import current_metrics
+
+# The database is resolved by the settings (ARTHA_DB_FILE, default data/artha.db)
+DB_FILE = get_settings().db_file
+
+# Reason codes of the ticker_tape checks, in the order they are reported. Each
+# one is a column of quality_summary.
+REASONS = ("missing_symbol", "unparsable_price", "negative_volume", "unknown_symbol", "duplicate", "price_jump")
+
+# A price that moved by more than this factor since the symbol's previous
+# price is implausible, unless the row's own netchange explains it
+MAX_PRICE_RATIO = 10.0
+# How far lastsale - netchange may be off the previous price and still explain a jump, relative to the price
+PRICE_JUMP_TOLERANCE = 0.01
+# Days before the load date searched for the symbol's previous price
+PRICE_LOOKBACK_DAYS = 31
+
+# Temp table with the last checked batch, the loader inserts its accepted rows
+CHECKED_TABLE = "ticker_tape_checked"
+
+
+def check_ticker_tape_batch(
+    con: duckdb.DuckDBPyConnection, batch: Any, max_price_ratio: float = MAX_PRICE_RATIO
+) -> dict:
+    """
+    Checks a cleaned ticker_tape batch as whole columns and quarantines the bad rows.
+
+    Every row gets the list of the checks it fails, in one DuckDB statement:
+    missing_symbol, unparsable_price (a non-empty price or volume that could
+    not be parsed), negative_volume, unknown_symbol (not in stock_master),
+    duplicate (already loaded for the date, or listed earlier in the batch)
+    and price_jump (lastsale moved by more than max_price_ratio against the
+    symbol's previous price, and the row's netchange does not account for
+    it). The previous price is the last one seen, quarantined rows included,
+    so after e.g. a reverse split only the first day at the new price level is
+    quarantined and not every following day. The checked rows are kept in the ticker_tape_checked temp
+    table, rows failing any check are copied to ticker_tape_quarantine and
+    counted as rejects of the current run.
+
+    Args:
+        con: Active DuckDB connection.
+        batch: A DataFrame as returned by load_ticker_data.build_ticker_tape_batch.
+        max_price_ratio: See MAX_PRICE_RATIO.
+
+    Returns:
+        A dict of reason code -> number of rows failing the check, only the
+        reasons that occurred. A row failing several checks is counted once
+        per reason.
+    """
+    create_table_if_missing(con, "ticker_tape_quarantine")
+    if "unparsable" not in batch.columns:
+        batch = batch.assign(unparsable=False)
+    con.register("ticker_tape_batch", batch)
+    try:
+        con.execute(
+            f"""
+            CREATE OR REPLACE TEMP TABLE {CHECKED_TABLE} AS
+            WITH b AS (
+                SELECT *, CAST(load_date AS DATE) AS tape_date, row_number() OVER () AS batch_pos
+                FROM ticker_tape_batch
+            ),
+            observed AS (
+                SELECT symbol, load_date, CAST(lastsale AS DOUBLE) AS lastsale FROM ticker_tape
+                UNION ALL
+                SELECT symbol, load_date, lastsale FROM ticker_tape_quarantine
+            ),
+            prev AS (
+                SELECT o.symbol, arg_max(o.lastsale, o.load_date) AS prev_lastsale
+                FROM observed o
+                WHERE o.load_date < (SELECT min(tape_date) FROM b)
+                  AND o.load_date >= (SELECT min(tape_date) FROM b) - CAST($lookback AS INTEGER)
+                  AND o.lastsale IS NOT NULL
+                  AND o.symbol IN (SELECT symbol FROM b)
+                GROUP BY o.symbol
+            )
+            SELECT
+                b.*,
+                p.prev_lastsale,
+                list_filter([
+                    CASE WHEN b.symbol IS NULL OR trim(b.symbol) = '' THEN 'missing_symbol' END,
+                    CASE WHEN b.unparsable THEN 'unparsable_price' END,
+                    CASE WHEN b.volume < 0 THEN 'negative_volume' END,
+                    CASE WHEN b.symbol IS NOT NULL AND NOT EXISTS (
+                        SELECT 1 FROM stock_master sm WHERE sm.symbol = b.symbol
+                    ) THEN 'unknown_symbol' END,
+                    CASE WHEN b.symbol IS NOT NULL AND (
+                        row_number() OVER (PARTITION BY b.symbol ORDER BY b.batch_pos) > 1
+                        OR EXISTS (
+                            SELECT 1 FROM ticker_tape tt WHERE tt.symbol = b.symbol AND tt.load_date = b.tape_date
+                        )
+                    ) THEN 'duplicate' END,
+                    CASE WHEN p.prev_lastsale > 0 AND b.lastsale > 0
+                        AND greatest(b.lastsale / p.prev_lastsale, p.prev_lastsale / b.lastsale) > $max_ratio
+                        AND (b.netchange IS NULL
+                             OR abs(b.lastsale - b.netchange - p.prev_lastsale) > $tolerance * p.prev_lastsale)
+                    THEN 'price_jump' END
+                ], reason -> reason IS NOT NULL) AS reasons
+            FROM b
+            LEFT JOIN prev p ON p.symbol = b.symbol
+            """,  # noqa: S608 - CHECKED_TABLE is a constant
+            {"lookback": PRICE_LOOKBACK_DAYS, "max_ratio": max_price_ratio, "tolerance": PRICE_JUMP_TOLERANCE},
+        )
+    finally:
+        con.unregister("ticker_tape_batch")
+
+    quarantined = execute_count(
+        con,
+        f"""
+        INSERT INTO ticker_tape_quarantine (
+            load_date, exchange, symbol, reasons, lastsale, netchange, pctchange, volume, marketCap, prev_lastsale,
+            nd_sector, nd_industry
+        )
+        SELECT
+            tape_date, exchange, symbol, reasons, lastsale, netchange, pctchange, volume, marketCap, prev_lastsale,
+            nd_sector, nd_industry
+        FROM {CHECKED_TABLE}
+        WHERE len(reasons) > 0
+        ORDER BY batch_pos
+        """,  # noqa: S608 - CHECKED_TABLE is a constant
+    )
+    counts = dict(
+        con.execute(
+            f"SELECT reason, count(*) FROM (SELECT unnest(reasons) AS reason FROM {CHECKED_TABLE}) GROUP BY reason"  # noqa: S608 - CHECKED_TABLE is a constant
+        ).fetchall()
+    )
+    counts = {reason: counts[reason] for reason in REASONS if reason in counts}
+    current_metrics().reject_rows(quarantined, counts)
+    return counts
+
+
+def delete_quarantine(con: duckdb.DuckDBPyConnection, load_date: str, exchange: str) -> int:
+    """Deletes the quarantined rows of one exchange and date, e.g. before its file is reloaded."""
+    create_table_if_missing(con, "ticker_tape_quarantine")
+    return execute_count(
+        con, "DELETE FROM ticker_tape_quarantine WHERE load_date = ? AND exchange = ?", (load_date, exchange)
+    )
+
+
+def refresh_quality_summary(con: duckdb.DuckDBPyConnection, load_date: Optional[str] = None) -> int:
+    """
+    Recomputes the quality_summary rows of one load date, or of all dates.
+
+    The accepted rows are counted in ticker_tape, the quarantined rows and
+    their reasons in ticker_tape_quarantine. The caller is responsible for
+    committing, so the loader can refresh the summary in the same transaction
+    as the day's data.
+
+    Args:
+        con: Active DuckDB connection.
+        load_date: The load date to refresh as 'YYYY-MM-DD', or None to rebuild
+            the whole table.
+
+    Returns:
+        The number of quality_summary rows written.
+    """
+    create_table_if_missing(con, "quality_summary")
+    create_table_if_missing(con, "ticker_tape_quarantine")
+    if load_date is None:
+        con.execute("DELETE FROM quality_summary")
+    else:
+        con.execute("DELETE FROM quality_summary WHERE load_date = ?", (load_date,))
+
+    reason_columns = ", ".join(REASONS)
+    reason_counts = ", ".join(f"count(*) FILTER (WHERE list_contains(reasons, '{r}')) AS {r}" for r in REASONS)
+    reason_values = ", ".join(f"COALESCE(q.{reason}, 0)" for reason in REASONS)
+    # Rows without an exchange were not loaded from an exchange file and are not summarized
+    return execute_count(
+        con,
+        f"""
+        INSERT INTO quality_summary (
+            load_date, exchange, rows_checked, rows_accepted, rows_quarantined, {reason_columns}
+        )
+        WITH accepted AS (
+            SELECT load_date, CAST(exchange AS TEXT) AS exchange, count(*) AS rows_accepted
+            FROM ticker_tape
+            WHERE exchange IS NOT NULL AND ($load_date IS NULL OR load_date = CAST($load_date AS DATE))
+            GROUP BY load_date, exchange
+        ),
+        q AS (
+            SELECT load_date, exchange, count(*) AS rows_quarantined, {reason_counts}
+            FROM ticker_tape_quarantine
+            WHERE exchange IS NOT NULL AND ($load_date IS NULL OR load_date = CAST($load_date AS DATE))
+            GROUP BY load_date, exchange
+        )
+        SELECT
+            COALESCE(a.load_date, q.load_date),
+            COALESCE(a.exchange, q.exchange),
+            COALESCE(a.rows_accepted, 0) + COALESCE(q.rows_quarantined, 0),
+            COALESCE(a.rows_accepted, 0),
+            COALESCE(q.rows_quarantined, 0),
+            {reason_values}
+        FROM accepted a
+        FULL OUTER JOIN q ON a.load_date = q.load_date AND a.exchange = q.exchange
+        ORDER BY 1, 2
+        """,  # noqa: S608 - the reason columns come from REASONS, the values are bound
+        {"load_date": load_date},
+    )
+
+
+def main(argv: Optional[list] = None) -> int:
+    """
+    Main entry point to inspect the data quality of one load date.
+
+    Prints the date's quality_summary rows and its quarantined ticker tape
+    rows. With --refresh the summary is recomputed first.
+    """
+    args = sys.argv[1:] if argv is None else list(argv)
+    refresh = "--refresh" in args
+    args = [arg for arg in args if arg != "--refresh"]
+    if len(args) != 1:
+        print("Usage: python -m artha_data.batch.data_quality [--refresh] YYYY-MM-DD")
+        return 1
+    try:
+        load_date = datetime.strptime(args[0], "%Y-%m-%d").strftime("%Y-%m-%d")
+    except ValueError:
+        print("Invalid date format. Please use YYYY-MM-DD.")
+        return 2
+
+    con = get_settings().connect(DB_FILE, read_only=not refresh)
+    try:
+        if refresh:
+            con.begin()
+            refresh_quality_summary(con, load_date)
+            con.commit()
+        summary = con.execute(
+            "SELECT * EXCLUDE (created_at) FROM quality_summary WHERE load_date = ? ORDER BY exchange", (load_date,)
+        ).fetchdf()
+        quarantined = con.execute(
+            """
+            SELECT exchange, symbol, reasons, lastsale, prev_lastsale, netchange, volume
+            FROM ticker_tape_quarantine WHERE load_date = ? ORDER BY exchange, symbol
+            """,
+            (load_date,),
+        ).fetchdf()
+    except duckdb.Error as e:
+        print(f"Data quality report was unsuccessful: {e}")
+        return -1
+    finally:
+        con.close()
+    print(summary.to_string(index=False) if len(summary) else f"No quality summary for {load_date}")
+    if len(quarantined):
+        print(quarantined.to_string(index=False))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,17 +1,30 @@
+import errno
+import hashlib
 import os
+import re
+import shutil
 import sys
+from collections import namedtuple
+from graphlib import CycleError, TopologicalSorter
+from typing import Optional
 
 import duckdb
 
-# Construct a robust, absolute path to the database file.
-# This assumes the script is in 'src/artha-data' and the db is in 'data/' at the project root.
-_PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", ".."))
-_DB_DIR = os.path.join(_PROJECT_ROOT, "data")
-os.makedirs(_DB_DIR, exist_ok=True)  # Ensure the data directory exists
-DB_FILE = os.path.join(_DB_DIR, "artha.db")
-SCHEMA_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "schemas")) # schemas is in src/artha_data
+from ..utils.settings import get_settings
+from .load_metrics import current_metrics, enable_json_logs, load_run
 
-#SCHEMA_DIR = os.path.join(os.path.dirname(__file__), "schemas")
+# The database is resolved by the settings (ARTHA_DB_FILE, default data/artha.db)
+DB_FILE = get_settings().db_file
+SCHEMA_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "schemas"))  # schemas is in src/artha_data
+
+# Schema files that are not part of the database (my_table.sql is the project template's sample)
+EXCLUDED_SCHEMAS = ("my_table",)
+
+_CREATE_TABLE = re.compile(r'CREATE\s+TABLE\s+(?:IF\s+NOT\s+EXISTS\s+)?"?(\w+)"?', re.IGNORECASE)
+_REFERENCES = re.compile(r'REFERENCES\s+"?(\w+)"?', re.IGNORECASE)
+
+# A table's schema: the .sql file name without extension, its DDL and the tables its foreign keys reference
+Schema = namedtuple("Schema", ["table", "name", "sql", "depends"])
 
 
 def table_exists(connection: duckdb.DuckDBPyConnection, table_name: str) -> bool:
@@ -28,47 +41,418 @@ def table_exists(connection: duckdb.DuckDBPyConnection, table_name: str) -> bool
         return False
 
 
-def create_table_from_schema(table_name: str):
+def table_columns(connection: duckdb.DuckDBPyConnection, table_name: str) -> list:
     """
-    Creates a table in the DuckDB database using a .sql schema file.
+    Returns the column names of a table in definition order, an empty list if it does not exist.
     """
-    schema_file = os.path.join(SCHEMA_DIR, f"{table_name}.sql")
+    rows = connection.execute(
+        "SELECT column_name FROM information_schema.columns WHERE table_name = ? ORDER BY ordinal_position",
+        [table_name],
+    ).fetchall()
+    return [row[0] for row in rows]
 
-    if not os.path.exists(schema_file):
-        print(f"Error: Schema file not found at '{schema_file}'")
-        sys.exit(1)
 
+def execute_count(connection: duckdb.DuckDBPyConnection, query: str, parameters: object = None) -> int:
+    """
+    Runs a statement that produces a single count and returns it, e.g. the
+    rows written by an INSERT, DELETE or COPY or a SELECT count(*).
+    """
+    row = connection.execute(query, parameters).fetchone()
+    return int(row[0]) if row is not None else 0
+
+
+def read_schema(table_name: str) -> str:
+    """
+    Returns the DDL from the table's .sql schema file with the SQL comment lines removed.
+    """
+    with open(os.path.join(SCHEMA_DIR, f"{table_name}.sql")) as f:
+        return "".join(line for line in f if not line.strip().startswith("--"))
+
+
+def create_table_if_missing(connection: duckdb.DuckDBPyConnection, table_name: str) -> bool:
+    """
+    Creates a table from its .sql schema file on the given connection unless it
+    already exists. Unlike create_table_from_schema, errors are raised to the
+    caller. Returns True if the table was created.
+    """
+    metrics = current_metrics()
+    with metrics.phase("db_init"):
+        if table_exists(connection, table_name):
+            return False
+        connection.execute(read_schema(table_name))
+    metrics.count("tables_created")
+    return True
+
+
+def _compact_ticker_tape(con: duckdb.DuckDBPyConnection) -> None:
+    from .migrate_ticker_tape import migrate_ticker_tape, needs_migration
+
+    if table_exists(con, "ticker_tape") and needs_migration(con):
+        migrate_ticker_tape(con, transaction=False)
+
+
+def _seed_stock_master_history(con: duckdb.DuckDBPyConnection) -> None:
+    from .stock_master_history import seed_stock_master_history
+
+    if table_exists(con, "stock_master"):
+        seed_stock_master_history(con)
+
+
+# The derived tables are created empty by migrate(), the refreshes fill them
+# from the ticker_tape rows loaded before the table existed
+
+
+def _rebuild_market_breadth(con: duckdb.DuckDBPyConnection) -> None:
+    from .market_breadth import refresh_market_breadth
+
+    refresh_market_breadth(con)
+
+
+def _rebuild_latest_quote(con: duckdb.DuckDBPyConnection) -> None:
+    from .latest_quote import refresh_latest_quote
+
+    # Recreated, the first layout stored the prices as REAL
+    con.execute("DROP TABLE IF EXISTS latest_quote")
+    refresh_latest_quote(con)
+
+
+def _rebuild_sector_breadth(con: duckdb.DuckDBPyConnection) -> None:
+    from .sector_breadth import refresh_sector_breadth
+
+    refresh_sector_breadth(con)
+
+
+def _rebuild_quality_summary(con: duckdb.DuckDBPyConnection) -> None:
+    from .data_quality import refresh_quality_summary
+
+    refresh_quality_summary(con)
+
+
+# Schema migrations as (version, name, function), in version order. migrate()
+# runs the pending ones on databases created before the change; a database
+# created from the current schema files records them as applied without
+# running them. Add a migration whenever a schema file changes a table that
+# existing databases already have; it must leave an up-to-date table as it is,
+# since init_tables() creates tables without recording migrations.
+MIGRATIONS = (
+    (1, "compact_ticker_tape", _compact_ticker_tape),
+    (2, "seed_stock_master_history", _seed_stock_master_history),
+    (3, "rebuild_market_breadth", _rebuild_market_breadth),
+    (4, "rebuild_latest_quote", _rebuild_latest_quote),
+    (5, "rebuild_sector_breadth", _rebuild_sector_breadth),
+    (6, "rebuild_quality_summary", _rebuild_quality_summary),
+)
+
+
+def load_schemas(schema_dir: Optional[str] = None) -> dict:
+    """
+    Reads the .sql schema files of the database.
+
+    Args:
+        schema_dir: Directory of the schema files, defaults to SCHEMA_DIR.
+
+    Returns:
+        A dict of table name -> Schema. The table name is taken from the CREATE
+        TABLE statement, e.g. watchlists.sql creates the watchlist table.
+    Raises:
+        ValueError: if a schema file has no CREATE TABLE statement.
+    """
+    schema_dir = schema_dir or SCHEMA_DIR
+    schemas = {}
+    for file_name in sorted(os.listdir(schema_dir)):
+        name, ext = os.path.splitext(file_name)
+        if ext != ".sql" or name in EXCLUDED_SCHEMAS:
+            continue
+        with open(os.path.join(schema_dir, file_name)) as f:
+            sql = f.read()
+        code = "".join(line for line in sql.splitlines(keepends=True) if not line.strip().startswith("--"))
+        match = _CREATE_TABLE.search(code)
+        if match is None:
+            msg = f"Schema file {file_name} has no CREATE TABLE statement"
+            raise ValueError(msg)
+        table = match.group(1)
+        depends = frozenset(_REFERENCES.findall(code)) - {table}
+        schemas[table] = Schema(table, name, sql, depends)
+    return schemas
+
+
+def schema_order(schemas: dict, tables: Optional[list] = None) -> list:
+    """
+    Returns table names in dependency order, referenced tables first.
+
+    Args:
+        schemas: The schemas from load_schemas().
+        tables: Table or schema file names to order together with the tables
+            they depend on, all tables if None.
+
+    Raises:
+        ValueError: for an unknown table, a reference to a table without a
+            schema file, or a cycle of references.
+    """
+    by_name = {schema.name: table for table, schema in schemas.items()}
+    wanted = list(schemas) if tables is None else [by_name.get(table, table) for table in tables]
+    graph = {}
+    while wanted:
+        table = wanted.pop()
+        if table in graph:
+            continue
+        if table not in schemas:
+            msg = f"No schema file for table '{table}'"
+            raise ValueError(msg)
+        graph[table] = sorted(schemas[table].depends)
+        wanted.extend(graph[table])
+    sorter = TopologicalSorter({table: graph[table] for table in sorted(graph)})
     try:
-        with open(schema_file, "r") as f:
-            # Read all lines and filter out SQL comments (starting with '--') before executing
-            schema_sql = "".join(line for line in f if not line.strip().startswith("--"))
-    except IOError as e:
-        print(f"Error reading schema file: {e}")
-        sys.exit(1)
+        return list(sorter.static_order())
+    except CycleError as e:
+        msg = f"Schema files reference each other in a cycle: {e.args[1]}"
+        raise ValueError(msg) from e
+
 
+def _existing_tables(connection: duckdb.DuckDBPyConnection) -> set:
+    rows = connection.execute(
+        "SELECT table_name FROM information_schema.tables WHERE table_catalog = current_database()"
+    ).fetchall()
+    return {row[0] for row in rows}
+
+
+def _bootstrap(
+    connection: duckdb.DuckDBPyConnection,
+    tables: Optional[list] = None,
+    run_migrations: bool = False,
+    schemas: Optional[dict] = None,
+) -> tuple[list, list]:
+    """
+    Creates the missing tables and, for the whole database, records or runs
+    the migrations, all in one transaction. Returns the lists of created tables
+    and applied migrations.
+    """
+    schemas = schemas or load_schemas()
+    order = schema_order(schemas, tables)
+    metrics = current_metrics()
+    created, applied = [], []
+    connection.begin()
     try:
-        con = duckdb.connect(database=DB_FILE, read_only=False)
+        with metrics.phase("db_init"):
+            existing = _existing_tables(connection)
+            fresh = not (existing & (set(schemas) - {"schema_migrations"}))
+            for table in order:
+                if table not in existing:
+                    connection.execute(schemas[table].sql)
+                    created.append(table)
+            if tables is None:
+                if "schema_migrations" not in existing:
+                    connection.execute(schemas["schema_migrations"].sql)
+                done = {row[0] for row in connection.execute("SELECT version FROM schema_migrations").fetchall()}
+                for version, name, migration in MIGRATIONS:
+                    if version in done:
+                        continue
+                    if not fresh:
+                        if not run_migrations:
+                            continue
+                        migration(connection)
+                        applied.append(name)
+                    connection.execute("INSERT INTO schema_migrations (version, name) VALUES (?, ?)", (version, name))
+        connection.commit()
+    except BaseException:
+        connection.rollback()
+        raise
+    metrics.count("tables_created", len(created))
+    return created, applied
 
-        if table_exists(con, table_name):
-            print(f"Table '{table_name}' already exists. Skipping creation.")
-        else:
-            print(f"Creating table '{table_name}' from '{os.path.basename(schema_file)}'...")
-            con.execute(schema_sql)
-            print(f"Table '{table_name}' created successfully.")
 
-    except duckdb.Error as e:
-        print(f"Database error: {e}")
-        sys.exit(1)
+def init_tables(connection: duckdb.DuckDBPyConnection, tables: list) -> list:
+    """
+    Creates the given tables and the tables they reference, in dependency
+    order and in one transaction. Existing tables are left as they are.
+
+    Args:
+        connection: Active DuckDB connection.
+        tables: Table or schema file names, e.g. 'watchlists' or 'watchlist'.
+
+    Returns:
+        The names of the created tables.
+    Raises:
+        ValueError: for an unknown table.
+    """
+    return _bootstrap(connection, tables)[0]
+
+
+def init_all(connection: duckdb.DuckDBPyConnection) -> list:
+    """
+    Creates every missing table from the schema files in one transaction.
+
+    On an empty database every migration is recorded as applied, since the
+    tables were created in their current layout. On an existing database the
+    pending migrations are left for migrate().
+
+    Returns:
+        The names of the created tables.
+    """
+    return _bootstrap(connection)[0]
+
+
+def migrate(connection: duckdb.DuckDBPyConnection) -> tuple:
+    """
+    Brings a database to the current schema in one transaction: creates the
+    missing tables and runs the pending MIGRATIONS in version order. Nothing
+    is changed if any step fails.
+
+    Returns:
+        The names of the created tables and of the applied migrations.
+    """
+    return _bootstrap(connection, run_migrations=True)
+
+
+def pending_migrations(connection: duckdb.DuckDBPyConnection) -> list:
+    """
+    Returns the names of the migrations that are not recorded in schema_migrations.
+    """
+    if not table_exists(connection, "schema_migrations"):
+        return [name for _, name, _ in MIGRATIONS]
+    done = {row[0] for row in connection.execute("SELECT version FROM schema_migrations").fetchall()}
+    return [name for version, name, _ in MIGRATIONS if version not in done]
+
+
+def schema_fingerprint(schemas: Optional[dict] = None) -> str:
+    """
+    Returns a short hash of the schema files and migrations, it changes
+    whenever a database built from them would be different.
+    """
+    schemas = schemas or load_schemas()
+    digest = hashlib.sha256()
+    for table in sorted(schemas):
+        digest.update(schemas[table].sql.encode())
+    for version, name, _ in MIGRATIONS:
+        digest.update(f"{version}:{name}".encode())
+    return digest.hexdigest()[:16]
+
+
+def build_template(path: Optional[str] = None) -> str:
+    """
+    Builds a database file with every table, unless it already exists.
+
+    The default template lives in the scratch directory under the schema
+    fingerprint, so it is built once per schema change and then reused by
+    create_database(). The file is written under a temporary name and moved
+    into place, concurrent builds do not see a partial template.
+
+    Args:
+        path: The template file, defaults to artha-template-<fingerprint>.db
+            in the scratch directory.
+
+    Returns:
+        The path of the template.
+    """
+    settings = get_settings()
+    path = path or os.path.join(settings.scratch_dir, f"artha-template-{schema_fingerprint()}.db")
+    if os.path.exists(path):
+        return path
+    partial = f"{path}.{os.getpid()}.tmp"
+    con = settings.connect(partial)
+    try:
+        init_all(con)
     finally:
-        if "con" in locals():
-            con.close()
+        con.close()
+    os.replace(partial, path)
+    return path
 
 
-if __name__ == "__main__":
-    if len(sys.argv) != 2:
-        print("Usage: python src/artha/db_init.py <table_name>")
-        print("Available schemas:", [f.split(".")[0] for f in os.listdir(SCHEMA_DIR) if f.endswith(".sql")])
+def create_database(db_file: str = ":memory:", template: Optional[str] = None) -> duckdb.DuckDBPyConnection:
+    """
+    Opens a new database with every table, e.g. for tests and CI jobs.
+
+    An in-memory database is initialized directly. A database file is a copy
+    of the template, which is faster than running the DDL again.
+
+    Args:
+        db_file: ':memory:' or the path of the new database file.
+        template: The template to copy, see build_template().
+
+    Returns:
+        A connection to the new database, the caller closes it.
+    Raises:
+        FileExistsError: if db_file already exists.
+    """
+    settings = get_settings()
+    if db_file == ":memory:":
+        con = settings.connect(db_file)
+        init_all(con)
+        return con
+    if os.path.exists(db_file):
+        raise FileExistsError(errno.EEXIST, "Database file already exists", db_file)
+    os.makedirs(os.path.dirname(os.path.abspath(db_file)), exist_ok=True)
+    shutil.copyfile(build_template(template), db_file)
+    return settings.connect(db_file)
+
+
+def create_table_from_schema(table_name: str):
+    """
+    Creates a table in the DuckDB database using a .sql schema file, together
+    with the tables it references.
+    """
+    try:
+        con = get_settings().connect(DB_FILE)
+        try:
+            created = init_tables(con, [table_name])
+        finally:
+            con.close()
+    except (duckdb.Error, ValueError) as e:
+        print(f"Error creating table '{table_name}': {e}")
         sys.exit(1)
+    print(f"Created tables: {', '.join(created)}" if created else f"Table '{table_name}' already exists.")
+
+
+def available_schemas() -> list:
+    """
+    Returns the names of the tables that have a .sql schema file, sorted.
+    """
+    return sorted(load_schemas())
+
+
+def main(argv: Optional[list] = None) -> int:
+    """
+    Main entry point to create the database tables from their schema files.
+
+    Usage:
+        python -m artha_data.batch.db_init init-all
+        python -m artha_data.batch.db_init migrate
+        python -m artha_data.batch.db_init template [PATH]
+        python -m artha_data.batch.db_init <table_name> [<table_name> ...]
+    """
+    args = sys.argv[1:] if argv is None else argv
+    if not args or (args[0] in ("init-all", "migrate") and len(args) > 1) or (args[0] == "template" and len(args) > 2):
+        print("Usage: python -m artha_data.batch.db_init init-all | migrate | template [PATH] | <table_name> ...")
+        print("Available schemas:", available_schemas())
+        return 1
 
-    table_to_create = sys.argv[1]
-    create_table_from_schema(table_to_create)
+    enable_json_logs()
+    command = args[0]
+    with load_run(None, "db_init", args):
+        if command == "template":
+            print(f"Template database: {build_template(args[1] if len(args) > 1 else None)}")
+            return 0
+        con = get_settings().connect(DB_FILE)
+        try:
+            if command == "migrate":
+                created, applied = migrate(con)
+            elif command == "init-all":
+                created, applied = _bootstrap(con)
+            else:
+                created, applied = _bootstrap(con, args)
+            pending = pending_migrations(con) if command in ("init-all", "migrate") else []
+        except (duckdb.Error, ValueError) as e:
+            print(f"Database initialization was unsuccessful, nothing was changed: {e}")
+            return 1
+        finally:
+            con.close()
+    print(f"Created tables: {', '.join(created)}" if created else "No tables were missing.")
+    if applied:
+        print(f"Applied migrations: {', '.join(applied)}")
+    if pending:
+        print(f"Pending migrations: {', '.join(pending)}, run python -m artha_data.batch.db_init migrate")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,258 @@
+import argparse
+import glob
+import json
+import os
+import shutil
+import sys
+from datetime import date
+from typing import Any, Optional
+
+import duckdb
+
+from ..utils.settings import get_settings
+from .db_init import execute_count, table_columns
+
+# The export only reads, so it uses the report replica when there is one
+DB_FILE = get_settings().report_db_file
+# Root of the Parquet dataset, one sub-directory per table (ARTHA_EXPORT_DIR)
+EXPORT_DIR = get_settings().export_dir
+# Kept in the ticker_tape dataset directory, the newest load_manifest.loaded_at the dataset includes
+STATE_FILE = ".export_state.json"
+
+
+def _dataset_glob(export_dir: str, table_name: str) -> str:
+    return os.path.join(export_dir, table_name, "**", "*.parquet")
+
+
+def _read_state(target: str) -> dict:
+    try:
+        with open(os.path.join(target, STATE_FILE)) as f:
+            state: dict = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+    return state
+
+
+def _write_state(target: str, state: dict) -> None:
+    path = os.path.join(target, STATE_FILE)
+    with open(path + ".tmp", "w") as f:
+        json.dump(state, f, indent=2, sort_keys=True)
+    os.replace(path + ".tmp", path)
+
+
+def reloaded_months(con: duckdb.DuckDBPyConnection, loaded_after: str) -> list:
+    """
+    Returns the (year, month) of every load date that load_manifest records as
+    loaded after the loaded_after timestamp, as sorted tuples.
+    """
+    return con.execute(
+        """
+        SELECT DISTINCT year(load_date), month(load_date) FROM load_manifest
+        WHERE loaded_at > CAST(? AS TIMESTAMP) ORDER BY ALL
+        """,
+        (loaded_after,),
+    ).fetchall()
+
+
+def exported_until(con: duckdb.DuckDBPyConnection, export_dir: str = EXPORT_DIR) -> Optional[date]:
+    """
+    Returns the last load_date in the exported ticker_tape dataset, or None if
+    nothing has been exported yet. Only the Parquet footers are read for this.
+    """
+    if not glob.glob(_dataset_glob(export_dir, "ticker_tape"), recursive=True):
+        return None
+    last: Optional[date] = con.execute(
+        "SELECT max(load_date) FROM read_parquet(?, hive_partitioning = true)",
+        (_dataset_glob(export_dir, "ticker_tape"),),
+    ).fetchall()[0][0]
+    return last
+
+
+def _ticker_tape_query(con: duckdb.DuckDBPyConnection) -> str:
+    # Rows loaded before ticker_tape had an exchange column take it from stock_master.
+    # The compact layout's industry_id is exported as the sector and industry names.
+    if "industry_id" in table_columns(con, "ticker_tape"):
+        columns = "tt.* EXCLUDE (industry_id) REPLACE (COALESCE(tt.exchange, sm.exchange) AS exchange), "
+        columns += "ind.nd_industry, ind.nd_sector"
+        joins = "LEFT JOIN industry ind ON ind.industry_id = tt.industry_id"
+    else:
+        columns = "tt.* REPLACE (COALESCE(tt.exchange, sm.exchange) AS exchange)"
+        joins = ""
+    return f"""
+        SELECT
+            {columns},
+            year(tt.load_date) AS year,
+            month(tt.load_date) AS month
+        FROM ticker_tape tt
+        LEFT JOIN stock_master sm ON tt.symbol = sm.symbol
+        {joins}
+    """  # noqa: S608 - columns and joins are constant SQL
+
+
+def export_ticker_tape(con: duckdb.DuckDBPyConnection, export_dir: str = EXPORT_DIR, incremental: bool = True) -> int:
+    """
+    Writes ticker_tape to a Hive-partitioned Parquet dataset under
+    <export_dir>/ticker_tape/exchange=<exchange>/year=<year>/month=<month>/.
+
+    The newest load_manifest.loaded_at of an export is kept in the dataset
+    directory. An incremental export rewrites the year-month partitions of
+    every load date loaded since, so backfilled and reloaded dates are
+    exported as well as new ones. A database without load_manifest appends
+    the load dates after the last exported one instead.
+
+    Args:
+        con: Active DuckDB connection to the database being exported.
+        export_dir: Root directory of the Parquet dataset.
+        incremental: Only export the load dates loaded since the last export.
+            With False, or when the dataset has no recorded export yet, the
+            dataset is rewritten from scratch.
+
+    Returns:
+        The number of rows written.
+    """
+    target = os.path.join(export_dir, "ticker_tape")
+    since = months = loaded_until = loaded_after = None
+    if table_columns(con, "load_manifest"):
+        [(loaded_until,)] = con.execute("SELECT max(loaded_at) FROM load_manifest").fetchall()
+        loaded_after = _read_state(target).get("loaded_until") if incremental else None
+        months = reloaded_months(con, loaded_after) if loaded_after else None
+    elif incremental:
+        since = exported_until(con, export_dir)
+    if since is None and months is None and os.path.isdir(target):
+        shutil.rmtree(target)
+    for year, month in months or []:
+        # A reloaded date replaces its whole partition, there is no deleting rows from Parquet files
+        for partition in glob.glob(os.path.join(target, "exchange=*", f"year={year}", f"month={month}")):
+            shutil.rmtree(partition)
+    os.makedirs(target, exist_ok=True)
+
+    query = _ticker_tape_query(con)
+    params: dict = {"target": target}
+    if since is not None:
+        query += " WHERE tt.load_date > $since"
+        params["since"] = since
+    elif months is not None:
+        query += " WHERE list_contains($year_months, year(tt.load_date) * 100 + month(tt.load_date))"
+        params["year_months"] = [year * 100 + month for year, month in months]
+    query += " ORDER BY tt.load_date, tt.symbol"
+
+    written = execute_count(
+        con,
+        f"""
+        COPY ({query}) TO $target (
+            FORMAT PARQUET, COMPRESSION ZSTD, PARTITION_BY (exchange, year, month), APPEND,
+            FILENAME_PATTERN 'data_{{uuid}}'
+        )
+        """,
+        params,
+    )
+    if loaded_until is not None:
+        _write_state(target, {"loaded_until": loaded_until.isoformat()})
+    if months is not None:
+        print(f"Exported {written} ticker_tape rows of {len(months)} months loaded after {loaded_after}")
+    else:
+        print(f"Exported {written} ticker_tape rows" + (f" loaded after {since}" if since else ""))
+    return written
+
+
+def export_stock_master(con: duckdb.DuckDBPyConnection, export_dir: str = EXPORT_DIR) -> int:
+    """
+    Rewrites stock_master as a Parquet dataset partitioned by exchange under
+    <export_dir>/stock_master/exchange=<exchange>/.
+
+    Returns:
+        The number of rows written.
+    """
+    target = os.path.join(export_dir, "stock_master")
+    if os.path.isdir(target):
+        shutil.rmtree(target)
+    os.makedirs(target)
+    written = execute_count(
+        con,
+        """
+        COPY (SELECT * FROM stock_master ORDER BY symbol) TO $target (
+            FORMAT PARQUET, COMPRESSION ZSTD, PARTITION_BY (exchange), FILENAME_PATTERN 'data_{uuid}'
+        )
+        """,
+        {"target": target},
+    )
+    print(f"Exported {written} stock_master rows")
+    return written
+
+
+def read_ticker_tape(
+    con: Optional[duckdb.DuckDBPyConnection] = None,
+    export_dir: str = EXPORT_DIR,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    exchanges: Optional[list] = None,
+    symbols: Optional[list] = None,
+    columns: str = "*",
+) -> Any:
+    """
+    Queries the exported ticker_tape dataset without touching the database file.
+
+    The exchange, year and month filters are applied to the partition
+    directories, so only the files of the matching partitions are opened.
+
+    Args:
+        con: DuckDB connection to run the query on, defaults to a new in-memory
+            one that is closed afterwards.
+        export_dir: Root directory of the Parquet dataset.
+        start_date: First load date to include as 'YYYY-MM-DD', or None.
+        end_date: Last load date to include as 'YYYY-MM-DD', or None.
+        exchanges: Optional list of exchanges (e.g. ['NYSE']).
+        symbols: Optional list of symbols.
+        columns: The select list, e.g. 'load_date, symbol, lastsale'.
+
+    Returns:
+        A DataFrame with the matching rows ordered by load_date and symbol.
+    """
+    conditions = []
+    params: list = [_dataset_glob(export_dir, "ticker_tape")]
+    if start_date:
+        conditions.append("(year > ? OR (year = ? AND month >= ?)) AND load_date >= CAST(? AS DATE)")
+        params += [int(start_date[:4]), int(start_date[:4]), int(start_date[5:7]), start_date]
+    if end_date:
+        conditions.append("(year < ? OR (year = ? AND month <= ?)) AND load_date <= CAST(? AS DATE)")
+        params += [int(end_date[:4]), int(end_date[:4]), int(end_date[5:7]), end_date]
+    if exchanges:
+        conditions.append("list_contains(?, exchange)")
+        params.append(list(exchanges))
+    if symbols:
+        conditions.append("list_contains(?, symbol)")
+        params.append(list(symbols))
+
+    query = f"SELECT {columns} FROM read_parquet(?, hive_partitioning = true)"  # noqa: S608 - the caller's select list, values are bound
+    if conditions:
+        query += " WHERE " + " AND ".join(conditions)
+    query += " ORDER BY load_date, symbol"
+    if con is not None:
+        return con.execute(query, params).fetchdf()
+    with duckdb.connect() as con:
+        return con.execute(query, params).fetchdf()
+
+
+def main(argv: Optional[list] = None) -> int:
+    """
+    Main entry point to export the database to the Parquet dataset.
+    """
+    parser = argparse.ArgumentParser(prog="artha_data.batch.export_parquet", description=main.__doc__)
+    parser.add_argument("--full", action="store_true", help="rewrite the whole dataset instead of appending new dates")
+    parser.add_argument("--dir", dest="export_dir", default=EXPORT_DIR, help=f"dataset root (default: {EXPORT_DIR})")
+    args = parser.parse_args(argv)
+
+    con = get_settings().connect(DB_FILE, read_only=True)
+    try:
+        export_stock_master(con, args.export_dir)
+        export_ticker_tape(con, args.export_dir, incremental=not args.full)
+    except (duckdb.Error, OSError) as e:
+        print(f"Parquet export was unsuccessful: {e}")
+        return -1
+    finally:
+        con.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
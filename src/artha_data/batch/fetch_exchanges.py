@@ -0,0 +1,385 @@
+import argparse
+import asyncio
+import email.utils
+import gzip
+import hashlib
+import http.client
+import json
+import os
+import sys
+import urllib.error
+import urllib.parse
+import urllib.request
+from collections import namedtuple
+from collections.abc import Iterable
+from datetime import date, datetime
+from typing import Optional
+
+import duckdb
+
+from ..utils.settings import get_settings, refresh_report_snapshot
+from .load_metrics import enable_json_logs, load_run
+from .load_ticker_data import (
+    DB_FILE,
+    EXCHANGES,
+    MIGRATE_FIRST,
+    iter_datafile_chunks,
+    load_data,
+    needs_migrate,
+    refresh_load_date,
+)
+
+# The screener API rejects requests without a browser user agent
+USER_AGENT = "Mozilla/5.0 (Macintosh; Intel Mac OS X 10.15; rv:85.0) Gecko/20100101 Firefox/85.0"
+# Attempts after the first one, and the delay before the first retry in seconds (doubled for every further retry)
+RETRIES = 3
+BACKOFF = 2.0
+# A Retry-After longer than this is not honored, the retry waits this long instead
+MAX_RETRY_AFTER = 60.0
+TIMEOUT = 60.0
+# HTTP statuses worth retrying, any other error status fails the exchange at once
+RETRY_STATUSES = (408, 429, 500, 502, 503, 504)
+
+# The ETag/Last-Modified of each exchange's last fetched file, for conditional requests
+STATE_FILE = ".fetch_state.json"
+
+# The outcome of one exchange: rows is None when the server answered 304 Not
+# Modified and the file on disk is still current
+FetchResult = namedtuple("FetchResult", ["exchange", "path", "rows", "fingerprint"])
+
+
+def screener_url(exchange: str, base_url: Optional[str] = None) -> str:
+    """
+    Returns the URL of an exchange's full ticker download, base_url defaults to the screener_url setting.
+
+    Raises:
+        ValueError: if base_url is not an http or https URL.
+    """
+    base_url = base_url or get_settings().screener_url
+    if urllib.parse.urlsplit(base_url).scheme not in ("http", "https"):
+        msg = f"The screener URL must be http or https: {base_url}"
+        raise ValueError(msg)
+    query = urllib.parse.urlencode({
+        "tableonly": "true",
+        "limit": 25,
+        "offset": 0,
+        "exchange": EXCHANGES[exchange],
+        "download": "true",
+    })
+    return f"{base_url}?{query}"
+
+
+def fetched_path(load_date: str, exchange: str, datafile_dir: Optional[str] = None) -> str:
+    """Returns the path fetch_exchanges writes an exchange's datafile to, as found by load_ticker_data."""
+    prefix = EXCHANGES[exchange]
+    datafile_dir = datafile_dir or get_settings().datafiles_dir
+    return os.path.join(datafile_dir, prefix, f"{prefix}_full_tickers-{load_date}.json.gz")
+
+
+def _download(url: str, headers: dict, timeout: float) -> tuple[Optional[list], dict]:
+    """
+    Sends one GET request and parses the .data.rows of the response while it is downloaded.
+
+    Returns:
+        A (rows, validators) tuple, rows is None for 304 Not Modified.
+        validators has the response's ETag and Last-Modified, when it has them.
+    """
+    headers = {**headers, "User-Agent": USER_AGENT, "Accept-Encoding": "gzip"}
+    request = urllib.request.Request(url, headers=headers)  # noqa: S310 - screener_url only builds http(s) URLs
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:  # noqa: S310 - see above
+            validators = {
+                name: response.headers[header]
+                for name, header in (("etag", "ETag"), ("last_modified", "Last-Modified"))
+                if response.headers.get(header)
+            }
+            body = response
+            if response.headers.get("Content-Encoding", "").lower() == "gzip":
+                body = gzip.GzipFile(fileobj=response)
+            rows: list = []
+            for chunk in iter_datafile_chunks(body, keys=("data", "rows")):
+                rows.extend(chunk)
+            return rows, validators
+    except urllib.error.HTTPError as e:
+        if e.code == 304:
+            return None, {}
+        raise
+
+
+def _retry_delay(error: Exception, attempt: int, backoff: float) -> Optional[float]:
+    """Returns the seconds to wait before retrying after error, or None if it is not worth retrying."""
+    if isinstance(error, urllib.error.HTTPError):
+        if error.code not in RETRY_STATUSES:
+            return None
+        retry_after = error.headers.get("Retry-After") if error.headers else None
+        if retry_after and retry_after.isdigit():
+            return min(float(retry_after), MAX_RETRY_AFTER)
+    return float(backoff * 2**attempt)
+
+
+def write_datafile(path: str, rows: list) -> tuple[int, str]:
+    """
+    Writes rows as compact gzipped JSON, atomically.
+
+    The file is written next to its final path and then moved over it, so a
+    reader or an interrupted fetch never sees a partial file.
+
+    Returns:
+        The (size, sha256) fingerprint of the JSON content, the same as
+        load_ticker_data.datafile_fingerprint(path) returns.
+    """
+    content = json.dumps(rows, separators=(",", ":")).encode("utf-8")
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    partial = path + ".tmp"
+    # mtime=0 keeps the file identical for identical rows
+    with open(partial, "wb") as f, gzip.GzipFile(fileobj=f, mode="wb", compresslevel=6, mtime=0) as gz:
+        gz.write(content)
+    os.replace(partial, path)
+    return len(content), hashlib.sha256(content).hexdigest()
+
+
+def _read_state(datafile_dir: str) -> dict:
+    try:
+        with open(os.path.join(datafile_dir, STATE_FILE)) as f:
+            state: dict = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+    return state
+
+
+def _write_state(datafile_dir: str, state: dict) -> None:
+    path = os.path.join(datafile_dir, STATE_FILE)
+    with open(path + ".tmp", "w") as f:
+        json.dump(state, f, indent=2, sort_keys=True)
+    os.replace(path + ".tmp", path)
+
+
+async def fetch_exchange(
+    exchange: str,
+    path: str,
+    base_url: Optional[str] = None,
+    state: Optional[dict] = None,
+    retries: int = RETRIES,
+    backoff: float = BACKOFF,
+    timeout: float = TIMEOUT,
+) -> FetchResult:
+    """
+    Downloads one exchange's full ticker list and writes it to path.
+
+    The download runs in a worker thread so the exchanges are fetched
+    concurrently. Connection errors, timeouts, truncated responses and
+    retryable HTTP statuses are retried with exponential backoff, honoring
+    Retry-After. When path already exists and state has the validators it was
+    fetched with, the request is conditional and a 304 Not Modified answer
+    leaves the file as it is.
+
+    Args:
+        exchange: The stock exchange name (e.g., 'NASDAQ').
+        path: The datafile to write, see fetched_path().
+        base_url: The screener API, defaults to the screener_url setting.
+        state: The exchange's entry of the fetch state, a dict with the file
+            and its etag/last_modified. It is updated after a download.
+        retries: Attempts after the first one.
+        backoff: Seconds before the first retry, doubled for every further one.
+        timeout: Socket timeout of each attempt in seconds.
+
+    Returns:
+        A FetchResult.
+    Raises:
+        OSError (e.g. urllib.error.HTTPError), ValueError or
+        http.client.HTTPException: when the last attempt failed.
+    """
+    state = {} if state is None else state
+    headers: dict[str, str] = {}
+    if state.get("file") == os.path.basename(path) and os.path.exists(path):
+        if state.get("etag"):
+            headers["If-None-Match"] = state["etag"]
+        if state.get("last_modified"):
+            headers["If-Modified-Since"] = state["last_modified"]
+        elif not state.get("etag"):
+            headers["If-Modified-Since"] = email.utils.formatdate(os.path.getmtime(path), usegmt=True)
+
+    url = screener_url(exchange, base_url)
+    for attempt in range(retries + 1):
+        try:
+            rows, validators = await asyncio.to_thread(_download, url, headers, timeout)
+            break
+        except (OSError, ValueError, http.client.HTTPException) as e:
+            delay = _retry_delay(e, attempt, backoff) if attempt < retries else None
+            if delay is None:
+                raise
+            print(f"Fetching {exchange} failed ({e}), retrying in {delay:g}s")
+            await asyncio.sleep(delay)
+
+    if rows is None:
+        print(f"{exchange} is not modified, keeping {os.path.basename(path)}")
+        return FetchResult(exchange, path, None, None)
+    fingerprint = await asyncio.to_thread(write_datafile, path, rows)
+    state.clear()
+    state.update({"file": os.path.basename(path), **validators})
+    print(f"Fetched {len(rows)} {exchange} rows to {os.path.basename(path)}")
+    return FetchResult(exchange, path, rows, fingerprint)
+
+
+async def _fetch_all(
+    load_date: str,
+    exchanges: list,
+    base_url: Optional[str],
+    datafile_dir: str,
+    retries: int,
+    backoff: float,
+    timeout: float,
+) -> list:
+    state = _read_state(datafile_dir)
+    tasks = [
+        fetch_exchange(
+            exchange,
+            fetched_path(load_date, exchange, datafile_dir),
+            base_url,
+            state.setdefault(exchange, {}),
+            retries,
+            backoff,
+            timeout,
+        )
+        for exchange in exchanges
+    ]
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+    os.makedirs(datafile_dir, exist_ok=True)
+    _write_state(datafile_dir, {exchange: entry for exchange, entry in state.items() if entry})
+    for result in results:
+        if isinstance(result, BaseException):
+            raise result
+    return results
+
+
+def fetch_exchanges(
+    load_date: str,
+    exchanges: Optional[Iterable[str]] = None,
+    base_url: Optional[str] = None,
+    datafile_dir: Optional[str] = None,
+    retries: int = RETRIES,
+    backoff: float = BACKOFF,
+    timeout: float = TIMEOUT,
+) -> list:
+    """
+    Fetches the datafiles of several exchanges concurrently.
+
+    Every exchange is written as compact gzipped JSON, which the loaders read
+    like the pretty-printed .json files of the old curl/jq workflow. The ETag
+    and Last-Modified of each response are kept in .fetch_state.json in the
+    datafiles directory for the conditional requests of a re-run.
+
+    Args:
+        load_date: The date the files are named after, as 'YYYY-MM-DD'.
+        exchanges: Exchange names, defaults to all of load_ticker_data.EXCHANGES.
+        base_url: The screener API, defaults to the screener_url setting.
+        datafile_dir: Root directory of the datafiles, defaults to the datafiles_dir setting.
+        retries, backoff, timeout: See fetch_exchange().
+
+    Returns:
+        A list of FetchResult, in the order of exchanges.
+    Raises:
+        The error of the first exchange that could not be fetched, after the
+        others have finished and been written.
+    """
+    datafile_dir = datafile_dir or get_settings().datafiles_dir
+    return asyncio.run(
+        _fetch_all(load_date, list(exchanges or EXCHANGES), base_url, datafile_dir, retries, backoff, timeout)
+    )
+
+
+def load_fetched(con: duckdb.DuckDBPyConnection, load_date: str, results: list) -> int:
+    """
+    Hands fetched rows straight to the loader, without reading the files again.
+
+    Exchanges that were not modified are loaded from their file, which
+    load_data skips if load_manifest already has it. The exchanges are loaded
+    in one transaction and the date is refreshed once, after the last.
+
+    Returns:
+        The number of ticker_tape rows loaded.
+    """
+    loaded = 0
+    refresh = False
+    con.begin()
+    try:
+        for result in results:
+            if result.rows is None:
+                rows = load_data(con, load_date, result.path, result.exchange, refresh=False)
+            else:
+                rows = load_data(
+                    con,
+                    load_date,
+                    result.path,
+                    result.exchange,
+                    data=result.rows,
+                    fingerprint=result.fingerprint,
+                    refresh=False,
+                )
+            refresh = refresh or rows is not None
+            loaded += rows or 0
+        if refresh:
+            refresh_load_date(con, load_date)
+        con.commit()
+    except BaseException:
+        con.rollback()
+        raise
+    return loaded
+
+
+def main(argv: Optional[list] = None) -> int:
+    """
+    Main entry point to fetch the exchange datafiles of a date.
+
+    Fetches NASDAQ, AMEX and NYSE concurrently into the datafiles directory.
+    With --load the fetched rows are loaded into the database in the same
+    process, like 'load_ticker_data DATE' but without re-reading the files.
+    """
+    parser = argparse.ArgumentParser(prog="artha_data.batch.fetch_exchanges", description=main.__doc__)
+    parser.add_argument("date", nargs="?", help="date the files are named after, YYYY-MM-DD (default: today)")
+    parser.add_argument(
+        "--exchange", dest="exchanges", action="append", choices=list(EXCHANGES), help="exchange to fetch, repeatable"
+    )
+    parser.add_argument("--base-url", help="screener API URL (default: the screener_url setting)")
+    parser.add_argument("--retries", type=int, default=RETRIES, help=f"retries per exchange (default: {RETRIES})")
+    parser.add_argument("--load", action="store_true", help="load the fetched rows into the database")
+    args = parser.parse_args(sys.argv[1:] if argv is None else argv)
+
+    load_date = args.date or date.today().strftime("%Y-%m-%d")
+    try:
+        datetime.strptime(load_date, "%Y-%m-%d")
+    except ValueError:
+        print("Invalid date format. Please use YYYY-MM-DD.")
+        return 2
+
+    try:
+        results = fetch_exchanges(load_date, args.exchanges, args.base_url, retries=args.retries)
+    except (OSError, ValueError, http.client.HTTPException) as e:
+        print(f"Fetch was unsuccessful for date {load_date}: {e}")
+        return 1
+    if not args.load:
+        return 0
+
+    enable_json_logs()
+    con = get_settings().connect(DB_FILE)
+    try:
+        if needs_migrate(con):
+            print(MIGRATE_FIRST)
+            return 1
+        with load_run(con, "fetch", argv if argv is not None else sys.argv[1:]) as metrics:
+            try:
+                load_fetched(con, load_date, results)
+                print(f"Successfully loaded data for date: {load_date}")
+                with metrics.phase("snapshot"):
+                    refresh_report_snapshot(con)
+            except (duckdb.Error, ValueError) as e:
+                metrics.fail(e)
+                print(f"Data load was unsuccessful for date: {load_date}")
+                return -1
+    finally:
+        con.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
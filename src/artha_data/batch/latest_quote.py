@@ -0,0 +1,137 @@
+import sys
+from datetime import datetime
+from typing import Optional
+
+import duckdb
+
+from ..utils.settings import get_settings
+from .db_init import create_table_if_missing, execute_count
+
+# The database is resolved by the settings (ARTHA_DB_FILE, default data/artha.db)
+DB_FILE = get_settings().db_file
+
+# The latest_quote columns copied from ticker_tape
+_QUOTE_COLUMNS = "symbol, load_date, exchange, lastsale, netchange, pctchange, volume, marketCap, adv_dec"
+
+# Selects the quote columns of ticker_tape rows, the exchange falls back to
+# stock_master for rows loaded before ticker_tape had the column
+_SELECT_QUOTES = """
+    SELECT
+        tt.symbol, tt.load_date, COALESCE(tt.exchange, sm.exchange), tt.lastsale, tt.netchange, tt.pctchange,
+        tt.volume, tt.marketCap, tt.adv_dec
+    FROM ticker_tape tt
+    LEFT JOIN stock_master sm ON tt.symbol = sm.symbol
+"""
+
+
+def refresh_latest_quote(con: duckdb.DuckDBPyConnection, load_date: Optional[str] = None) -> int:
+    """
+    Brings the latest_quote table up to date after a load date was (re)loaded.
+
+    The ticker_tape rows of the given date replace the quotes of their symbols
+    unless a symbol already has a quote from a later date. Symbols whose quote
+    came from this date but that are no longer in it fall back to their
+    previous ticker_tape row. Only these symbols touch the history. The caller
+    is responsible for committing, so the loader can refresh the quotes in the
+    same transaction as the day's data.
+
+    Args:
+        con: Active DuckDB connection.
+        load_date: The load date to refresh as 'YYYY-MM-DD', or None to rebuild
+            the whole table.
+
+    Returns:
+        The number of latest_quote rows written.
+    """
+    create_table_if_missing(con, "latest_quote")
+    if load_date is None:
+        con.execute("DELETE FROM latest_quote")
+        return execute_count(
+            con,
+            f"""
+            INSERT INTO latest_quote ({_QUOTE_COLUMNS})
+            {_SELECT_QUOTES}
+            QUALIFY row_number() OVER (PARTITION BY tt.symbol ORDER BY tt.load_date DESC) = 1
+            """,
+        )
+
+    stale = con.execute(
+        """
+        DELETE FROM latest_quote
+        WHERE load_date = CAST($load_date AS DATE)
+          AND symbol NOT IN (SELECT symbol FROM ticker_tape WHERE load_date = CAST($load_date AS DATE))
+        RETURNING symbol
+        """,
+        {"load_date": load_date},
+    ).fetchall()
+    written = 0
+    if stale:
+        written += execute_count(
+            con,
+            f"""
+            INSERT INTO latest_quote ({_QUOTE_COLUMNS})
+            {_SELECT_QUOTES}
+            WHERE tt.symbol IN (SELECT unnest($symbols))
+            QUALIFY row_number() OVER (PARTITION BY tt.symbol ORDER BY tt.load_date DESC) = 1
+            """,
+            {"symbols": [symbol for (symbol,) in stale]},
+        )
+
+    written += execute_count(
+        con,
+        f"""
+        INSERT INTO latest_quote ({_QUOTE_COLUMNS})
+        {_SELECT_QUOTES}
+        WHERE tt.load_date = CAST($load_date AS DATE)
+        ON CONFLICT (symbol) DO UPDATE SET
+            load_date = excluded.load_date,
+            exchange = excluded.exchange,
+            lastsale = excluded.lastsale,
+            netchange = excluded.netchange,
+            pctchange = excluded.pctchange,
+            volume = excluded.volume,
+            marketCap = excluded.marketCap,
+            adv_dec = excluded.adv_dec,
+            updated_at = NOW()
+        WHERE excluded.load_date >= latest_quote.load_date
+        """,
+        {"load_date": load_date},
+    )
+    return written
+
+
+def main() -> int:
+    """
+    Main entry point to refresh the latest_quote table.
+
+    With a YYYY-MM-DD argument only that date is applied, with --rebuild the
+    whole table is recomputed from ticker_tape, e.g. for repairs.
+    """
+    if len(sys.argv) != 2:
+        print("Usage: python -m artha_data.batch.latest_quote YYYY-MM-DD | --rebuild")
+        return 1
+
+    load_date = None
+    if sys.argv[1] != "--rebuild":
+        try:
+            load_date = datetime.strptime(sys.argv[1], "%Y-%m-%d").strftime("%Y-%m-%d")
+        except ValueError:
+            print("Invalid date format. Please use YYYY-MM-DD.")
+            return 2
+
+    con = get_settings().connect(DB_FILE)
+    try:
+        con.begin()
+        written = refresh_latest_quote(con, load_date)
+        con.commit()
+        print(f"Refreshed {written} latest quotes for {load_date or 'all dates'}")
+    except duckdb.Error as e:
+        print(f"Latest quote refresh was unsuccessful: {e}")
+        return -1
+    finally:
+        con.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
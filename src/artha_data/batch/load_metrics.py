@@ -0,0 +1,281 @@
+import cProfile
+import json
+import logging
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from typing import IO, Any, Optional, Union
+
+import duckdb
+
+# Metrics are logged as one JSON object per line on this logger
+logger = logging.getLogger("artha_data.metrics")
+
+
+def peak_rss_mb() -> Optional[float]:
+    """Returns the peak resident set size of this process so far, in MB, or None where it is not available."""
+    try:
+        # Unix only
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    return round(peak / (1 << 20 if sys.platform == "darwin" else 1 << 10), 1)
+
+
+class LoadMetrics:
+    """
+    Collects the metrics of one run: seconds spent per phase, row and file
+    counters, rejections by reason and the peak memory.
+
+    The hot paths record into the current run with `current_metrics()`, which
+    is a no-op collector when no run is active, so the loader functions can be
+    called without setting anything up.
+    """
+
+    def __init__(self, command: Optional[str], args: Optional[list] = None) -> None:
+        self.run_id = uuid.uuid4().hex
+        self.command = command
+        self.args = args or []
+        self.started_at = datetime.now()
+        self.finished_at: Optional[datetime] = None
+        self.error: Optional[str] = None
+        self.phases: Counter[str] = Counter()
+        self.counters: Counter[str] = Counter()
+        self.rejects: Counter[str] = Counter()
+        # Per thread, the seconds spent in the phases nested in each open phase
+        self._nested = threading.local()
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """
+        Adds the time spent in the block to the named phase.
+
+        The time of a phase nested in the block, e.g. 'quality' inside
+        'tape_insert', only counts for the nested phase, so the phases add up
+        to at most the run's seconds.
+        """
+        stack = self._nested.__dict__.setdefault("stack", [])
+        stack.append(0.0)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - started
+            self.phases[name] += seconds - stack.pop()
+            if stack:
+                stack[-1] += seconds
+
+    def count(self, name: str, n: int = 1) -> None:
+        """Adds n to a counter, e.g. 'rows_accepted' or 'files_loaded'."""
+        self.counters[name] += n
+
+    def reject(self, reason: Union[BaseException, str], n: int = 1) -> None:
+        """Counts n rejected rows. reason is an exception, whose type name is used, or a string."""
+        if isinstance(reason, BaseException):
+            reason = type(reason).__name__
+        self.reject_rows(n, {reason: n})
+
+    def reject_rows(self, rows: int, reasons: dict) -> None:
+        """
+        Counts rows rejected rows that failed the checks in reasons, a dict of
+        reason -> rows. A row that fails several checks counts once in
+        rows_rejected and once for each of its reasons.
+        """
+        self.rejects.update(reasons)
+        self.counters["rows_rejected"] += rows
+
+    def fail(self, error: object) -> None:
+        """Marks the run as failed with an error message, for errors the caller handles itself."""
+        self.error = str(error)
+
+    def event(self, event: str, **fields: Any) -> None:
+        """Logs a structured event of this run."""
+        logger.info(json.dumps({"event": event, "run_id": self.run_id, "command": self.command, **fields}, default=str))
+
+    def summary(self) -> dict:
+        """Returns the metrics collected so far as a dict."""
+        finished_at = self.finished_at or datetime.now()
+        return {
+            "run_id": self.run_id,
+            "command": self.command,
+            "args": self.args,
+            "started_at": self.started_at.isoformat(timespec="seconds"),
+            "seconds": round((finished_at - self.started_at).total_seconds(), 3),
+            "phases": {name: round(seconds, 4) for name, seconds in self.phases.most_common()},
+            "counters": dict(self.counters),
+            "rejects": dict(self.rejects),
+            "peak_rss_mb": peak_rss_mb(),
+        }
+
+
+class _NoMetrics(LoadMetrics):
+    """Collector used outside of a run, it records nothing."""
+
+    def __init__(self) -> None:
+        super().__init__(None)
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        yield
+
+    def count(self, name: str, n: int = 1) -> None:
+        pass
+
+    def reject(self, reason: Union[BaseException, str], n: int = 1) -> None:
+        pass
+
+    def reject_rows(self, rows: int, reasons: dict) -> None:
+        pass
+
+    def fail(self, error: object) -> None:
+        pass
+
+    def event(self, event: str, **fields: Any) -> None:
+        pass
+
+
+_NO_METRICS = _NoMetrics()
+# The active run's collector. Per thread and per asyncio task, so concurrent runs do not record into each other.
+_current: ContextVar[LoadMetrics] = ContextVar("load_metrics", default=_NO_METRICS)
+
+
+def current_metrics() -> LoadMetrics:
+    """Returns the collector of the active run, or a no-op collector."""
+    return _current.get()
+
+
+def enable_json_logs(stream: Optional[IO[str]] = None, level: int = logging.INFO) -> None:
+    """Writes the metrics events as bare JSON lines to stream (default: stderr)."""
+    if not logger.handlers:
+        handler = logging.StreamHandler(stream)
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        logger.addHandler(handler)
+    logger.setLevel(level)
+    logger.propagate = False
+
+
+def record_load_run(
+    con: duckdb.DuckDBPyConnection, metrics: LoadMetrics, status: str, error: Optional[str] = None
+) -> None:
+    """Writes the summary of a run to the load_runs table."""
+    # Imported here as db_init records its own metrics
+    from .db_init import create_table_if_missing
+
+    create_table_if_missing(con, "load_runs")
+    summary = metrics.summary()
+    counters = summary["counters"]
+    con.execute(
+        """
+        INSERT INTO load_runs (
+            run_id, command, args, started_at, finished_at, seconds, status, error, files_loaded, files_skipped,
+            rows_accepted, rows_rejected, rejects, phases, peak_rss_mb
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """,
+        (
+            metrics.run_id,
+            metrics.command,
+            " ".join(metrics.args),
+            metrics.started_at,
+            metrics.finished_at,
+            summary["seconds"],
+            status,
+            error,
+            counters.get("files_loaded", 0),
+            counters.get("files_skipped", 0),
+            counters.get("rows_accepted", 0),
+            counters.get("rows_rejected", 0),
+            json.dumps(summary["rejects"]),
+            json.dumps(summary["phases"]),
+            summary["peak_rss_mb"],
+        ),
+    )
+
+
+@contextmanager
+def load_run(
+    con: Optional[duckdb.DuckDBPyConnection], command: str, args: Optional[list] = None
+) -> Iterator[LoadMetrics]:
+    """
+    Context manager for one instrumented run.
+
+    The run's LoadMetrics is the current collector inside the block. On exit
+    the summary is logged as a 'run_summary' event and written to load_runs
+    with status 'ok', or 'error' if the block raised or called metrics.fail().
+    con may be None to only log the summary.
+    """
+    metrics = LoadMetrics(command, args)
+    token = _current.set(metrics)
+    metrics.event("run_started", args=metrics.args)
+    try:
+        yield metrics
+    except BaseException as e:
+        metrics.fail(f"{type(e).__name__}: {e}")
+        raise
+    finally:
+        _current.reset(token)
+        metrics.finished_at = datetime.now()
+        status, error = ("error", metrics.error) if metrics.error else ("ok", None)
+        metrics.event("run_summary", status=status, error=error, **metrics.summary())
+        if con is not None:
+            try:
+                record_load_run(con, metrics, status, error)
+            except Exception as e:
+                print(f"Could not record the run in load_runs: {e}")
+
+
+@contextmanager
+def profiled(path: Optional[str]) -> Iterator[None]:
+    """
+    Profiles the block if path is set. A path ending in .html is written with
+    pyinstrument when it is installed, anything else is a cProfile stats dump
+    (read it with python -m pstats).
+    """
+    if not path:
+        yield
+        return
+    if path.endswith(".html"):
+        try:
+            from pyinstrument import Profiler  # type: ignore[import-not-found]
+        except ImportError:
+            print("pyinstrument is not installed, writing a cProfile dump instead.")
+            path = path[: -len(".html")] + ".prof"
+        else:
+            profiler = Profiler()
+            profiler.start()
+            try:
+                yield
+            finally:
+                profiler.stop()
+                with open(path, "w") as f:
+                    f.write(profiler.output_html())
+                print(f"Wrote profile to {path}")
+            return
+
+    cprofiler = cProfile.Profile()
+    cprofiler.enable()
+    try:
+        yield
+    finally:
+        cprofiler.disable()
+        cprofiler.dump_stats(path)
+        print(f"Wrote profile to {path}")
+
+
+def pop_profile_option(argv: list) -> tuple[list, Optional[str]]:
+    """Removes '--profile PATH' from an argument list and returns (argv, path or None)."""
+    argv = list(argv)
+    if "--profile" in argv:
+        i = argv.index("--profile")
+        if i + 1 < len(argv):
+            path = argv[i + 1]
+            del argv[i : i + 2]
+            return argv, path
+    return argv, None
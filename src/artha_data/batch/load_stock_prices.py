@@ -0,0 +1,266 @@
+import argparse
+import csv
+import errno
+import gzip
+import os
+import sys
+from collections.abc import Iterable, Sequence
+from typing import Optional
+
+import duckdb
+
+from ..utils.settings import get_settings, refresh_report_snapshot
+from .db_init import create_table_if_missing, execute_count
+from .load_metrics import current_metrics, enable_json_logs, load_run
+
+# The database is resolved by the settings (ARTHA_DB_FILE, default data/artha.db)
+DB_FILE = get_settings().db_file
+
+# Extensions of the price dumps, by DuckDB reader
+CSV_EXTENSIONS = (".csv", ".csv.gz")
+PARQUET_EXTENSIONS = (".parquet",)
+
+# stock_prices column -> source column names it is read from, compared in lower
+# case without spaces and underscores, e.g. 'Stock Splits' or 'stock_splits'.
+# Other source columns, e.g. Yahoo's 'Adj Close', are ignored.
+PRICE_COLUMNS = {
+    "symbol": ("symbol", "ticker"),
+    "Date": ("date", "datetime", "timestamp"),
+    "Open": ("open",),
+    "High": ("high",),
+    "Low": ("low",),
+    "Close": ("close",),
+    "Volume": ("volume",),
+    "Dividends": ("dividends",),
+    "Stock Splits": ("stocksplits", "splits"),
+}
+
+
+def find_price_files(paths: Iterable[str]) -> tuple:
+    """
+    Returns the CSV and the Parquet price files in the given files and
+    directories, directories are searched recursively.
+
+    Returns:
+        A tuple of two sorted lists, the CSV files and the Parquet files.
+    Raises:
+        FileNotFoundError: if a path does not exist.
+    """
+    csv_files: set[str] = set()
+    parquet_files: set[str] = set()
+
+    def add(path: str) -> None:
+        name = path.lower()
+        if name.endswith(CSV_EXTENSIONS):
+            csv_files.add(path)
+        elif name.endswith(PARQUET_EXTENSIONS):
+            parquet_files.add(path)
+
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, files in os.walk(path):
+                for file_name in files:
+                    add(os.path.join(root, file_name))
+        elif os.path.exists(path):
+            add(path)
+        else:
+            raise FileNotFoundError(errno.ENOENT, "Price file or directory not found", path)
+    return sorted(csv_files), sorted(parquet_files)
+
+
+def _csv_header(path: str) -> tuple:
+    opener = gzip.open if path.lower().endswith(".gz") else open
+    with opener(path, "rt", newline="") as f:
+        return tuple(column.strip() for column in next(csv.reader(f), []))
+
+
+def _source_select(reader: str, columns: Iterable[str]) -> str:
+    """
+    Returns a SELECT of the stock_prices columns, plus filename, from a DuckDB
+    file reader with the given columns. Values that cannot be cast become NULL
+    instead of failing the load; rows without a symbol, e.g. of per-symbol
+    files such as AAPL.csv, take the file name as their symbol.
+    """
+    by_key = {column.lower().replace(" ", "").replace("_", ""): column for column in columns if column != "filename"}
+
+    def source(name: str) -> Optional[str]:
+        for key in PRICE_COLUMNS[name]:
+            if key in by_key:
+                return '"{}"'.format(by_key[key].replace('"', '""'))
+        return None
+
+    file_symbol = r"regexp_replace(regexp_extract(filename, '[^/\\]+$'), '(?i)\.(csv|parquet)(\.gz)?$', '')"
+    symbol = source("symbol")
+    symbol = f"COALESCE(NULLIF(trim(CAST({symbol} AS VARCHAR)), ''), {file_symbol})" if symbol else file_symbol
+    date = source("Date")
+    expressions = [
+        f"upper({symbol}) AS symbol",
+        # The first 10 characters also parse timestamps such as '2020-01-02 00:00:00-05:00' as their date
+        f"TRY_CAST(left(CAST({date} AS VARCHAR), 10) AS DATE) AS Date" if date else "CAST(NULL AS DATE) AS Date",
+    ]
+    for name in ("Open", "High", "Low", "Close", "Dividends", "Stock Splits"):
+        column = source(name)
+        expressions.append(f'TRY_CAST({column or "NULL"} AS DOUBLE) AS "{name}"')
+    volume = source("Volume")
+    # TRY_CAST again, a volume outside the BIGINT range is NULL rather than failing the whole file
+    expressions.append(f"TRY_CAST(round(TRY_CAST({volume or 'NULL'} AS DOUBLE)) AS BIGINT) AS Volume")
+    return f"SELECT {', '.join(expressions)}, filename FROM {reader}"  # noqa: S608 - quoted column names, the files are bound
+
+
+def _price_sources(con: duckdb.DuckDBPyConnection, csv_files: Iterable[str], parquet_files: Sequence[str]) -> tuple:
+    """
+    Returns the SELECTs of the stock_prices columns from the files and the
+    dict of their file list parameters. CSV files are grouped by their header
+    line and each group is read by one read_csv, which sniffs only the group's
+    first file; union_by_name would sniff every file. Parquet files are read
+    by one read_parquet, which unifies their schemas from the file metadata.
+    """
+    groups: dict[tuple, list] = {}
+    for path in csv_files:
+        groups.setdefault(_csv_header(path), []).append(path)
+    sources: list[str] = []
+    params: dict[str, list] = {}
+    for header, files in groups.items():
+        if header:
+            name = f"csv_files_{len(params)}"
+            params[name] = files
+            reader = f"read_csv(${name}, header = true, all_varchar = true, filename = true)"
+            sources.append(_source_select(reader, header))
+    if parquet_files:
+        parquet_params = {"parquet_files": list(parquet_files)}
+        reader = "read_parquet($parquet_files, union_by_name = true, filename = true)"
+        described = con.execute(f"DESCRIBE SELECT * FROM {reader}", parquet_params)  # noqa: S608 - reader is constant SQL
+        params.update(parquet_params)
+        sources.append(_source_select(reader, [row[0] for row in described.fetchall()]))
+    return sources, params
+
+
+def last_loaded_dates(con: duckdb.DuckDBPyConnection, symbols: Optional[Iterable[str]] = None) -> dict:
+    """
+    Returns the last loaded date of each symbol in stock_prices, e.g. to fetch
+    only the newer bars.
+
+    Args:
+        con: Active DuckDB connection.
+        symbols: Symbols to return, all symbols if None.
+
+    Returns:
+        A dict of symbol -> datetime.date.
+    """
+    rows = con.execute(
+        """
+        SELECT symbol, max(Date) FROM stock_prices
+        WHERE $symbols IS NULL OR list_contains($symbols, symbol)
+        GROUP BY symbol
+        """,
+        {"symbols": None if symbols is None else [symbol.upper() for symbol in symbols]},
+    ).fetchall()
+    return dict(rows)
+
+
+def load_stock_prices(
+    con: duckdb.DuckDBPyConnection, csv_files: Sequence[str] = (), parquet_files: Sequence[str] = (), full: bool = False
+) -> int:
+    """
+    Merges CSV and Parquet price dumps into stock_prices in one statement.
+
+    DuckDB reads the files in parallel, the files can be per-symbol dumps
+    (the symbol is the file name) or combined files with a symbol column.
+    Rows without a symbol, date or close are skipped, and when several files
+    have a bar for the same symbol and date the last file in sorted order
+    wins, so there are no primary key violations. Incremental loads only
+    insert bars after each symbol's last loaded date, so re-reading a growing
+    dump only adds its new days. The caller is responsible for committing.
+
+    Args:
+        con: Active DuckDB connection.
+        csv_files: CSV files, see find_price_files().
+        parquet_files: Parquet files.
+        full: Insert or replace every bar instead, e.g. after a provider
+            adjusted its history for a split.
+
+    Returns:
+        The number of rows inserted or replaced.
+    """
+    metrics = current_metrics()
+    create_table_if_missing(con, "stock_prices")
+    with metrics.phase("merge_prices"):
+        sources, params = _price_sources(con, csv_files, parquet_files)
+        if not sources:
+            return 0
+        source = "\nUNION ALL\n".join(sources)
+        loaded = execute_count(
+            con,
+            f"""
+            INSERT {"OR REPLACE " if full else ""}INTO stock_prices
+                (symbol, Date, Open, High, Low, Close, Volume, Dividends, "Stock Splits")
+            WITH source AS (
+                {source}
+            ),
+            bars AS (
+                SELECT * FROM source
+                WHERE symbol <> '' AND Date IS NOT NULL AND Close IS NOT NULL
+                QUALIFY row_number() OVER (PARTITION BY symbol, Date ORDER BY filename DESC) = 1
+            ),
+            last_loaded AS (
+                SELECT symbol, max(Date) AS last_date FROM stock_prices GROUP BY symbol
+            )
+            SELECT b.symbol, b.Date, b.Open, b.High, b.Low, b.Close, b.Volume, b.Dividends, b."Stock Splits"
+            FROM bars b
+            LEFT JOIN last_loaded l ON b.symbol = l.symbol
+            WHERE $full OR l.last_date IS NULL OR b.Date > l.last_date
+            -- Appended in key order, so per-symbol range scans are pruned by the zone maps
+            ORDER BY b.symbol, b.Date
+            """,  # noqa: S608 - the sources are built by _source_select, the values are bound
+            {**params, "full": full},
+        )
+    metrics.count("files_loaded", len(csv_files) + len(parquet_files))
+    metrics.count("rows_accepted", loaded)
+    return loaded
+
+
+def main(argv: Optional[list] = None) -> int:
+    """
+    Main entry point to load daily OHLCV price dumps into stock_prices.
+
+    Takes CSV/Parquet files or directories of them, e.g. a directory of
+    per-symbol Yahoo downloads, and loads the bars after each symbol's last
+    loaded date in one transaction.
+    """
+    parser = argparse.ArgumentParser(prog="artha_data.batch.load_stock_prices", description=main.__doc__)
+    parser.add_argument("paths", nargs="+", metavar="PATH", help="CSV/Parquet file or directory")
+    parser.add_argument("--full", action="store_true", help="insert or replace every bar, not only the new ones")
+    args = parser.parse_args(sys.argv[1:] if argv is None else argv)
+
+    try:
+        csv_files, parquet_files = find_price_files(args.paths)
+    except FileNotFoundError as e:
+        print(e)
+        return 1
+    if not csv_files and not parquet_files:
+        print("No CSV or Parquet price files found.")
+        return 1
+
+    enable_json_logs()
+    con = get_settings().connect(DB_FILE)
+    try:
+        with load_run(con, "load_stock_prices", argv if argv is not None else sys.argv[1:]) as metrics:
+            try:
+                con.begin()
+                loaded = load_stock_prices(con, csv_files, parquet_files, full=args.full)
+                con.commit()
+            except duckdb.Error as e:
+                con.rollback()
+                metrics.fail(e)
+                print(f"Price load was unsuccessful: {e}")
+                return -1
+            print(f"Loaded {loaded} price rows from {len(csv_files) + len(parquet_files)} files")
+            with metrics.phase("snapshot"):
+                refresh_report_snapshot(con)
+    finally:
+        con.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,17 +1,72 @@
+import argparse
+import codecs
+import errno
+import fnmatch
+import glob
+import gzip
+import hashlib
+import io
 import json
 import os
+import re
 import sys
+import time
+import zipfile
+from collections import deque
+from collections.abc import Iterable, Iterator, Sequence
+from concurrent.futures import Executor, ProcessPoolExecutor
+from contextlib import ExitStack, contextmanager
 from datetime import datetime
+from itertools import groupby
+from operator import itemgetter
+from typing import IO, Any, Callable, Optional, Union, cast
 
 import duckdb
+import numpy as np
+import pandas as pd  # type: ignore[import-untyped]
 
-# Construct a robust, absolute path to the database file.
-# This assumes the script is in 'src/artha-data' and the db is in 'data/' at the project root.
-_PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", ".."))
-_DB_DIR = os.path.join(_PROJECT_ROOT, "data")
-_DATAFILE_DIR = os.path.join(_PROJECT_ROOT, "datafiles")
-os.makedirs(_DB_DIR, exist_ok=True)  # Ensure the data directory exists
-DB_FILE = os.path.join(_DB_DIR, "artha.db")
+from ..utils.settings import get_settings, refresh_report_snapshot
+from .data_quality import CHECKED_TABLE, check_ticker_tape_batch, delete_quarantine, refresh_quality_summary
+from .db_init import create_table_if_missing, execute_count, table_exists
+from .latest_quote import refresh_latest_quote
+from .load_metrics import LoadMetrics, current_metrics, enable_json_logs, load_run, pop_profile_option, profiled
+from .market_breadth import refresh_market_breadth
+from .migrate_ticker_tape import needs_migration
+from .parquet_datafiles import (
+    PARQUET_RE,
+    datafile_records,
+    parquet_datafile_path,
+    parquet_dates,
+    parquet_source,
+    read_parquet_datafile,
+    rebuild_datafile,
+)
+from .sector_breadth import refresh_sector_breadth
+from .stock_master_history import record_stock_master_history
+
+# The database and the datafiles root are resolved by the settings
+# (ARTHA_DB_FILE and ARTHA_DATAFILES_DIR, default data/artha.db and datafiles/)
+DB_FILE = get_settings().db_file
+_DATAFILE_DIR = get_settings().datafiles_dir
+
+# Exchange name as stored in the database -> datafile prefix/sub-directory
+EXCHANGES = {"NASDAQ": "nasdaq", "AMEX": "amex", "NYSE": "nyse"}
+# Daily datafiles are pretty-printed JSON from the old curl/jq workflow or compact gzipped JSON from fetch_exchanges
+_DATAFILE_RE = re.compile(r"(?P<prefix>nasdaq|amex|nyse)_full_tickers-(?P<load_date>\d{4}-\d{2}-\d{2})\.json(?:\.gz)?$")
+# Printed instead of loading into a database that still has an older ticker_tape layout
+MIGRATE_FIRST = "The database has an older ticker_tape layout, run 'artha-data migrate' before loading."
+# Integers are stored as BIGINT, values outside its range cannot be loaded
+_INT64_MIN, _INT64_MAX = -(2**63), 2**63 - 1
+# Number of records per chunk when a datafile is parsed incrementally
+DEFAULT_CHUNK_SIZE = 1000
+# Whitespace between the records of a datafile, a UTF-8 BOM included
+_WHITESPACE_RE = re.compile("[ \t\r\n\ufeff]*")
+# A decode error further than this before the end of the read buffer is a syntax error, not a cut off record
+_INCOMPLETE_MARGIN = 8
+# A --date value of backfill, a load date or a whole month
+_DATE_OR_MONTH_RE = re.compile(r"\d{4}-\d{2}(?:-\d{2})?")
+# Monthly zip archives of the older datafiles, scripts/archive-datafiles.sh now writes Parquet datafiles instead
+_ARCHIVE_RE = re.compile(r"(?P<prefix>nasdaq|amex|nyse)_full_tickers-(?P<month>\d{4}-\d{2})\.zip$")
 
 
 # 08/28/25 - This will read data from each of the exchange data files and insert into the ticker_tape table with the load_date specified
@@ -25,7 +80,8 @@ def clean_value(value, value_type):
         value_type: The target type ('real' for float, 'integer' for int).
 
     Returns:
-        The converted numeric value, or None if conversion fails or input is empty.
+        The converted numeric value, or None if conversion fails, the input is
+        empty or an integer is outside the BIGINT range.
     """
     if value is None or value == "":
         return None
@@ -34,12 +90,212 @@ def clean_value(value, value_type):
             return float(value.replace("$", "").replace("%", ""))
         if value_type == "integer":
             # Handle potential float strings like '123.0'
-            return int(float(value))
-    except (ValueError, TypeError):
+            value = int(float(value))
+            return value if _INT64_MIN <= value <= _INT64_MAX else None
+    except (ValueError, TypeError, OverflowError):
         return None
     return value
 
 
+def clean_column(values: Any, value_type: str) -> Any:
+    """
+    Vectorized counterpart of clean_value for a whole column of raw values.
+
+    Args:
+        values: A pandas Series of raw values, typically strings.
+        value_type: The target type ('real' for float, 'integer' for int).
+
+    Returns:
+        A nullable Float64 ('real') or Int64 ('integer') Series where every value
+        that clean_value would turn into None is <NA>.
+    """
+    values = values.astype("string")
+    if value_type == "real":
+        values = values.str.replace("$", "", regex=False).str.replace("%", "", regex=False)
+        return pd.to_numeric(values, errors="coerce").astype("Float64")
+    if value_type == "integer":
+        # Same as int(float(value)), i.e. truncate '123.7' towards zero. Values outside the int64 range would wrap
+        # around in astype, they are <NA> instead.
+        numbers = np.trunc(pd.to_numeric(values, errors="coerce").astype("Float64"))
+        numbers = numbers.mask((numbers < -(2.0**63)) | (numbers >= 2.0**63))
+        return numbers.astype("Int64")
+    return values
+
+
+def _raw_records(data: Any, columns: list) -> Any:
+    # The raw columns of a list of records, or of a DataFrame of them such as a Parquet datafile's
+    if isinstance(data, pd.DataFrame):
+        return data.reindex(columns=columns).reset_index(drop=True)
+    return pd.DataFrame.from_records(data, columns=columns)
+
+
+def build_ticker_tape_batch(load_date: str, data: Any, exchange: str) -> Any:
+    """
+    Builds a cleaned, columnar ticker_tape batch from the raw exchange rows.
+
+    Args:
+        load_date: The specific date for which the data is being loaded.
+        data: A list of dictionaries, where each dictionary is a stock's data,
+            or a DataFrame of them as read from a Parquet datafile.
+        exchange: The stock exchange name (e.g., 'NASDAQ').
+
+    Returns:
+        A DataFrame with one column per ticker_tape column being loaded, and
+        an unparsable column flagging the rows with a price or volume that is
+        not empty but could not be parsed.
+    """
+    raw = _raw_records(
+        data, columns=["symbol", "lastsale", "netchange", "pctchange", "volume", "marketCap", "industry", "sector"]
+    )
+    lastsale = clean_column(raw["lastsale"], "real")
+    netchange = clean_column(raw["netchange"], "real")
+    pctchange = clean_column(raw["pctchange"], "real")
+    volume = clean_column(raw["volume"], "integer")
+    # Empty values are NULL as in the datafiles, the market cap is informational and not checked
+    unparsable = pd.Series(False, index=raw.index)
+    checked = {"lastsale": lastsale, "netchange": netchange, "pctchange": pctchange, "volume": volume}
+    for column, cleaned in checked.items():
+        text = raw[column].astype("string").str.strip()
+        unparsable |= (text.notna() & (text != "") & cleaned.isna()).fillna(False).astype(bool)
+    return pd.DataFrame({
+        "load_date": pd.Series([load_date] * len(raw), dtype="string"),
+        "symbol": raw["symbol"].astype("string"),
+        "lastsale": lastsale,
+        "netchange": netchange,
+        "pctchange": pctchange,
+        "volume": volume,
+        "marketCap": clean_column(raw["marketCap"], "real"),
+        "adv_dec": np.sign(netchange).fillna(0).astype("int8"),
+        "nd_industry": raw["industry"].astype("string"),
+        "nd_sector": raw["sector"].astype("string"),
+        "exchange": pd.Series([exchange] * len(raw), dtype="string"),
+        "unparsable": unparsable,
+    })
+
+
+def upsert_industries(con: duckdb.DuckDBPyConnection, pairs: Any) -> int:
+    """
+    Adds the (nd_sector, nd_industry) pairs missing in the industry lookup table.
+
+    New pairs get the next industry_ids in (sector, industry) order. Rows with
+    neither a sector nor an industry have no lookup entry, their industry_id
+    stays NULL.
+
+    Args:
+        con: Active DuckDB connection.
+        pairs: A DataFrame with nd_sector and nd_industry columns.
+
+    Returns:
+        The number of industries added.
+    """
+    con.register("industry_batch", pairs)
+    try:
+        return execute_count(
+            con,
+            """
+            INSERT INTO industry (industry_id, nd_sector, nd_industry)
+            SELECT
+                (SELECT COALESCE(max(industry_id), 0) FROM industry)
+                    + row_number() OVER (ORDER BY nd_sector, nd_industry),
+                nd_sector,
+                nd_industry
+            FROM (
+                SELECT DISTINCT nd_sector, nd_industry
+                FROM industry_batch
+                WHERE nd_sector IS NOT NULL OR nd_industry IS NOT NULL
+            ) b
+            WHERE NOT EXISTS (
+                SELECT 1 FROM industry i
+                WHERE i.nd_sector IS NOT DISTINCT FROM b.nd_sector AND i.nd_industry IS NOT DISTINCT FROM b.nd_industry
+            )
+            """,
+        )
+    finally:
+        con.unregister("industry_batch")
+
+
+def insert_ticker_tape_batch(con: duckdb.DuckDBPyConnection, batch: Any) -> int:
+    """
+    Inserts a cleaned ticker_tape batch with a single INSERT ... SELECT.
+
+    The batch first goes through the data-quality checks of
+    data_quality.check_ticker_tape_batch, which moves the rows failing any of
+    them, e.g. symbols missing in stock_master, symbols already loaded for
+    the date or implausible price jumps, to ticker_tape_quarantine. Only the
+    remaining rows are inserted, so no row can raise a constraint error. The
+    sector and industry are stored as an industry_id, and the rows are written
+    sorted by symbol to keep ticker_tape physically ordered by (load_date,
+    symbol).
+
+    Args:
+        con: Active DuckDB connection.
+        batch: A DataFrame as returned by build_ticker_tape_batch.
+
+    Returns:
+        The number of rows inserted.
+    """
+    upsert_industries(con, batch[["nd_sector", "nd_industry"]])
+    with current_metrics().phase("quality"):
+        check_ticker_tape_batch(con, batch)
+    return execute_count(
+        con,
+        f"""
+        INSERT INTO ticker_tape (
+            load_date, symbol, lastsale, netchange, pctchange, volume, marketCap, adv_dec, industry_id, exchange,
+            created_at, updated_at
+        )
+        SELECT
+            b.tape_date, b.symbol, b.lastsale, b.netchange, b.pctchange, b.volume, b.marketCap,
+            b.adv_dec, i.industry_id, b.exchange, NOW(), NOW()
+        FROM {CHECKED_TABLE} b
+        LEFT JOIN industry i
+            ON i.nd_sector IS NOT DISTINCT FROM b.nd_sector AND i.nd_industry IS NOT DISTINCT FROM b.nd_industry
+        WHERE len(b.reasons) = 0
+        ORDER BY b.symbol
+        """,  # noqa: S608 - CHECKED_TABLE is a constant
+    )
+
+
+def load_ticker_tape_data_bulk(con: duckdb.DuckDBPyConnection, load_date: str, data: Any, exchange: str) -> int:
+    """
+    Loads time-sensitive ticker data into the ticker_tape table as one batch.
+
+    This is the bulk counterpart of load_ticker_tape_data. The rows are cleaned
+    column by column and written with one INSERT, which avoids a DuckDB round
+    trip per row. The resulting table contents are the same as with the per-row
+    path.
+
+    Args:
+        con: Active DuckDB connection.
+        load_date: The specific date for which the data is being loaded.
+        data: A list of dictionaries, where each dictionary is a stock's data.
+        exchange: The stock exchange name (e.g., 'NASDAQ').
+
+    Returns:
+        The number of rows inserted.
+    """
+    if not data:
+        return 0
+    metrics = current_metrics()
+    with metrics.phase("clean"):
+        batch = build_ticker_tape_batch(load_date, data, exchange)
+    with metrics.phase("tape_insert"):
+        inserted = insert_ticker_tape_batch(con, batch)
+    skipped = len(data) - inserted
+    metrics.count("rows_accepted", inserted)
+    if skipped:
+        print(f"Quarantined {skipped} of {len(data)} ticker tape rows ({quarantine_reasons(con)})")
+    return inserted
+
+
+def quarantine_reasons(con: duckdb.DuckDBPyConnection) -> str:
+    """Returns the reason counts of the last checked batch as text, e.g. 'unknown_symbol: 2, duplicate: 1'."""
+    rows = con.execute(
+        f"SELECT reason, count(*) FROM (SELECT unnest(reasons) AS reason FROM {CHECKED_TABLE}) GROUP BY 1 ORDER BY 1"  # noqa: S608 - CHECKED_TABLE is a constant
+    ).fetchall()
+    return ", ".join(f"{reason}: {count}" for reason, count in rows)
+
+
 def load_ticker_tape_data(con, load_date, data, exchange):
     """
     Loads time-sensitive ticker data into the ticker_tape table.
@@ -49,130 +305,1161 @@ def load_ticker_tape_data(con, load_date, data, exchange):
         load_date: The specific date for which the data is being loaded.
         data: A list of dictionaries, where each dictionary is a stock's data.
         exchange: The stock exchange name (e.g., 'NASDAQ').
+
+    Returns:
+        The number of rows inserted.
     """
-    for item in data:
-        try:
-            netchange = clean_value(item.get("netchange"), "real")
-            adv_dec = 0
-            if netchange is not None:
-                if netchange > 0:
-                    adv_dec = 1
-                elif netchange < 0:
-                    adv_dec = -1
+    inserted = 0
+    metrics = current_metrics()
+    with metrics.phase("tape_insert"):
+        upsert_industries(
+            con,
+            pd.DataFrame({
+                "nd_sector": pd.Series([item.get("sector") for item in data], dtype="string"),
+                "nd_industry": pd.Series([item.get("industry") for item in data], dtype="string"),
+            }),
+        )
+        # The same data-quality checks as the bulk path, only the accepted rows are inserted
+        with metrics.phase("quality"):
+            check_ticker_tape_batch(con, build_ticker_tape_batch(load_date, data, exchange))
+        accepted = con.execute(f"SELECT batch_pos - 1 FROM {CHECKED_TABLE} WHERE len(reasons) = 0").fetchall()  # noqa: S608 - CHECKED_TABLE is a constant
+        accepted = {row[0] for row in accepted}
+        data = [item for pos, item in enumerate(data) if pos in accepted]
+        # Sorted by symbol like the bulk path
+        for item in sorted(data, key=lambda item: item.get("symbol") or ""):
+            try:
+                netchange = clean_value(item.get("netchange"), "real")
+                adv_dec = 0
+                if netchange is not None:
+                    if netchange > 0:
+                        adv_dec = 1
+                    elif netchange < 0:
+                        adv_dec = -1
 
-            con.execute(
-                """
-                INSERT INTO ticker_tape (
-                    load_date, symbol, lastsale, netchange, pctchange, volume, marketCap, adv_dec, nd_industry, nd_sector, exchange, created_at, updated_at
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, NOW(), NOW())
-                """,
-                (
-                    load_date,
-                    item.get("symbol"),
-                    clean_value(item.get("lastsale"), "real"),
-                    netchange,
-                    clean_value(item.get("pctchange"), "real"),
-                    clean_value(item.get("volume"), "integer"),
-                    clean_value(item.get("marketCap"), "real"),
-                    adv_dec,
-                    item.get("industry"),
-                    item.get("sector"),
-                    exchange,
-                ),
-            )
-        except (duckdb.ConstraintException, duckdb.ConversionException, ValueError) as e:
-            print(f"Skipping row for symbol {item.get('symbol')} due to error: {e}")
-            continue
+                con.execute(
+                    """
+                    INSERT INTO ticker_tape (
+                        load_date, symbol, lastsale, netchange, pctchange, volume, marketCap, adv_dec, industry_id,
+                        exchange, created_at, updated_at
+                    ) VALUES (
+                        ?, ?, ?, ?, ?, ?, ?, ?,
+                        (
+                            SELECT industry_id FROM industry
+                            WHERE nd_sector IS NOT DISTINCT FROM ? AND nd_industry IS NOT DISTINCT FROM ?
+                        ),
+                        ?, NOW(), NOW()
+                    )
+                    """,
+                    (
+                        load_date,
+                        item.get("symbol"),
+                        clean_value(item.get("lastsale"), "real"),
+                        netchange,
+                        clean_value(item.get("pctchange"), "real"),
+                        clean_value(item.get("volume"), "integer"),
+                        clean_value(item.get("marketCap"), "real"),
+                        adv_dec,
+                        item.get("sector"),
+                        item.get("industry"),
+                        exchange,
+                    ),
+                )
+                inserted += 1
+            except (duckdb.ConstraintException, duckdb.ConversionException, ValueError) as e:
+                print(f"Skipping row for symbol {item.get('symbol')} due to error: {e}")
+                metrics.reject(e)
+                continue
+    metrics.count("rows_accepted", inserted)
+    return inserted
+
+
+def build_stock_master_batch(data: Any, exchange: str) -> Any:
+    """
+    Builds the stock_master rows for one exchange file as a DataFrame.
+
+    Rows without a symbol are dropped and when a symbol is listed more than once
+    the last occurrence wins, same as applying the rows one after another.
 
+    Args:
+        data: A list of dictionaries, where each dictionary is a stock's data,
+            or a DataFrame of them as read from a Parquet datafile.
+        exchange: The stock exchange name (e.g., 'NASDAQ').
 
-def load_stock_master_data(con, data, exchange):
+    Returns:
+        A DataFrame with the symbol, name, ipoyear, nd_industry, nd_sector and
+        exchange columns.
+    """
+    raw = _raw_records(data, columns=["symbol", "name", "ipoyear", "industry", "sector"])
+    ipoyear = raw["ipoyear"]
+    if pd.api.types.is_float_dtype(ipoyear) and (ipoyear.dropna() % 1 == 0).all():
+        # Numeric years mixed with None come in as float64, as Int64 they format like str(1980), not '1980.0'
+        ipoyear = ipoyear.astype("Int64")
+    ipoyear = ipoyear.astype("string")
+    batch = pd.DataFrame({
+        "symbol": raw["symbol"].astype("string"),
+        "name": raw["name"].astype("string"),
+        # Same as str(ipoyear) with None/"" mapped to None
+        "ipoyear": ipoyear.mask(ipoyear == ""),
+        "nd_industry": raw["industry"].astype("string"),
+        "nd_sector": raw["sector"].astype("string"),
+        "exchange": pd.Series([exchange] * len(raw), dtype="string"),
+    })
+    batch = batch[batch["symbol"].notna()]
+    return batch.drop_duplicates(subset="symbol", keep="last")
+
+
+def load_stock_master_data(
+    con: duckdb.DuckDBPyConnection, data: Any, exchange: str, load_date: Optional[str] = None
+) -> dict:
     """
     Inserts or updates records in the stock_master table with general stock info.
 
-    This function is idempotent, using an ON CONFLICT clause to update existing
-    stock symbols and insert new ones.
+    The rows are staged as one relation and diffed against stock_master on
+    (name, ipoyear, nd_industry, nd_sector, exchange). Only new or changed
+    symbols are written, with a single INSERT ... ON CONFLICT statement, so
+    updated_at moves only when something actually changed. The load is
+    idempotent.
 
     Args:
         con: Active DuckDB connection.
         data: A list of dictionaries, where each dictionary is a stock's data.
         exchange: The stock exchange name (e.g., 'NASDAQ').
+        load_date: The load date of the data. When given, the rows are also
+            recorded as of that date in stock_master_history.
+
+    Returns:
+        A dict with the 'inserted', 'updated' and 'unchanged' symbol counts.
     """
-    for item in data:
-        try:
-            # Get ipoyear and handle potential None values before converting to string
-            ipoyear_val = item.get("ipoyear")
-            ipoyear_str = str(ipoyear_val) if ipoyear_val not in [None, ""] else None
+    if not data:
+        return {"inserted": 0, "updated": 0, "unchanged": 0}
+    metrics = current_metrics()
+    with metrics.phase("clean"):
+        batch = build_stock_master_batch(data, exchange)
+    with metrics.phase("master_upsert"):
+        return upsert_stock_master_batch(con, batch, exchange, load_date)
+
+
+def upsert_stock_master_batch(
+    con: duckdb.DuckDBPyConnection, batch: Any, exchange: str, load_date: Optional[str] = None
+) -> dict:
+    """
+    Merges a stock_master batch into the stock_master table.
+
+    Args:
+        con: Active DuckDB connection.
+        batch: A DataFrame as returned by build_stock_master_batch.
+        exchange: The stock exchange name, used for reporting only.
+        load_date: The load date of the batch, see
+            stock_master_history.record_stock_master_history. None leaves the
+            history as it is.
+
+    Returns:
+        A dict with the 'inserted', 'updated' and 'unchanged' symbol counts.
+    """
+    con.register("stock_master_batch", batch)
+    try:
+        con.execute(
+            """
+            CREATE OR REPLACE TEMP TABLE stock_master_changes AS
+            SELECT b.*, sm.symbol IS NULL AS is_new
+            FROM stock_master_batch b
+            LEFT JOIN stock_master sm ON sm.symbol = b.symbol
+            WHERE sm.symbol IS NULL
+               OR sm.name IS DISTINCT FROM b.name
+               OR sm.ipoyear IS DISTINCT FROM b.ipoyear
+               OR sm.nd_industry IS DISTINCT FROM b.nd_industry
+               OR sm.nd_sector IS DISTINCT FROM b.nd_sector
+               OR sm.exchange IS DISTINCT FROM b.exchange
+            """
+        )
+        [(inserted, updated)] = con.execute(
+            "SELECT count(*) FILTER (is_new), count(*) FILTER (NOT is_new) FROM stock_master_changes"
+        ).fetchall()
+        counts = {
+            "inserted": inserted,
+            "updated": updated,
+            "unchanged": len(batch) - inserted - updated,
+        }
 
+        if inserted or updated:
             con.execute(
                 """
                 INSERT INTO stock_master (symbol, name, ipoyear, nd_industry, nd_sector, exchange)
-                VALUES (?, ?, ?, ?, ?, ?)
+                SELECT symbol, name, ipoyear, nd_industry, nd_sector, exchange FROM stock_master_changes
                 ON CONFLICT (symbol) DO UPDATE SET
                     name = excluded.name,
                     ipoyear = excluded.ipoyear,
                     nd_industry = excluded.nd_industry,
                     nd_sector = excluded.nd_sector,
-                    exchange = excluded.exchange
-                """,
-                (item.get("symbol"), item.get("name"), ipoyear_str, item.get("industry"), item.get("sector"), exchange),
+                    exchange = excluded.exchange,
+                    updated_at = NOW()
+                """
             )
-        except duckdb.Error as e:
-            print(f"Skipping master data for symbol {item.get('symbol')} due to error: {e}")
+    finally:
+        con.execute("DROP TABLE IF EXISTS stock_master_changes")
+        con.unregister("stock_master_batch")
+    if load_date is not None:
+        record_stock_master_history(con, batch, load_date)
+
+    print(
+        f"stock_master {exchange}: {counts['inserted']} inserted, {counts['updated']} updated, "
+        f"{counts['unchanged']} unchanged"
+    )
+    return counts
+
+
+def is_parquet_datafile(datafile: Union[str, tuple]) -> bool:
+    """Tells whether a datafile is a (parquet_path, load_date) tuple naming one date of a Parquet datafile."""
+    return not isinstance(datafile, str) and datafile[0].endswith(".parquet")
+
+
+@contextmanager
+def open_datafile(datafile: Union[str, tuple]) -> Iterator[Union[IO[bytes], gzip.GzipFile]]:
+    """
+    Opens a datafile for reading in binary mode.
+
+    Args:
+        datafile: Either a path to a JSON file, an (archive, member) tuple
+            naming a JSON member of a monthly zip archive or a (parquet_path,
+            load_date) tuple naming one date of a monthly Parquet datafile.
+            Archive members and .json.gz files are decompressed while they are
+            read, nothing is extracted to disk. A Parquet date is rebuilt into
+            the exact bytes of its original JSON file.
+
+    Yields:
+        A binary file object with the JSON text.
+    Raises:
+        FileNotFoundError
+    """
+    if is_parquet_datafile(datafile):
+        frame, source = read_parquet_datafile(*datafile)
+        yield io.BytesIO(rebuild_datafile(frame, source[2]))
+        return
+    if isinstance(datafile, str):
+        with open(datafile, "rb") as f:
+            if datafile.endswith(".gz"):
+                with gzip.GzipFile(fileobj=f) as gz:
+                    yield gz
+            else:
+                yield f
+        return
+
+    archive, member = datafile
+    with zipfile.ZipFile(archive) as zf:
+        try:
+            member_file = zf.open(member)
+        except KeyError:
+            raise FileNotFoundError(errno.ENOENT, "No such member in the archive", f"{archive}:{member}") from None
+        with member_file:
+            if member.endswith(".gz"):
+                with gzip.GzipFile(fileobj=member_file) as gz:
+                    yield gz
+            else:
+                yield member_file
+
+
+def _is_syntax_error(error: json.JSONDecodeError, buffer: str) -> bool:
+    # A record cut off by the end of the read buffer fails within a few characters of the end (a partial number,
+    # literal or escape) or as an unterminated string, any other error is in the data itself
+    return not error.msg.startswith("Unterminated string") and error.pos + _INCOMPLETE_MARGIN < len(buffer)
+
+
+def _decode_record(decoder: json.JSONDecoder, buffer: str, pos: int, eof: bool) -> Optional[tuple[Any, int]]:
+    # Returns the (record, end) of the record at pos, or None when more of the file has to be read first
+    try:
+        record, end = decoder.raw_decode(buffer, pos)
+    except json.JSONDecodeError as e:
+        if eof or _is_syntax_error(e, buffer):
+            raise
+        return None
+    if end == len(buffer) and not eof:
+        # A bare number may continue in the next block
+        return None
+    return record, end
+
+
+class _JsonSyntaxError(json.JSONDecodeError):
+    """A syntax error at the current position of a _BufferedText, expected is what the scanner was expecting there."""
+
+    def __init__(self, text: "_BufferedText", expected: Optional[str] = None, offset: int = 0) -> None:
+        message = f"Expecting {expected}" if expected else "Unexpected end of data"
+        super().__init__(message, text.buffer, text.pos + offset)
+
+
+class _MissingMemberError(ValueError):
+    """The JSON object scanned for the member key ended without one."""
+
+    def __init__(self, key: str) -> None:
+        super().__init__(f"No '{key}' member in the JSON document")
+
+
+class _BufferedText:
+    """The unparsed text of a binary or text file object, read a block at a time."""
+
+    def __init__(self, f: Any, read_size: int) -> None:
+        self._f = f
+        self._read_size = read_size
+        self._text_decoder = codecs.getincrementaldecoder("utf-8")()
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+
+    def fill(self) -> None:
+        """Appends the next block from the file to the unparsed tail of the buffer."""
+        block = self._f.read(self._read_size)
+        self.eof = not block
+        if isinstance(block, bytes):
+            block = self._text_decoder.decode(block, final=self.eof)
+        self.buffer = self.buffer[self.pos :] + block
+        self.pos = 0
+
+    def next_char(self) -> str:
+        """Skips whitespace and returns the next character, reading more of the file as needed."""
+        while True:
+            self.pos = _WHITESPACE_RE.match(self.buffer, self.pos).end()  # type: ignore[union-attr]  # matches ''
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if self.eof:
+                raise _JsonSyntaxError(self)
+            self.fill()
+
+
+def _read_value(text: _BufferedText, decoder: json.JSONDecoder) -> Any:
+    # Parses the value at the position of text, reading more of the file until it is complete
+    while True:
+        text.next_char()
+        decoded = _decode_record(decoder, text.buffer, text.pos, text.eof)
+        if decoded is not None:
+            value, text.pos = decoded
+            return value
+        text.fill()
+
+
+def _enter_member(text: _BufferedText, decoder: json.JSONDecoder, key: str) -> None:
+    # Skips the members of the object at the position of text up to the value of key
+    if text.next_char() != "{":
+        raise _JsonSyntaxError(text, f"an object with a '{key}' member")
+    text.pos += 1
+    while True:
+        char = text.next_char()
+        if char == "}":
+            raise _MissingMemberError(key)
+        if char == ",":
+            text.pos += 1
             continue
+        name = _read_value(text, decoder)
+        if text.next_char() != ":":
+            raise _JsonSyntaxError(text, "':' delimiter")
+        text.pos += 1
+        if name == key:
+            return
+        _read_value(text, decoder)
+
+
+def _iter_records(f: Any, read_size: int, keys: Sequence[str] = ()) -> Iterator[Any]:
+    # Yields the records of a JSON array one at a time, the array is the value of the nested member keys
+    text = _BufferedText(f, read_size)
+    decoder = json.JSONDecoder()
+    for key in keys:
+        _enter_member(text, decoder, key)
+    if text.next_char() != "[":
+        raise _JsonSyntaxError(text, "'['")
+    text.pos += 1
+    if text.next_char() == "]":
+        return
+    while True:
+        yield _read_value(text, decoder)
+        char = text.next_char()
+        text.pos += 1
+        if char == "]":
+            return
+        if char != ",":
+            raise _JsonSyntaxError(text, "',' delimiter", -1)
+        text.next_char()
+
+
+def iter_datafile_chunks(
+    f: Any, chunk_size: int = DEFAULT_CHUNK_SIZE, read_size: int = 65536, keys: Sequence[str] = ()
+) -> Iterator[list]:
+    """
+    Incrementally parses a datafile holding a JSON array of records.
+
+    Only the current read buffer and one chunk of records are held in memory,
+    so memory use does not grow with the size of the file. A syntax error
+    fails as soon as the block holding it has been read, not at the end of
+    the file.
+
+    Args:
+        f: A file object opened in binary or text mode, e.g. from open_datafile
+            or an HTTP response.
+        chunk_size: Number of records per yielded chunk.
+        read_size: Number of bytes/characters read from f at a time.
+        keys: The member names from the outermost object in when the array is
+            nested in the document, e.g. ('data', 'rows') for a screener
+            response. The members before it are parsed and skipped.
+
+    Yields:
+        Lists of at most chunk_size dictionaries, in file order.
+    Raises:
+        json.JSONDecodeError
+        ValueError: if a member in keys does not exist.
+    """
+    chunk: list = []
+    for record in _iter_records(f, read_size, keys):
+        chunk.append(record)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def datafile_name(datafile: Union[str, tuple]) -> str:
+    """Returns a printable name for a datafile path, (archive, member) or (parquet_path, load_date) tuple."""
+    if isinstance(datafile, str):
+        return os.path.basename(datafile)
+    return f"{os.path.basename(datafile[0])}:{datafile[1]}"
+
+
+class DatafileError(ValueError):
+    """Raised when a datafile is missing or is not valid JSON, the message tells that the file is skipped."""
+
+    def __init__(self, datafile: Union[str, tuple], error: Exception) -> None:
+        problem = "Data file not found at" if isinstance(error, FileNotFoundError) else "Could not decode JSON from"
+        super().__init__(f"Warning: {problem} {datafile_name(datafile)}. Skipping.")
 
 
-def load_data(con, load_date, datafile, exchange):
+def datafile_path(load_date: str, exchange: str, datafile_dir: str = _DATAFILE_DIR) -> Union[str, tuple]:
+    """
+    Locates the datafile for an exchange and date.
+
+    Args:
+        load_date: The load date as 'YYYY-MM-DD'.
+        exchange: The stock exchange name (e.g., 'NASDAQ').
+        datafile_dir: Root directory of the datafiles.
+
+    Returns:
+        The path to the daily .json or .json.gz file or, once that day has
+        been archived, an (archive, member) tuple for the monthly zip archive
+        or a (parquet_path, load_date) tuple for the monthly Parquet datafile.
+        The daily .json path is returned when none exists.
+    """
+    prefix = EXCHANGES[exchange]
+    members = [f"{prefix}/{prefix}_full_tickers-{load_date}.json{ext}" for ext in ("", ".gz")]
+    for member in members:
+        path = os.path.join(datafile_dir, member)
+        if os.path.exists(path):
+            return path
+    archive = os.path.join(datafile_dir, f"{prefix}_full_tickers-{load_date[:7]}.zip")
+    if os.path.exists(archive):
+        with zipfile.ZipFile(archive) as zf:
+            names = set(zf.namelist())
+        for member in members:
+            if member in names:
+                return (archive, member)
+    parquet = parquet_datafile_path(datafile_dir, prefix, load_date[:7])
+    if os.path.exists(parquet) and load_date in parquet_dates(parquet):
+        return (parquet, load_date)
+    return os.path.join(datafile_dir, members[0])
+
+
+class HashingReader:
+    """
+    Wraps a binary file object and fingerprints everything read through it.
+    """
+
+    def __init__(self, f: Any) -> None:
+        self._f = f
+        self._hash = hashlib.sha256()
+        self.size = 0
+
+    def read(self, size: int = -1) -> Union[bytes, str]:
+        block: Union[bytes, str] = self._f.read(size)
+        block_bytes = block.encode("utf-8") if isinstance(block, str) else block
+        self._hash.update(block_bytes)
+        self.size += len(block_bytes)
+        return block
+
+    def fingerprint(self) -> tuple[int, str]:
+        """Returns the (size, sha256 hex digest) of the data read so far."""
+        return self.size, self._hash.hexdigest()
+
+
+def datafile_fingerprint(datafile: Union[str, tuple], read_size: int = 1 << 20) -> tuple:
+    """
+    Returns the (size, sha256 hex digest) of a datafile's content.
+
+    The content is hashed, not the file, so a day's file and the same day's
+    member of a monthly archive have the same fingerprint. A date of a Parquet
+    datafile has the fingerprint of the JSON file it was converted from, which
+    is stored with its rows.
+    """
+    if is_parquet_datafile(datafile):
+        return tuple(parquet_source(*datafile)[:2])
+    with open_datafile(datafile) as f:
+        reader = HashingReader(f)
+        while reader.read(read_size):
+            pass
+    return reader.fingerprint()
+
+
+def create_load_manifest(con: duckdb.DuckDBPyConnection) -> None:
+    """Creates the load_manifest table if it does not exist yet."""
+    create_table_if_missing(con, "load_manifest")
+
+
+def get_manifest_entries(con: duckdb.DuckDBPyConnection) -> dict:
+    """Returns a dict of (load_date, exchange) -> (file_size, content_hash) for every loaded file."""
+    rows = con.execute(
+        "SELECT strftime(load_date, '%Y-%m-%d'), exchange, file_size, content_hash FROM load_manifest"
+    ).fetchall()
+    return {(load_date, exchange): (size, content_hash) for load_date, exchange, size, content_hash in rows}
+
+
+def get_manifest_entry(con: duckdb.DuckDBPyConnection, load_date: str, exchange: str) -> Optional[tuple]:
+    """Returns the (file_size, content_hash) recorded for an exchange and date, or None."""
+    return con.execute(
+        "SELECT file_size, content_hash FROM load_manifest WHERE load_date = ? AND exchange = ?", (load_date, exchange)
+    ).fetchone()
+
+
+def record_manifest_entry(
+    con: duckdb.DuckDBPyConnection,
+    load_date: str,
+    exchange: str,
+    datafile: Union[str, tuple],
+    fingerprint: Sequence,
+    source_rows: int,
+    tape_rows: int,
+) -> None:
+    """Records a loaded datafile in load_manifest, replacing an earlier load of the same exchange and date."""
+    con.execute(
+        """
+        INSERT OR REPLACE INTO load_manifest (
+            load_date, exchange, source_file, file_size, content_hash, source_rows, tape_rows, loaded_at
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, NOW())
+        """,
+        (load_date, exchange, datafile_name(datafile), fingerprint[0], fingerprint[1], source_rows, tape_rows),
+    )
+
+
+def delete_ticker_tape_date(con: duckdb.DuckDBPyConnection, load_date: str, exchange: str) -> int:
+    """
+    Deletes the ticker_tape rows of one exchange and date so a changed file
+    can replace them, together with the rows it quarantined. Returns the
+    number of ticker_tape rows deleted.
+    """
+    delete_quarantine(con, load_date, exchange)
+    return execute_count(con, "DELETE FROM ticker_tape WHERE load_date = ? AND exchange = ?", (load_date, exchange))
+
+
+def in_transaction(con: duckdb.DuckDBPyConnection) -> bool:
+    """Returns True if a transaction was begun on the connection and is not committed or rolled back yet."""
+    # Outside of a transaction every statement runs in a transaction of its own
+    return len({con.execute("SELECT txid_current()").fetchall()[0][0] for _ in range(2)}) == 1
+
+
+def refresh_load_date(con: duckdb.DuckDBPyConnection, load_date: str) -> None:
+    """
+    Refreshes the market_breadth, latest_quote, sector_breadth and
+    quality_summary rows of one load date from its ticker_tape rows.
+
+    Run it once after the last exchange of the date is loaded, in the same
+    transaction, so the derived rows never reflect a partly loaded day.
+    """
+    with current_metrics().phase("refresh"):
+        refresh_market_breadth(con, load_date)
+        refresh_latest_quote(con, load_date)
+        refresh_sector_breadth(con, load_date)
+        refresh_quality_summary(con, load_date)
+
+
+@contextmanager
+def _own_transaction(con: duckdb.DuckDBPyConnection, metrics: LoadMetrics) -> Iterator[None]:
+    # Runs the block in a transaction that is committed after it, or rolled back when it fails.
+    # Inside a transaction the caller began the block joins it and the caller commits or rolls back.
+    if in_transaction(con):
+        yield
+        return
+    con.begin()
+    try:
+        yield
+        with metrics.phase("commit"):
+            con.commit()
+    except BaseException:
+        con.rollback()
+        raise
+
+
+def timed_chunks(chunks: Iterable, metrics: LoadMetrics) -> Iterator:
+    """Yields the chunks of a datafile, adding the time spent reading each one to the parse phase."""
+    remaining = iter(chunks)
+    while True:
+        with metrics.phase("parse"):
+            data = next(remaining, None)
+        if data is None:
+            return
+        yield data
+
+
+def _datafile_chunks(
+    stack: ExitStack, datafile: Union[str, tuple], data: Optional[list], chunk_size: Optional[int], metrics: LoadMetrics
+) -> tuple[Iterable[list], Callable[[], Optional[tuple]]]:
+    # The records of one datafile in chunks of chunk_size (a single chunk without it) and a function that
+    # returns the (size, sha256) of the content once they are read, or None for data passed in by the caller
+    fingerprint: Optional[tuple] = None
+    if data is None and is_parquet_datafile(datafile):
+        # Columnar read, there is no JSON to parse
+        with metrics.phase("parse"):
+            frame, source = read_parquet_datafile(*datafile)
+        data, fingerprint = datafile_records(frame), source[:2]
+    if data is not None:
+        chunks: Iterable[list] = (
+            [data[i : i + chunk_size] for i in range(0, len(data), chunk_size)] if chunk_size else [data]
+        )
+        return chunks, lambda: fingerprint
+    f = HashingReader(stack.enter_context(open_datafile(datafile)))
+    # A generator in both cases, so reading the file is timed as the parse phase
+    chunks = iter_datafile_chunks(f, chunk_size) if chunk_size else (json.load(f) for _ in range(1))
+    return chunks, f.fingerprint
+
+
+def _load_chunks(
+    con: duckdb.DuckDBPyConnection,
+    load_date: str,
+    chunks: Iterable[list],
+    exchange: str,
+    bulk: bool,
+    metrics: LoadMetrics,
+) -> tuple[int, int]:
+    # Loads each chunk as soon as it is read, returns the numbers of source records and ticker_tape rows
+    source_rows = tape_rows = 0
+    for chunk in timed_chunks(chunks, metrics):
+        # First load the stock master table as it is a foreign key in the
+        # ticker_tape table
+        load_stock_master_data(con, chunk, exchange, load_date)
+        if bulk:
+            inserted = load_ticker_tape_data_bulk(con, load_date, chunk, exchange)
+        else:
+            inserted = load_ticker_tape_data(con, load_date, chunk, exchange)
+        source_rows += len(chunk)
+        tape_rows += inserted or 0
+    return source_rows, tape_rows
+
+
+def load_data(
+    con: duckdb.DuckDBPyConnection,
+    load_date: str,
+    datafile: Union[str, tuple],
+    exchange: str,
+    bulk: bool = True,
+    chunk_size: Optional[int] = None,
+    force: bool = False,
+    data: Optional[list] = None,
+    fingerprint: Optional[Sequence] = None,
+    refresh: bool = True,
+) -> Optional[int]:
     """
     Orchestrates the loading of data from a single JSON file.
 
     It reads the file, then calls functions to load both the time-series
     price data (ticker_tape) and the general stock information (stock_master).
 
+    Every loaded file is recorded in load_manifest with its size and content
+    hash, and unless refresh is False the date's rows are refreshed with
+    refresh_load_date before the commit. A file that was
+    already loaded with the same content is skipped without being parsed,
+    although it is still read once to hash its content unless the caller
+    passes the fingerprint. When the content changed, the exchange's rows for
+    the date are replaced in the same transaction that loads the new file.
+
+    The file is loaded in a transaction of its own, or in the caller's when
+    one is open on con. Committing or rolling back is then left to the
+    caller.
+
     Args:
         con: Active DuckDB connection.
         load_date: The load date for the data.
-        datafile: Path to the JSON data file.
+        datafile: Path to the JSON data file, an (archive, member) tuple
+            for a file inside a monthly zip archive or a (parquet_path,
+            load_date) tuple for a date of a monthly Parquet datafile.
         exchange: The stock exchange name.
+        bulk: Load ticker_tape with a single batch insert (default). Set to
+            False to fall back to the per-row inserts.
+        chunk_size: Parse the file incrementally and load each chunk of
+            chunk_size records as soon as it is read instead of reading the
+            whole file at once. This keeps memory flat for large files, and a
+            syntax error fails the load without reading the rest of the file.
+            The file is still committed as a whole.
+        force: Reload the file even if load_manifest says it is unchanged.
+        data: The file's records, when the caller has already parsed them,
+            e.g. fetch_exchanges right after the download. The file is then
+            not read again.
+        fingerprint: The (size, sha256) of the file's content, as returned by
+            datafile_fingerprint. Required with data.
+        refresh: Refresh the date's derived rows after the file is loaded.
+            Pass False when loading the exchanges of a date one after another
+            in one transaction, and call refresh_load_date after the last.
+
+    Returns:
+        The number of ticker_tape rows loaded, or None if the file was skipped.
     Raises:
-        ValueError
+        DatafileError: if the file is missing or is not valid JSON.
     """
-    json_path = datafile
+    if data is not None and fingerprint is None:
+        msg = "load_data needs the datafile's fingerprint together with its data"
+        raise ValueError(msg)
+    json_path = datafile_name(datafile)
+    metrics = current_metrics()
+    started = time.perf_counter()
 
+    create_load_manifest(con)
     try:
-        with open(json_path, "r") as f:
-            data = json.load(f)
-        # First load the stock master table as it is a foreign key in the
-        # ticker_tape table
-        print(f"Loading stock master data from {os.path.basename(datafile)}...")
-        load_stock_master_data(con, data, exchange)
+        with metrics.phase("manifest"):
+            entry = get_manifest_entry(con, load_date, exchange)
+            unchanged = False
+            if entry is not None and not force:
+                if fingerprint is None:
+                    fingerprint = datafile_fingerprint(datafile)
+                unchanged = tuple(fingerprint) == tuple(entry)
+        if unchanged:
+            print(f"Skipping {json_path}, it is already loaded for {load_date}.")
+            metrics.count("files_skipped")
+            return None
+    except FileNotFoundError as e:
+        metrics.count("files_failed")
+        raise DatafileError(datafile, e) from e
+
+    try:
+        with _own_transaction(con, metrics):
+            with metrics.phase("replace"):
+                replaced = delete_ticker_tape_date(con, load_date, exchange)
+            if replaced:
+                print(f"Replacing {replaced} ticker tape rows of {exchange} for {load_date}...")
+            with ExitStack() as stack:
+                chunks, read_fingerprint = _datafile_chunks(stack, datafile, data, chunk_size, metrics)
+                print(f"Loading stock master and ticker tape data from {json_path}...")
+                source_rows, tape_rows = _load_chunks(con, load_date, chunks, exchange, bulk, metrics)
+                fingerprint = read_fingerprint() or fingerprint
 
-        print(f"Loading ticker tape data from {os.path.basename(datafile)}...")
-        load_ticker_tape_data(con, load_date, data, exchange)
+            with metrics.phase("manifest"):
+                # fingerprint is read from the file, or was passed in together with data
+                record_manifest_entry(
+                    con, load_date, exchange, datafile, cast(Sequence, fingerprint), source_rows, tape_rows
+                )
+            if refresh:
+                refresh_load_date(con, load_date)
+    except (FileNotFoundError, json.JSONDecodeError) as e:
+        metrics.count("files_failed")
+        raise DatafileError(datafile, e) from e
+    metrics.count("files_loaded")
+    metrics.event(
+        "file_loaded",
+        load_date=load_date,
+        exchange=exchange,
+        file=json_path,
+        source_rows=source_rows,
+        tape_rows=tape_rows,
+        seconds=round(time.perf_counter() - started, 4),
+    )
+    return tape_rows
 
-        con.commit()
-    except FileNotFoundError:
-        raise ValueError(f"Warning: Data file not found at {json_path}. Skipping.")
-    except json.JSONDecodeError:
-        raise ValueError(f"Warning: Could not decode JSON from {json_path}. Skipping.")
 
+def _monthly_files(
+    datafile_dir: str, extension: str, regex: re.Pattern, in_range: Callable[[str], bool]
+) -> Iterator[tuple[str, str]]:
+    # The (path, prefix) of the monthly zip archives or Parquet datafiles of the months in range
+    for path in glob.glob(os.path.join(datafile_dir, f"*_full_tickers-*.{extension}")):
+        match = regex.search(os.path.basename(path))
+        if match and in_range(match.group("month")):
+            yield path, match.group("prefix")
 
-def main() -> int:
+
+def _archived_datafiles(
+    datafile_dir: str, pattern: str, in_range: Callable[[str], bool]
+) -> Iterator[tuple[str, str, tuple]]:
+    # The (load_date, prefix, datafile) of the Parquet datafiles' dates and the zip archive members matching the
+    # pattern, the members last so they win over the same date in a Parquet datafile
+    for parquet, prefix in _monthly_files(datafile_dir, "parquet", PARQUET_RE, in_range):
+        for load_date in parquet_dates(parquet):
+            if fnmatch.fnmatch(f"{prefix}/{prefix}_full_tickers-{load_date}.json", pattern):
+                yield load_date, prefix, (parquet, load_date)
+    for archive, _ in _monthly_files(datafile_dir, "zip", _ARCHIVE_RE, in_range):
+        with zipfile.ZipFile(archive) as zf:
+            members = zf.namelist()
+        for member in fnmatch.filter(members, pattern):
+            match = _DATAFILE_RE.search(member)
+            if match:
+                yield match.group("load_date"), match.group("prefix"), (archive, member)
+
+
+def find_datafiles(
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    pattern: Optional[str] = None,
+    datafile_dir: str = _DATAFILE_DIR,
+    dates: Optional[list] = None,
+    archives: bool = True,
+) -> list:
+    """
+    Finds the daily exchange datafiles to backfill.
+
+    Besides the daily JSON files, the members of the monthly zip archives and
+    the dates of the monthly Parquet datafiles are included. When a day exists
+    in more than one of them, the daily file is used first, then the zip
+    archive and then the Parquet datafile.
+
+    Args:
+        start_date: First load date to include as 'YYYY-MM-DD', or None.
+        end_date: Last load date to include as 'YYYY-MM-DD', or None.
+        pattern: Glob, relative to datafile_dir, selecting the files. It is
+            matched against the archive member names too, which use the same
+            '<exchange>/<file>' layout, and against the daily .json name of
+            each date of a Parquet datafile. Defaults to every datafile.
+        datafile_dir: Root directory of the datafiles.
+        dates: Optional list of dates ('YYYY-MM-DD') and/or whole months
+            ('YYYY-MM') to include.
+        archives: Include the monthly zip archives and Parquet datafiles.
+
+    Returns:
+        A list of (load_date, exchange, datafile) tuples sorted by date, in the
+        same exchange order as the daily load. datafile is a path, an
+        (archive, member) or a (parquet_path, load_date) tuple as accepted by
+        load_data.
+    """
+    pattern = pattern or "*/*_full_tickers-*.json*"
+    order = list(EXCHANGES.values())
+
+    def selected(load_date: str) -> bool:
+        if (start_date and load_date < start_date) or (end_date and load_date > end_date):
+            return False
+        return not dates or any(load_date.startswith(d) for d in dates)
+
+    def in_range(month: str) -> bool:
+        return not ((start_date and month < start_date[:7]) or (end_date and month > end_date[:7]))
+
+    found: dict[tuple[str, int], Union[str, tuple]] = {}
+    for load_date, prefix, datafile in _archived_datafiles(datafile_dir, pattern, in_range) if archives else ():
+        if selected(load_date):
+            found[(load_date, order.index(prefix))] = datafile
+
+    # Reverse order, so a day's .json file wins over its .json.gz as in datafile_path
+    for path in sorted(glob.glob(os.path.join(datafile_dir, pattern)), reverse=True):
+        match = _DATAFILE_RE.search(os.path.basename(path))
+        if match and selected(match.group("load_date")):
+            found[(match.group("load_date"), order.index(match.group("prefix")))] = path
+
+    return [(load_date, list(EXCHANGES)[idx], found[(load_date, idx)]) for load_date, idx in sorted(found)]
+
+
+def parse_datafile(job: tuple) -> tuple:
+    """
+    Reads and cleans one exchange datafile. Runs in the backfill worker processes.
+
+    The file is parsed incrementally and cleaned chunk by chunk, so the raw
+    records are never all held in memory at once. The cleaned chunks are
+    kept apart, as they are handed to the writer process they are held for
+    the whole file, see backfill. A date of a Parquet datafile is read as
+    columns and cleaned in one go.
+
+    Args:
+        job: A (load_date, exchange, datafile) tuple as returned by
+            find_datafiles, optionally followed by the (file_size,
+            content_hash) recorded in load_manifest for the same exchange and
+            date.
+
+    Returns:
+        A (load_date, exchange, datafile, fingerprint, chunks) tuple, chunks
+        being a list of (master_batch, tape_batch) pairs in file order. chunks
+        is None when the file's fingerprint matches the recorded one, i.e.
+        the file is already loaded.
+    Raises:
+        DatafileError: if the file is not valid JSON.
+    """
+    load_date, exchange, path = job[:3]
+    loaded = tuple(job[3]) if len(job) > 3 and job[3] else None
+    if loaded is not None:
+        fingerprint = datafile_fingerprint(path)
+        if fingerprint == loaded:
+            return load_date, exchange, path, fingerprint, None
+
+    if is_parquet_datafile(path):
+        frame, source = read_parquet_datafile(*path)
+        chunks = [(build_stock_master_batch(frame, exchange), build_ticker_tape_batch(load_date, frame, exchange))]
+        return load_date, exchange, path, source[:2], chunks
+
+    chunks = []
+    try:
+        with open_datafile(path) as raw:
+            f = HashingReader(raw)
+            for data in iter_datafile_chunks(f):
+                master_batch = build_stock_master_batch(data, exchange)
+                chunks.append((master_batch, build_ticker_tape_batch(load_date, data, exchange)))
+    except json.JSONDecodeError as e:
+        raise DatafileError(path, e) from e
+    return load_date, exchange, path, f.fingerprint(), chunks
+
+
+def ordered_results(executor: Executor, fn: Callable, jobs: Iterable, window: int) -> Iterator:
+    """
+    Yields fn(job) for every job in order, like executor.map, but with at most
+    window jobs submitted ahead of the consumer.
+
+    executor.map submits every job at once, so when the consumer is slower
+    than the workers their results pile up in memory. Here the next job is
+    only submitted as the oldest result is taken.
+    """
+    jobs = iter(jobs)
+    pending = deque(executor.submit(fn, job) for _, job in zip(range(window), jobs))
+    while pending:
+        result = pending.popleft().result()
+        for job in jobs:
+            pending.append(executor.submit(fn, job))
+            break
+        yield result
+
+
+@contextmanager
+def parsed_datafiles(jobs: list, workers: Optional[int] = None) -> Iterator[Iterator[tuple]]:
+    """
+    Parses backfill jobs with parse_datafile, in a process pool unless one
+    worker is asked for or there is a single job.
+
+    Yields:
+        An iterator over the parse_datafile results in job order. At most two
+        jobs per worker are parsed ahead of the consumer.
+    """
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(jobs) < 2:
+        yield map(parse_datafile, jobs)
+        return
+    executor = ProcessPoolExecutor(max_workers=workers)
+    try:
+        yield ordered_results(executor, parse_datafile, jobs, 2 * workers)
+    finally:
+        executor.shutdown(cancel_futures=True)
+
+
+def _load_parsed_file(
+    con: duckdb.DuckDBPyConnection,
+    metrics: LoadMetrics,
+    load_date: str,
+    exchange: str,
+    path: Union[str, tuple],
+    fingerprint: tuple,
+    chunks: list,
+) -> int:
+    # Writes one parsed datafile in the current transaction, returns the number of ticker_tape rows inserted
+    with metrics.phase("replace"):
+        replaced = delete_ticker_tape_date(con, load_date, exchange)
+    if replaced:
+        print(f"Replacing ticker tape rows of {exchange} for {load_date}")
+    source_rows = inserted = 0
+    for master_batch, tape_batch in chunks:
+        with metrics.phase("master_upsert"):
+            upsert_stock_master_batch(con, master_batch, exchange, load_date)
+        with metrics.phase("tape_insert"):
+            inserted += insert_ticker_tape_batch(con, tape_batch)
+        source_rows += len(tape_batch)
+    with metrics.phase("manifest"):
+        record_manifest_entry(con, load_date, exchange, path, fingerprint, source_rows, inserted)
+    metrics.count("rows_accepted", inserted)
+    metrics.count("files_loaded")
+    print(f"Loaded {datafile_name(path)}")
+    return inserted
+
+
+def backfill(con: duckdb.DuckDBPyConnection, jobs: list, workers: Optional[int] = None, resume: bool = True) -> dict:
+    """
+    Loads many datafiles, parsing them in a process pool.
+
+    The files are parsed and cleaned in worker processes while this process is
+    the only DuckDB writer. A worker hands over the cleaned chunks of a whole
+    file, which the writer inserts chunk by chunk. At most two files per
+    worker are parsed ahead of the writer, so memory stays bounded by the
+    cleaned columns of that many files when the writer is the slower side.
+    Each date is committed as one transaction together with its
+    load_manifest entries, breadth rows and latest quotes, so an interrupted
+    backfill can be re-run and continues with the first date that was not
+    committed. Inside a transaction the caller began, the dates join it and
+    the caller commits.
+
+    Args:
+        con: Active DuckDB connection.
+        jobs: A list of (load_date, exchange, datafile) tuples as returned by
+            find_datafiles.
+        workers: Number of worker processes, defaults to the CPU count. With 1
+            the files are parsed in this process.
+        resume: Skip files whose content is already loaded according to
+            load_manifest. A file whose content changed replaces the rows of
+            its exchange and date. With False every file is reloaded.
+
+    Returns:
+        A dict with the 'files', 'skipped', 'rows', 'seconds', 'rows_per_sec'
+        and 'files_per_sec' totals.
+    """
+    create_load_manifest(con)
+    manifest = get_manifest_entries(con) if resume else {}
+    jobs = [(load_date, exchange, path, manifest.get((load_date, exchange))) for load_date, exchange, path in jobs]
+
+    metrics = current_metrics()
+    started = time.perf_counter()
+    files = skipped = rows = 0
+    with parsed_datafiles(jobs, workers) as batches:
+        # The parse phase is the time spent waiting for the parsed files
+        for load_date, parsed_files in groupby(timed_chunks(batches, metrics), key=itemgetter(0)):
+            loaded = 0
+            with _own_transaction(con, metrics):
+                for parsed in parsed_files:
+                    if parsed[-1] is None:
+                        skipped += 1
+                        metrics.count("files_skipped")
+                        continue
+                    rows += _load_parsed_file(con, metrics, *parsed)
+                    loaded += 1
+                if loaded:
+                    refresh_load_date(con, load_date)
+            if loaded:
+                files += loaded
+                print(f"Committed load date {load_date}")
+
+    if skipped:
+        print(f"Skipped {skipped} files that are already loaded")
+    seconds = time.perf_counter() - started
+    stats = {
+        "files": files,
+        "skipped": skipped,
+        "rows": rows,
+        "seconds": round(seconds, 3),
+        "rows_per_sec": round(rows / seconds, 1) if seconds else 0.0,
+        "files_per_sec": round(files / seconds, 2) if seconds else 0.0,
+    }
+    print(
+        f"Backfilled {files} files, {rows} rows in {stats['seconds']}s "
+        f"({stats['rows_per_sec']} rows/sec, {stats['files_per_sec']} files/sec)"
+    )
+    return stats
+
+
+def needs_migrate(con: duckdb.DuckDBPyConnection) -> bool:
+    """
+    Returns True if the database was created before the compact ticker_tape
+    layout and its industry lookup table. The loader cannot write into it
+    until 'artha-data migrate' has converted it.
+    """
+    if not table_exists(con, "ticker_tape"):
+        return False
+    return bool(needs_migration(con)) or not table_exists(con, "industry")
+
+
+def _is_date_or_month(value: str) -> bool:
+    # A --date value is matched as a prefix of the load dates, so it must be a whole date or month
+    if not _DATE_OR_MONTH_RE.fullmatch(value):
+        return False
+    try:
+        datetime.strptime(value, "%Y-%m-%d" if len(value) > 7 else "%Y-%m")
+    except ValueError:
+        return False
+    return True
+
+
+def backfill_main(argv: list) -> int:
+    """
+    Entry point for 'load_ticker_data backfill'.
+
+    Loads every datafile, daily or archived, within a date range and/or
+    matching a glob.
+    """
+    parser = argparse.ArgumentParser(
+        prog="artha_data.batch.load_ticker_data backfill", description=backfill_main.__doc__
+    )
+    parser.add_argument("--from", dest="start_date", help="first load date, YYYY-MM-DD")
+    parser.add_argument("--to", dest="end_date", help="last load date, YYYY-MM-DD")
+    parser.add_argument(
+        "--glob", dest="pattern", help="glob relative to the datafiles directory, e.g. 'nyse/*2026-03-*'"
+    )
+    parser.add_argument(
+        "--date", dest="dates", action="append", help="load date YYYY-MM-DD or whole month YYYY-MM, repeatable"
+    )
+    parser.add_argument("--no-archives", dest="archives", action="store_false", help="skip the monthly zip archives")
+    parser.add_argument("--workers", type=int, default=None, help="number of parser processes (default: CPU count)")
+    parser.add_argument(
+        "--no-resume", dest="resume", action="store_false", help="reload files even if they are already loaded"
+    )
+    args = parser.parse_args(argv)
+
+    try:
+        for value in (args.start_date, args.end_date):
+            if value:
+                datetime.strptime(value, "%Y-%m-%d")
+    except ValueError:
+        print("Invalid date format. Please use YYYY-MM-DD.")
+        return 2
+    for value in args.dates or ():
+        if not _is_date_or_month(value):
+            print(f"Invalid --date {value}. Please use YYYY-MM-DD or YYYY-MM.")
+            return 2
+
+    jobs = find_datafiles(args.start_date, args.end_date, args.pattern, dates=args.dates, archives=args.archives)
+    if not jobs:
+        print("No datafiles found to backfill.")
+        return 1
+
+    con = get_settings().connect(DB_FILE)
+    try:
+        if needs_migrate(con):
+            print(MIGRATE_FIRST)
+            return 1
+        with load_run(con, "backfill", argv) as metrics:
+            try:
+                backfill(con, jobs, workers=args.workers, resume=args.resume)
+                with metrics.phase("snapshot"):
+                    refresh_report_snapshot(con)
+            except (duckdb.Error, ValueError, OSError) as e:
+                metrics.fail(e)
+                print(f"Backfill was unsuccessful: {e}")
+                return -1
+    finally:
+        con.close()
+    return 0
+
+
+def main(argv: Optional[list] = None) -> int:
     """
     Main entry point for the data loading script.
 
-    Parses command-line arguments for the load date, connects to the database,
-    and iterates through the exchange data files to load them.
+    Parses command-line arguments (sys.argv by default) for the load date,
+    connects to the database, and iterates through the exchange data files to
+    load them.
+
+    Every run logs its metrics as JSON lines on stderr and records a summary
+    row in the load_runs table. With --profile PATH the run is profiled to
+    PATH (a cProfile dump, or pyinstrument HTML for a .html path).
     """
     rc = 0
 
     print(f"sys path: {sys.path}")
-    if len(sys.argv) < 2:
-        print("Usage: python load_ticker_data.py YYYY-MM-DD")
+    argv, profile = pop_profile_option(sys.argv[1:] if argv is None else argv)
+    if len(argv) < 1:
+        print("Usage: python -m artha_data.batch.load_ticker_data [--profile PATH] YYYY-MM-DD")
+        print(
+            "       python -m artha_data.batch.load_ticker_data [--profile PATH] backfill [--from YYYY-MM-DD] "
+            "[--to YYYY-MM-DD] [--date YYYY-MM[-DD]] [--glob PATTERN]"
+        )
         rc = 1
         return rc
 
+    enable_json_logs()
+    with profiled(profile):
+        if argv[0] == "backfill":
+            return backfill_main(argv[1:])
+        return load_date_main(argv[0])
+
+
+def load_date_main(load_date_str: str) -> int:
+    """Loads the three exchange datafiles of one date."""
+    rc = 0
     try:
-        load_date_str = sys.argv[1]
         # Validate date format
         datetime.strptime(load_date_str, "%Y-%m-%d")
     except ValueError:
@@ -180,26 +1467,37 @@ def main() -> int:
         rc = 2
         return rc
 
-    con = duckdb.connect(database=DB_FILE, read_only=False)
+    con = get_settings().connect(DB_FILE)
 
     # create_table(con)
-    # Load data for all three exchanges
-    nasdaq_file = _DATAFILE_DIR + "/nasdaq/nasdaq_full_tickers-" + load_date_str + ".json"
-    amex_file = _DATAFILE_DIR + "/amex/amex_full_tickers-" + load_date_str + ".json"
-    nyse_file = _DATAFILE_DIR + "/nyse/nyse_full_tickers-" + load_date_str + ".json"
+    # Load data for all three exchanges, from the monthly archive if the day
+    # has already been archived
+    files = [(exchange, datafile_path(load_date_str, exchange)) for exchange in ("NASDAQ", "AMEX", "NYSE")]
 
     try:
-        load_data(con, load_date_str, nasdaq_file, "NASDAQ")
-
-        load_data(con, load_date_str, amex_file, "AMEX")
-
-        load_data(con, load_date_str, nyse_file, "NYSE")
+        if needs_migrate(con):
+            print(MIGRATE_FIRST)
+            return 1
+        with load_run(con, "load", [load_date_str]) as metrics:
+            try:
+                # The date is committed as a whole and refreshed once, after all three exchanges, as in backfill
+                with _own_transaction(con, metrics):
+                    loaded = [
+                        load_data(con, load_date_str, datafile, exchange, chunk_size=DEFAULT_CHUNK_SIZE, refresh=False)
+                        for exchange, datafile in files
+                    ]
+                    if any(rows is not None for rows in loaded):
+                        refresh_load_date(con, load_date_str)
 
+                print(f"Successfully loaded data for date: {load_date_str}")
+                with metrics.phase("snapshot"):
+                    refresh_report_snapshot(con)
+            except (duckdb.Error, ValueError) as e:
+                metrics.fail(e)
+                print(f"Data load was unsuccessful for date: {load_date_str}")
+                rc = -1
+    finally:
         con.close()
-        print(f"Successfully loaded data for date: {load_date_str}")
-    except (duckdb.Error, ValueError):
-        print(f"Data load was unsuccessful for date: {load_date_str}")
-        rc = -1
 
     return rc
 
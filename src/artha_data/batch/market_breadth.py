@@ -0,0 +1,121 @@
+import sys
+from datetime import datetime
+from typing import Optional
+
+import duckdb
+
+from ..utils.settings import get_settings
+from .db_init import create_table_if_missing, execute_count
+
+# The database is resolved by the settings (ARTHA_DB_FILE, default data/artha.db)
+DB_FILE = get_settings().db_file
+
+
+def refresh_market_breadth(con: duckdb.DuckDBPyConnection, load_date: Optional[str] = None) -> int:
+    """
+    Recomputes the market_breadth rows of one load date, or of all dates.
+
+    Only the ticker_tape rows of the given date are aggregated. The cumulative
+    advance/decline line is then carried forward from the previous date, which
+    only touches the (small) market_breadth table. The caller is responsible for
+    committing, so the loader can refresh the breadth in the same transaction
+    as the day's data.
+
+    Args:
+        con: Active DuckDB connection.
+        load_date: The load date to refresh as 'YYYY-MM-DD', or None to rebuild
+            the whole table.
+
+    Returns:
+        The number of market_breadth rows written.
+    """
+    create_table_if_missing(con, "market_breadth")
+    if load_date is None:
+        con.execute("DELETE FROM market_breadth")
+    else:
+        con.execute("DELETE FROM market_breadth WHERE load_date = ?", (load_date,))
+
+    # The exchange comes from the file the row was loaded from, stock_master
+    # only fills the gap for rows loaded before ticker_tape had the column.
+    # Rows with neither are not counted.
+    written = execute_count(
+        con,
+        """
+        INSERT INTO market_breadth (
+            load_date, exchange, advancers, decliners, unchanged, total_volume, up_volume, down_volume, ad_line
+        )
+        SELECT
+            tt.load_date,
+            COALESCE(tt.exchange, sm.exchange) AS exchange,
+            count(*) FILTER (WHERE tt.adv_dec > 0),
+            count(*) FILTER (WHERE tt.adv_dec < 0),
+            count(*) FILTER (WHERE tt.adv_dec = 0),
+            COALESCE(SUM(tt.volume), 0),
+            COALESCE(SUM(tt.volume) FILTER (WHERE tt.adv_dec > 0), 0),
+            COALESCE(SUM(tt.volume) FILTER (WHERE tt.adv_dec < 0), 0),
+            0
+        FROM ticker_tape tt
+        LEFT JOIN stock_master sm ON tt.symbol = sm.symbol
+        WHERE ($load_date IS NULL OR tt.load_date = CAST($load_date AS DATE))
+          AND COALESCE(tt.exchange, sm.exchange) IS NOT NULL
+        GROUP BY tt.load_date, COALESCE(tt.exchange, sm.exchange)
+        """,
+        {"load_date": load_date},
+    )
+
+    # Every later date's cumulative line moves with a refreshed date
+    con.execute(
+        """
+        UPDATE market_breadth mb
+        SET ad_line = c.ad_line, updated_at = NOW()
+        FROM (
+            SELECT
+                load_date,
+                exchange,
+                SUM(advancers - decliners) OVER (PARTITION BY exchange ORDER BY load_date) AS ad_line
+            FROM market_breadth
+        ) c
+        WHERE mb.load_date = c.load_date
+          AND mb.exchange = c.exchange
+          AND ($load_date IS NULL OR mb.load_date >= CAST($load_date AS DATE))
+        """,
+        {"load_date": load_date},
+    )
+    return written
+
+
+def main() -> int:
+    """
+    Main entry point to refresh the market_breadth table.
+
+    With a YYYY-MM-DD argument only that date is refreshed, with --rebuild the
+    whole table is recomputed from ticker_tape, e.g. for repairs.
+    """
+    if len(sys.argv) != 2:
+        print("Usage: python -m artha_data.batch.market_breadth YYYY-MM-DD | --rebuild")
+        return 1
+
+    load_date = None
+    if sys.argv[1] != "--rebuild":
+        try:
+            load_date = datetime.strptime(sys.argv[1], "%Y-%m-%d").strftime("%Y-%m-%d")
+        except ValueError:
+            print("Invalid date format. Please use YYYY-MM-DD.")
+            return 2
+
+    con = get_settings().connect(DB_FILE)
+    try:
+        con.begin()
+        written = refresh_market_breadth(con, load_date)
+        con.commit()
+        print(f"Refreshed {written} market breadth rows for {load_date or 'all dates'}")
+    except duckdb.Error as e:
+        print(f"Market breadth refresh was unsuccessful: {e}")
+        return -1
+    finally:
+        con.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,239 @@
+import argparse
+import sys
+
+import duckdb
+
+from ..utils.settings import get_settings
+from .db_init import create_table_if_missing, execute_count, read_schema, table_columns
+
+# The database is resolved by the settings (ARTHA_DB_FILE, default data/artha.db)
+DB_FILE = get_settings().db_file
+
+# Expected types of the compact ticker_tape columns
+COMPACT_TYPES = {
+    "lastsale": "DECIMAL(18,4)",
+    "netchange": "DECIMAL(18,4)",
+    "pctchange": "DECIMAL(18,3)",
+    "volume": "BIGINT",
+    "marketCap": "DECIMAL(18,2)",
+    "adv_dec": "TINYINT",
+    "industry_id": "SMALLINT",
+    "exchange": "ENUM",
+}
+
+
+def column_types(con: duckdb.DuckDBPyConnection, table_name: str) -> dict:
+    """Returns a dict of column name -> data type of a table, ENUM columns as 'ENUM'."""
+    rows = con.execute(
+        "SELECT column_name, data_type FROM duckdb_columns() WHERE table_name = ? ORDER BY column_index",
+        [table_name],
+    ).fetchall()
+    return {name: "ENUM" if data_type.startswith("ENUM") else data_type for name, data_type in rows}
+
+
+def needs_migration(con: duckdb.DuckDBPyConnection) -> dict:
+    """Returns the ticker_tape columns that differ from the compact layout, as {column: current type or None}."""
+    types = column_types(con, "ticker_tape")
+    return {name: types.get(name) for name, data_type in COMPACT_TYPES.items() if types.get(name) != data_type}
+
+
+def is_sorted(con: duckdb.DuckDBPyConnection) -> bool:
+    """Returns True if the ticker_tape rows are stored in (load_date, symbol) order."""
+    unsorted = execute_count(
+        con,
+        """
+        SELECT count(*) FROM (
+            SELECT load_date, symbol,
+                   lag(load_date) OVER w AS prev_date,
+                   lag(symbol) OVER w AS prev_symbol
+            FROM ticker_tape
+            WINDOW w AS (ORDER BY rowid)
+        )
+        WHERE prev_date > load_date OR (prev_date = load_date AND prev_symbol > symbol)
+        """,
+    )
+    return unsorted == 0
+
+
+def database_bytes(con: duckdb.DuckDBPyConnection) -> int:
+    """Returns the bytes used by the blocks of the database file."""
+    [(block_size, used_blocks)] = con.execute(
+        "SELECT block_size, used_blocks FROM pragma_database_size() WHERE database_name = current_database()"
+    ).fetchall()
+    return int(block_size) * int(used_blocks)
+
+
+def unknown_exchanges(con: duckdb.DuckDBPyConnection, exchange: str = "tt.exchange") -> list:
+    """
+    Returns the distinct exchange values of ticker_tape that are not in the
+    exchange_code ENUM. exchange is the SQL expression of the value, it may
+    use stock_master as sm.
+    """
+    rows = con.execute(
+        f"""
+        SELECT DISTINCT {exchange}
+        FROM ticker_tape tt
+        LEFT JOIN stock_master sm ON tt.symbol = sm.symbol
+        WHERE {exchange} IS NOT NULL AND TRY_CAST({exchange} AS exchange_code) IS NULL
+        ORDER BY 1
+        """  # noqa: S608 - exchange is an SQL expression given by the caller
+    ).fetchall()
+    return [row[0] for row in rows]
+
+
+def _check_exchanges(con: duckdb.DuckDBPyConnection, exchange: str) -> None:
+    # TRY_CAST turns an exchange the ENUM does not have into NULL, the migration must not lose it
+    unknown = unknown_exchanges(con, exchange)
+    if unknown:
+        msg = f"ticker_tape has exchanges that are not in exchange_code: {', '.join(map(str, unknown))}"
+        raise ValueError(msg)
+
+
+def _check_copied(con: duckdb.DuckDBPyConnection, copied: int) -> None:
+    total = execute_count(con, "SELECT count(*) FROM ticker_tape")
+    if copied != total:
+        msg = f"Copied {copied} of {total} ticker_tape rows, the migration was rolled back."
+        raise ValueError(msg)
+
+
+def migrate_ticker_tape(con: duckdb.DuckDBPyConnection, transaction: bool = True) -> int:
+    """
+    Rewrites ticker_tape in the compact layout of ticker_tape.sql.
+
+    The rows are copied into a new table in (load_date, symbol) order with the
+    typed columns, then the new table replaces the old one, all in one
+    transaction. Legacy TEXT sector/industry columns are moved into the
+    industry lookup table, a missing exchange is taken from stock_master. A
+    database that already has the compact layout is only re-sorted, e.g. after
+    an older date was reloaded.
+
+    Prices are rounded to the DECIMAL scales of ticker_tape.sql, see there.
+
+    Args:
+        con: Active DuckDB connection.
+        transaction: Run in a transaction of its own. False when the caller
+            runs the migration inside its transaction, e.g. db_init migrate.
+
+    Returns:
+        The number of rows copied.
+    Raises:
+        ValueError: if an exchange is not one of exchange_code or the copy
+            does not have the same number of rows.
+    """
+    columns = table_columns(con, "ticker_tape")
+    if transaction:
+        con.begin()
+    try:
+        create_table_if_missing(con, "industry")
+        if "industry_id" in columns:
+            industry_id = "tt.industry_id"
+            industry_join = ""
+        elif "nd_industry" in columns and "nd_sector" in columns:
+            con.execute(
+                """
+                INSERT INTO industry (industry_id, nd_sector, nd_industry)
+                SELECT
+                    (SELECT COALESCE(max(industry_id), 0) FROM industry)
+                        + row_number() OVER (ORDER BY nd_sector, nd_industry),
+                    nd_sector,
+                    nd_industry
+                FROM (
+                    SELECT DISTINCT nd_sector, nd_industry
+                    FROM ticker_tape
+                    WHERE nd_sector IS NOT NULL OR nd_industry IS NOT NULL
+                ) b
+                WHERE NOT EXISTS (
+                    SELECT 1 FROM industry i
+                    WHERE i.nd_sector IS NOT DISTINCT FROM b.nd_sector
+                      AND i.nd_industry IS NOT DISTINCT FROM b.nd_industry
+                )
+                """
+            )
+            industry_id = "i.industry_id"
+            industry_join = """
+                LEFT JOIN industry i
+                    ON i.nd_sector IS NOT DISTINCT FROM tt.nd_sector AND i.nd_industry IS NOT DISTINCT FROM tt.nd_industry
+            """
+        else:
+            industry_id = "NULL"
+            industry_join = ""
+        exchange = "COALESCE(tt.exchange, sm.exchange)" if "exchange" in columns else "sm.exchange"
+
+        # Same DDL as ticker_tape.sql, under a new name
+        con.execute(
+            read_schema("ticker_tape").replace(
+                "CREATE TABLE IF NOT EXISTS ticker_tape", "CREATE TABLE ticker_tape_compact"
+            )
+        )
+        _check_exchanges(con, exchange)
+        copied = execute_count(
+            con,
+            f"""
+            INSERT INTO ticker_tape_compact (
+                load_date, symbol, lastsale, netchange, pctchange, volume, marketCap, adv_dec, industry_id, exchange,
+                created_at, updated_at
+            )
+            SELECT
+                tt.load_date, tt.symbol, tt.lastsale, tt.netchange, tt.pctchange, tt.volume, tt.marketCap,
+                tt.adv_dec, {industry_id}, TRY_CAST({exchange} AS exchange_code), tt.created_at, tt.updated_at
+            FROM ticker_tape tt
+            LEFT JOIN stock_master sm ON tt.symbol = sm.symbol
+            {industry_join}
+            ORDER BY tt.load_date, tt.symbol
+            """,  # noqa: S608 - the industry and exchange expressions are constant SQL
+        )
+        _check_copied(con, copied)
+
+        con.execute("DROP TABLE ticker_tape")
+        con.execute("ALTER TABLE ticker_tape_compact RENAME TO ticker_tape")
+        if transaction:
+            con.commit()
+    except BaseException:
+        if transaction:
+            con.rollback()
+        raise
+    return copied
+
+
+def main() -> int:
+    """
+    Main entry point of the ticker_tape migration.
+
+    Converts ticker_tape to the compact, sorted layout in place. With --check
+    only reports whether the table needs it.
+    """
+    parser = argparse.ArgumentParser(prog="artha_data.batch.migrate_ticker_tape", description=main.__doc__)
+    parser.add_argument("--check", action="store_true", help="only report the current layout")
+    parser.add_argument("--db", default=DB_FILE, help=f"database file (default: {DB_FILE})")
+    args = parser.parse_args()
+
+    con = get_settings().connect(args.db, read_only=args.check)
+    try:
+        pending = needs_migration(con)
+        ordered = is_sorted(con)
+        for name, data_type in pending.items():
+            print(f"ticker_tape.{name}: {data_type or 'missing'}, expected {COMPACT_TYPES[name]}")
+        if not ordered:
+            print("ticker_tape rows are not stored in (load_date, symbol) order")
+        if args.check:
+            return 1 if pending or not ordered else 0
+        if not pending and ordered:
+            print("ticker_tape already has the compact layout.")
+            return 0
+
+        size_before = database_bytes(con)
+        copied = migrate_ticker_tape(con)
+        # Return the old table's blocks to the free list
+        con.execute("CHECKPOINT")
+        size_after = database_bytes(con)
+        print(f"Migrated {copied} ticker_tape rows, database {size_before / 1e6:.1f} MB -> {size_after / 1e6:.1f} MB")
+    except (duckdb.Error, ValueError) as e:
+        print(f"ticker_tape migration was unsuccessful: {e}")
+        return -1
+    finally:
+        con.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
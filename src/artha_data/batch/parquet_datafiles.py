@@ -0,0 +1,202 @@
+import errno
+import json
+import os
+import re
+from typing import Any
+
+import duckdb
+
+# The monthly Parquet datafiles written by convert_datafiles, one per exchange and month:
+# <datafiles_dir>/<prefix>_full_tickers-<YYYY-MM>.parquet with the load date as a column
+PARQUET_RE = re.compile(r"(?P<prefix>nasdaq|amex|nyse)_full_tickers-(?P<month>\d{4}-\d{2})\.parquet$")
+
+# The keys of a datafile record, in file order
+FIELDS = (
+    "symbol",
+    "name",
+    "lastsale",
+    "netchange",
+    "pctchange",
+    "volume",
+    "marketCap",
+    "country",
+    "ipoyear",
+    "industry",
+    "sector",
+    "url",
+)
+
+# Canonical text of a DECIMAL: its digits with at least 2 decimals, e.g. 10.3000 -> '10.30'
+_DECIMAL_TEXT = r"regexp_replace(CAST({} AS VARCHAR), '(\.\d\d\d*?)0+$', '\1')"
+
+# Typed fields: name -> (SQL parsing the raw text {} into the stored type, SQL formatting the typed value {} as
+# text). An empty text is NULL. When formatting the typed value does not give back the exact raw text, e.g. a price
+# with more decimals than the type keeps, the raw text is stored in the <name>_raw column.
+TYPED_FIELDS = {
+    "lastsale": (
+        "TRY_CAST(CASE WHEN starts_with({0}, '$') THEN substr({0}, 2) END AS DECIMAL(18, 4))",
+        "COALESCE('$' || " + _DECIMAL_TEXT + ", '')",
+    ),
+    "netchange": ("TRY_CAST({} AS DECIMAL(18, 4))", "COALESCE(" + _DECIMAL_TEXT + ", '')"),
+    "pctchange": (
+        "TRY_CAST(CASE WHEN ends_with({0}, '%') THEN substr({0}, 1, length({0}) - 1) END AS DECIMAL(18, 3))",
+        "COALESCE(" + _DECIMAL_TEXT + " || '%', '')",
+    ),
+    "volume": ("TRY_CAST({} AS BIGINT)", "COALESCE(CAST({} AS VARCHAR), '')"),
+    "marketCap": ("TRY_CAST({} AS DECIMAL(18, 2))", "COALESCE(" + _DECIMAL_TEXT + ", '')"),
+    "ipoyear": ("TRY_CAST({} AS SMALLINT)", "COALESCE(CAST({} AS VARCHAR), '')"),
+}
+
+# Rows per Parquet row group, about one exchange-day
+ROW_GROUP_SIZE = 8192
+
+# JSON layouts of the raw datafiles: the pretty-printed output of the old curl/jq
+# workflow and the compact output of fetch_exchanges. The layout is stored with
+# the rows, so the original bytes can be rebuilt and verified.
+SOURCE_FORMATS = {
+    "pretty": lambda records: json.dumps(records, indent=2, ensure_ascii=False).encode("utf-8") + b"\n",
+    "compact": lambda records: json.dumps(records, separators=(",", ":")).encode("utf-8"),
+}
+
+
+def typed_select(relation: str) -> str:
+    """
+    Returns a SELECT of the Parquet datafile columns from a relation with the
+    raw text of the FIELDS plus load_date, pos and the source_size,
+    source_hash and source_format of the file each row came from.
+    """
+    columns = ["CAST(load_date AS DATE) AS load_date", "CAST(pos AS INTEGER) AS pos"]
+    raw_columns = []
+    for field in FIELDS:
+        if field not in TYPED_FIELDS:
+            columns.append(f'"{field}"')
+            continue
+        parse, text = TYPED_FIELDS[field]
+        columns.append(f'{parse.format(f"raw.{field}")} AS "{field}"')
+        raw_columns.append(
+            f"CASE WHEN {text.format(parse.format(f'raw.{field}'))} IS DISTINCT FROM raw.{field} "
+            f'THEN raw.{field} END AS "{field}_raw"'
+        )
+    columns += raw_columns
+    columns += ["CAST(source_size AS BIGINT) AS source_size", "source_hash", "source_format"]
+    return f"SELECT {', '.join(columns)} FROM {relation} raw"  # noqa: S608 - quoted FIELDS, relation is given by the caller
+
+
+def write_parquet_datafile(
+    con: duckdb.DuckDBPyConnection, relation: str, path: str, row_group_size: int = ROW_GROUP_SIZE
+) -> None:
+    """
+    Writes a Parquet datafile, zstd-compressed and sorted by load date and
+    record position.
+
+    Args:
+        con: Active DuckDB connection.
+        relation: A table or view with the columns typed_select expects.
+        path: The Parquet file to write, replaced if it exists.
+        row_group_size: Rows per row group.
+    """
+    con.execute(
+        f"""
+        COPY ({typed_select(relation)} ORDER BY load_date, pos)
+        TO $path (FORMAT parquet, COMPRESSION zstd, ROW_GROUP_SIZE {int(row_group_size)})
+        """,
+        {"path": path},
+    )
+
+
+def _text_select(relation: str) -> str:
+    # Rebuilds the raw text of every field, in FIELDS order
+    columns = []
+    for field in FIELDS:
+        if field in TYPED_FIELDS:
+            columns.append(f'COALESCE("{field}_raw", {TYPED_FIELDS[field][1].format(field)}) AS "{field}"')
+        else:
+            columns.append(f'"{field}"')
+    return f"SELECT {', '.join(columns)}, source_size, source_hash, source_format FROM {relation}"  # noqa: S608 - see typed_select
+
+
+def parquet_dates(path: str) -> list:
+    """Returns the load dates in a Parquet datafile as sorted 'YYYY-MM-DD' strings."""
+    con = duckdb.cursor()
+    try:
+        rows = con.execute(
+            "SELECT DISTINCT strftime(load_date, '%Y-%m-%d') FROM read_parquet($path) ORDER BY 1", {"path": path}
+        ).fetchall()
+    finally:
+        con.close()
+    return [row[0] for row in rows]
+
+
+def parquet_source(path: str, load_date: str) -> tuple:
+    """
+    Returns the (size, sha256, format) of the original JSON file of one date
+    in a Parquet datafile, without reading its rows.
+
+    Raises:
+        FileNotFoundError: if the date is not in the file.
+    """
+    con = duckdb.cursor()
+    try:
+        source = con.execute(
+            """
+            SELECT source_size, source_hash, source_format FROM read_parquet($path)
+            WHERE load_date = CAST($load_date AS DATE) LIMIT 1
+            """,
+            {"path": path, "load_date": load_date},
+        ).fetchone()
+    finally:
+        con.close()
+    if source is None:
+        raise FileNotFoundError(errno.ENOENT, f"No {load_date} rows in the Parquet datafile", path)
+    return source
+
+
+def read_parquet_datafile(path: str, load_date: str) -> tuple:
+    """
+    Reads one date of a Parquet datafile as the raw records' text.
+
+    Args:
+        path: The monthly Parquet datafile.
+        load_date: The load date as 'YYYY-MM-DD'.
+
+    Returns:
+        A (frame, source) tuple. frame is a DataFrame with one string column
+        per FIELDS entry, in the original record order; it can be passed to
+        load_ticker_data.build_ticker_tape_batch like a list of records.
+        source is the (size, sha256, format) of the original JSON file.
+    Raises:
+        FileNotFoundError: if the date is not in the file.
+    """
+    con = duckdb.cursor()
+    try:
+        frame = con.execute(
+            f"""
+            {_text_select("read_parquet($path)")}
+            WHERE load_date = CAST($load_date AS DATE)
+            ORDER BY pos
+            """,
+            {"path": path, "load_date": load_date},
+        ).fetchdf()
+    finally:
+        con.close()
+    if frame.empty:
+        raise FileNotFoundError(errno.ENOENT, f"No {load_date} rows in the Parquet datafile", path)
+    source = tuple(frame.loc[0, ["source_size", "source_hash", "source_format"]])
+    return frame[list(FIELDS)].astype("string"), (int(source[0]), source[1], source[2])
+
+
+def datafile_records(frame: Any) -> list:
+    """Returns the records of a frame from read_parquet_datafile as a list of dictionaries."""
+    frame = frame[list(FIELDS)].astype(object)
+    records: list = frame.where(frame.notna(), None).to_dict("records")
+    return records
+
+
+def rebuild_datafile(frame: Any, source_format: str) -> bytes:
+    """Returns the original JSON bytes of a frame from read_parquet_datafile."""
+    return SOURCE_FORMATS[source_format](datafile_records(frame))
+
+
+def parquet_datafile_path(datafile_dir: str, prefix: str, month: str) -> str:
+    """Returns the path of an exchange's Parquet datafile for a month ('YYYY-MM')."""
+    return os.path.join(datafile_dir, f"{prefix}_full_tickers-{month}.parquet")
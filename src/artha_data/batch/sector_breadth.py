@@ -0,0 +1,191 @@
+import sys
+from collections.abc import Iterable
+from datetime import datetime
+from typing import Any, Optional
+
+import duckdb
+
+from ..utils.settings import get_settings
+from .db_init import create_table_if_missing, execute_count, table_columns
+from .stock_master_history import AS_OF_JOIN
+
+# The database is resolved by the settings (ARTHA_DB_FILE, default data/artha.db)
+DB_FILE = get_settings().db_file
+
+# The rolled-up columns, in the order of the grouping_id bits (exchange is the highest bit)
+ROLLUP_COLUMNS = ("exchange", "nd_sector", "nd_industry")
+
+
+def grouping_id(by: Iterable[str] = ()) -> int:
+    """
+    Returns the sector_breadth grouping_id of the cells grouped by the given
+    columns, e.g. () for the whole market or ('exchange', 'nd_sector').
+
+    Raises:
+        ValueError: for a column that is not in ROLLUP_COLUMNS.
+    """
+    unknown = set(by) - set(ROLLUP_COLUMNS)
+    if unknown:
+        msg = f"Cannot group sector_breadth by {', '.join(sorted(unknown))}"
+        raise ValueError(msg)
+    return sum(1 << (len(ROLLUP_COLUMNS) - 1 - i) for i, column in enumerate(ROLLUP_COLUMNS) if column not in by)
+
+
+def refresh_sector_breadth(con: duckdb.DuckDBPyConnection, load_date: Optional[str] = None) -> int:
+    """
+    Recomputes the sector_breadth rows of one load date, or of all dates.
+
+    Every combination of exchange, sector and industry is aggregated in one
+    GROUP BY CUBE pass over the date's ticker_tape rows. The sector and
+    industry come from the row's industry_id. Rows without one take them from
+    the stock_master_history version valid on the load date, so a rebuild
+    rolls up every past date with the classification of that date without
+    replaying the datafiles; stock_master fills the gap for symbols without
+    history. The caller is responsible for committing, so the loader can
+    refresh the rollups in the same transaction as the day's data.
+
+    Args:
+        con: Active DuckDB connection.
+        load_date: The load date to refresh as 'YYYY-MM-DD', or None to rebuild
+            the whole table.
+
+    Returns:
+        The number of sector_breadth rows written.
+    """
+    create_table_if_missing(con, "sector_breadth")
+    create_table_if_missing(con, "stock_master_history")
+    if load_date is None:
+        con.execute("DELETE FROM sector_breadth")
+    else:
+        con.execute("DELETE FROM sector_breadth WHERE load_date = ?", (load_date,))
+
+    columns = table_columns(con, "ticker_tape")
+    sector = "NULLIF(COALESCE(smh.nd_sector, sm.nd_sector), '')"
+    industry = "NULLIF(COALESCE(smh.nd_industry, sm.nd_industry), '')"
+    if "industry_id" in columns:
+        industry_join = "LEFT JOIN industry ind ON tt.industry_id = ind.industry_id"
+        sector = f"COALESCE(NULLIF(ind.nd_sector, ''), {sector})"
+        industry = f"COALESCE(NULLIF(ind.nd_industry, ''), {industry})"
+    else:
+        industry_join = ""
+    exchange = "COALESCE(smh.exchange, sm.exchange)"
+    if "exchange" in columns:
+        exchange = f"COALESCE(CAST(tt.exchange AS TEXT), {exchange})"
+
+    return execute_count(
+        con,
+        f"""
+        INSERT INTO sector_breadth (
+            load_date, grouping_id, exchange, nd_sector, nd_industry, symbols, advancers, decliners, unchanged,
+            total_volume, up_volume, down_volume, market_cap, cap_weighted_return, equal_weighted_return
+        )
+        WITH tape AS (
+            SELECT
+                tt.load_date,
+                {exchange} AS exchange,
+                {sector} AS nd_sector,
+                {industry} AS nd_industry,
+                tt.adv_dec,
+                tt.volume,
+                CAST(tt.marketCap AS DOUBLE) AS market_cap,
+                CAST(tt.pctchange AS DOUBLE) AS pctchange
+            FROM ticker_tape tt
+            {AS_OF_JOIN}
+            LEFT JOIN stock_master sm ON tt.symbol = sm.symbol
+            {industry_join}
+            WHERE ($load_date IS NULL OR tt.load_date = CAST($load_date AS DATE))
+        )
+        SELECT
+            load_date,
+            GROUPING(exchange, nd_sector, nd_industry),
+            exchange,
+            nd_sector,
+            nd_industry,
+            count(*),
+            count(*) FILTER (WHERE adv_dec > 0),
+            count(*) FILTER (WHERE adv_dec < 0),
+            count(*) FILTER (WHERE adv_dec = 0),
+            COALESCE(SUM(volume), 0),
+            COALESCE(SUM(volume) FILTER (WHERE adv_dec > 0), 0),
+            COALESCE(SUM(volume) FILTER (WHERE adv_dec < 0), 0),
+            SUM(market_cap),
+            SUM(market_cap * pctchange) FILTER (WHERE market_cap > 0 AND pctchange IS NOT NULL)
+                / SUM(market_cap) FILTER (WHERE market_cap > 0 AND pctchange IS NOT NULL),
+            AVG(pctchange)
+        FROM tape
+        GROUP BY load_date, CUBE (exchange, nd_sector, nd_industry)
+        """,  # noqa: S608 - the column expressions and joins are constant SQL
+        {"load_date": load_date},
+    )
+
+
+def read_sector_breadth(
+    con: duckdb.DuckDBPyConnection, by: Iterable[str] = (), start: Optional[str] = None, end: Optional[str] = None
+) -> Any:
+    """
+    Returns the precomputed sector_breadth cells of one grouping as a DataFrame.
+
+    Args:
+        con: Active DuckDB connection.
+        by: The columns the cells are grouped by, e.g. ('nd_sector',) for the
+            sectors across all exchanges.
+        start: First load date (inclusive) as 'YYYY-MM-DD'.
+        end: Last load date (inclusive) as 'YYYY-MM-DD'.
+
+    Returns:
+        A DataFrame with load_date, the by columns and the measures, ordered by
+        load_date and the by columns.
+    """
+    keys = [column for column in ROLLUP_COLUMNS if column in by]
+    selected = ", ".join(["load_date", *keys])
+    return con.execute(
+        f"""
+        SELECT
+            {selected}, symbols, advancers, decliners, unchanged, total_volume, up_volume, down_volume,
+            market_cap, cap_weighted_return, equal_weighted_return
+        FROM sector_breadth
+        WHERE grouping_id = $grouping_id
+          AND ($start IS NULL OR load_date >= CAST($start AS DATE))
+          AND ($end IS NULL OR load_date <= CAST($end AS DATE))
+        ORDER BY {selected}
+        """,  # noqa: S608 - selected only has ROLLUP_COLUMNS, the values are bound
+        {"grouping_id": grouping_id(by), "start": start, "end": end},
+    ).fetchdf()
+
+
+def main() -> int:
+    """
+    Main entry point to refresh the sector_breadth table.
+
+    With a YYYY-MM-DD argument only that date is refreshed, with --rebuild the
+    whole table is recomputed from ticker_tape and stock_master_history, e.g.
+    for repairs.
+    """
+    if len(sys.argv) != 2:
+        print("Usage: python -m artha_data.batch.sector_breadth YYYY-MM-DD | --rebuild")
+        return 1
+
+    load_date = None
+    if sys.argv[1] != "--rebuild":
+        try:
+            load_date = datetime.strptime(sys.argv[1], "%Y-%m-%d").strftime("%Y-%m-%d")
+        except ValueError:
+            print("Invalid date format. Please use YYYY-MM-DD.")
+            return 2
+
+    con = get_settings().connect(DB_FILE)
+    try:
+        con.begin()
+        written = refresh_sector_breadth(con, load_date)
+        con.commit()
+        print(f"Refreshed {written} sector breadth rows for {load_date or 'all dates'}")
+    except duckdb.Error as e:
+        print(f"Sector breadth refresh was unsuccessful: {e}")
+        return -1
+    finally:
+        con.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
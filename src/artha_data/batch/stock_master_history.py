@@ -0,0 +1,255 @@
+import sys
+from datetime import datetime
+from typing import Any, Optional
+
+import duckdb
+
+from ..utils.settings import get_settings
+from .db_init import create_table_if_missing, execute_count, table_exists
+
+# The database is resolved by the settings (ARTHA_DB_FILE, default data/artha.db)
+DB_FILE = get_settings().db_file
+
+# The versioned stock_master columns, a change in any of them starts a new version
+HISTORY_COLUMNS = ("name", "ipoyear", "nd_industry", "nd_sector", "exchange")
+
+# Joins every ticker_tape row tt to the stock_master_history version smh that
+# was valid on its load date. Versions of a symbol are contiguous, so the
+# latest valid_from on or before the date is the valid one.
+AS_OF_JOIN = "ASOF LEFT JOIN stock_master_history smh ON tt.symbol = smh.symbol AND tt.load_date >= smh.valid_from"
+
+
+def record_stock_master_history(con: duckdb.DuckDBPyConnection, batch: Any, load_date: str) -> dict:
+    """
+    Records the stock_master batch of a load date in stock_master_history.
+
+    The batch is diffed as a whole against the versions valid on the load date
+    in one statement. A symbol without a version gets one, a symbol whose
+    values changed gets a new version from the load date and its previous
+    version ends there. When the changed version itself started on the load
+    date, e.g. a reloaded file, it is corrected in place. Dates can be loaded
+    in any order: a version added before a symbol's later versions ends where
+    the next one starts. Symbols missing from the batch keep their version,
+    so delisted symbols keep their last classification. The caller is
+    responsible for committing.
+
+    Args:
+        con: Active DuckDB connection.
+        batch: A DataFrame as returned by load_ticker_data.build_stock_master_batch.
+        load_date: The load date of the batch as 'YYYY-MM-DD'.
+
+    Returns:
+        A dict with the 'added' (first version of a symbol), 'changed' and
+        'corrected' symbol counts.
+    """
+    create_table_if_missing(con, "stock_master_history")
+    differs = " OR ".join(f"h.{column} IS DISTINCT FROM b.{column}" for column in HISTORY_COLUMNS)
+    con.register("stock_master_history_batch", batch)
+    try:
+        con.execute(
+            f"""
+            CREATE OR REPLACE TEMP TABLE stock_master_history_changes AS
+            SELECT
+                b.symbol, {", ".join(f"b.{column}" for column in HISTORY_COLUMNS)},
+                h.valid_from AS current_from,
+                CASE WHEN h.symbol IS NULL THEN (
+                    SELECT min(n.valid_from) FROM stock_master_history n
+                    WHERE n.symbol = b.symbol AND n.valid_from > CAST($load_date AS DATE)
+                ) ELSE h.valid_to END AS valid_to
+            FROM stock_master_history_batch b
+            LEFT JOIN stock_master_history h
+                ON h.symbol = b.symbol
+               AND h.valid_from <= CAST($load_date AS DATE)
+               AND (h.valid_to IS NULL OR h.valid_to > CAST($load_date AS DATE))
+            WHERE h.symbol IS NULL OR {differs}
+            """,  # noqa: S608 - the columns come from HISTORY_COLUMNS, the values are bound
+            {"load_date": load_date},
+        )
+    finally:
+        con.unregister("stock_master_history_batch")
+
+    try:
+        [(added, changed, corrected)] = con.execute(
+            """
+            SELECT
+                count(*) FILTER (current_from IS NULL),
+                count(*) FILTER (current_from < CAST($load_date AS DATE)),
+                count(*) FILTER (current_from = CAST($load_date AS DATE))
+            FROM stock_master_history_changes
+            """,
+            {"load_date": load_date},
+        ).fetchall()
+        if corrected:
+            assignments = ", ".join(f"{column} = c.{column}" for column in HISTORY_COLUMNS)
+            con.execute(
+                f"""
+                UPDATE stock_master_history h SET {assignments}
+                FROM stock_master_history_changes c
+                WHERE h.symbol = c.symbol AND h.valid_from = c.current_from
+                  AND c.current_from = CAST($load_date AS DATE)
+                """,  # noqa: S608 - the columns come from HISTORY_COLUMNS, the values are bound
+                {"load_date": load_date},
+            )
+        if changed:
+            con.execute(
+                """
+                UPDATE stock_master_history h SET valid_to = CAST($load_date AS DATE)
+                FROM stock_master_history_changes c
+                WHERE h.symbol = c.symbol AND h.valid_from = c.current_from
+                  AND c.current_from < CAST($load_date AS DATE)
+                """,
+                {"load_date": load_date},
+            )
+        if added or changed:
+            columns = ", ".join(HISTORY_COLUMNS)
+            con.execute(
+                f"""
+                INSERT INTO stock_master_history (symbol, {columns}, valid_from, valid_to)
+                SELECT symbol, {columns}, CAST($load_date AS DATE), valid_to
+                FROM stock_master_history_changes
+                WHERE current_from IS NULL OR current_from < CAST($load_date AS DATE)
+                ORDER BY symbol
+                """,  # noqa: S608 - the columns come from HISTORY_COLUMNS, the values are bound
+                {"load_date": load_date},
+            )
+    finally:
+        con.execute("DROP TABLE IF EXISTS stock_master_history_changes")
+    return {"added": added, "changed": changed, "corrected": corrected}
+
+
+def seed_stock_master_history(con: duckdb.DuckDBPyConnection) -> int:
+    """
+    Gives every stock_master symbol without history a first version.
+
+    Databases loaded before stock_master_history existed only know the latest
+    values, so they are taken as valid from the symbol's first ticker_tape
+    date (or the day the symbol was created). Symbols that already have
+    versions are left as they are.
+
+    Returns:
+        The number of versions added.
+    """
+    create_table_if_missing(con, "stock_master_history")
+    columns = ", ".join(HISTORY_COLUMNS)
+    first_seen = "CAST(sm.created_at AS DATE)"
+    if table_exists(con, "ticker_tape"):
+        first_tape_date = "(SELECT min(tt.load_date) FROM ticker_tape tt WHERE tt.symbol = sm.symbol)"
+        first_seen = f"COALESCE({first_tape_date}, {first_seen})"
+    return execute_count(
+        con,
+        f"""
+        INSERT INTO stock_master_history (symbol, {columns}, valid_from)
+        SELECT sm.symbol, {", ".join(f"sm.{column}" for column in HISTORY_COLUMNS)}, {first_seen}
+        FROM stock_master sm
+        WHERE NOT EXISTS (SELECT 1 FROM stock_master_history h WHERE h.symbol = sm.symbol)
+        ORDER BY sm.symbol
+        """,  # noqa: S608 - the columns come from HISTORY_COLUMNS, first_seen is constant SQL
+    )
+
+
+def ticker_tape_as_of(
+    con: duckdb.DuckDBPyConnection,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    symbols: Optional[list] = None,
+) -> Any:
+    """
+    Returns ticker_tape rows with the classification that was valid on their load date.
+
+    The rows of the whole range are joined to stock_master_history in one
+    ASOF JOIN, so a report over several years needs no per-day lookups.
+
+    Args:
+        con: Active DuckDB connection.
+        start: First load date (inclusive) as 'YYYY-MM-DD'.
+        end: Last load date (inclusive) as 'YYYY-MM-DD'.
+        symbols: Symbols to return, all symbols if None.
+
+    Returns:
+        A DataFrame with load_date, symbol, lastsale, pctchange, volume,
+        marketCap, adv_dec and the name, nd_sector, nd_industry and exchange
+        valid on the load date (NULL when the symbol has no version yet),
+        ordered by load_date and symbol.
+    """
+    return con.execute(
+        f"""
+        SELECT
+            tt.load_date, tt.symbol, tt.lastsale, tt.pctchange, tt.volume, tt.marketCap, tt.adv_dec,
+            smh.name, smh.nd_sector, smh.nd_industry, smh.exchange
+        FROM ticker_tape tt
+        {AS_OF_JOIN}
+        WHERE ($start IS NULL OR tt.load_date >= CAST($start AS DATE))
+          AND ($end IS NULL OR tt.load_date <= CAST($end AS DATE))
+          AND ($symbols IS NULL OR list_contains($symbols, tt.symbol))
+        ORDER BY tt.load_date, tt.symbol
+        """,  # noqa: S608 - AS_OF_JOIN is a constant, the values are bound
+        {"start": start, "end": end, "symbols": symbols},
+    ).fetchdf()
+
+
+def stock_master_as_of(con: duckdb.DuckDBPyConnection, as_of_date: str, symbols: Optional[list] = None) -> Any:
+    """
+    Returns the stock_master_history versions valid on one date as a DataFrame,
+    ordered by symbol, e.g. the sector members of a past date.
+    """
+    return con.execute(
+        f"""
+        SELECT symbol, {", ".join(HISTORY_COLUMNS)}, valid_from, valid_to
+        FROM stock_master_history
+        WHERE valid_from <= CAST($as_of AS DATE) AND (valid_to IS NULL OR valid_to > CAST($as_of AS DATE))
+          AND ($symbols IS NULL OR list_contains($symbols, symbol))
+        ORDER BY symbol
+        """,  # noqa: S608 - the columns come from HISTORY_COLUMNS, the values are bound
+        {"as_of": as_of_date, "symbols": symbols},
+    ).fetchdf()
+
+
+def main(argv: Optional[list] = None) -> int:
+    """
+    Main entry point to print the stock_master_history of symbols.
+
+    With --as-of YYYY-MM-DD only the versions valid on that date are printed.
+    """
+    args = sys.argv[1:] if argv is None else list(argv)
+    as_of = None
+    if "--as-of" in args:
+        i = args.index("--as-of")
+        if i + 1 >= len(args):
+            args = []
+        else:
+            as_of = args[i + 1]
+            del args[i : i + 2]
+    if not args:
+        print("Usage: python -m artha_data.batch.stock_master_history SYMBOL... [--as-of YYYY-MM-DD]")
+        return 1
+    if as_of is not None:
+        try:
+            as_of = datetime.strptime(as_of, "%Y-%m-%d").strftime("%Y-%m-%d")
+        except ValueError:
+            print("Invalid date format. Please use YYYY-MM-DD.")
+            return 2
+
+    symbols = [symbol.upper() for symbol in args]
+    con = get_settings().connect(DB_FILE, read_only=True)
+    try:
+        if as_of is not None:
+            history = stock_master_as_of(con, as_of, symbols)
+        else:
+            history = con.execute(
+                f"""
+                SELECT symbol, {", ".join(HISTORY_COLUMNS)}, valid_from, valid_to FROM stock_master_history
+                WHERE list_contains($symbols, symbol) ORDER BY symbol, valid_from
+                """,  # noqa: S608 - the columns come from HISTORY_COLUMNS, the values are bound
+                {"symbols": symbols},
+            ).fetchdf()
+    except duckdb.Error as e:
+        print(f"Stock master history lookup was unsuccessful: {e}")
+        return -1
+    finally:
+        con.close()
+    print(history.to_string(index=False) if len(history) else "No stock master history found")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
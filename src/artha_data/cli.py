@@ -0,0 +1,168 @@
+import argparse
+import sys
+from typing import Optional
+
+# Only the standard library is imported here. Each command imports its batch
+# module when it runs, so scheduled jobs do not pay for pandas, matplotlib or
+# seaborn unless the command needs them and 'artha-data --help' is instant.
+
+
+def _load(args: argparse.Namespace) -> int:
+    from .batch.load_metrics import enable_json_logs, profiled
+    from .batch.load_ticker_data import load_date_main
+
+    enable_json_logs()
+    with profiled(args.profile):
+        return load_date_main(args.date)
+
+
+def _backfill(args: argparse.Namespace) -> int:
+    from .batch.load_metrics import enable_json_logs, profiled
+    from .batch.load_ticker_data import backfill_main
+
+    enable_json_logs()
+    with profiled(args.profile):
+        return backfill_main(args.options)
+
+
+def _fetch(args: argparse.Namespace) -> int:
+    from .batch import fetch_exchanges
+
+    return fetch_exchanges.main(args.options)
+
+
+def _convert(args: argparse.Namespace) -> int:
+    from .batch import convert_datafiles
+
+    return convert_datafiles.main(args.options)
+
+
+def _prices(args: argparse.Namespace) -> int:
+    from .batch import load_stock_prices
+
+    return load_stock_prices.main(args.options)
+
+
+def _init_db(args: argparse.Namespace) -> int:
+    from .batch import db_init
+
+    if args.all:
+        if args.tables:
+            print("init-db: give table names or --all, not both", file=sys.stderr)
+            return 2
+        return db_init.main(["init-all"])
+    return db_init.main(args.tables)
+
+
+def _migrate(args: argparse.Namespace) -> int:
+    from .batch import db_init
+
+    return db_init.main(["migrate"])
+
+
+def _breadth(args: argparse.Namespace) -> int:
+    from .batch import calculate_exchange_adv_dec
+
+    return calculate_exchange_adv_dec.main(["--output", args.output] if args.output else [])
+
+
+def _quality(args: argparse.Namespace) -> int:
+    from .batch import data_quality
+
+    return data_quality.main(["--refresh", args.date] if args.refresh else [args.date])
+
+
+def _history(args: argparse.Namespace) -> int:
+    from .batch import stock_master_history
+
+    return stock_master_history.main([*args.symbols, *(["--as-of", args.as_of] if args.as_of else [])])
+
+
+def _export(args: argparse.Namespace) -> int:
+    from .batch import export_parquet
+
+    return export_parquet.main(args.options)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Returns the argument parser of the artha-data command."""
+    parser = argparse.ArgumentParser(prog="artha-data", description="Artha database batch commands.")
+    commands = parser.add_subparsers(dest="command", metavar="COMMAND", required=True)
+
+    load = commands.add_parser("load", help="load the three exchange datafiles of one date")
+    load.add_argument("date", help="load date, YYYY-MM-DD")
+    load.add_argument("--profile", metavar="PATH", help="profile the run (cProfile dump, or pyinstrument .html)")
+    load.set_defaults(run=_load)
+
+    # Options of backfill, fetch, convert, prices and export are parsed by their batch module, '-h' included
+    backfill = commands.add_parser("backfill", help="load every datafile in a date range", add_help=False)
+    backfill.add_argument("--profile", metavar="PATH", help="profile the run (cProfile dump, or pyinstrument .html)")
+    backfill.set_defaults(run=_backfill, passthrough=True)
+
+    fetch = commands.add_parser("fetch", help="download the exchange datafiles of a date concurrently", add_help=False)
+    fetch.set_defaults(run=_fetch, passthrough=True)
+
+    convert = commands.add_parser(
+        "convert", help="convert the JSON datafiles into monthly Parquet datafiles", add_help=False
+    )
+    convert.set_defaults(run=_convert, passthrough=True)
+
+    prices = commands.add_parser("prices", help="load daily OHLCV CSV/Parquet dumps into stock_prices", add_help=False)
+    prices.set_defaults(run=_prices, passthrough=True)
+
+    init_db = commands.add_parser("init-db", help="create tables from their schema files")
+    init_db.add_argument("tables", nargs="*", metavar="TABLE", help="table names, prints the schemas if none")
+    init_db.add_argument("--all", action="store_true", help="create every missing table in one transaction")
+    init_db.set_defaults(run=_init_db)
+
+    migrate = commands.add_parser("migrate", help="create missing tables and run the pending schema migrations")
+    migrate.set_defaults(run=_migrate)
+
+    breadth = commands.add_parser("breadth", help="plot the advance/decline by exchange")
+    breadth.add_argument("--output", metavar="PATH", help="write the chart to a PNG/SVG file instead of showing it")
+    breadth.set_defaults(run=_breadth)
+
+    quality = commands.add_parser("quality", help="print the data-quality summary and quarantined rows of a date")
+    quality.add_argument("date", help="load date, YYYY-MM-DD")
+    quality.add_argument("--refresh", action="store_true", help="recompute the summary first")
+    quality.set_defaults(run=_quality)
+
+    history = commands.add_parser("history", help="print the classification history of symbols")
+    history.add_argument("symbols", nargs="+", metavar="SYMBOL", help="stock symbols")
+    history.add_argument("--as-of", metavar="DATE", help="only the versions valid on DATE, YYYY-MM-DD")
+    history.set_defaults(run=_history)
+
+    export = commands.add_parser("export", help="export the database to the Parquet dataset", add_help=False)
+    export.set_defaults(run=_export, passthrough=True)
+    return parser
+
+
+def main(argv: Optional[list] = None) -> int:
+    """
+    Entry point of the artha-data command.
+
+    Usage:
+        artha-data load 2026-03-03
+        artha-data backfill --from 2026-03-01 --to 2026-03-31
+        artha-data fetch 2026-03-03 --load
+        artha-data convert --month 2026-02 --remove
+        artha-data prices downloads/yahoo
+        artha-data init-db stock_master ticker_tape
+        artha-data init-db --all
+        artha-data migrate
+        artha-data breadth --output breadth.png
+        artha-data quality 2026-03-03
+        artha-data history AAPL --as-of 2025-09-08
+        artha-data export --full
+    """
+    parser = build_parser()
+    args, options = parser.parse_known_args(sys.argv[1:] if argv is None else argv)
+    if options and not getattr(args, "passthrough", False):
+        parser.error(f"unrecognized arguments: {' '.join(options)}")
+    args.options = options
+    status: int = args.run(args)
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,8 @@
+-- This lookup table holds every distinct NASDAQ (sector, industry) pair seen in the datafiles. ticker_tape stores
+-- the small industry_id instead of repeating both strings on every row. New pairs are added by the loader.
+CREATE TABLE IF NOT EXISTS industry (
+    industry_id SMALLINT PRIMARY KEY,
+    nd_sector TEXT,
+    nd_industry TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+)
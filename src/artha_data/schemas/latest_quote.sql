@@ -0,0 +1,15 @@
+-- This table holds the latest ticker_tape row of every symbol. It is maintained by the loader in the same
+-- transaction as each day's data, so "latest price per symbol" lookups do not have to scan the whole history.
+-- The quote columns have the types of ticker_tape, so a quote is exactly the ticker_tape value.
+CREATE TABLE IF NOT EXISTS latest_quote (
+    symbol TEXT PRIMARY KEY,
+    load_date DATE,
+    exchange TEXT,
+    lastsale DECIMAL(18, 4),
+    netchange DECIMAL(18, 4),
+    pctchange DECIMAL(18, 3),
+    volume BIGINT,
+    marketCap DECIMAL(18, 2),
+    adv_dec TINYINT,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+)
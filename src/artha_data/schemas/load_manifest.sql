@@ -0,0 +1,13 @@
+-- This table records every exchange datafile loaded into ticker_tape, one row per exchange and load date.
+-- The size and content hash let the loader skip a file it has already loaded and reload a date when its file changed.
+CREATE TABLE IF NOT EXISTS load_manifest (
+    load_date DATE,
+    exchange TEXT,
+    source_file TEXT,
+    file_size BIGINT,
+    content_hash TEXT,
+    source_rows INTEGER,
+    tape_rows INTEGER,
+    loaded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (load_date, exchange)
+)
@@ -0,0 +1,21 @@
+-- This table has one summary row per instrumented batch run, e.g. a daily load or a backfill, so ingest
+-- durations and reject counts can be tracked over time. rejects and phases are JSON objects of
+-- reason -> rows and phase -> seconds. rows_rejected counts each rejected row once, a row can have several
+-- reasons. The seconds of a phase exclude the phases nested in it, so the phases add up to at most seconds.
+CREATE TABLE IF NOT EXISTS load_runs (
+    run_id TEXT PRIMARY KEY,
+    command TEXT,
+    args TEXT,
+    started_at TIMESTAMP,
+    finished_at TIMESTAMP,
+    seconds DOUBLE,
+    status TEXT,
+    error TEXT,
+    files_loaded INTEGER,
+    files_skipped INTEGER,
+    rows_accepted BIGINT,
+    rows_rejected BIGINT,
+    rejects TEXT,
+    phases TEXT,
+    peak_rss_mb DOUBLE
+)
@@ -0,0 +1,17 @@
+-- This table holds the daily market breadth per exchange, derived from ticker_tape. It is refreshed by the
+-- loader for every load date it commits, so breadth reports do not have to scan the whole ticker_tape.
+-- ad_line is the cumulative sum of advancers - decliners for the exchange up to and including load_date.
+CREATE TABLE IF NOT EXISTS market_breadth (
+    load_date DATE,
+    exchange TEXT,
+    advancers INTEGER,
+    decliners INTEGER,
+    unchanged INTEGER,
+    total_volume BIGINT,
+    up_volume BIGINT,
+    down_volume BIGINT,
+    ad_line BIGINT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (load_date, exchange)
+)
@@ -0,0 +1,18 @@
+-- This table holds the daily data-quality summary per exchange: the ticker tape rows checked, accepted and
+-- quarantined, and the number of quarantined rows that failed each check (a row can fail several). It is refreshed
+-- by the loader for every load date it commits, from ticker_tape and ticker_tape_quarantine.
+CREATE TABLE IF NOT EXISTS quality_summary (
+    load_date DATE,
+    exchange TEXT,
+    rows_checked INTEGER,
+    rows_accepted INTEGER,
+    rows_quarantined INTEGER,
+    missing_symbol INTEGER,
+    unparsable_price INTEGER,
+    negative_volume INTEGER,
+    unknown_symbol INTEGER,
+    duplicate INTEGER,
+    price_jump INTEGER,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (load_date, exchange)
+)
@@ -0,0 +1,8 @@
+-- This table records the schema migrations applied to the database, one row per version. A database created by
+-- python -m artha_data.batch.db_init init-all already has the current layout, so every migration is recorded
+-- as applied when it is created; older databases run the pending ones with db_init migrate.
+CREATE TABLE IF NOT EXISTS schema_migrations (
+    version INTEGER PRIMARY KEY,
+    name TEXT,
+    applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+)
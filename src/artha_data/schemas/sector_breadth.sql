@@ -0,0 +1,24 @@
+-- This table holds the daily breadth rolled up over every combination of exchange, NASDAQ sector and industry,
+-- derived from ticker_tape in one GROUPING SETS pass per load date. It is refreshed by the loader for every load
+-- date it commits, so sector-rotation reports read precomputed cells instead of re-aggregating the tape.
+-- grouping_id has a bit set for each rolled-up column (4 = exchange, 2 = nd_sector, 1 = nd_industry), e.g. 7 is
+-- the whole market and 3 one exchange. A NULL in a column that is not rolled up means the value was missing.
+-- cap_weighted_return is the market-cap-weighted average pctchange, equal_weighted_return the plain average.
+CREATE TABLE IF NOT EXISTS sector_breadth (
+    load_date DATE,
+    grouping_id TINYINT,
+    exchange TEXT,
+    nd_sector TEXT,
+    nd_industry TEXT,
+    symbols INTEGER,
+    advancers INTEGER,
+    decliners INTEGER,
+    unchanged INTEGER,
+    total_volume BIGINT,
+    up_volume BIGINT,
+    down_volume BIGINT,
+    market_cap DOUBLE,
+    cap_weighted_return DOUBLE,
+    equal_weighted_return DOUBLE,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+)
@@ -0,0 +1,17 @@
+-- This table keeps every version of a stock's name, NASDAQ classification and exchange as they appeared in the
+-- datafiles (a type 2 slowly changing dimension of stock_master, which only holds the latest values). A version is
+-- valid from valid_from (inclusive) to valid_to (exclusive); the current version has no valid_to. The loader adds
+-- a version when a symbol's values differ from the ones valid on the load date, so historical reports can attach
+-- the classification of the day with an ASOF JOIN on (symbol, load_date >= valid_from).
+CREATE TABLE IF NOT EXISTS stock_master_history (
+    symbol TEXT,
+    name TEXT,
+    ipoyear TEXT,
+    nd_industry TEXT,
+    nd_sector TEXT,
+    exchange TEXT,
+    valid_from DATE,
+    valid_to DATE,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (symbol, valid_from)
+)
@@ -1,14 +1,24 @@
 -- The ticker_tape table holds summary pricing data downloaded daily from NASDAQ with the US Stock Symbols datafiles
+-- The layout is compact: the exchange is an ENUM, the NASDAQ sector/industry pair is a key into the industry
+-- lookup table, volume is a BIGINT and prices are exact DECIMALs, which also compress better than DOUBLEs.
+-- Values with more decimals than the column's scale are rounded when they are loaded or migrated. In the datafiles
+-- these are float artifacts such as a lastsale of 750749.900000000023, which rounds to the intended 750749.9, but a
+-- price below 0.0001 would lose its digits. The loader appends each day sorted by symbol, so the
+-- rows are physically ordered by (load_date, symbol) and date range scans are pruned by the zone maps.
+-- Databases with the old TEXT/REAL/INTEGER layout are converted with python -m artha_data.batch.migrate_ticker_tape
+CREATE TYPE IF NOT EXISTS exchange_code AS ENUM ('NASDAQ', 'AMEX', 'NYSE');
 
 CREATE TABLE IF NOT EXISTS ticker_tape (
     load_date DATE,
     symbol TEXT,
-    lastsale REAL,
-    netchange REAL,
-    pctchange REAL,
-    volume INTEGER,
-    marketCap REAL,
-    adv_dec INTEGER,
+    lastsale DECIMAL(18, 4),
+    netchange DECIMAL(18, 4),
+    pctchange DECIMAL(18, 3),
+    volume BIGINT,
+    marketCap DECIMAL(18, 2),
+    adv_dec TINYINT,
+    industry_id SMALLINT,
+    exchange exchange_code,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     PRIMARY KEY (symbol, load_date),
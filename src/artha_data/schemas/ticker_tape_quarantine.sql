@@ -0,0 +1,20 @@
+-- This table holds the ticker tape rows the loader's data-quality checks rejected, with the reason codes of every
+-- failed check, e.g. ['unknown_symbol', 'price_jump'], so bad rows can be found and inspected instead of being
+-- dropped. Values are the cleaned values, NULL where the datafile's value could not be parsed; prev_lastsale is
+-- the symbol's last price before load_date that the price_jump check compared against. Reloading a file replaces
+-- the quarantined rows of its exchange and date.
+CREATE TABLE IF NOT EXISTS ticker_tape_quarantine (
+    load_date DATE,
+    exchange TEXT,
+    symbol TEXT,
+    reasons VARCHAR[],
+    lastsale DOUBLE,
+    netchange DOUBLE,
+    pctchange DOUBLE,
+    volume BIGINT,
+    marketCap DOUBLE,
+    prev_lastsale DOUBLE,
+    nd_sector TEXT,
+    nd_industry TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+)
@@ -1,13 +1,42 @@
 import logging
 import os
+import threading
+import weakref
+from collections.abc import Iterator
+from contextlib import contextmanager
+from typing import ClassVar, Optional
 
 import duckdb
 
+from .settings import get_settings
+
 # Configure logging
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 
+# The default database, ARTHA_DB_FILE or <project root>/data/artha.db
+DEFAULT_DB_FILE = get_settings().db_file
+
 
 class DbHelper:
+    # Process-wide connection manager. One DuckDB connection is opened lazily
+    # per database file and every thread gets its own cursor on it. DuckDB does
+    # not allow a read-only and a read-write connection to the same file in one
+    # process, so read-only handles come from the read-write connection once
+    # that is open, and asking for a read-write handle reopens a read-only
+    # connection as read-write. Reopening closes the cursors of every thread,
+    # so a process that writes should call open_for_writing() before its
+    # threads start reading.
+    _db_file = DEFAULT_DB_FILE
+    _lock = threading.RLock()
+    # db_file -> (connection, read_only, generation)
+    _connections: ClassVar[dict] = {}
+    # Database files whose connection is opened read-write from the start
+    _writable: ClassVar[set] = set()
+    # generation -> threads holding a cursor on that connection
+    _cursor_threads: ClassVar[dict] = {}
+    _generation = 0
+    _local = threading.local()
+
     @staticmethod
     def get_connection(_file, db_file):
         # Always pass the __file__ as the first argument from the caller. This
@@ -17,14 +46,137 @@ class DbHelper:
         # is made to the requested database and this helper can be reused with
         # multiple databases.
         # This helper assumes the database always exists in a "data" directory
-        # under the project root.
+        # under the project root, unless the database location is configured
+        # (ARTHA_DB_FILE), then db_file is looked up in that directory.
+        # This opens a new, unshared connection; use DbHelper.cursor() to reuse
+        # the shared one.
         try:
-            _PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(_file), "..", "..", ".."))
-            _DB_DIR = os.path.join(_PROJECT_ROOT, "data")
-            # _DATAFILE_DIR = os.path.join(_PROJECT_ROOT, "datafiles")
-            os.makedirs(_DB_DIR, exist_ok=True)  # Ensure the data directory exists
-            DB_FILE = os.path.join(_DB_DIR, db_file)
-            return duckdb.connect(database=DB_FILE, read_only=False)
+            settings = get_settings()
+            if "db_file" in settings.configured:
+                _DB_DIR = settings.db_dir
+            else:
+                _PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(_file), "..", "..", ".."))
+                _DB_DIR = os.path.join(_PROJECT_ROOT, "data")
+            return settings.connect(os.path.join(_DB_DIR, db_file))
         except duckdb.Error as e:
             logging.error(f"Error connecting to database: {e}")
             return None
+
+    @classmethod
+    def configure(cls, db_file: str) -> None:
+        """Sets the database file used by cursor() and transaction() when no
+        db_file is passed. Connections to the previous default stay open until
+        close_all() is called."""
+        with cls._lock:
+            cls._db_file = os.path.abspath(db_file)
+
+    @classmethod
+    def open_for_writing(cls, db_file: Optional[str] = None) -> None:
+        """Opens the shared connection to db_file (default: the configured
+        database) read-write from the start, read-only cursors included, so it
+        never has to be reopened while other threads use it. Call it before
+        any thread asks for a cursor."""
+        db_file = os.path.abspath(db_file) if db_file else cls._db_file
+        with cls._lock:
+            cls._writable.add(db_file)
+            cls._shared_connection(db_file, read_only=False)
+
+    @classmethod
+    def db_file(cls) -> str:
+        """Returns the configured default database file."""
+        return cls._db_file
+
+    @classmethod
+    def _shared_connection(cls, db_file: str, read_only: bool) -> tuple[duckdb.DuckDBPyConnection, int]:
+        """Returns the (connection, generation) shared by all threads for
+        db_file, opening or upgrading it as needed."""
+        current = threading.current_thread()
+        with cls._lock:
+            read_only = read_only and db_file not in cls._writable
+            entry = cls._connections.get(db_file)
+            if entry is not None and (read_only or not entry[1]):
+                cls._cursor_threads[entry[2]].add(current)
+                return entry[0], entry[2]
+            if entry is not None:
+                # Upgrade a read-only connection. Closing it breaks the cursors
+                # other threads may be reading with, so that is refused.
+                readers = [t for t in cls._cursor_threads.get(entry[2], ()) if t is not current and t.is_alive()]
+                if readers:
+                    msg = f"{db_file} is open read-only for other threads, call DbHelper.open_for_writing() first"
+                    raise duckdb.ConnectionException(msg)
+                entry[0].close()
+                cls._cursor_threads.pop(entry[2], None)
+            con = get_settings().connect(db_file, read_only=read_only)
+            cls._generation += 1
+            cls._connections[db_file] = (con, read_only, cls._generation)
+            cls._cursor_threads[cls._generation] = weakref.WeakSet([current])
+            return con, cls._generation
+
+    @classmethod
+    def _thread_state(cls, name: str) -> dict:
+        """Returns the calling thread's dict with the given name."""
+        state = getattr(cls._local, name, None)
+        if state is None:
+            state = {}
+            setattr(cls._local, name, state)
+        return state
+
+    @classmethod
+    def cursor(cls, read_only: bool = False, db_file: Optional[str] = None) -> duckdb.DuckDBPyConnection:
+        """
+        Returns this thread's cursor on the shared connection to db_file
+        (default: the configured database). Inside DbHelper.transaction() the
+        transaction's cursor is returned, so the calls share the transaction.
+
+        Do not close the returned cursor, it is reused by later calls.
+        """
+        db_file = os.path.abspath(db_file) if db_file else cls._db_file
+        transaction: Optional[duckdb.DuckDBPyConnection] = cls._thread_state("transactions").get(db_file)
+        if transaction is not None:
+            return transaction
+
+        con, generation = cls._shared_connection(db_file, read_only)
+        cursors = cls._thread_state("cursors")
+        cached: Optional[tuple[duckdb.DuckDBPyConnection, int]] = cursors.get(db_file)
+        if cached is not None and cached[1] == generation:
+            return cached[0]
+        cur = con.cursor()
+        cursors[db_file] = (cur, generation)
+        return cur
+
+    @classmethod
+    @contextmanager
+    def transaction(cls, db_file: Optional[str] = None) -> Iterator[duckdb.DuckDBPyConnection]:
+        """
+        Context manager running every DbHelper.cursor() call of this thread
+        inside one read-write transaction. It commits on success and rolls back
+        if the block raises. Nested use joins the outer transaction.
+        """
+        db_file = os.path.abspath(db_file) if db_file else cls._db_file
+        transactions = cls._thread_state("transactions")
+        if db_file in transactions:
+            yield transactions[db_file]
+            return
+
+        cur = cls.cursor(read_only=False, db_file=db_file)
+        cur.begin()
+        transactions[db_file] = cur
+        try:
+            yield cur
+        except BaseException:
+            cur.rollback()
+            raise
+        else:
+            cur.commit()
+        finally:
+            del transactions[db_file]
+
+    @classmethod
+    def close_all(cls) -> None:
+        """Closes every shared connection. The next cursor() call reopens them."""
+        with cls._lock:
+            for con, _, _ in cls._connections.values():
+                con.close()
+            cls._connections.clear()
+            cls._cursor_threads.clear()
+            cls._generation += 1
@@ -0,0 +1,359 @@
+from collections.abc import Iterable
+from typing import Any, Optional
+
+import duckdb
+import numpy as np
+
+from .db_helper import DbHelper
+
+# Tables a price history can be read from, with the columns mapped to
+# (date, close, high, low, volume). ticker_tape has one price per day, so its
+# high and low are the last sale.
+SOURCES = {
+    "ticker_tape": ("load_date", "lastsale", "lastsale", "lastsale", "volume"),
+    "stock_prices": ('"Date"', '"Close"', '"High"', '"Low"', '"Volume"'),
+}
+
+# Trading days per year, used for the 52-week window and to annualize volatility
+TRADING_DAYS = 252
+
+
+def load_price_history(
+    symbols: Optional[Iterable[str]] = None,
+    watchlist: Optional[str] = None,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    source: str = "ticker_tape",
+    con: Optional[duckdb.DuckDBPyConnection] = None,
+) -> "PriceHistory":
+    """
+    Reads the daily prices of many symbols with one query.
+
+    Args:
+        symbols: Symbols to read, all symbols when None.
+        watchlist: Only read the symbols of this watchlist.
+        start: First date (inclusive), e.g. '2025-01-02'. Indicators need
+            their window of history before the dates that are screened.
+        end: Last date (inclusive).
+        source: 'ticker_tape' or 'stock_prices'.
+        con: DuckDB connection, defaults to this thread's read-only cursor
+            from DbHelper.
+
+    Returns:
+        A PriceHistory.
+    Raises:
+        ValueError: for an unknown source.
+    """
+    if source not in SOURCES:
+        msg = f"Unknown price source '{source}', expected one of {', '.join(SOURCES)}"
+        raise ValueError(msg)
+    date, close, high, low, volume = SOURCES[source]
+    conditions: list[str] = []
+    params: dict[str, Any] = {}
+    if symbols is not None:
+        conditions.append("list_contains($symbols, symbol)")
+        params["symbols"] = list(symbols)
+    if watchlist is not None:
+        conditions.append("symbol IN (SELECT symbol FROM stocks_lists WHERE watchlist = $watchlist)")
+        params["watchlist"] = watchlist
+    if start is not None:
+        conditions.append(f"{date} >= CAST($start AS DATE)")
+        params["start"] = start
+    if end is not None:
+        conditions.append(f"{date} <= CAST($end AS DATE)")
+        params["end"] = end
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+    con = con or DbHelper.cursor(read_only=True)
+    columns = con.execute(
+        f"""
+        SELECT
+            symbol,
+            {date} AS date,
+            CAST({close} AS DOUBLE) AS close,
+            CAST({high} AS DOUBLE) AS high,
+            CAST({low} AS DOUBLE) AS low,
+            CAST({volume} AS DOUBLE) AS volume
+        FROM {source}
+        {where}
+        """,  # noqa: S608 - the source and its columns come from SOURCES, the values are bound
+        params,
+    ).fetchnumpy()
+    return PriceHistory.from_rows(
+        columns["symbol"],
+        columns["date"],
+        {name: np.ma.filled(np.ma.asarray(columns[name], dtype=float), np.nan) for name in PriceHistory.FIELDS},
+    )
+
+
+class PriceHistory:
+    """
+    Daily prices of many symbols as (dates x symbols) matrices.
+
+    Each field is a 2-D float array with one row per date and one column per
+    symbol, NaN where a symbol has no price on a date. The indicator methods
+    work on whole matrices, so they compute every symbol at once and loop in
+    Python at most over the dates. A rolling window counts rows of the shared
+    date axis; a value is NaN until the window has min_periods prices.
+
+    Usage:
+        history = load_price_history(start="2024-01-01")
+        history.screen()["rsi_14"]
+        history.series("AAPL")["close"]
+    """
+
+    FIELDS = ("close", "high", "low", "volume")
+
+    def __init__(
+        self,
+        symbols: Any,
+        dates: Any,
+        close: Any,
+        high: Optional[Any] = None,
+        low: Optional[Any] = None,
+        volume: Optional[Any] = None,
+    ) -> None:
+        """
+        Args:
+            symbols: 1-D array of the symbols, one per column.
+            dates: 1-D datetime64[D] array of the dates, one per row, ascending.
+            close: Closing prices.
+            high: Daily highs, defaults to close.
+            low: Daily lows, defaults to close.
+            volume: Daily volumes, all NaN by default.
+        """
+        self.symbols = np.asarray(symbols, dtype=object)
+        self.dates = np.asarray(dates, dtype="datetime64[D]")
+        self.close = np.asarray(close, dtype=float)
+        self.high = self.close if high is None else np.asarray(high, dtype=float)
+        self.low = self.close if low is None else np.asarray(low, dtype=float)
+        self.volume = np.full(self.close.shape, np.nan) if volume is None else np.asarray(volume, dtype=float)
+        self._columns = {symbol: i for i, symbol in enumerate(self.symbols)}
+
+    @classmethod
+    def from_rows(cls, symbols: Any, dates: Any, fields: dict) -> "PriceHistory":
+        """
+        Builds the matrices from long-format rows.
+
+        Args:
+            symbols: 1-D array with the symbol of each row.
+            dates: 1-D array with the date of each row.
+            fields: Dict of field name -> 1-D float array, for the FIELDS.
+
+        Returns:
+            A PriceHistory with the symbols and dates sorted.
+        """
+        symbol_values, columns = np.unique(np.asarray(symbols, dtype=str), return_inverse=True)
+        date_values, rows = np.unique(np.asarray(dates).astype("datetime64[D]"), return_inverse=True)
+        matrices = {}
+        for name in cls.FIELDS:
+            matrix = np.full((len(date_values), len(symbol_values)), np.nan)
+            matrix[rows, columns] = fields[name]
+            matrices[name] = matrix
+        return cls(symbol_values.astype(object), date_values, **matrices)
+
+    def __len__(self) -> int:
+        return len(self.symbols)
+
+    def __contains__(self, symbol: object) -> bool:
+        return symbol in self._columns
+
+    def _field(self, field: str) -> np.ndarray:
+        if field not in self.FIELDS:
+            msg = f"Unknown field '{field}', expected one of {', '.join(self.FIELDS)}"
+            raise ValueError(msg)
+        values: np.ndarray = getattr(self, field)
+        return values
+
+    def sma(self, window: int, field: str = "close", min_periods: Optional[int] = None) -> np.ndarray:
+        """Returns the simple moving average of a field over window rows."""
+        return _rolling_mean(self._field(field), window, min_periods)
+
+    def ema(self, span: int, field: str = "close") -> np.ndarray:
+        """Returns the exponential moving average of a field, with alpha = 2 / (span + 1)."""
+        return _ewm(self._field(field), 2.0 / (span + 1))
+
+    def rsi(self, period: int = 14) -> np.ndarray:
+        """Returns Wilder's relative strength index of the closing prices, from 0 to 100."""
+        change = np.diff(self.close, axis=0, prepend=np.nan)
+        average_gain = _wilder(np.where(change > 0, change, np.where(np.isnan(change), np.nan, 0.0)), period)
+        average_loss = _wilder(np.where(change < 0, -change, np.where(np.isnan(change), np.nan, 0.0)), period)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            rsi = 100.0 - 100.0 / (1.0 + average_gain / average_loss)
+        # No losses in the period is an RSI of 100
+        return np.where((average_loss == 0) & (average_gain > 0), 100.0, rsi)
+
+    def returns(self) -> np.ndarray:
+        """Returns the daily log returns of the closing prices. A return from or
+        to a zero close is NaN, not an infinity, so it drops out of the rolling
+        sums instead of turning them into NaN for good."""
+        with np.errstate(divide="ignore", invalid="ignore"):
+            returns = np.diff(np.log(self.close), axis=0, prepend=np.nan)
+        return np.where(np.isfinite(returns), returns, np.nan)
+
+    def volatility(self, window: int = 20, annualize: bool = True) -> np.ndarray:
+        """Returns the rolling standard deviation of the daily log returns, annualized by default."""
+        returns = self.returns()
+        count, total = _rolling_sum(returns, window)
+        _, squares = _rolling_sum(returns * returns, window)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            variance = (squares - total * total / count) / (count - 1)
+        volatility: np.ndarray = np.sqrt(np.clip(np.where(count >= window, variance, np.nan), 0.0, None))
+        return volatility * np.sqrt(TRADING_DAYS) if annualize else volatility
+
+    def high_low(self, window: int = TRADING_DAYS, min_periods: int = 1) -> tuple[np.ndarray, np.ndarray]:
+        """Returns (highest high, lowest low) over window rows, e.g. the 52-week high and low."""
+        return (
+            _rolling_max(self.high, window, min_periods),
+            -_rolling_max(-self.low, window, min_periods),
+        )
+
+    def relative_volume(self, window: int = 20) -> np.ndarray:
+        """Returns each day's volume divided by the average volume of the window days before it."""
+        average = np.roll(_rolling_mean(self.volume, window), 1, axis=0)
+        average[0] = np.nan
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.where(average > 0, self.volume / average, np.nan)
+
+    def indicators(self) -> dict[str, np.ndarray]:
+        """Returns a dict of the standard indicators, each a (dates x symbols) matrix."""
+        high_52w, low_52w = self.high_low(TRADING_DAYS)
+        return {
+            "sma_20": self.sma(20),
+            "sma_50": self.sma(50),
+            "sma_200": self.sma(200),
+            "ema_12": self.ema(12),
+            "ema_26": self.ema(26),
+            "rsi_14": self.rsi(14),
+            "volatility_20": self.volatility(20),
+            "high_52w": high_52w,
+            "low_52w": low_52w,
+            "relative_volume_20": self.relative_volume(20),
+        }
+
+    def screen(self, date: Optional[str] = None) -> dict[str, np.ndarray]:
+        """
+        Returns the standard indicators of every symbol on one date, for
+        screening the whole universe in one pass.
+
+        Args:
+            date: The date to screen, defaults to the last date.
+
+        Returns:
+            A dict of column name -> 1-D array aligned with self.symbols, with
+            'symbol', 'close' and 'volume' followed by the indicators. Symbols
+            without a price on the date have NaN values.
+        Raises:
+            KeyError: if there are no prices on the date.
+        """
+        if not len(self.dates):
+            raise KeyError(date)
+        row = len(self.dates) - 1 if date is None else self._row(date)
+        screen = {"symbol": self.symbols, "close": self.close[row], "volume": self.volume[row]}
+        screen.update({name: values[row] for name, values in self.indicators().items()})
+        return screen
+
+    def series(self, symbol: str, indicators: bool = False) -> dict[str, np.ndarray]:
+        """
+        Returns the history of one symbol as a dict of 1-D arrays: 'date' and
+        the FIELDS, plus the standard indicators with indicators=True. Dates
+        without a price are left out.
+        """
+        column = self._columns[symbol]
+        present = ~np.isnan(self.close[:, column])
+        series = {"date": self.dates[present]}
+        series.update({name: self._field(name)[present, column] for name in self.FIELDS})
+        if indicators:
+            series.update({name: values[present, column] for name, values in self.indicators().items()})
+        return series
+
+    def _row(self, date: str) -> int:
+        row = np.searchsorted(self.dates, np.datetime64(date, "D"))
+        if row == len(self.dates) or self.dates[row] != np.datetime64(date, "D"):
+            raise KeyError(date)
+        return int(row)
+
+
+def to_arrow(columns: dict) -> Any:
+    """Converts a dict of 1-D arrays, e.g. from screen() or series(), to a pyarrow Table with NaN as null."""
+    import pyarrow as pa  # type: ignore[import-untyped]
+
+    return pa.table({
+        name: pa.array(values, from_pandas=True) if values.dtype.kind == "f" else pa.array(values)
+        for name, values in columns.items()
+    })
+
+
+def _rolling_sum(values: np.ndarray, window: int) -> tuple[np.ndarray, np.ndarray]:
+    """Returns the (count, sum) of the non-NaN values over window rows, for every column."""
+    present = ~np.isnan(values)
+    zeros = np.zeros((1, values.shape[1]))
+    counts = np.concatenate([zeros, np.cumsum(present, axis=0)])
+    sums = np.concatenate([zeros, np.cumsum(np.where(present, values, 0.0), axis=0)])
+    start = np.maximum(np.arange(1, len(values) + 1) - window, 0)
+    return counts[1:] - counts[start], sums[1:] - sums[start]
+
+
+def _rolling_mean(values: np.ndarray, window: int, min_periods: Optional[int] = None) -> np.ndarray:
+    count, total = _rolling_sum(values, window)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(count >= (min_periods or window), total / count, np.nan)
+
+
+def _rolling_max(values: np.ndarray, window: int, min_periods: int = 1) -> np.ndarray:
+    """
+    Returns the max of the non-NaN values over window rows, for every column.
+
+    Uses the van Herk/Gil-Werman blocks: the rows are split into blocks of
+    window rows, and each window is the max of a block suffix and the next
+    block's prefix, so the cost does not grow with the window.
+    """
+    n, width = values.shape
+    if n == 0:
+        return values.copy()
+    blocks = -(-n // window)
+    padded = np.full((blocks * window, width), np.nan)
+    padded[:n] = values
+    padded = padded.reshape(blocks, window, width)
+    prefix = np.fmax.accumulate(padded, axis=1).reshape(-1, width)
+    suffix = np.fmax.accumulate(padded[:, ::-1], axis=1)[:, ::-1].reshape(-1, width)
+    result = np.empty((n, width))
+    # Rows before a full window take the max so far
+    head = min(window - 1, n)
+    result[:head] = np.fmax.accumulate(values[:head], axis=0)
+    result[head:] = np.fmax(suffix[: n - head], prefix[head:n])
+    count, _ = _rolling_sum(values, window)
+    return np.where(count >= min_periods, result, np.nan)
+
+
+def _ewm(values: np.ndarray, alpha: float) -> np.ndarray:
+    """Returns the exponentially weighted mean of each column, seeded with its first value. NaN rows are
+    skipped."""
+    result = np.empty(values.shape)
+    current = np.full(values.shape[1], np.nan)
+    for row in range(len(values)):
+        value = values[row]
+        updated = np.where(np.isnan(value), current, current + alpha * (value - current))
+        current = np.where(np.isnan(current), value, updated)
+        result[row] = np.where(np.isnan(value), np.nan, current)
+    return result
+
+
+def _wilder(values: np.ndarray, period: int) -> np.ndarray:
+    """Returns Wilder's smoothing of each column: the mean of the first period values, then
+    avg += (value - avg) / period. Rows with a NaN value are NaN and do not count."""
+    result = np.full(values.shape, np.nan)
+    count = np.zeros(values.shape[1])
+    total = np.zeros(values.shape[1])
+    average = np.full(values.shape[1], np.nan)
+    for row in range(len(values)):
+        value = values[row]
+        present = ~np.isnan(value)
+        count += present
+        total += np.where(present, value, 0.0)
+        seeding = present & (count == period)
+        smoothing = present & (count > period)
+        average = np.where(seeding, total / period, average)
+        average = np.where(smoothing, average + (value - average) / period, average)
+        result[row] = np.where(present & (count >= period), average, np.nan)
+    return result
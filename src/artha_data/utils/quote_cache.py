@@ -0,0 +1,138 @@
+import threading
+import time
+from collections.abc import Sequence
+from typing import Any, Optional
+
+import duckdb
+import numpy as np
+
+from .db_helper import DbHelper
+
+# Columns of the snapshot, in latest_quote order
+QUOTE_COLUMNS = (
+    "symbol",
+    "load_date",
+    "exchange",
+    "lastsale",
+    "netchange",
+    "pctchange",
+    "volume",
+    "marketCap",
+    "adv_dec",
+)
+
+
+class QuoteCache:
+    """
+    In-memory snapshot of the latest_quote table.
+
+    The quotes are held as one numpy array per column plus a symbol -> row
+    index, so point and batch lookups never query the database. The snapshot
+    is reloaded when the load manifest or the latest load date changes, which
+    is checked at most once every check_interval seconds. Call invalidate() to
+    force a reload on the next lookup.
+
+    Usage:
+        quotes = QuoteCache()
+        quotes.get("AAPL")["lastsale"]
+        quotes.get_many(["AAPL", "MSFT"])["pctchange"]
+    """
+
+    def __init__(self, db_file: Optional[str] = None, check_interval: float = 5.0) -> None:
+        """
+        Args:
+            db_file: The database to read, defaults to the one configured in
+                DbHelper.
+            check_interval: Seconds between checks whether the snapshot is
+                stale. With 0 every lookup checks.
+        """
+        self.db_file = db_file
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._columns: dict[str, Any] = {}
+        self._index: dict[str, int] = {}
+        self._version: Optional[tuple] = None
+        self._checked_at: Optional[float] = None
+
+    def _current_version(self, con: duckdb.DuckDBPyConnection) -> tuple:
+        """Returns a token that changes whenever a load commits new quotes."""
+        manifest = None
+        if con.execute("SELECT 1 FROM information_schema.tables WHERE table_name = 'load_manifest'").fetchone():
+            manifest = con.execute("SELECT count(*), max(loaded_at) FROM load_manifest").fetchone()
+        latest = con.execute("SELECT count(*), max(load_date), max(updated_at) FROM latest_quote").fetchone()
+        return manifest, latest
+
+    def _load(self, con: duckdb.DuckDBPyConnection) -> None:
+        """Reads latest_quote into columnar arrays and rebuilds the symbol index."""
+        columns = con.execute(
+            """
+            SELECT symbol, strftime(load_date, '%Y-%m-%d') AS load_date, exchange, lastsale, netchange, pctchange,
+                   volume, marketCap, adv_dec
+            FROM latest_quote
+            ORDER BY symbol
+            """
+        ).fetchnumpy()
+        # Masked arrays for every column, so missing symbols and NULLs look the same
+        self._columns = {name: np.ma.asarray(columns[name]) for name in QUOTE_COLUMNS}
+        self._index = {symbol: row for row, symbol in enumerate(columns["symbol"])}
+
+    def _snapshot(self) -> tuple[dict[str, Any], dict[str, int]]:
+        """Returns the (columns, index) of a current snapshot, reloading it if needed."""
+        with self._lock:
+            now = time.monotonic()
+            if self._checked_at is None or now - self._checked_at >= self.check_interval:
+                con = DbHelper.cursor(read_only=True, db_file=self.db_file)
+                version = self._current_version(con)
+                if not self._columns or version != self._version:
+                    self._load(con)
+                    self._version = version
+                self._checked_at = now
+            return self._columns, self._index
+
+    def invalidate(self) -> None:
+        """Forces the snapshot to be reloaded on the next lookup."""
+        with self._lock:
+            self._columns = {}
+            self._checked_at = None
+
+    def get(self, symbol: str) -> Optional[dict]:
+        """Returns a dict with the latest quote of a symbol, or None if the
+        symbol has no quote. NULL values are returned as None."""
+        columns, index = self._snapshot()
+        row = index.get(symbol)
+        if row is None:
+            return None
+        quote: dict[str, Any] = {}
+        for name, values in columns.items():
+            value = values[row]
+            quote[name] = None if value is np.ma.masked else value.item() if hasattr(value, "item") else value
+        return quote
+
+    def get_many(self, symbols: Sequence[str]) -> dict:
+        """
+        Returns the latest quotes of many symbols as a dict of column name ->
+        masked array, aligned with symbols. Symbols without a quote are masked
+        in every column except 'symbol'.
+        """
+        columns, index = self._snapshot()
+        rows = np.fromiter((index.get(symbol, -1) for symbol in symbols), dtype=np.intp, count=len(symbols))
+        missing = rows < 0
+        quotes: dict[str, Any] = {}
+        for name, values in columns.items():
+            if len(values):
+                taken = values.take(np.where(missing, 0, rows))
+            else:
+                taken = np.ma.masked_all(len(rows), values.dtype)
+            quotes[name] = np.ma.array(taken, mask=np.ma.getmaskarray(taken) | missing)
+        quotes["symbol"] = np.ma.asarray(np.array(symbols, dtype=object))
+        return quotes
+
+    def symbols(self) -> list:
+        """Returns the symbols in the snapshot, sorted."""
+        return list(self._snapshot()[0]["symbol"])
+
+    def __contains__(self, symbol: object) -> bool:
+        return symbol in self._snapshot()[1]
+
+    def __len__(self) -> int:
+        return len(self._snapshot()[1])
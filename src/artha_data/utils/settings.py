@@ -0,0 +1,223 @@
+import configparser
+import errno
+import os
+import shutil
+import tempfile
+import threading
+from collections.abc import Iterable, Iterator, Mapping
+from contextlib import contextmanager
+from typing import Optional
+
+import duckdb
+
+# The project root, relative defaults are resolved against it
+_PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", ".."))
+
+# Setting name -> default. Every setting can be set in the [artha] section of
+# the config file or with an ARTHA_<NAME> environment variable, which wins.
+DEFAULTS = {
+    # The primary database the loaders write to
+    "db_file": os.path.join(_PROJECT_ROOT, "data", "artha.db"),
+    # Read-only snapshot of the primary for reports, the primary itself if not set
+    "report_db_file": None,
+    # Root of the downloaded exchange datafiles
+    "datafiles_dir": os.path.join(_PROJECT_ROOT, "datafiles"),
+    # Stock screener API the exchange datafiles are fetched from, e.g. a local stub server in tests
+    "screener_url": "https://api.nasdaq.com/api/screener/stocks",
+    # Root of the Parquet export
+    "export_dir": os.path.join(_PROJECT_ROOT, "data", "parquet"),
+    # Directory for scratch databases, the system temp directory if not set
+    "scratch_dir": None,
+    # DuckDB settings applied to every connection, DuckDB's defaults if not set
+    "threads": None,
+    "memory_limit": None,
+    "temp_directory": None,
+}
+
+# Settings that are paths, relative paths are resolved against the config file's directory
+_PATHS = ("db_file", "report_db_file", "datafiles_dir", "export_dir", "scratch_dir", "temp_directory")
+# Settings passed to duckdb.connect as its config
+_PRAGMAS = ("threads", "memory_limit", "temp_directory")
+
+# Config file read when ARTHA_CONFIG is not set, if it exists
+DEFAULT_CONFIG_FILE = os.path.join(_PROJECT_ROOT, "artha.ini")
+
+
+class Settings:
+    """
+    Resolved locations and DuckDB settings.
+
+    Values come from the defaults, then the [artha] section of the config file
+    (ARTHA_CONFIG, or artha.ini in the project root), then ARTHA_<NAME>
+    environment variables. For example, to keep the database on a local disk,
+    cap DuckDB's memory and let reports read a snapshot while the loader
+    writes:
+
+        ARTHA_DB_FILE=/nvme/artha.db
+        ARTHA_MEMORY_LIMIT=4GB
+        ARTHA_REPORT_DB_FILE=/nvme/artha-report.db
+    """
+
+    def __init__(self, values: Optional[dict] = None, configured: Iterable[str] = ()) -> None:
+        """
+        Args:
+            values: Dict of setting name -> value, missing names use DEFAULTS.
+            configured: Names of the settings that were set explicitly.
+        """
+        values = {**DEFAULTS, **(values or {})}
+        unknown = set(values) - set(DEFAULTS)
+        if unknown:
+            msg = f"Unknown settings: {', '.join(sorted(unknown))}"
+            raise ValueError(msg)
+        self.configured = frozenset(configured)
+        self.db_file: str = values["db_file"]
+        self.report_db_file: str = values["report_db_file"] or self.db_file
+        self.datafiles_dir = values["datafiles_dir"]
+        self.screener_url = values["screener_url"]
+        self.export_dir = values["export_dir"]
+        self.scratch_dir = values["scratch_dir"] or tempfile.gettempdir()
+        self.threads = int(values["threads"]) if values["threads"] else None
+        self.memory_limit = values["memory_limit"]
+        self.temp_directory = values["temp_directory"]
+
+    @property
+    def db_dir(self) -> str:
+        """The directory of the primary database."""
+        return os.path.dirname(self.db_file)
+
+    @property
+    def has_report_replica(self) -> bool:
+        """True if reports read a snapshot instead of the primary database."""
+        return os.path.abspath(self.report_db_file) != os.path.abspath(self.db_file)
+
+    def duckdb_config(self) -> dict:
+        """Returns the DuckDB settings to open connections with, only the ones that are set."""
+        return {name: getattr(self, name) for name in _PRAGMAS if getattr(self, name) is not None}
+
+    def connect(self, db_file: Optional[str] = None, read_only: bool = False) -> duckdb.DuckDBPyConnection:
+        """
+        Opens a DuckDB connection with the configured DuckDB settings.
+
+        Args:
+            db_file: The database, defaults to the primary database.
+            read_only: Open the database read-only.
+
+        Returns:
+            A new DuckDB connection, the caller closes it.
+        """
+        db_file = db_file or self.db_file
+        if not read_only and db_file != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(db_file)), exist_ok=True)
+        return duckdb.connect(database=db_file, read_only=read_only, config=self.duckdb_config())
+
+    def connect_report(self) -> duckdb.DuckDBPyConnection:
+        """Opens a read-only connection to the report database, the replica if there is one."""
+        return self.connect(self.report_db_file, read_only=True)
+
+
+def load_settings(environ: Optional[Mapping[str, str]] = None, config_file: Optional[str] = None) -> Settings:
+    """
+    Resolves the settings from a config file and environment variables.
+
+    Args:
+        environ: The environment, defaults to os.environ.
+        config_file: INI file with an [artha] section, defaults to ARTHA_CONFIG
+            or artha.ini in the project root when it exists.
+
+    Returns:
+        A Settings.
+    Raises:
+        FileNotFoundError: if an explicitly given config file does not exist.
+        ValueError: for an unknown setting in the config file.
+    """
+    environ = os.environ if environ is None else environ
+    config_file = config_file or environ.get("ARTHA_CONFIG")
+    values = {}
+    if config_file or os.path.exists(DEFAULT_CONFIG_FILE):
+        config_file = config_file or DEFAULT_CONFIG_FILE
+        if not os.path.exists(config_file):
+            raise FileNotFoundError(errno.ENOENT, "Config file not found", config_file)
+        parser = configparser.ConfigParser()
+        parser.read(config_file)
+        if parser.has_section("artha"):
+            base = os.path.dirname(os.path.abspath(config_file))
+            for name, value in parser.items("artha"):
+                if name not in DEFAULTS:
+                    msg = f"Unknown setting '{name}' in {config_file}"
+                    raise ValueError(msg)
+                values[name] = os.path.join(base, os.path.expanduser(value)) if name in _PATHS else value
+    for name in DEFAULTS:
+        override = environ.get(f"ARTHA_{name.upper()}")
+        if override:
+            values[name] = os.path.abspath(os.path.expanduser(override)) if name in _PATHS else override
+    return Settings(values, configured=values)
+
+
+_lock = threading.Lock()
+_settings: Optional[Settings] = None
+
+
+def get_settings() -> Settings:
+    """Returns the process-wide settings, resolved on first use."""
+    global _settings
+    with _lock:
+        if _settings is None:
+            _settings = load_settings()
+        return _settings
+
+
+def reset_settings(settings: Optional[Settings] = None) -> None:
+    """Replaces the process-wide settings, or resolves them again on next use when None."""
+    global _settings
+    with _lock:
+        _settings = settings
+
+
+def refresh_report_snapshot(con: duckdb.DuckDBPyConnection, settings: Optional[Settings] = None) -> bool:
+    """
+    Copies the primary database into the report replica.
+
+    The copy is written next to the replica and then moved over it, so
+    reports that have the old snapshot open keep reading it and new
+    connections see the complete new one. Call it on the loader's connection
+    after the load committed; it does nothing without a replica.
+
+    Args:
+        con: Connection to the primary database, with no open transaction.
+        settings: Defaults to get_settings().
+
+    Returns:
+        True if the snapshot was written.
+    """
+    settings = settings or get_settings()
+    if not settings.has_report_replica:
+        return False
+    target = settings.report_db_file
+    partial = target + ".tmp"
+    for path in (partial, partial + ".wal"):
+        if os.path.exists(path):
+            os.remove(path)
+    os.makedirs(os.path.dirname(os.path.abspath(target)), exist_ok=True)
+    [(database,)] = con.execute("SELECT current_database()").fetchall()
+    con.execute("ATTACH '{}' AS report_snapshot".format(partial.replace("'", "''")))
+    try:
+        con.execute(f'COPY FROM DATABASE "{database}" TO report_snapshot')
+    finally:
+        con.execute("DETACH report_snapshot")
+    os.replace(partial, target)
+    return True
+
+
+@contextmanager
+def scratch_database(prefix: str = "artha-scratch-", settings: Optional[Settings] = None) -> Iterator[str]:
+    """
+    Context manager yielding the path of a new, empty database file in the
+    scratch directory. The file is removed afterwards.
+    """
+    settings = settings or get_settings()
+    os.makedirs(settings.scratch_dir, exist_ok=True)
+    directory = tempfile.mkdtemp(prefix=prefix, dir=settings.scratch_dir)
+    try:
+        yield os.path.join(directory, "scratch.db")
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
@@ -1,13 +1,16 @@
 # Use below method of relative import by exporting PYTHONPATH=<...>/src and
 # executing the program as a module with python -m artha_data.app.watchlist_app
-from .db_helper import DbHelper
+from collections.abc import Sequence
+
+import duckdb
 
-DB_FILE = "artha.db"
+from .db_helper import DbHelper
 
 
-def get_db_connection():
-    """Returns a connection to the DuckDb database named with global"""
-    return DbHelper.get_connection(__file__, DB_FILE)
+def get_db_connection(read_only: bool = False) -> duckdb.DuckDBPyConnection:
+    """Returns this thread's cursor on the shared connection to the DuckDb
+    database configured in DbHelper. The cursor is reused, do not close it."""
+    return DbHelper.cursor(read_only=read_only)
 
 
 class WatchlistHelper:
@@ -16,22 +19,22 @@ class WatchlistHelper:
     @staticmethod
     def add_watchlist(name, description=""):
         """Inserts a new row in the watchlist table with the name & description passed"""
-        with get_db_connection() as con:
-            con.execute("INSERT INTO watchlist (name, description) VALUES (?, ?)", (name, description))
+        con = get_db_connection()
+        con.execute("INSERT INTO watchlist (name, description) VALUES (?, ?)", (name, description))
 
     @staticmethod
     def get_watchlists():
         """Returns a list of ordered watchlists."""
-        with get_db_connection() as con:
-            return con.execute("SELECT name FROM watchlist ORDER BY name").fetchall()
+        con = get_db_connection(read_only=True)
+        return con.execute("SELECT name FROM watchlist ORDER BY name").fetchall()
 
     @staticmethod
     def watchlist_exists(name):
         """Checks if a watchlist with given name already exists (case insensitive)
         and returns True or False."""
-        with get_db_connection() as con:
-            result = con.execute("SELECT 1 FROM watchlist WHERE LOWER(name) = LOWER(?)", (name,)).fetchone()
-            return result is not None
+        con = get_db_connection(read_only=True)
+        result = con.execute("SELECT 1 FROM watchlist WHERE LOWER(name) = LOWER(?)", (name,)).fetchone()
+        return result is not None
 
     @staticmethod
     def delete_watchlist(name):
@@ -39,44 +42,134 @@ class WatchlistHelper:
         orphan records in stocks_lists and other tables that have foreign keys
         to the watchlist table, therefore delete corresponding rows from all
         child tables first."""
-        with get_db_connection() as con:
-            con.execute("DELETE FROM watchlist WHERE name = ?", (name,))
+        con = get_db_connection()
+        con.execute("DELETE FROM watchlist WHERE name = ?", (name,))
 
     @staticmethod
     def delete_all_symbols_from_watchlist(watchlist_name):
         """Deletes all rows from stocks_lists table that are related to the
         given watchlist."""
-        with get_db_connection() as con:
-            con.execute("DELETE FROM stocks_lists WHERE watchlist = ?", (watchlist_name,))
+        con = get_db_connection()
+        con.execute("DELETE FROM stocks_lists WHERE watchlist = ?", (watchlist_name,))
 
     @staticmethod
     def add_symbol_to_watchlist(watchlist_name, symbol):
         """Inserts a row in stocks_lists table with the given symbol linking it
         to the given watchlist."""
-        with get_db_connection() as con:
-            con.execute("INSERT INTO stocks_lists (watchlist, symbol) VALUES (?, ?)", (watchlist_name, symbol))
+        con = get_db_connection()
+        con.execute("INSERT INTO stocks_lists (watchlist, symbol) VALUES (?, ?)", (watchlist_name, symbol))
 
     @staticmethod
     def delete_symbols_from_watchlist(watchlist_name, symbols: list[str]):
-        with get_db_connection() as con:
-            if not symbols:
-                return
-            con.execute("DELETE FROM stocks_lists WHERE watchlist = ? AND symbol IN ?", (watchlist_name, tuple(symbols)))
+        con = get_db_connection()
+        if not symbols:
+            return
+        con.execute("DELETE FROM stocks_lists WHERE watchlist = ? AND symbol IN ?", (watchlist_name, tuple(symbols)))
 
     @staticmethod
     def get_symbols_for_watchlist(watchlist_name):
         """Returns a list of symbols for a given watchlist."""
-        with get_db_connection() as con:
-            return con.execute(
-                "SELECT symbol FROM stocks_lists WHERE watchlist = ? ORDER BY symbol", (watchlist_name,)
-            ).fetchall()
+        con = get_db_connection(read_only=True)
+        return con.execute(
+            "SELECT symbol FROM stocks_lists WHERE watchlist = ? ORDER BY symbol", (watchlist_name,)
+        ).fetchall()
+
+    @staticmethod
+    def get_watchlist_quotes(watchlist_name: str) -> list:
+        """Returns a list of (symbol, lastsale, pctchange, volume, adv_dec)
+        tuples for a given watchlist, with the prices from each symbol's latest
+        ticker_tape row, in one query. The prices are None for symbols that
+        have no ticker_tape rows. The prices are read from the latest_quote
+        table maintained by the loader, databases without it fall back to
+        searching ticker_tape."""
+        con = get_db_connection(read_only=True)
+        has_latest_quote = con.execute(
+            "SELECT 1 FROM information_schema.tables WHERE table_name = 'latest_quote'"
+        ).fetchone()
+        if has_latest_quote:
+            quotes = "latest_quote"
+        else:
+            quotes = """(
+                SELECT symbol, lastsale, pctchange, volume, adv_dec
+                FROM ticker_tape
+                WHERE symbol IN (SELECT symbol FROM stocks_lists WHERE watchlist = $watchlist)
+                QUALIFY row_number() OVER (PARTITION BY symbol ORDER BY load_date DESC) = 1
+            )"""
+        return con.execute(
+            f"""
+            SELECT sl.symbol, tt.lastsale, tt.pctchange, tt.volume, tt.adv_dec
+            FROM stocks_lists sl
+            LEFT JOIN {quotes} tt ON tt.symbol = sl.symbol
+            WHERE sl.watchlist = $watchlist
+            ORDER BY sl.symbol
+            """,  # noqa: S608 - quotes is a constant table or subquery
+            {"watchlist": watchlist_name},
+        ).fetchall()
 
     @staticmethod
     def symbol_exists_in_watchlist(watchlist_name, symbol):
         """Checks if any symbol exists for a given watchlist and returns True
         or False."""
-        with get_db_connection() as con:
-            result = con.execute(
-                "SELECT 1 FROM stocks_lists WHERE watchlist = ? AND symbol = ?", (watchlist_name, symbol)
-            ).fetchone()
-            return result is not None
+        con = get_db_connection(read_only=True)
+        result = con.execute(
+            "SELECT 1 FROM stocks_lists WHERE watchlist = ? AND symbol = ?", (watchlist_name, symbol)
+        ).fetchone()
+        return result is not None
+
+    @staticmethod
+    def partition_symbols_in_watchlist(watchlist_name: str, symbols: Sequence[str]) -> tuple[list, list]:
+        """Splits the given symbols into those that already exist in the
+        watchlist and those that do not, with a single query. Returns a tuple
+        of two lists (existing, missing), both in the order given."""
+        if not symbols:
+            return [], []
+        con = get_db_connection(read_only=True)
+        rows = con.execute(
+            "SELECT symbol FROM stocks_lists WHERE watchlist = ? AND list_contains(?, symbol)",
+            (watchlist_name, list(symbols)),
+        ).fetchall()
+        found = {row[0] for row in rows}
+        return [s for s in symbols if s in found], [s for s in symbols if s not in found]
+
+    @staticmethod
+    def add_symbols_to_watchlist(
+        watchlist_name: str, symbols: Sequence[str], validate: bool = True
+    ) -> tuple[list, list, list]:
+        """Adds all the given symbols to the watchlist in one transaction.
+        A single query finds the symbols already in the watchlist and, with
+        validate, the ones unknown in stock_master; the rest are inserted with
+        one statement. Returns a tuple of lists (added, duplicates, unknown)."""
+        symbols = list(dict.fromkeys(symbols))
+        if not symbols:
+            return [], [], []
+        with DbHelper.transaction() as con:
+            rows = con.execute(
+                """
+                SELECT
+                    r.symbol,
+                    EXISTS (SELECT 1 FROM stocks_lists sl WHERE sl.watchlist = ? AND sl.symbol = r.symbol),
+                    NOT ? OR EXISTS (SELECT 1 FROM stock_master sm WHERE sm.symbol = r.symbol)
+                FROM (SELECT unnest(?) AS symbol) r
+                """,
+                (watchlist_name, bool(validate), symbols),
+            ).fetchall()
+            status = {symbol: (exists, known) for symbol, exists, known in rows}
+            duplicates = [s for s in symbols if status[s][0]]
+            unknown = [s for s in symbols if not status[s][0] and not status[s][1]]
+            added = [s for s in symbols if not status[s][0] and status[s][1]]
+            if added:
+                con.execute("INSERT INTO stocks_lists (watchlist, symbol) SELECT ?, unnest(?)", (watchlist_name, added))
+        return added, duplicates, unknown
+
+    @staticmethod
+    def remove_symbols_from_watchlist(watchlist_name: str, symbols: Sequence[str]) -> tuple[list, list]:
+        """Deletes all the given symbols from the watchlist in one transaction
+        and returns a tuple of lists (deleted, missing), missing being the
+        symbols that were not in the watchlist."""
+        symbols = list(dict.fromkeys(symbols))
+        if not symbols:
+            return [], []
+        with DbHelper.transaction():
+            deleted, missing = WatchlistHelper.partition_symbols_in_watchlist(watchlist_name, symbols)
+            WatchlistHelper.delete_symbols_from_watchlist(watchlist_name, deleted)
+        return deleted, missing
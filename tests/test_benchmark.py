@@ -0,0 +1,60 @@
+import json
+import os
+import sys
+import tempfile
+import unittest
+
+# Add the src directory to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../src")))
+
+from artha_data.batch.benchmark import compare, generate_datafiles, run_benchmarks, trading_days
+from artha_data.batch.load_ticker_data import find_datafiles
+
+
+class TestBenchmark(unittest.TestCase):
+    def test_trading_days(self):
+        self.assertEqual(trading_days("2025-01-02", 3), ["2025-01-02", "2025-01-03", "2025-01-06"])
+
+    def test_generate_datafiles(self):
+        with tempfile.TemporaryDirectory() as root:
+            jobs = generate_datafiles(root, symbols=10, days=2, exchanges=("NASDAQ", "NYSE"))
+            self.assertEqual(find_datafiles(datafile_dir=root, archives=False), jobs)
+            with open(jobs[0][2]) as f:
+                first = f.read()
+            # The same seed writes the same files
+            generate_datafiles(root, symbols=10, days=2, exchanges=("NASDAQ", "NYSE"))
+            with open(jobs[0][2]) as f:
+                self.assertEqual(f.read(), first)
+            records = json.loads(first)
+        self.assertEqual(len(records), 10)
+        self.assertTrue(records[0]["lastsale"].startswith("$"))
+
+    def test_run_benchmarks(self):
+        report = run_benchmarks(symbols=20, days=2, exchanges=("NASDAQ", "AMEX"), repeat=2)
+        results = report["results"]
+        self.assertEqual(
+            sorted(results),
+            [
+                "calculate_exchange_adv_dec",
+                "load_data",
+                "load_stock_master_data",
+                "load_ticker_tape_data",
+                "load_ticker_tape_data_bulk",
+                "price_history_screen",
+            ],
+        )
+        self.assertEqual(results["load_data"]["calls"], 4)
+        self.assertEqual(results["load_data"]["rows"], 80)
+        self.assertEqual(results["load_ticker_tape_data"]["rows"], 80)
+        self.assertEqual(results["load_ticker_tape_data_bulk"]["rows"], 80)
+        self.assertEqual(results["calculate_exchange_adv_dec"]["rows"], 8)
+        self.assertEqual(results["price_history_screen"]["rows"], 80)
+        self.assertGreater(results["load_data"]["peak_rss_mb"], 0)
+        self.assertEqual(report["meta"]["files"], 4)
+
+        ratios = compare(report, report)
+        self.assertEqual(ratios["load_data"], {"rows_per_sec": 1.0, "p95_ms": 1.0})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,76 @@
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import duckdb
+
+# Add the src directory to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../src")))
+
+from artha_data import cli
+from artha_data.batch import calculate_exchange_adv_dec, db_init
+from artha_data.batch.market_breadth import refresh_market_breadth
+
+SRC_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "../src"))
+
+
+class TestCli(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db_file = os.path.join(self.tmpdir.name, "artha.db")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_startup_does_not_import_heavy_modules(self):
+        code = (
+            "import sys, artha_data.cli; "
+            "print(sorted(m for m in ('duckdb', 'pandas', 'numpy', 'matplotlib', 'seaborn') if m in sys.modules))"
+        )
+        result = subprocess.run(  # noqa: S603 - the test's own interpreter and code
+            [sys.executable, "-c", code], capture_output=True, text=True, env={**os.environ, "PYTHONPATH": SRC_DIR}
+        )
+        self.assertEqual(result.stdout.strip(), "[]")
+
+    def test_unknown_arguments(self):
+        with self.assertRaises(SystemExit) as cm, patch("sys.stderr"):
+            cli.main(["load", "2025-09-08", "--bogus"])
+        self.assertEqual(cm.exception.code, 2)
+
+    def test_init_db(self):
+        with patch.object(db_init, "DB_FILE", self.db_file), patch("sys.stdout"):
+            self.assertEqual(cli.main(["init-db", "stock_master", "ticker_tape"]), 0)
+            self.assertEqual(cli.main(["init-db"]), 1)
+        con = duckdb.connect(self.db_file)
+        tables = con.execute("SELECT table_name FROM information_schema.tables ORDER BY 1").fetchall()
+        con.close()
+        self.assertEqual(tables, [("stock_master",), ("ticker_tape",)])
+
+    def test_breadth_writes_chart_headless(self):
+        con = duckdb.connect(self.db_file)
+        for table in ("stock_master", "industry", "ticker_tape"):
+            db_init.create_table_if_missing(con, table)
+        con.execute("INSERT INTO stock_master (symbol) VALUES ('A'), ('B')")
+        con.execute("""
+            INSERT INTO ticker_tape (load_date, symbol, adv_dec, exchange) VALUES
+                ('2025-09-08', 'A', 1, 'NYSE'), ('2025-09-08', 'B', -1, 'NASDAQ'), ('2025-09-09', 'A', 1, 'NYSE')
+        """)
+        refresh_market_breadth(con)
+        con.close()
+
+        png = os.path.join(self.tmpdir.name, "breadth.png")
+        svg = os.path.join(self.tmpdir.name, "breadth.svg")
+        with patch.object(calculate_exchange_adv_dec, "DB_FILE", self.db_file), patch("sys.stdout"):
+            self.assertEqual(cli.main(["breadth", "--output", png]), 0)
+            self.assertEqual(cli.main(["breadth", "--output", svg]), 0)
+        with open(png, "rb") as f:
+            self.assertEqual(f.read(8), b"\x89PNG\r\n\x1a\n")
+        with open(svg) as f:
+            self.assertIn("<svg", f.read())
+
+
+if __name__ == "__main__":
+    unittest.main()
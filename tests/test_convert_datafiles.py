@@ -0,0 +1,159 @@
+import gzip
+import hashlib
+import json
+import os
+import sys
+import tempfile
+import unittest
+import zipfile
+from unittest.mock import patch
+
+# Add the src directory to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../src")))
+
+from artha_data.batch.convert_datafiles import convert_datafiles
+from artha_data.batch.db_init import create_database
+from artha_data.batch.load_ticker_data import (
+    backfill,
+    datafile_fingerprint,
+    datafile_path,
+    find_datafiles,
+    load_data,
+    open_datafile,
+)
+
+
+def record(symbol, lastsale="$10.00", netchange="0.50", pctchange="5.263%", volume="1000", ipoyear="2000"):
+    return {
+        "symbol": symbol,
+        "name": f"{symbol} Corp. Common Stock",
+        "lastsale": lastsale,
+        "netchange": netchange,
+        "pctchange": pctchange,
+        "volume": volume,
+        "marketCap": "1000000.00",
+        "country": "United States",
+        "ipoyear": ipoyear,
+        "industry": "Software",
+        "sector": "Technology",
+        "url": f"/market-activity/stocks/{symbol.lower()}",
+    }
+
+
+# Values whose text the typed columns do not give back on their own
+RECORDS = [
+    record("A"),
+    record("B", lastsale="$10.340612345678", netchange="-0.00", pctchange="", volume="", ipoyear=""),
+    record("C", lastsale="$0.0001", netchange="UNCH", pctchange="-100.000%", volume="1,000"),
+    record("D", lastsale="", netchange="", pctchange="0.00%", volume="0"),
+    record("É", lastsale="$1e3", netchange="2.5", pctchange=" 1.5%"),
+]
+
+
+def pretty(records):
+    return json.dumps(records, indent=2, ensure_ascii=False).encode("utf-8") + b"\n"
+
+
+class TestConvertDatafiles(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.root = self.tmpdir.name
+        self.contents = {}
+        os.makedirs(os.path.join(self.root, "nyse"))
+        # One date in the monthly zip, one daily pretty .json and one compact .json.gz as written by fetch_exchanges
+        with zipfile.ZipFile(os.path.join(self.root, "nyse_full_tickers-2025-08.zip"), "w") as zf:
+            self.contents["2025-08-28"] = pretty(RECORDS)
+            zf.writestr("nyse/nyse_full_tickers-2025-08-28.json", self.contents["2025-08-28"])
+        self.contents["2025-08-29"] = pretty(RECORDS[::-1])
+        with open(os.path.join(self.root, "nyse", "nyse_full_tickers-2025-08-29.json"), "wb") as f:
+            f.write(self.contents["2025-08-29"])
+        self.contents["2025-09-02"] = json.dumps(RECORDS[:3], separators=(",", ":")).encode("utf-8")
+        with open(os.path.join(self.root, "nyse", "nyse_full_tickers-2025-09-02.json.gz"), "wb") as f:
+            f.write(gzip.compress(self.contents["2025-09-02"]))
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def _convert(self, **kwargs):
+        with patch("builtins.print"):
+            return convert_datafiles(datafile_dir=self.root, **kwargs)
+
+    def _backfill(self, con):
+        with patch("builtins.print"):
+            return backfill(con, find_datafiles(datafile_dir=self.root), workers=1)
+
+    def test_round_trip(self):
+        results = self._convert(remove=True)
+        self.assertEqual(
+            [os.path.basename(result.path) for result in results],
+            [
+                "nyse_full_tickers-2025-08.parquet",
+                "nyse_full_tickers-2025-09.parquet",
+            ],
+        )
+        self.assertEqual(sorted(os.listdir(self.root)), sorted([*(os.path.basename(r.path) for r in results), "nyse"]))
+        self.assertEqual(os.listdir(os.path.join(self.root, "nyse")), [])
+
+        jobs = find_datafiles(datafile_dir=self.root)
+        self.assertEqual([load_date for load_date, _, _ in jobs], list(self.contents))
+        for load_date, exchange, datafile in jobs:
+            content = self.contents[load_date]
+            self.assertEqual(datafile_path(load_date, exchange, self.root), datafile)
+            self.assertEqual(datafile_fingerprint(datafile), (len(content), hashlib.sha256(content).hexdigest()))
+            with open_datafile(datafile) as f:
+                self.assertEqual(f.read(), content)
+        self.assertEqual(len(find_datafiles(pattern="nyse/*2025-08-2*", datafile_dir=self.root)), 2)
+
+        # Converting again has nothing to do, a new daily file is merged into its month
+        self.assertEqual(self._convert(), [])
+        self.contents["2025-09-03"] = pretty(RECORDS[1:])
+        with open(os.path.join(self.root, "nyse", "nyse_full_tickers-2025-09-03.json"), "wb") as f:
+            f.write(self.contents["2025-09-03"])
+        (result,) = self._convert()
+        self.assertEqual(result.dates, ["2025-09-02", "2025-09-03"])
+        with open_datafile((result.path, "2025-09-02")) as f:
+            self.assertEqual(f.read(), self.contents["2025-09-02"])
+
+    def test_load_from_parquet(self):
+        from_json = create_database()
+        self._backfill(from_json)
+        self._convert(remove=True)
+        from_parquet = create_database()
+        self.assertEqual(self._backfill(from_parquet)["files"], 3)
+        for query in (
+            "SELECT * EXCLUDE (created_at, updated_at) FROM ticker_tape ORDER BY ALL",
+            "SELECT * EXCLUDE (created_at, updated_at) FROM stock_master ORDER BY ALL",
+            "SELECT * EXCLUDE (created_at) FROM ticker_tape_quarantine ORDER BY ALL",
+            "SELECT * EXCLUDE (loaded_at, source_file) FROM load_manifest ORDER BY ALL",
+        ):
+            self.assertEqual(from_parquet.execute(query).fetchall(), from_json.execute(query).fetchall(), query)
+
+        # The dates loaded from JSON are unchanged once converted, so they are not loaded again
+        self.assertEqual(self._backfill(from_json)["skipped"], 3)
+        datafile = datafile_path("2025-08-29", "NYSE", self.root)
+        tape_rows = "SELECT tape_rows FROM load_manifest WHERE load_date = '2025-08-29'"
+        loaded = from_json.execute(tape_rows).fetchone()[0]
+        with patch("builtins.print"):
+            self.assertIsNone(load_data(from_json, "2025-08-29", datafile, "NYSE"))
+            self.assertEqual(load_data(from_json, "2025-08-29", datafile, "NYSE", force=True), loaded)
+        from_json.close()
+        from_parquet.close()
+
+    def test_unknown_layout_is_not_converted(self):
+        path = os.path.join(self.root, "nyse", "nyse_full_tickers-2025-08-29.json")
+        with open(path, "w") as f:
+            json.dump(RECORDS, f)
+        with self.assertRaisesRegex(ValueError, "no known JSON layout"):
+            self._convert(remove=True)
+        self.assertTrue(os.path.exists(path))
+        self.assertEqual(sorted(os.listdir(self.root)), ["nyse", "nyse_full_tickers-2025-08.zip"])
+
+        # A JSON document that is not an array of records is reported the same way
+        with open(path, "w") as f:
+            json.dump({"data": RECORDS}, f)
+        with self.assertRaisesRegex(ValueError, "cannot be converted: the datafile is not a JSON array"):
+            self._convert(remove=True)
+
+
+if __name__ == "__main__":
+    unittest.main()
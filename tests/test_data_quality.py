@@ -0,0 +1,118 @@
+import os
+import sys
+import unittest
+from unittest.mock import patch
+
+# Add the src directory to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../src")))
+
+from artha_data.batch.data_quality import check_ticker_tape_batch, refresh_quality_summary
+from artha_data.batch.db_init import create_database
+from artha_data.batch.load_metrics import load_run
+from artha_data.batch.load_ticker_data import (
+    build_ticker_tape_batch,
+    delete_ticker_tape_date,
+    load_ticker_tape_data,
+    load_ticker_tape_data_bulk,
+)
+
+
+class TestDataQuality(unittest.TestCase):
+    def setUp(self):
+        self.con = create_database()
+        self.con.execute(
+            "INSERT INTO stock_master (symbol) VALUES ('AAPL'), ('MSFT'), ('SPLT'), ('MOON'), ('BAD'), ('NEG')"
+        )
+        self.con.execute("""
+            INSERT INTO ticker_tape (load_date, symbol, lastsale, exchange) VALUES
+                ('2025-09-08', 'AAPL', 150, 'NASDAQ'),
+                ('2025-09-08', 'SPLT', 10, 'NASDAQ'),
+                ('2025-09-08', 'MOON', 10, 'NASDAQ'),
+                ('2025-07-01', 'MSFT', 1, 'NASDAQ')
+        """)
+        self.data = [
+            {"symbol": "AAPL", "lastsale": "$151.00", "netchange": "1.00", "volume": "100"},
+            # A reverse split: the price jumps, but the row's netchange agrees with it
+            {"symbol": "SPLT", "lastsale": "$150.00", "netchange": "140.00", "volume": "100"},
+            # A jump the netchange does not explain
+            {"symbol": "MOON", "lastsale": "$1000.00", "netchange": "0.50", "volume": "100"},
+            # The previous price is older than the lookback
+            {"symbol": "MSFT", "lastsale": "$400.00", "netchange": "1.00", "volume": "100", "pctchange": ""},
+            {"symbol": "BAD", "lastsale": "$1.2.3", "netchange": "0.10", "volume": "100"},
+            {"symbol": "NEG", "lastsale": "$5.00", "netchange": "0.10", "volume": "-100"},
+            {"symbol": "NOPE", "lastsale": "$5.00", "netchange": "0.10", "volume": "100"},
+            {"symbol": "AAPL", "lastsale": "$152.00", "netchange": "2.00", "volume": "100"},
+            {"symbol": "", "lastsale": "$5.00"},
+        ]
+
+    def tearDown(self):
+        self.con.close()
+
+    def _quarantine(self):
+        return self.con.execute(
+            "SELECT symbol, reasons, lastsale, prev_lastsale FROM ticker_tape_quarantine ORDER BY symbol, lastsale"
+        ).fetchall()
+
+    def test_check_batch(self):
+        batch = build_ticker_tape_batch("2025-09-09", self.data, "NASDAQ")
+        self.assertEqual(batch["unparsable"].tolist(), [False, False, False, False, True, False, False, False, False])
+        with load_run(None, "test") as metrics:
+            counts = check_ticker_tape_batch(self.con, batch)
+        self.assertEqual(
+            counts,
+            {
+                "missing_symbol": 1,
+                "unparsable_price": 1,
+                "negative_volume": 1,
+                "unknown_symbol": 2,
+                "duplicate": 1,
+                "price_jump": 1,
+            },
+        )
+        self.assertEqual(
+            self._quarantine(),
+            [
+                ("", ["missing_symbol", "unknown_symbol"], 5.0, None),
+                ("AAPL", ["duplicate"], 152.0, 150.0),
+                ("BAD", ["unparsable_price"], None, None),
+                ("MOON", ["price_jump"], 1000.0, 10.0),
+                ("NEG", ["negative_volume"], 5.0, None),
+                ("NOPE", ["unknown_symbol"], 5.0, None),
+            ],
+        )
+        # The row failing two checks is rejected once
+        self.assertEqual(metrics.counters["rows_rejected"], 6)
+        self.assertEqual(metrics.rejects, counts)
+
+    def test_bulk_and_per_row_load_the_same_rows(self):
+        with patch("builtins.print"):
+            self.assertEqual(load_ticker_tape_data_bulk(self.con, "2025-09-09", self.data, "NASDAQ"), 3)
+        bulk = self.con.execute("SELECT symbol FROM ticker_tape WHERE load_date = '2025-09-09' ORDER BY 1").fetchall()
+        self.assertEqual(bulk, [("AAPL",), ("MSFT",), ("SPLT",)])
+
+        # Reloading the exchange's date replaces its quarantined rows too
+        self.assertEqual(delete_ticker_tape_date(self.con, "2025-09-09", "NASDAQ"), 3)
+        self.assertEqual(self._quarantine(), [])
+        with patch("builtins.print"):
+            self.assertEqual(load_ticker_tape_data(self.con, "2025-09-09", self.data, "NASDAQ"), 3)
+        per_row = self.con.execute(
+            "SELECT symbol FROM ticker_tape WHERE load_date = '2025-09-09' ORDER BY 1"
+        ).fetchall()
+        self.assertEqual(per_row, bulk)
+        self.assertEqual(len(self._quarantine()), 6)
+
+    def test_quality_summary(self):
+        with patch("builtins.print"):
+            load_ticker_tape_data_bulk(self.con, "2025-09-09", self.data, "NASDAQ")
+        self.assertEqual(refresh_quality_summary(self.con, "2025-09-09"), 1)
+        summary = self.con.execute("SELECT * EXCLUDE (created_at) FROM quality_summary").fetchall()
+        self.assertEqual(
+            [tuple(str(v) if i == 0 else v for i, v in enumerate(row)) for row in summary],
+            [("2025-09-09", "NASDAQ", 9, 3, 6, 1, 1, 1, 2, 1, 1)],
+        )
+        # A full rebuild also summarizes the earlier dates
+        self.assertEqual(refresh_quality_summary(self.con), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
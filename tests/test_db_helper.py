@@ -1,5 +1,18 @@
+import os
+import sys
+import tempfile
+import threading
+import unittest
+
+import duckdb
 import pytest
-from artha_data.utils.DbHelper import DbHelper
+
+# Add the src directory to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../src")))
+
+from artha_data.utils.db_helper import DbHelper
+from artha_data.utils.watchlist_helper import WatchlistHelper
+
 
 def test_get_connection():
     """Tests that a database connection can be successfully established."""
@@ -10,3 +23,84 @@ def test_get_connection():
         assert result == (1,)
     except Exception as e:
         pytest.fail(f"Database connection test failed with an exception: {e}")
+
+
+class TestDbHelperPool(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.default_db_file = DbHelper.db_file()
+        DbHelper.configure(os.path.join(self.tmpdir.name, "test.db"))
+        with DbHelper.transaction() as con:
+            con.execute("CREATE TABLE watchlist (name TEXT PRIMARY KEY, description TEXT)")
+            con.execute("CREATE TABLE stocks_lists (watchlist TEXT, symbol TEXT, PRIMARY KEY (watchlist, symbol))")
+
+    def tearDown(self):
+        DbHelper.close_all()
+        DbHelper.configure(self.default_db_file)
+        self.tmpdir.cleanup()
+
+    def test_cursor_is_reused_per_thread(self):
+        cur = DbHelper.cursor()
+        self.assertIs(DbHelper.cursor(), cur)
+        # read-only handles share the read-write connection once it is open
+        self.assertIs(DbHelper.cursor(read_only=True), cur)
+
+        other = []
+        thread = threading.Thread(target=lambda: other.append(DbHelper.cursor()))
+        thread.start()
+        thread.join()
+        self.assertIsNot(other[0], cur)
+
+    def test_read_only_upgrades_to_read_write(self):
+        DbHelper.close_all()
+        ro = DbHelper.cursor(read_only=True)
+        self.assertEqual(ro.execute("SELECT count(*) FROM watchlist").fetchone(), (0,))
+        WatchlistHelper.add_watchlist("Tech")
+        self.assertEqual(WatchlistHelper.get_watchlists(), [("Tech",)])
+
+    def test_upgrade_with_readers_in_other_threads(self):
+        DbHelper.close_all()
+        reading, done = threading.Event(), threading.Event()
+
+        def reader():
+            DbHelper.cursor(read_only=True).execute("SELECT count(*) FROM watchlist").fetchone()
+            reading.set()
+            done.wait()
+
+        thread = threading.Thread(target=reader)
+        thread.start()
+        reading.wait()
+        try:
+            # Reopening read-write would close the reader's connection
+            with self.assertRaises(duckdb.ConnectionException):
+                DbHelper.cursor()
+        finally:
+            done.set()
+            thread.join()
+
+    def test_open_for_writing(self):
+        DbHelper.close_all()
+        DbHelper.open_for_writing()
+        ro = []
+        thread = threading.Thread(target=lambda: ro.append(DbHelper.cursor(read_only=True)))
+        thread.start()
+        thread.join()
+        WatchlistHelper.add_watchlist("Tech")
+        self.assertEqual(ro[0].execute("SELECT name FROM watchlist").fetchall(), [("Tech",)])
+
+    def test_transaction(self):
+        with DbHelper.transaction():
+            WatchlistHelper.add_watchlist("Tech")
+            WatchlistHelper.add_symbol_to_watchlist("Tech", "AAPL")
+        self.assertTrue(WatchlistHelper.symbol_exists_in_watchlist("Tech", "AAPL"))
+
+        with self.assertRaises(RuntimeError), DbHelper.transaction():
+            WatchlistHelper.add_watchlist("Energy")
+            WatchlistHelper.add_symbol_to_watchlist("Energy", "XOM")
+            raise RuntimeError
+        self.assertFalse(WatchlistHelper.watchlist_exists("Energy"))
+        self.assertEqual(WatchlistHelper.get_symbols_for_watchlist("Tech"), [("AAPL",)])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,191 @@
+import os
+import sys
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import duckdb
+
+# Add the src directory to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../src")))
+
+from artha_data.batch import db_init
+from artha_data.batch.db_init import (
+    MIGRATIONS,
+    build_template,
+    create_database,
+    init_all,
+    init_tables,
+    load_schemas,
+    migrate,
+    pending_migrations,
+    schema_order,
+    table_columns,
+)
+from artha_data.batch.migrate_ticker_tape import needs_migration
+
+
+def tables(con):
+    return [row[0] for row in con.execute("SELECT table_name FROM information_schema.tables ORDER BY 1").fetchall()]
+
+
+class TestSchemaOrder(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def _write(self, name, sql):
+        with open(os.path.join(self.tmpdir.name, f"{name}.sql"), "w") as f:
+            f.write(sql)
+
+    def test_dependencies(self):
+        schemas = load_schemas()
+        self.assertEqual(schemas["watchlist"].name, "watchlists")
+        self.assertEqual(schemas["stocks_lists"].depends, {"watchlist"})
+        self.assertEqual(schemas["ticker_tape"].depends, {"stock_master"})
+        self.assertNotIn("my_table", schemas)
+
+        order = schema_order(schemas)
+        self.assertEqual(sorted(order), sorted(schemas))
+        self.assertLess(order.index("watchlist"), order.index("stocks_lists"))
+        self.assertLess(order.index("stock_master"), order.index("ticker_tape"))
+        # Schema file names select their table, referenced tables are added
+        self.assertEqual(schema_order(schemas, ["stocks_lists"]), ["watchlist", "stocks_lists"])
+        self.assertEqual(schema_order(schemas, ["watchlists"]), ["watchlist"])
+        with self.assertRaises(ValueError):
+            schema_order(schemas, ["no_such_table"])
+
+    def test_invalid_schemas(self):
+        self._write("a", "-- REFERENCES c(x) is a comment\nCREATE TABLE IF NOT EXISTS a (x INTEGER REFERENCES b(x))")
+        self._write("b", "CREATE TABLE b (x INTEGER PRIMARY KEY, y INTEGER REFERENCES a(x))")
+        schemas = load_schemas(self.tmpdir.name)
+        self.assertEqual(schemas["a"].depends, {"b"})
+        with self.assertRaises(ValueError):
+            schema_order(schemas)
+
+        self._write("c", "-- no table here\n")
+        with self.assertRaises(ValueError):
+            load_schemas(self.tmpdir.name)
+
+
+class TestInitAll(unittest.TestCase):
+    def setUp(self):
+        self.con = duckdb.connect(":memory:")
+
+    def tearDown(self):
+        self.con.close()
+
+    def test_init_all(self):
+        created = init_all(self.con)
+        self.assertEqual(sorted(created), sorted(load_schemas()))
+        self.assertEqual(tables(self.con), sorted(load_schemas()))
+        # A new database has the current layout, the migrations are recorded but not run
+        self.assertEqual(pending_migrations(self.con), [])
+        self.assertEqual(
+            self.con.execute("SELECT version, name FROM schema_migrations ORDER BY version").fetchall(),
+            [(version, name) for version, name, _ in MIGRATIONS],
+        )
+        self.assertEqual(init_all(self.con), [])
+        self.assertEqual(migrate(self.con), ([], []))
+
+    def test_init_tables(self):
+        self.assertEqual(init_tables(self.con, ["stocks_lists"]), ["watchlist", "stocks_lists"])
+        self.assertEqual(init_tables(self.con, ["watchlists", "stock_master"]), ["stock_master"])
+        self.assertEqual(tables(self.con), ["stock_master", "stocks_lists", "watchlist"])
+
+    def test_migrate_legacy_database(self):
+        init_tables(self.con, ["stock_master"])
+        self.con.execute("""
+            CREATE TABLE ticker_tape (
+                load_date DATE, symbol TEXT, lastsale REAL, netchange REAL, pctchange REAL, volume INTEGER,
+                marketCap REAL, adv_dec INTEGER, created_at TIMESTAMP, updated_at TIMESTAMP, exchange TEXT
+            )
+        """)
+        self.con.execute("INSERT INTO stock_master (symbol, exchange) VALUES ('A', 'NYSE'), ('B', NULL)")
+        self.con.execute(
+            "INSERT INTO ticker_tape (load_date, symbol, lastsale) VALUES ('2025-09-08', 'A', 1.5), ('2025-09-08', 'B', 2)"
+        )
+
+        # init_all only adds the missing tables and leaves the migration pending
+        created = init_all(self.con)
+        self.assertIn("latest_quote", created)
+        self.assertNotIn("ticker_tape", created)
+        self.assertEqual(pending_migrations(self.con), [name for _, name, _ in MIGRATIONS])
+        self.assertTrue(needs_migration(self.con))
+
+        self.assertEqual(migrate(self.con), ([], [name for _, name, _ in MIGRATIONS]))
+        self.assertEqual(needs_migration(self.con), {})
+        self.assertIn("industry_id", table_columns(self.con, "ticker_tape"))
+        self.assertEqual(
+            self.con.execute("SELECT symbol, CAST(lastsale AS DOUBLE) FROM ticker_tape ORDER BY 1").fetchall(),
+            [("A", 1.5), ("B", 2.0)],
+        )
+        self.assertEqual(
+            self.con.execute(
+                "SELECT symbol, CAST(valid_from AS VARCHAR) FROM stock_master_history ORDER BY 1"
+            ).fetchall(),
+            [("A", "2025-09-08"), ("B", "2025-09-08")],
+        )
+        # The derived tables created by migrate() are filled from the existing rows
+        for table in ("market_breadth", "latest_quote", "sector_breadth", "quality_summary"):
+            self.assertTrue(self.con.execute(f"SELECT count(*) FROM {table}").fetchone()[0], table)  # noqa: S608
+        # B has no exchange and is left out of the exchange breadth
+        self.assertEqual(self.con.execute("SELECT exchange FROM market_breadth").fetchall(), [("NYSE",)])
+        self.assertEqual(pending_migrations(self.con), [])
+
+    def test_failed_migration_changes_nothing(self):
+        init_tables(self.con, ["stock_master"])
+
+        def broken(con):
+            con.execute("CREATE TABLE half_done (x INTEGER)")
+            raise duckdb.Error("broken")
+
+        with patch.object(db_init, "MIGRATIONS", ((1, "broken", broken),)), self.assertRaises(duckdb.Error):
+            migrate(self.con)
+        self.assertEqual(tables(self.con), ["stock_master"])
+
+
+class TestCreateDatabase(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_in_memory(self):
+        con = create_database()
+        self.assertEqual(tables(con), sorted(load_schemas()))
+        con.close()
+
+    def test_from_template(self):
+        template = build_template(os.path.join(self.tmpdir.name, "template.db"))
+        self.assertEqual(build_template(template), template)
+        db_file = os.path.join(self.tmpdir.name, "ci", "artha.db")
+        con = create_database(db_file, template=template)
+        con.execute("INSERT INTO watchlist (name) VALUES ('Tech')")
+        self.assertEqual(tables(con), sorted(load_schemas()))
+        self.assertEqual(pending_migrations(con), [])
+        con.close()
+        # The template is copied, not changed
+        con = duckdb.connect(template, read_only=True)
+        self.assertEqual(con.execute("SELECT count(*) FROM watchlist").fetchone()[0], 0)
+        con.close()
+        with self.assertRaises(FileExistsError):
+            create_database(db_file, template=template)
+
+    def test_main(self):
+        db_file = os.path.join(self.tmpdir.name, "artha.db")
+        with patch.object(db_init, "DB_FILE", db_file), patch("sys.stdout"):
+            self.assertEqual(db_init.main(["init-all"]), 0)
+            self.assertEqual(db_init.main(["migrate"]), 0)
+            self.assertEqual(db_init.main(["migrate", "extra"]), 1)
+            self.assertEqual(db_init.main(["no_such_table"]), 1)
+        con = duckdb.connect(db_file, read_only=True)
+        self.assertEqual(tables(con), sorted(load_schemas()))
+        con.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,96 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import duckdb
+
+# Add the src directory to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../src")))
+
+from artha_data.batch.export_parquet import export_stock_master, export_ticker_tape, read_ticker_tape
+
+
+class TestExportParquet(unittest.TestCase):
+    def setUp(self):
+        self.con = duckdb.connect(":memory:")
+        self.con.execute("CREATE TABLE stock_master (symbol VARCHAR PRIMARY KEY, name VARCHAR, exchange VARCHAR)")
+        self.con.execute("""
+            CREATE TABLE ticker_tape (
+                load_date DATE,
+                symbol VARCHAR,
+                lastsale DOUBLE,
+                exchange VARCHAR
+            );
+        """)
+        self.con.execute("INSERT INTO stock_master VALUES ('A', 'A Inc', 'NYSE'), ('B', 'B Inc', 'NASDAQ')")
+        self.con.execute("""
+            INSERT INTO ticker_tape VALUES
+                ('2025-08-29', 'A', 1.0, 'NYSE'),
+                ('2025-08-29', 'B', 2.0, NULL),
+                ('2025-09-02', 'A', 1.5, 'NYSE'),
+                ('2025-09-02', 'B', 2.5, 'NASDAQ')
+        """)
+        self.export_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        self.con.close()
+        shutil.rmtree(self.export_dir)
+
+    def test_export_and_read(self):
+        with patch("builtins.print"):
+            self.assertEqual(export_stock_master(self.con, self.export_dir), 2)
+            self.assertEqual(export_ticker_tape(self.con, self.export_dir), 4)
+        self.assertTrue(
+            os.path.isdir(os.path.join(self.export_dir, "ticker_tape", "exchange=NASDAQ", "year=2025", "month=8"))
+        )
+        self.assertTrue(os.path.isdir(os.path.join(self.export_dir, "stock_master", "exchange=NYSE")))
+
+        df = read_ticker_tape(export_dir=self.export_dir, columns="symbol, lastsale, exchange")
+        self.assertEqual(len(df), 4)
+        df = read_ticker_tape(
+            export_dir=self.export_dir, start_date="2025-09-01", exchanges=["NASDAQ"], columns="symbol, lastsale"
+        )
+        self.assertEqual(df.values.tolist(), [["B", 2.5]])
+        df = read_ticker_tape(export_dir=self.export_dir, end_date="2025-08-31", symbols=["A"], columns="lastsale")
+        self.assertEqual(df["lastsale"].tolist(), [1.0])
+
+    def test_incremental_export(self):
+        with patch("builtins.print"):
+            export_ticker_tape(self.con, self.export_dir)
+            self.assertEqual(export_ticker_tape(self.con, self.export_dir), 0)
+            self.con.execute("INSERT INTO ticker_tape VALUES ('2025-09-03', 'A', 1.75, 'NYSE')")
+            self.assertEqual(export_ticker_tape(self.con, self.export_dir), 1)
+            self.assertEqual(len(read_ticker_tape(export_dir=self.export_dir)), 5)
+            self.assertEqual(export_ticker_tape(self.con, self.export_dir, incremental=False), 5)
+        self.assertEqual(len(read_ticker_tape(export_dir=self.export_dir)), 5)
+
+    def test_incremental_export_of_reloaded_dates(self):
+        self.con.execute("CREATE TABLE load_manifest (load_date DATE, exchange VARCHAR, loaded_at TIMESTAMP)")
+        self.con.execute("""
+            INSERT INTO load_manifest VALUES
+                ('2025-08-29', 'NYSE', '2025-09-02 18:00'),
+                ('2025-09-02', 'NASDAQ', '2025-09-02 18:00')
+        """)
+        with patch("builtins.print"):
+            self.assertEqual(export_ticker_tape(self.con, self.export_dir), 4)
+            self.assertEqual(export_ticker_tape(self.con, self.export_dir), 0)
+
+            # A backfilled older date and a reloaded date rewrite their months, not just the dates after the last export
+            self.con.execute("INSERT INTO ticker_tape VALUES ('2025-08-28', 'A', 0.5, 'NYSE')")
+            self.con.execute("UPDATE ticker_tape SET lastsale = 3.0 WHERE load_date = '2025-09-02' AND symbol = 'B'")
+            self.con.execute("""
+                INSERT INTO load_manifest VALUES
+                    ('2025-08-28', 'NYSE', '2025-09-03 18:00'),
+                    ('2025-09-02', 'NASDAQ', '2025-09-03 18:00')
+            """)
+            self.assertEqual(export_ticker_tape(self.con, self.export_dir), 5)
+        df = read_ticker_tape(export_dir=self.export_dir, columns="load_date, symbol, lastsale")
+        self.assertEqual(len(df), 5)
+        self.assertEqual(df[df["symbol"] == "B"]["lastsale"].tolist(), [2.0, 3.0])
+
+
+if __name__ == "__main__":
+    unittest.main()
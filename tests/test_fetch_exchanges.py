@@ -0,0 +1,163 @@
+import gzip
+import io
+import json
+import os
+import sys
+import tempfile
+import threading
+import unittest
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import ClassVar
+from unittest.mock import patch
+
+# Add the src directory to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../src")))
+
+from artha_data.batch.db_init import create_database
+from artha_data.batch.fetch_exchanges import fetch_exchanges, load_fetched
+from artha_data.batch.load_ticker_data import (
+    datafile_fingerprint,
+    datafile_path,
+    find_datafiles,
+    iter_datafile_chunks,
+)
+
+LOAD_DATE = "2025-09-08"
+
+
+def rows(exchange):
+    return [
+        {
+            "symbol": f"{exchange[:2]}{i}",
+            "name": f"{exchange} stock {i}",
+            "lastsale": f"${10 + i}.00",
+            "netchange": "0.50",
+            "pctchange": "2.0%",
+            "volume": "1000",
+            "marketCap": "1000000.00",
+            "ipoyear": "2000",
+            "industry": "Software",
+            "sector": "Technology",
+        }
+        for i in range(3)
+    ]
+
+
+class StubScreener(BaseHTTPRequestHandler):
+    """Answers like the screener API, with ETags, gzip and a failing first request per exchange if asked to."""
+
+    requests: ClassVar[list] = []
+    failures: ClassVar[dict] = {}
+
+    def do_GET(self):
+        exchange = urllib.parse.parse_qs(urllib.parse.urlparse(self.path).query)["exchange"][0]
+        self.requests.append((exchange, self.headers.get("If-None-Match")))
+        if self.failures.get(exchange):
+            self.failures[exchange] -= 1
+            self.send_response(503)
+            self.send_header("Retry-After", "0")
+            self.end_headers()
+            return
+        etag = f'"{exchange}-1"'
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+        body = json.dumps(
+            {"data": {"headers": {"symbol": "Symbol"}, "rows": rows(exchange.upper())}, "message": None}, indent=4
+        ).encode()
+        gzipped = "gzip" in self.headers.get("Accept-Encoding", "")
+        if gzipped:
+            body = gzip.compress(body)
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("ETag", etag)
+        if gzipped:
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestFetchExchanges(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        StubScreener.requests = []
+        StubScreener.failures = {}
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), StubScreener)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.base_url = f"http://127.0.0.1:{self.server.server_address[1]}/api/screener/stocks"
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.tmpdir.cleanup()
+
+    def _fetch(self, **kwargs):
+        with patch("builtins.print"):
+            return fetch_exchanges(
+                LOAD_DATE, base_url=self.base_url, datafile_dir=self.tmpdir.name, backoff=0, **kwargs
+            )
+
+    def test_nested_rows(self):
+        text = '{"data": {"headers": {"rows": [1]}, "asOf": 12345, "rows": [{"a": 1}, {"a": 2}]}, "status": {}}'
+        for read_size in (1, 7, 65536):
+            chunks = iter_datafile_chunks(io.BytesIO(text.encode()), 1, read_size, keys=("data", "rows"))
+            self.assertEqual([r for chunk in chunks for r in chunk], [{"a": 1}, {"a": 2}])
+        with self.assertRaises(ValueError):
+            list(iter_datafile_chunks(io.BytesIO(b'{"data": null}'), keys=("data", "rows")))
+
+        # A garbled member before the rows fails once its block is read, not at the end of the response
+        raw = io.BytesIO(
+            b'{"data": {"headers": {"a": tru}, "rows": ' + json.dumps(rows("NYSE") * 1000).encode() + b"}}"
+        )
+        with self.assertRaises(json.JSONDecodeError):
+            list(iter_datafile_chunks(raw, read_size=1024, keys=("data", "rows")))
+        self.assertLessEqual(raw.tell(), 2048)
+
+    def test_fetch_retry_and_conditional_request(self):
+        StubScreener.failures = {"nyse": 2}
+        results = self._fetch()
+        self.assertEqual([result.exchange for result in results], ["NASDAQ", "AMEX", "NYSE"])
+        self.assertEqual([exchange for exchange, _ in StubScreener.requests].count("nyse"), 3)
+        for result in results:
+            # Compact gzipped JSON, found and read by the loader like the old .json files
+            self.assertTrue(result.path.endswith(".json.gz"))
+            self.assertEqual(datafile_path(LOAD_DATE, result.exchange, self.tmpdir.name), result.path)
+            self.assertEqual(datafile_fingerprint(result.path), result.fingerprint)
+            with gzip.open(result.path, "rb") as f:
+                self.assertEqual(json.load(f), rows(result.exchange))
+        self.assertEqual(len(find_datafiles(datafile_dir=self.tmpdir.name)), 3)
+
+        # A re-run sends the ETags and keeps the unmodified files
+        StubScreener.requests = []
+        results = self._fetch(exchanges=["AMEX"])
+        self.assertEqual(StubScreener.requests, [("amex", '"amex-1"')])
+        self.assertIsNone(results[0].rows)
+
+        StubScreener.failures = {"nasdaq": 5}
+        with self.assertRaises(OSError):
+            self._fetch(exchanges=["NASDAQ"], retries=1)
+
+        # Only http and https URLs are opened
+        with self.assertRaisesRegex(ValueError, "http or https"):
+            fetch_exchanges(LOAD_DATE, base_url="file:///etc/passwd", datafile_dir=self.tmpdir.name)
+
+    def test_load_fetched_rows(self):
+        results = self._fetch()
+        con = create_database()
+        with patch("builtins.print"):
+            self.assertEqual(load_fetched(con, LOAD_DATE, results), 9)
+            # The files are recorded in load_manifest like loaded files, so loading them again skips them
+            self.assertEqual(load_fetched(con, LOAD_DATE, self._fetch()), 0)
+        self.assertEqual(con.execute("SELECT count(*) FROM load_manifest").fetchone()[0], 3)
+        self.assertEqual(con.execute("SELECT count(*) FROM stock_master_history").fetchone()[0], 9)
+        con.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,138 @@
+import os
+import sys
+import tempfile
+import unittest
+
+import duckdb
+
+# Add the src directory to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../src")))
+
+from artha_data.batch.latest_quote import refresh_latest_quote
+from artha_data.utils.db_helper import DbHelper
+from artha_data.utils.quote_cache import QuoteCache
+
+
+def create_tables(con):
+    con.execute("CREATE TABLE stock_master (symbol VARCHAR PRIMARY KEY, exchange VARCHAR)")
+    con.execute("""
+        CREATE TABLE ticker_tape (
+            load_date DATE,
+            symbol VARCHAR,
+            lastsale DECIMAL(18, 4),
+            netchange DECIMAL(18, 4),
+            pctchange DECIMAL(18, 3),
+            volume BIGINT,
+            marketCap DECIMAL(18, 2),
+            adv_dec TINYINT,
+            exchange VARCHAR
+        );
+    """)
+    con.execute("INSERT INTO stock_master VALUES ('A', 'NYSE'), ('B', 'NYSE'), ('C', 'NASDAQ')")
+    con.execute("""
+        INSERT INTO ticker_tape VALUES
+            ('2025-09-08', 'A', 10, 1, 11.1, 100, 1000, 1, 'NYSE'),
+            ('2025-09-08', 'B', 20, -1, -4.8, 50, 2000, -1, 'NYSE'),
+            ('2025-09-08', 'C', 30, 0, 0, 70, NULL, 0, NULL),
+            ('2025-09-09', 'A', 11, 1, 10, 120, 1100, 1, 'NYSE')
+    """)
+
+
+class TestRefreshLatestQuote(unittest.TestCase):
+    def setUp(self):
+        self.con = duckdb.connect(":memory:")
+        create_tables(self.con)
+
+    def tearDown(self):
+        self.con.close()
+
+    def _quotes(self):
+        return self.con.execute(
+            "SELECT symbol, strftime(load_date, '%Y-%m-%d'), exchange, lastsale FROM latest_quote ORDER BY symbol"
+        ).fetchall()
+
+    def test_rebuild(self):
+        self.assertEqual(refresh_latest_quote(self.con), 3)
+        self.assertEqual(
+            self._quotes(),
+            [("A", "2025-09-09", "NYSE", 11.0), ("B", "2025-09-08", "NYSE", 20.0), ("C", "2025-09-08", "NASDAQ", 30.0)],
+        )
+
+    def test_quotes_are_exact(self):
+        self.con.execute("UPDATE ticker_tape SET lastsale = 730707.01, marketCap = 1074777942627 WHERE symbol = 'B'")
+        refresh_latest_quote(self.con)
+        columns = "symbol, load_date, lastsale, netchange, pctchange, volume, marketCap, adv_dec"
+        self.assertEqual(
+            self.con.execute(f"SELECT {columns} FROM latest_quote ORDER BY symbol").fetchall(),  # noqa: S608
+            self.con.execute(
+                f"SELECT {columns} FROM ticker_tape QUALIFY load_date = max(load_date) OVER (PARTITION BY symbol) ORDER BY symbol"  # noqa: S608
+            ).fetchall(),
+        )
+
+    def test_incremental_refresh(self):
+        refresh_latest_quote(self.con, "2025-09-08")
+        refresh_latest_quote(self.con, "2025-09-09")
+        expected = self._quotes()
+
+        # Reloading an older date does not overwrite a later quote
+        self.con.execute("UPDATE ticker_tape SET lastsale = 9 WHERE symbol = 'A' AND load_date = '2025-09-08'")
+        refresh_latest_quote(self.con, "2025-09-08")
+        self.assertEqual(self._quotes(), expected)
+
+        # A symbol dropped from its latest date falls back to its previous row
+        self.con.execute("DELETE FROM ticker_tape WHERE load_date = '2025-09-09'")
+        refresh_latest_quote(self.con, "2025-09-09")
+        self.assertEqual(self._quotes()[0], ("A", "2025-09-08", "NYSE", 9.0))
+
+        self.con.execute("DELETE FROM ticker_tape WHERE symbol = 'C'")
+        refresh_latest_quote(self.con, "2025-09-08")
+        self.assertEqual([quote[0] for quote in self._quotes()], ["A", "B"])
+
+
+class TestQuoteCache(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db_file = os.path.join(self.tmpdir.name, "test.db")
+        with DbHelper.transaction(self.db_file) as con:
+            create_tables(con)
+            refresh_latest_quote(con)
+        self.cache = QuoteCache(self.db_file, check_interval=0)
+
+    def tearDown(self):
+        DbHelper.close_all()
+        self.tmpdir.cleanup()
+
+    def test_get(self):
+        self.assertEqual(len(self.cache), 3)
+        self.assertIn("B", self.cache)
+        quote = self.cache.get("C")
+        self.assertEqual((quote["load_date"], quote["exchange"], quote["lastsale"]), ("2025-09-08", "NASDAQ", 30.0))
+        self.assertIsNone(quote["marketCap"])
+        self.assertIsNone(self.cache.get("ZZZZ"))
+
+    def test_get_many(self):
+        quotes = self.cache.get_many(["B", "ZZZZ", "A"])
+        self.assertEqual(list(quotes["symbol"]), ["B", "ZZZZ", "A"])
+        self.assertEqual(quotes["lastsale"].tolist(), [20.0, None, 11.0])
+        self.assertEqual(quotes["volume"].tolist(), [50, None, 120])
+
+    def test_reload_on_new_load(self):
+        self.assertEqual(self.cache.get("A")["lastsale"], 11.0)
+        with DbHelper.transaction(self.db_file) as con:
+            con.execute("INSERT INTO ticker_tape VALUES ('2025-09-10', 'A', 12, 1, 9.1, 90, 1200, 1, 'NYSE')")
+            refresh_latest_quote(con, "2025-09-10")
+        self.assertEqual(self.cache.get("A")["lastsale"], 12.0)
+
+        # Within the check interval the snapshot is not checked
+        cache = QuoteCache(self.db_file, check_interval=3600)
+        self.assertEqual(cache.get("B")["lastsale"], 20.0)
+        with DbHelper.transaction(self.db_file) as con:
+            con.execute("UPDATE ticker_tape SET lastsale = 21 WHERE symbol = 'B'")
+            refresh_latest_quote(con, "2025-09-08")
+        self.assertEqual(cache.get("B")["lastsale"], 20.0)
+        cache.invalidate()
+        self.assertEqual(cache.get("B")["lastsale"], 21.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
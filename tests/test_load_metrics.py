@@ -0,0 +1,116 @@
+import io
+import json
+import logging
+import os
+import pstats
+import sys
+import tempfile
+import threading
+import unittest
+from unittest.mock import patch
+
+import duckdb
+
+# Add the src directory to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../src")))
+
+from artha_data.batch.db_init import create_table_if_missing
+from artha_data.batch.load_metrics import (
+    LoadMetrics,
+    current_metrics,
+    load_run,
+    logger,
+    pop_profile_option,
+    profiled,
+)
+from artha_data.batch.load_ticker_data import load_ticker_tape_data
+
+
+class TestLoadMetrics(unittest.TestCase):
+    def setUp(self):
+        self.con = duckdb.connect(":memory:")
+        self.log = io.StringIO()
+        self.handler = logging.StreamHandler(self.log)
+        logger.addHandler(self.handler)
+        logger.setLevel(logging.INFO)
+
+    def tearDown(self):
+        logger.removeHandler(self.handler)
+        self.con.close()
+
+    def test_counters(self):
+        metrics = LoadMetrics("test")
+        with metrics.phase("parse"):
+            pass
+        metrics.count("rows_accepted", 3)
+        metrics.reject(ValueError("bad"))
+        metrics.reject("filtered", 2)
+        summary = metrics.summary()
+        self.assertIn("parse", summary["phases"])
+        self.assertEqual(summary["counters"], {"rows_accepted": 3, "rows_rejected": 3})
+        self.assertEqual(summary["rejects"], {"ValueError": 1, "filtered": 2})
+        self.assertGreater(summary["peak_rss_mb"], 0)
+
+    def test_nested_phases(self):
+        metrics = LoadMetrics("test")
+        with patch("time.perf_counter", side_effect=[0.0, 1.0, 3.0, 4.0, 5.0, 7.0]), metrics.phase("refresh"):
+            with metrics.phase("db_init"):
+                pass
+            with metrics.phase("db_init"):
+                pass
+        # refresh took 7s, 3s of it in db_init
+        self.assertEqual(metrics.phases, {"refresh": 4.0, "db_init": 3.0})
+
+    def test_reject_rows(self):
+        metrics = LoadMetrics("test")
+        metrics.reject_rows(2, {"unknown_symbol": 2, "missing_symbol": 1})
+        self.assertEqual(metrics.counters["rows_rejected"], 2)
+        self.assertEqual(metrics.rejects, {"unknown_symbol": 2, "missing_symbol": 1})
+
+    def test_load_run(self):
+        for table in ("stock_master", "industry", "ticker_tape"):
+            create_table_if_missing(self.con, table)
+        self.con.execute("INSERT INTO stock_master (symbol) VALUES ('AAPL')")
+        data = [{"symbol": "AAPL", "netchange": "1"}, {"symbol": "ZZZZ"}, {"symbol": "AAPL"}]
+
+        outside = current_metrics()
+        with patch("builtins.print"), load_run(self.con, "load", ["2025-09-09"]) as metrics:
+            load_ticker_tape_data(self.con, "2025-09-09", data, "NASDAQ")
+            self.assertIs(current_metrics(), metrics)
+            # Another thread's run does not record into this one
+            seen = []
+            thread = threading.Thread(target=lambda: seen.append(current_metrics()))
+            thread.start()
+            thread.join()
+            self.assertIs(seen[0], outside)
+        self.assertIs(current_metrics(), outside)
+
+        with self.assertRaises(RuntimeError), patch("builtins.print"), load_run(self.con, "load", []):
+            raise RuntimeError("boom")
+
+        runs = self.con.execute(
+            "SELECT status, error, rows_accepted, rows_rejected, rejects, phases FROM load_runs ORDER BY started_at"
+        ).fetchall()
+        self.assertEqual(len(runs), 2)
+        status, error, accepted, rejected, rejects, phases = runs[0]
+        self.assertEqual((status, error, accepted, rejected), ("ok", None, 1, 2))
+        self.assertEqual(json.loads(rejects), {"unknown_symbol": 1, "duplicate": 1})
+        self.assertIn("tape_insert", json.loads(phases))
+        self.assertEqual(runs[1][:2], ("error", "RuntimeError: boom"))
+
+        events = [json.loads(line) for line in self.log.getvalue().splitlines()]
+        self.assertEqual([e["event"] for e in events], ["run_started", "run_summary", "run_started", "run_summary"])
+        self.assertEqual(events[1]["rejects"], {"unknown_symbol": 1, "duplicate": 1})
+
+    def test_profiled(self):
+        self.assertEqual(pop_profile_option(["--profile", "out.prof", "backfill"]), (["backfill"], "out.prof"))
+        self.assertEqual(pop_profile_option(["2025-09-09"]), (["2025-09-09"], None))
+        with tempfile.TemporaryDirectory() as root:
+            path = os.path.join(root, "out.prof")
+            with patch("builtins.print"), profiled(path):
+                sum(range(1000))
+            self.assertGreater(pstats.Stats(path).total_calls, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,109 @@
+import datetime
+import os
+import sys
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import duckdb
+
+# Add the src directory to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../src")))
+
+from artha_data.batch import load_stock_prices as loader
+from artha_data.batch.db_init import create_database
+from artha_data.batch.load_stock_prices import find_price_files, last_loaded_dates, load_stock_prices
+
+YAHOO_HEADER = "Date,Open,High,Low,Close,Adj Close,Volume,Dividends,Stock Splits\n"
+
+
+class TestLoadStockPrices(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.con = create_database()
+
+    def tearDown(self):
+        self.con.close()
+        self.tmpdir.cleanup()
+
+    def _write(self, name, text):
+        path = os.path.join(self.tmpdir.name, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            f.write(text)
+        return path
+
+    def _rows(self):
+        return self.con.execute(
+            'SELECT symbol, CAST(Date AS VARCHAR), Close, Volume, "Stock Splits" FROM stock_prices ORDER BY 1, 2'
+        ).fetchall()
+
+    def test_per_symbol_and_combined_files(self):
+        self._write(
+            "yahoo/aapl.csv",
+            YAHOO_HEADER
+            + "2020-01-02 00:00:00-05:00,1,2,0.5,1.5,1.4,100,0,0\n"
+            + "2020-01-03,1,2,0.5,n/a,1.4,100,0,0\n"
+            + "2020-01-06,1,2,0.5,1.75,1.4,1.5e3,0,2\n"
+            + "2020-01-07,1,2,0.5,1.8,1.4,1e30,0,0\n",
+        )
+        self._write("combined/2020.csv", "ticker,date,close,volume\nmsft,2020-01-02,10,5\nMSFT,bad date,11,5\n")
+        self.con.execute(
+            "COPY (SELECT 'IBM' AS Symbol, DATE '2020-01-02' AS Date, 5.0 AS Close, 7 AS Volume) TO '{}'".format(
+                os.path.join(self.tmpdir.name, "ibm.parquet")
+            )
+        )
+        self._write("notes.txt", "not a price file")
+        csv_files, parquet_files = find_price_files([self.tmpdir.name])
+        self.assertEqual(len(csv_files), 2)
+        self.assertEqual(parquet_files, [os.path.join(self.tmpdir.name, "ibm.parquet")])
+
+        # Rows without a valid date or close are skipped, symbols are upper case, an out of range volume is NULL
+        self.assertEqual(load_stock_prices(self.con, csv_files, parquet_files), 5)
+        self.assertEqual(
+            self._rows(),
+            [
+                ("AAPL", "2020-01-02", 1.5, 100, 0.0),
+                ("AAPL", "2020-01-06", 1.75, 1500, 2.0),
+                ("AAPL", "2020-01-07", 1.8, None, 0.0),
+                ("IBM", "2020-01-02", 5.0, 7, None),
+                ("MSFT", "2020-01-02", 10.0, 5, None),
+            ],
+        )
+        self.assertEqual(last_loaded_dates(self.con, ["aapl"]), {"AAPL": datetime.date(2020, 1, 7)})
+
+    def test_incremental_and_full(self):
+        path = self._write("AAPL.csv", YAHOO_HEADER + "2020-01-02,1,2,0.5,1.5,1.4,100,0,0\n")
+        self.assertEqual(load_stock_prices(self.con, [path]), 1)
+
+        # A newer dump of the same symbol repeats the old bars with adjusted prices
+        self._write(
+            "AAPL.csv",
+            YAHOO_HEADER + "2020-01-02,1,2,0.5,0.75,1.4,200,0,0\n" + "2020-01-03,1,2,0.5,0.8,1.4,200,0,0\n",
+        )
+        self.assertEqual(load_stock_prices(self.con, [path]), 1)
+        self.assertEqual([row[2] for row in self._rows()], [1.5, 0.8])
+
+        self.assertEqual(load_stock_prices(self.con, [path], full=True), 2)
+        self.assertEqual([row[2] for row in self._rows()], [0.75, 0.8])
+
+    def test_duplicate_bars_across_files(self):
+        first = self._write("a/AAPL.csv", YAHOO_HEADER + "2020-01-02,1,2,0.5,1.5,1.4,100,0,0\n")
+        second = self._write("b/AAPL.csv", YAHOO_HEADER + "2020-01-02,1,2,0.5,1.6,1.4,100,0,0\n")
+        self.assertEqual(load_stock_prices(self.con, [first, second]), 1)
+        self.assertEqual(self._rows(), [("AAPL", "2020-01-02", 1.6, 100, 0.0)])
+
+    def test_main(self):
+        self._write("AAPL.csv", YAHOO_HEADER + "2020-01-02,1,2,0.5,1.5,1.4,100,0,0\n")
+        db_file = os.path.join(self.tmpdir.name, "artha.db")
+        with patch.object(loader, "DB_FILE", db_file), patch("sys.stdout"):
+            self.assertEqual(loader.main([self.tmpdir.name]), 0)
+            self.assertEqual(loader.main([os.path.join(self.tmpdir.name, "missing")]), 1)
+        con = duckdb.connect(db_file, read_only=True)
+        self.assertEqual(con.execute("SELECT count(*) FROM stock_prices").fetchone()[0], 1)
+        self.assertEqual(con.execute("SELECT status, files_loaded FROM load_runs").fetchall(), [("ok", 1)])
+        con.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
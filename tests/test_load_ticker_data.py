@@ -1,20 +1,37 @@
+import io
 import json
 import os
 import sys
+import tempfile
 import unittest
+import zipfile
+from concurrent.futures import Future
 from unittest.mock import MagicMock, mock_open, patch
 
-import duckdb
+import pandas as pd
 
 # Add the src directory to the Python path
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../src")))
 
+from artha_data.batch.db_init import create_database
 from artha_data.batch.load_ticker_data import (
+    backfill,
+    backfill_main,
+    build_stock_master_batch,
+    build_ticker_tape_batch,
+    clean_column,
     clean_value,
+    datafile_path,
+    find_datafiles,
+    in_transaction,
+    iter_datafile_chunks,
     load_data,
     load_stock_master_data,
     load_ticker_tape_data,
+    load_ticker_tape_data_bulk,
     main,
+    needs_migrate,
+    ordered_results,
 )
 
 
@@ -31,32 +48,37 @@ class TestLoadTickerData(unittest.TestCase):
         self.assertIsNone(clean_value("abc", "integer"))
         self.assertIs(clean_value("test string", "str"), "test string")
 
+    def test_clean_column_matches_clean_value(self):
+        import pandas as pd
+
+        raw = [
+            "123.45",
+            "$123.45",
+            "10%",
+            "-0.03",
+            "123",
+            "123.7",
+            "-1.9",
+            None,
+            "",
+            "abc",
+            "2.5T",
+            " 1.5 ",
+            "1e20",
+            "9.3e18",
+        ]
+        for value_type in ("real", "integer"):
+            cleaned = clean_column(pd.Series(raw, dtype="object"), value_type)
+            expected = [clean_value(v, value_type) for v in raw]
+            self.assertEqual([None if pd.isna(v) else v for v in cleaned.tolist()], expected)
+
+        # A volume outside the BIGINT range does not wrap around, the row is unparsable
+        batch = build_ticker_tape_batch("2025-09-08", [{"symbol": "BIG", "volume": "1e20"}], "NASDAQ")
+        self.assertTrue(batch["volume"].isna().all())
+        self.assertEqual(batch["unparsable"].tolist(), [True])
+
     def setUp(self):
-        self.con = duckdb.connect(":memory:")
-        self.con.execute("""
-            CREATE TABLE stock_master (
-                symbol VARCHAR PRIMARY KEY,
-                name VARCHAR,
-                ipoyear VARCHAR,
-                nd_industry VARCHAR,
-                nd_sector VARCHAR,
-                exchange VARCHAR
-            );
-        """)
-        self.con.execute("""
-            CREATE TABLE ticker_tape (
-                load_date DATE,
-                symbol VARCHAR,
-                lastsale DOUBLE,
-                netchange DOUBLE,
-                pctchange DOUBLE,
-                volume BIGINT,
-                marketCap DOUBLE,
-                adv_dec INTEGER,
-                created_at TIMESTAMP,
-                updated_at TIMESTAMP
-            );
-        """)
+        self.con = create_database()
         self.sample_data = [
             {
                 "symbol": "AAPL",
@@ -82,39 +104,333 @@ class TestLoadTickerData(unittest.TestCase):
         self.assertEqual(result[1], "Apple Inc.")
         self.assertEqual(result[2], "1980")
 
+    def test_numeric_ipoyear(self):
+        # Numeric years as str() formats them, also when some are missing
+        data = [dict(self.sample_data[0], ipoyear=1980), dict(self.sample_data[0], symbol="MSFT", ipoyear=None)]
+        batch = build_stock_master_batch(data, "NASDAQ")
+        self.assertEqual(batch["ipoyear"].tolist(), ["1980", pd.NA])
+
+    def test_load_stock_master_data_counts(self):
+        with patch("builtins.print"):
+            counts = load_stock_master_data(self.con, self.sample_data, "NASDAQ")
+        self.assertEqual(counts, {"inserted": 1, "updated": 0, "unchanged": 0})
+        self.con.execute("UPDATE stock_master SET updated_at = TIMESTAMP '2000-01-01'")
+
+        changed = [dict(self.sample_data[0], sector="Technology"), {"symbol": "MSFT", "name": "Microsoft"}]
+        with patch("builtins.print"):
+            self.assertEqual(
+                load_stock_master_data(self.con, self.sample_data, "NASDAQ"),
+                {"inserted": 0, "updated": 0, "unchanged": 1},
+            )
+            self.assertEqual(
+                load_stock_master_data(self.con, changed, "NASDAQ"),
+                {"inserted": 1, "updated": 1, "unchanged": 0},
+            )
+            self.assertEqual(
+                load_stock_master_data(self.con, self.sample_data, "NYSE"),
+                {"inserted": 0, "updated": 1, "unchanged": 0},
+            )
+        rows = self.con.execute(
+            "SELECT symbol, nd_sector, exchange, updated_at > TIMESTAMP '2000-01-01' FROM stock_master ORDER BY symbol"
+        ).fetchall()
+        self.assertEqual(rows, [("AAPL", "Electronic Technology", "NYSE", True), ("MSFT", None, "NASDAQ", True)])
+
     def test_load_ticker_tape_data(self):
         # First, insert a dummy record into stock_master to satisfy the foreign key constraint
         self.con.execute("INSERT INTO stock_master (symbol) VALUES ('AAPL')")
-        load_ticker_tape_data(self.con, "2025-09-09", self.sample_data)
+        load_ticker_tape_data(self.con, "2025-09-09", self.sample_data, "NASDAQ")
         result = self.con.execute("SELECT * FROM ticker_tape").fetchone()
         self.assertEqual(result[1], "AAPL")
         self.assertEqual(result[2], 150.00)
         self.assertEqual(result[5], 1000000)
-        self.assertEqual(result[7], 1) # adv_dec should be 1 for positive netchange
+        self.assertEqual(result[7], 1)  # adv_dec should be 1 for positive netchange
         # Load the same data again to thrown the unique constraint and test the exception
         # UPDATE - this did not work as expected. @FIXIT
-        load_ticker_tape_data(self.con, "2025-09-09", self.sample_data)
+        load_ticker_tape_data(self.con, "2025-09-09", self.sample_data, "NASDAQ")
         result = self.con.execute("SELECT * FROM ticker_tape").fetchone()
         self.assertEqual(result[1], "AAPL")
         self.assertEqual(result[2], 150.00)
         self.assertEqual(result[5], 1000000)
 
+    def test_load_ticker_tape_data_bulk_matches_per_row(self):
+        data = [
+            *self.sample_data,
+            {
+                "symbol": "MSFT",
+                "lastsale": "$410.1",
+                "netchange": "-1.25",
+                "pctchange": "-0.304%",
+                "volume": "123.0",
+                "marketCap": "3050000000000.00",
+                "industry": "",
+                "sector": "",
+            },
+            {"symbol": "IBM", "lastsale": "", "netchange": "", "pctchange": "", "volume": "", "marketCap": ""},
+            {"symbol": "NOPE", "lastsale": "$1.00", "netchange": "0.00"},  # not in stock_master
+            {"symbol": None, "lastsale": "$1.00"},
+        ]
+        self.con.execute("INSERT INTO stock_master (symbol) VALUES ('AAPL'), ('MSFT'), ('IBM')")
+        self.con.execute("CREATE TABLE per_row AS SELECT * FROM ticker_tape")
+        self.con.execute("ALTER TABLE ticker_tape RENAME TO bulk")
+        self.con.execute("ALTER TABLE per_row RENAME TO ticker_tape")
+        with patch("builtins.print"):
+            load_ticker_tape_data(self.con, "2025-09-09", data[:3], "NASDAQ")
+        self.con.execute("ALTER TABLE ticker_tape RENAME TO per_row")
+        self.con.execute("ALTER TABLE bulk RENAME TO ticker_tape")
+
+        with patch("builtins.print"):
+            inserted = load_ticker_tape_data_bulk(self.con, "2025-09-09", data, "NASDAQ")
+            # Reloading the same date inserts nothing
+            self.assertEqual(load_ticker_tape_data_bulk(self.con, "2025-09-09", data, "NASDAQ"), 0)
+        self.assertEqual(inserted, 3)
+
+        columns = "load_date, symbol, lastsale, netchange, pctchange, volume, marketCap, adv_dec, industry_id, exchange"
+        # The column list is the constant above
+        bulk_rows = self.con.execute(f"SELECT {columns} FROM ticker_tape ORDER BY symbol").fetchall()  # noqa: S608
+        per_row_rows = self.con.execute(f"SELECT {columns} FROM per_row ORDER BY symbol").fetchall()  # noqa: S608
+        self.assertEqual(bulk_rows, per_row_rows)
+        self.assertEqual([r[7] for r in bulk_rows], [1, 0, -1])
+        self.assertEqual([r[8] for r in bulk_rows], [2, None, 1])
+        industries = self.con.execute("SELECT industry_id, nd_sector, nd_industry FROM industry ORDER BY 1").fetchall()
+        self.assertEqual(industries, [(1, "", ""), (2, "Electronic Technology", "Technology")])
+
     @patch("builtins.open", new_callable=mock_open, read_data=json.dumps([{"symbol": "GOOG", "name": "Google LLC"}]))
     @patch("artha_data.batch.load_ticker_data.load_stock_master_data")
-    @patch("artha_data.batch.load_ticker_data.load_ticker_tape_data")
+    @patch("artha_data.batch.load_ticker_data.load_ticker_tape_data_bulk")
     def test_load_data(self, mock_load_tape, mock_load_master, mock_file):
+        mock_load_tape.return_value = 1
         load_data(self.con, "2025-09-09", "dummy_path.json", "NASDAQ")
         mock_load_master.assert_called_once()
         mock_load_tape.assert_called_once()
 
+    @patch("builtins.open", new_callable=mock_open, read_data=json.dumps([{"symbol": "GOOG", "name": "Google LLC"}]))
+    @patch("artha_data.batch.load_ticker_data.load_stock_master_data")
+    @patch("artha_data.batch.load_ticker_data.load_ticker_tape_data")
+    def test_load_data_per_row(self, mock_load_tape, mock_load_master, mock_file):
+        mock_load_tape.return_value = 1
+        load_data(self.con, "2025-09-09", "dummy_path.json", "NASDAQ", bulk=False)
+        mock_load_master.assert_called_once()
+        mock_load_tape.assert_called_once()
+
+    def _write_datafiles(self, root, dates):
+        for prefix in ("nasdaq", "amex", "nyse"):
+            os.makedirs(os.path.join(root, prefix))
+            for load_date in dates:
+                rows = [dict(self.sample_data[0], symbol=f"{prefix.upper()}1", lastsale=f"${load_date[-2:]}.00")]
+                with open(os.path.join(root, prefix, f"{prefix}_full_tickers-{load_date}.json"), "w") as f:
+                    json.dump(rows, f)
+            # the undated latest-file copy is not part of a backfill
+            with open(os.path.join(root, prefix, f"{prefix}_full_tickers.json"), "w") as f:
+                json.dump([], f)
+
+    def test_find_datafiles(self):
+        with tempfile.TemporaryDirectory() as root:
+            self._write_datafiles(root, ["2025-09-08", "2025-09-09", "2025-09-10"])
+            jobs = find_datafiles("2025-09-09", "2025-09-10", datafile_dir=root)
+            self.assertEqual(
+                [(d, e) for d, e, _ in jobs],
+                [
+                    ("2025-09-09", "NASDAQ"),
+                    ("2025-09-09", "AMEX"),
+                    ("2025-09-09", "NYSE"),
+                    ("2025-09-10", "NASDAQ"),
+                    ("2025-09-10", "AMEX"),
+                    ("2025-09-10", "NYSE"),
+                ],
+            )
+            jobs = find_datafiles(pattern="nyse/*", datafile_dir=root)
+            self.assertEqual(
+                [(d, e) for d, e, _ in jobs], [("2025-09-08", "NYSE"), ("2025-09-09", "NYSE"), ("2025-09-10", "NYSE")]
+            )
+
+    def test_backfill_validates_dates(self):
+        for value in ("2026-3", "2026-13", "2026-02-30", "2026"):
+            with patch("builtins.print") as mock_print:
+                self.assertEqual(backfill_main(["--date", value]), 2)
+            mock_print.assert_called_once_with(f"Invalid --date {value}. Please use YYYY-MM-DD or YYYY-MM.")
+
+    def test_ordered_results_window(self):
+        class ImmediateExecutor:
+            submitted = 0
+
+            def submit(self, fn, job):
+                self.submitted += 1
+                future = Future()
+                future.set_result(fn(job))
+                return future
+
+        executor = ImmediateExecutor()
+        results = []
+        for result in ordered_results(executor, lambda job: job * 2, range(10), 3):
+            results.append(result)
+            # Never more than the window submitted ahead of what was taken
+            self.assertLessEqual(executor.submitted - len(results), 3)
+        self.assertEqual(results, [job * 2 for job in range(10)])
+
+    def test_backfill_resumes(self):
+        with tempfile.TemporaryDirectory() as root:
+            self._write_datafiles(root, ["2025-09-08", "2025-09-09"])
+            with patch("builtins.print"):
+                stats = backfill(self.con, find_datafiles("2025-09-08", "2025-09-08", datafile_dir=root), workers=1)
+                self.assertEqual((stats["files"], stats["rows"]), (3, 3))
+                stats = backfill(self.con, find_datafiles(datafile_dir=root), workers=1)
+            self.assertEqual((stats["files"], stats["rows"]), (3, 3))
+            self.assertEqual(stats["skipped"], 3)
+
+            # Only the changed file is reloaded
+            with open(os.path.join(root, "nyse", "nyse_full_tickers-2025-09-08.json"), "w") as f:
+                json.dump([dict(self.sample_data[0], symbol="NYSE1", lastsale="$99.00")], f)
+            with patch("builtins.print"):
+                stats = backfill(self.con, find_datafiles(datafile_dir=root), workers=1)
+            self.assertEqual((stats["files"], stats["skipped"]), (1, 5))
+        rows = self.con.execute(
+            "SELECT strftime(load_date, '%Y-%m-%d'), CAST(exchange AS VARCHAR), lastsale FROM ticker_tape ORDER BY ALL"
+        ).fetchall()
+        self.assertEqual(len(rows), 6)
+        self.assertEqual(rows[0], ("2025-09-08", "AMEX", 8.0))
+        self.assertIn(("2025-09-08", "NYSE", 99.0), rows)
+        self.assertEqual(self.con.execute("SELECT count(*) FROM load_manifest").fetchone()[0], 6)
+
+    def test_backfill_in_open_transaction(self):
+        with tempfile.TemporaryDirectory() as root:
+            self._write_datafiles(root, ["2025-09-08", "2025-09-09"])
+            self.con.begin()
+            with patch("builtins.print"):
+                stats = backfill(self.con, find_datafiles(datafile_dir=root), workers=1)
+            self.assertEqual(stats["files"], 6)
+            # The dates joined the caller's transaction and were not committed
+            self.con.rollback()
+        self.assertEqual(self.con.execute("SELECT count(*) FROM ticker_tape").fetchone()[0], 0)
+
+    def test_load_from_zip_archive(self):
+        with tempfile.TemporaryDirectory() as root:
+            self._write_datafiles(root, ["2025-09-10"])
+            archive = os.path.join(root, "nyse_full_tickers-2025-08.zip")
+            with zipfile.ZipFile(archive, "w", zipfile.ZIP_DEFLATED) as zf:
+                for load_date in ("2025-08-28", "2025-08-29"):
+                    rows = [dict(self.sample_data[0], symbol="NYSE1", lastsale=f"${load_date[-2:]}.00")]
+                    zf.writestr(f"nyse/nyse_full_tickers-{load_date}.json", json.dumps(rows))
+
+            self.assertEqual(
+                datafile_path("2025-08-29", "NYSE", datafile_dir=root),
+                (archive, "nyse/nyse_full_tickers-2025-08-29.json"),
+            )
+            self.assertEqual(
+                datafile_path("2025-09-10", "NYSE", datafile_dir=root),
+                os.path.join(root, "nyse", "nyse_full_tickers-2025-09-10.json"),
+            )
+            jobs = find_datafiles(dates=["2025-08"], datafile_dir=root)
+            self.assertEqual([(d, e) for d, e, _ in jobs], [("2025-08-28", "NYSE"), ("2025-08-29", "NYSE")])
+            self.assertEqual(len(find_datafiles(dates=["2025-08-29", "2025-09"], datafile_dir=root)), 4)
+            self.assertEqual(find_datafiles(dates=["2025-08"], datafile_dir=root, archives=False), [])
+
+            with patch("builtins.print"):
+                load_data(self.con, "2025-08-29", datafile_path("2025-08-29", "NYSE", datafile_dir=root), "NYSE")
+                with self.assertRaises(ValueError):
+                    load_data(self.con, "2025-08-27", (archive, "nyse/nyse_full_tickers-2025-08-27.json"), "NYSE")
+            # nothing was extracted next to the archive
+            self.assertEqual(sorted(os.listdir(root)), ["amex", "nasdaq", "nyse", "nyse_full_tickers-2025-08.zip"])
+        rows = self.con.execute("SELECT symbol, lastsale, exchange FROM ticker_tape").fetchall()
+        self.assertEqual(rows, [("NYSE1", 29.0, "NYSE")])
+
+    def test_iter_datafile_chunks(self):
+        records = [{"symbol": f"S{i}", "name": "Société \u00e9", "lastsale": f"${i}.00"} for i in range(25)]
+        raw = json.dumps(records, indent=2).encode()
+        for read_size in (1, 7, 65536):
+            chunks = list(iter_datafile_chunks(io.BytesIO(raw), chunk_size=10, read_size=read_size))
+            self.assertEqual([len(c) for c in chunks], [10, 10, 5])
+            self.assertEqual([r for c in chunks for r in c], records)
+        self.assertEqual(list(iter_datafile_chunks(io.StringIO(" [ ] "))), [])
+        for bad in ("", "[", '{"a": 1}', '[{"a": 1},]', '[{"a": 1} {"b": 2}]'):
+            with self.assertRaises(json.JSONDecodeError):
+                list(iter_datafile_chunks(io.StringIO(bad)))
+
+        # A syntax error fails once its block is read, not at the end of the file
+        raw = io.BytesIO(b'[{"a": 1}, {"a": tru}, ' + json.dumps(records * 1000).encode()[1:])
+        with self.assertRaises(json.JSONDecodeError):
+            list(iter_datafile_chunks(raw, read_size=1024))
+        self.assertLessEqual(raw.tell(), 2048)
+
+    def test_load_data_chunked(self):
+        with tempfile.TemporaryDirectory() as root:
+            path = os.path.join(root, "nasdaq_full_tickers-2025-09-09.json")
+            rows = [dict(self.sample_data[0], symbol=f"S{i}", netchange=str(i - 2)) for i in range(5)]
+            with open(path, "w") as f:
+                json.dump(rows, f)
+            with patch("builtins.print"):
+                load_data(self.con, "2025-09-09", path, "NASDAQ", chunk_size=2)
+        self.assertEqual(self.con.execute("SELECT count(*) FROM stock_master").fetchone()[0], 5)
+        result = self.con.execute("SELECT symbol, adv_dec FROM ticker_tape ORDER BY symbol").fetchall()
+        self.assertEqual(result, [("S0", -1), ("S1", -1), ("S2", 0), ("S3", 1), ("S4", 1)])
+
+    def test_load_data_manifest(self):
+        with tempfile.TemporaryDirectory() as root:
+            path = os.path.join(root, "nasdaq_full_tickers-2025-09-09.json")
+            rows = [dict(self.sample_data[0], symbol=f"S{i}") for i in range(3)]
+            with open(path, "w") as f:
+                json.dump(rows, f)
+            with patch("builtins.print"):
+                self.assertEqual(load_data(self.con, "2025-09-09", path, "NASDAQ"), 3)
+                with patch("artha_data.batch.load_ticker_data.load_ticker_tape_data_bulk") as mock_load_tape:
+                    self.assertIsNone(load_data(self.con, "2025-09-09", path, "NASDAQ"))
+                    mock_load_tape.assert_not_called()
+
+                # A changed file replaces the whole date for the exchange
+                with open(path, "w") as f:
+                    json.dump(rows[:2], f)
+                self.assertEqual(load_data(self.con, "2025-09-09", path, "NASDAQ"), 2)
+            size = os.path.getsize(path)
+
+        self.assertEqual(self.con.execute("SELECT count(*) FROM ticker_tape").fetchone()[0], 2)
+        manifest = self.con.execute(
+            "SELECT exchange, source_file, file_size, length(content_hash), source_rows, tape_rows FROM load_manifest"
+        ).fetchall()
+        self.assertEqual(manifest, [("NASDAQ", "nasdaq_full_tickers-2025-09-09.json", size, 64, 2, 2)])
+        breadth = self.con.execute("SELECT exchange, advancers, ad_line FROM market_breadth").fetchall()
+        self.assertEqual(breadth, [("NASDAQ", 2, 2)])
+        market = self.con.execute("SELECT symbols, advancers FROM sector_breadth WHERE grouping_id = 7").fetchall()
+        self.assertEqual(market, [(2, 2)])
+        # S2 is gone from the reloaded date and has no older quote
+        quotes = self.con.execute("SELECT symbol FROM latest_quote ORDER BY symbol").fetchall()
+        self.assertEqual(quotes, [("S0",), ("S1",)])
+
+    def test_needs_migrate(self):
+        self.assertFalse(needs_migrate(self.con))
+        self.con.execute("DROP TABLE industry")
+        self.assertTrue(needs_migrate(self.con))
+        self.con.execute("CREATE TABLE industry (industry_id SMALLINT)")
+        self.con.execute("DROP TABLE ticker_tape")
+        self.con.execute("CREATE TABLE ticker_tape (load_date DATE, symbol TEXT, lastsale REAL)")
+        self.assertTrue(needs_migrate(self.con))
+
+    def test_load_data_in_open_transaction(self):
+        with tempfile.TemporaryDirectory() as root:
+            path = os.path.join(root, "nasdaq_full_tickers-2025-09-09.json")
+            with open(path, "w") as f:
+                json.dump(self.sample_data, f)
+            self.assertFalse(in_transaction(self.con))
+            self.con.begin()
+            self.assertTrue(in_transaction(self.con))
+            with patch("builtins.print"):
+                self.assertEqual(load_data(self.con, "2025-09-09", path, "NASDAQ"), 1)
+            # The load joined the caller's transaction and is undone with it
+            self.assertTrue(in_transaction(self.con))
+            self.con.rollback()
+        self.assertEqual(self.con.execute("SELECT count(*) FROM ticker_tape").fetchone()[0], 0)
+
     @patch("sys.argv", ["load_ticker_data.py", "2025-09-09"])
     @patch("artha_data.batch.load_ticker_data.duckdb.connect")
     @patch("artha_data.batch.load_ticker_data.load_data")
-    def test_main(self, mock_load_data, mock_connect):
+    @patch("artha_data.batch.load_ticker_data.refresh_load_date")
+    @patch("artha_data.batch.load_ticker_data.needs_migrate", return_value=False)
+    def test_main(self, mock_needs_migrate, mock_refresh, mock_load_data, mock_connect):
         mock_con = MagicMock()
         mock_connect.return_value = mock_con
         main()
         self.assertEqual(mock_load_data.call_count, 3)
+        # The date is refreshed once, after all three exchanges
+        self.assertEqual([call.kwargs["refresh"] for call in mock_load_data.call_args_list], [False] * 3)
+        mock_refresh.assert_called_once_with(mock_con, "2025-09-09")
         mock_con.close.assert_called_once()
 
 
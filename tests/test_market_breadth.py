@@ -0,0 +1,76 @@
+import os
+import sys
+import unittest
+
+import duckdb
+
+# Add the src directory to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../src")))
+
+from artha_data.batch.market_breadth import refresh_market_breadth
+
+
+class TestMarketBreadth(unittest.TestCase):
+    def setUp(self):
+        self.con = duckdb.connect(":memory:")
+        self.con.execute("CREATE TABLE stock_master (symbol VARCHAR PRIMARY KEY, exchange VARCHAR)")
+        self.con.execute("""
+            CREATE TABLE ticker_tape (
+                load_date DATE,
+                symbol VARCHAR,
+                volume BIGINT,
+                adv_dec INTEGER,
+                exchange VARCHAR
+            );
+        """)
+        self.con.execute("INSERT INTO stock_master VALUES ('A', 'NYSE'), ('B', 'NYSE'), ('C', 'NASDAQ')")
+        self.con.execute("""
+            INSERT INTO ticker_tape VALUES
+                ('2025-09-08', 'A', 100, 1, 'NYSE'),
+                ('2025-09-08', 'B', 50, -1, 'NYSE'),
+                ('2025-09-08', 'C', 70, 0, NULL),
+                ('2025-09-09', 'A', 100, 1, 'NYSE'),
+                ('2025-09-09', 'B', 50, 1, 'NYSE')
+        """)
+
+    def tearDown(self):
+        self.con.close()
+
+    def _breadth(self):
+        return self.con.execute(
+            """
+            SELECT strftime(load_date, '%Y-%m-%d'), exchange, advancers, decliners, unchanged,
+                   total_volume, up_volume, down_volume, ad_line
+            FROM market_breadth ORDER BY ALL
+            """
+        ).fetchall()
+
+    def test_rebuild(self):
+        self.assertEqual(refresh_market_breadth(self.con), 3)
+        self.assertEqual(
+            self._breadth(),
+            [
+                ("2025-09-08", "NASDAQ", 0, 0, 1, 70, 0, 0, 0),
+                ("2025-09-08", "NYSE", 1, 1, 0, 150, 100, 50, 0),
+                ("2025-09-09", "NYSE", 2, 0, 0, 150, 150, 0, 2),
+            ],
+        )
+
+    def test_incremental_refresh_carries_ad_line(self):
+        refresh_market_breadth(self.con)
+        expected = self._breadth()
+
+        # Refreshing an earlier date moves the cumulative line of later dates
+        self.con.execute("UPDATE ticker_tape SET adv_dec = 1 WHERE load_date = '2025-09-08' AND symbol = 'B'")
+        self.assertEqual(refresh_market_breadth(self.con, "2025-09-08"), 2)
+        breadth = self._breadth()
+        self.assertEqual(breadth[1], ("2025-09-08", "NYSE", 2, 0, 0, 150, 150, 0, 2))
+        self.assertEqual(breadth[2][-1], 4)
+
+        self.con.execute("UPDATE ticker_tape SET adv_dec = -1 WHERE load_date = '2025-09-08' AND symbol = 'B'")
+        refresh_market_breadth(self.con, "2025-09-08")
+        self.assertEqual(self._breadth(), expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,115 @@
+import os
+import sys
+import unittest
+
+import duckdb
+
+# Add the src directory to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../src")))
+
+from artha_data.batch.db_init import create_table_if_missing
+from artha_data.batch.migrate_ticker_tape import is_sorted, migrate_ticker_tape, needs_migration
+
+
+class TestMigrateTickerTape(unittest.TestCase):
+    def setUp(self):
+        self.con = duckdb.connect(":memory:")
+        create_table_if_missing(self.con, "stock_master")
+        # The layout before the compact schema, with the columns the loader added
+        self.con.execute("""
+            CREATE TABLE ticker_tape (
+                load_date DATE,
+                symbol TEXT,
+                lastsale REAL,
+                netchange REAL,
+                pctchange REAL,
+                volume INTEGER,
+                marketCap REAL,
+                adv_dec INTEGER,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                nd_industry TEXT,
+                nd_sector TEXT,
+                exchange TEXT,
+                PRIMARY KEY (symbol, load_date),
+                FOREIGN KEY (symbol) REFERENCES stock_master(symbol)
+            )
+        """)
+        self.con.execute("INSERT INTO stock_master (symbol, exchange) VALUES ('A', 'NYSE'), ('B', 'NASDAQ')")
+        self.con.execute("""
+            INSERT INTO ticker_tape (load_date, symbol, lastsale, volume, adv_dec, nd_industry, nd_sector, exchange)
+            VALUES
+                ('2025-09-09', 'B', 2.5, 20, -1, 'Banks', 'Finance', 'NASDAQ'),
+                ('2025-09-09', 'A', 1.5, 10, 1, NULL, NULL, 'NYSE'),
+                ('2025-09-08', 'B', 2.0, 20, 0, 'Banks', 'Finance', NULL),
+                ('2025-09-08', 'A', 1.0, 10, 1, 'Semiconductors', 'Technology', NULL)
+        """)
+
+    def tearDown(self):
+        self.con.close()
+
+    def test_migrate(self):
+        self.assertEqual(
+            needs_migration(self.con),
+            {
+                "lastsale": "FLOAT",
+                "netchange": "FLOAT",
+                "pctchange": "FLOAT",
+                "volume": "INTEGER",
+                "marketCap": "FLOAT",
+                "adv_dec": "INTEGER",
+                "industry_id": None,
+                "exchange": "VARCHAR",
+            },
+        )
+        self.assertFalse(is_sorted(self.con))
+
+        self.assertEqual(migrate_ticker_tape(self.con), 4)
+        self.assertEqual(needs_migration(self.con), {})
+        self.assertTrue(is_sorted(self.con))
+        rows = self.con.execute(
+            """
+            SELECT strftime(tt.load_date, '%Y-%m-%d'), tt.symbol, tt.lastsale, CAST(tt.exchange AS VARCHAR), i.nd_sector
+            FROM ticker_tape tt LEFT JOIN industry i USING (industry_id)
+            ORDER BY tt.rowid
+            """
+        ).fetchall()
+        self.assertEqual(
+            rows,
+            [
+                ("2025-09-08", "A", 1.0, "NYSE", "Technology"),
+                ("2025-09-08", "B", 2.0, "NASDAQ", "Finance"),
+                ("2025-09-09", "A", 1.5, "NYSE", None),
+                ("2025-09-09", "B", 2.5, "NASDAQ", "Finance"),
+            ],
+        )
+        self.assertEqual(self.con.execute("SELECT count(*) FROM industry").fetchone()[0], 2)
+
+        # The constraints of the schema come along
+        with self.assertRaises(duckdb.ConstraintException):
+            self.con.execute("INSERT INTO ticker_tape (load_date, symbol) VALUES ('2025-09-09', 'A')")
+        with self.assertRaises(duckdb.ConstraintException):
+            self.con.execute("INSERT INTO ticker_tape (load_date, symbol) VALUES ('2025-09-10', 'ZZZZ')")
+
+        # Migrating again only re-sorts
+        self.con.execute("INSERT INTO ticker_tape (load_date, symbol, volume) VALUES ('2025-09-01', 'A', 5000000000)")
+        self.assertFalse(is_sorted(self.con))
+        self.assertEqual(migrate_ticker_tape(self.con), 5)
+        self.assertTrue(is_sorted(self.con))
+        self.assertEqual(self.con.execute("SELECT max(volume) FROM ticker_tape").fetchone()[0], 5000000000)
+        self.assertEqual(
+            self.con.execute("SELECT typeof(lastsale) FROM ticker_tape LIMIT 1").fetchone()[0], "DECIMAL(18,4)"
+        )
+
+    def test_unknown_exchange_is_not_migrated(self):
+        self.con.execute(
+            "UPDATE ticker_tape SET exchange = 'NYSE ARCA' WHERE symbol = 'A' AND load_date = '2025-09-09'"
+        )
+        with self.assertRaisesRegex(ValueError, "NYSE ARCA"):
+            migrate_ticker_tape(self.con)
+        self.assertEqual(needs_migration(self.con)["exchange"], "VARCHAR")
+        self.assertEqual(self.con.execute("SELECT count(*) FROM ticker_tape").fetchone()[0], 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,147 @@
+import os
+import sys
+import unittest
+
+import numpy as np
+
+# Add the src directory to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../src")))
+
+from artha_data.batch.db_init import create_database
+from artha_data.utils.price_history import PriceHistory, load_price_history, to_arrow
+
+
+class TestLoadPriceHistory(unittest.TestCase):
+    def setUp(self):
+        self.con = create_database()
+        self.con.execute("INSERT INTO stock_master (symbol) VALUES ('AAA'), ('BBB'), ('CCC')")
+        self.con.execute("INSERT INTO watchlist (name) VALUES ('Tech')")
+        self.con.execute("INSERT INTO stocks_lists (watchlist, symbol) VALUES ('Tech', 'BBB'), ('Tech', 'CCC')")
+        self.con.execute("""
+            INSERT INTO ticker_tape (load_date, symbol, lastsale, volume) VALUES
+                ('2025-09-08', 'AAA', 10.5, 100),
+                ('2025-09-09', 'AAA', 11.25, 200),
+                ('2025-09-08', 'BBB', 20, 50),
+                ('2025-09-10', 'BBB', 21, NULL),
+                ('2025-09-10', 'CCC', 5, 10)
+        """)
+        self.con.execute("""
+            INSERT INTO stock_prices VALUES
+                ('AAA', '2025-09-08', 10, 12, 9, 10.5, 100, 0, 0),
+                ('AAA', '2025-09-09', 10.5, 11.5, 10, 11.25, 200, 0, 0)
+        """)
+
+    def tearDown(self):
+        self.con.close()
+
+    def test_matrices(self):
+        history = load_price_history(con=self.con)
+        self.assertEqual(list(history.symbols), ["AAA", "BBB", "CCC"])
+        self.assertEqual([str(d) for d in history.dates], ["2025-09-08", "2025-09-09", "2025-09-10"])
+        np.testing.assert_array_equal(
+            history.close, [[10.5, 20.0, np.nan], [11.25, np.nan, np.nan], [np.nan, 21.0, 5.0]]
+        )
+        np.testing.assert_array_equal(history.volume[:, 1], [50.0, np.nan, np.nan])
+        self.assertIn("BBB", history)
+        self.assertEqual(len(history), 3)
+
+    def test_filters(self):
+        history = load_price_history(watchlist="Tech", start="2025-09-09", con=self.con)
+        self.assertEqual(list(history.symbols), ["BBB", "CCC"])
+        self.assertEqual([str(d) for d in history.dates], ["2025-09-10"])
+        history = load_price_history(symbols=["AAA"], end="2025-09-08", con=self.con)
+        self.assertEqual(list(history.symbols), ["AAA"])
+        np.testing.assert_array_equal(history.close, [[10.5]])
+
+    def test_stock_prices(self):
+        history = load_price_history(source="stock_prices", con=self.con)
+        np.testing.assert_array_equal(history.high[:, 0], [12.0, 11.5])
+        np.testing.assert_array_equal(history.low[:, 0], [9.0, 10.0])
+        self.assertEqual(history.series("AAA")["close"].tolist(), [10.5, 11.25])
+        with self.assertRaises(ValueError):
+            load_price_history(source="quotes", con=self.con)
+
+
+class TestIndicators(unittest.TestCase):
+    def setUp(self):
+        dates = np.datetime64("2025-01-01") + np.arange(6)
+        close = np.array([
+            [1.0, 10.0],
+            [2.0, 9.0],
+            [3.0, np.nan],
+            [4.0, 8.0],
+            [5.0, 7.0],
+            [6.0, 8.0],
+        ])
+        volume = np.array([[100.0, 10.0]] * 5 + [[300.0, 10.0]])
+        self.history = PriceHistory(["UP", "DOWN"], dates, close, volume=volume)
+
+    def test_sma(self):
+        np.testing.assert_array_equal(self.history.sma(3)[:, 0], [np.nan, np.nan, 2.0, 3.0, 4.0, 5.0])
+        # A missing price leaves the window short of prices
+        np.testing.assert_array_equal(self.history.sma(3)[:, 1], [np.nan, np.nan, np.nan, np.nan, np.nan, 23 / 3])
+        np.testing.assert_array_equal(self.history.sma(3, min_periods=2)[3:, 1], [8.5, 7.5, 23 / 3])
+
+    def test_ema(self):
+        ema = self.history.ema(3)
+        np.testing.assert_allclose(ema[:3, 0], [1.0, 1.5, 2.25])
+        # NaN rows are skipped
+        self.assertTrue(np.isnan(ema[2, 1]))
+        self.assertAlmostEqual(ema[3, 1], 8.75)
+
+    def test_rsi(self):
+        rsi = self.history.rsi(2)
+        np.testing.assert_array_equal(rsi[:, 0], [np.nan, np.nan, 100.0, 100.0, 100.0, 100.0])
+        # Losses of 1 and 1 seed the averages, then a gain of 1 moves both to 0.5
+        self.assertTrue(np.isnan(rsi[3, 1]))
+        self.assertAlmostEqual(rsi[4, 1], 0.0)
+        self.assertAlmostEqual(rsi[5, 1], 50.0)
+
+    def test_volatility(self):
+        log_returns = np.diff(np.log([1.0, 2.0, 3.0, 4.0]))
+        volatility = self.history.volatility(3, annualize=False)
+        self.assertTrue(np.isnan(volatility[2, 0]))
+        self.assertAlmostEqual(volatility[3, 0], np.std(log_returns, ddof=1))
+        self.assertAlmostEqual(self.history.volatility(3)[3, 0], np.std(log_returns, ddof=1) * np.sqrt(252))
+
+        # A zero close does not poison the volatility of the later windows
+        close = np.array([[1.0], [0.0], [2.0], [3.0], [4.0], [5.0]])
+        history = PriceHistory(["Z"], np.arange("2025-01-01", "2025-01-07", dtype="datetime64[D]"), close)
+        self.assertTrue(np.isnan(history.returns()[1:3, 0]).all())
+        volatility = history.volatility(3, annualize=False)
+        self.assertAlmostEqual(volatility[5, 0], np.std(np.diff(np.log([2.0, 3.0, 4.0, 5.0])), ddof=1))
+
+    def test_high_low(self):
+        high, low = self.history.high_low(window=2)
+        np.testing.assert_array_equal(high[:, 1], [10.0, 10.0, 9.0, 8.0, 8.0, 8.0])
+        np.testing.assert_array_equal(low[:, 1], [10.0, 9.0, 9.0, 8.0, 7.0, 7.0])
+        high, low = self.history.high_low(window=4, min_periods=4)
+        np.testing.assert_array_equal(high[:, 0], [np.nan, np.nan, np.nan, 4.0, 5.0, 6.0])
+
+    def test_relative_volume(self):
+        relative_volume = self.history.relative_volume(2)
+        np.testing.assert_array_equal(relative_volume[:, 0], [np.nan, np.nan, 1.0, 1.0, 1.0, 3.0])
+
+    def test_screen(self):
+        screen = self.history.screen()
+        self.assertEqual(list(screen["symbol"]), ["UP", "DOWN"])
+        self.assertEqual(screen["close"].tolist(), [6.0, 8.0])
+        self.assertEqual(screen["relative_volume_20"].shape, (2,))
+        self.assertEqual(screen["high_52w"].tolist(), [6.0, 10.0])
+        self.assertEqual(self.history.screen("2025-01-03")["close"][0], 3.0)
+        with self.assertRaises(KeyError):
+            self.history.screen("2024-01-01")
+
+    def test_series(self):
+        series = self.history.series("DOWN", indicators=True)
+        self.assertEqual(series["close"].tolist(), [10.0, 9.0, 8.0, 7.0, 8.0])
+        self.assertEqual(len(series["rsi_14"]), 5)
+
+    def test_to_arrow(self):
+        table = to_arrow(self.history.screen())
+        self.assertEqual(table.num_rows, 2)
+        self.assertEqual(table.column("sma_200").null_count, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,106 @@
+import os
+import sys
+import unittest
+
+# Add the src directory to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../src")))
+
+from artha_data.batch.db_init import create_database
+from artha_data.batch.sector_breadth import grouping_id, read_sector_breadth, refresh_sector_breadth
+
+
+class TestSectorBreadth(unittest.TestCase):
+    def setUp(self):
+        self.con = create_database()
+        self.con.execute("""
+            INSERT INTO stock_master (symbol, exchange, nd_sector, nd_industry) VALUES
+                ('A', 'NYSE', NULL, NULL),
+                ('B', 'NYSE', NULL, NULL),
+                ('C', 'NASDAQ', 'Technology', 'Software'),
+                ('D', 'NASDAQ', NULL, NULL)
+        """)
+        self.con.execute("""
+            INSERT INTO industry (industry_id, nd_sector, nd_industry) VALUES
+                (1, '', ''), (2, 'Finance', 'Major Banks'), (3, 'Technology', 'Semiconductors')
+        """)
+        self.con.execute("""
+            INSERT INTO ticker_tape (load_date, symbol, pctchange, volume, marketCap, adv_dec, industry_id, exchange)
+            VALUES
+                ('2025-09-08', 'A', 2.0, 100, 300, 1, 2, 'NYSE'),
+                ('2025-09-08', 'B', -1.0, 50, 100, -1, 3, 'NYSE'),
+                ('2025-09-08', 'C', 4.0, 70, 100, 1, NULL, NULL),
+                ('2025-09-08', 'D', 0.0, 10, NULL, 0, 1, 'NASDAQ'),
+                ('2025-09-09', 'A', 1.0, 100, 300, 1, 2, 'NYSE')
+        """)
+
+    def tearDown(self):
+        self.con.close()
+
+    def _cells(self, by, load_date="2025-09-08"):
+        return self.con.execute(
+            """
+            SELECT * EXCLUDE (load_date, grouping_id, created_at)
+            FROM sector_breadth
+            WHERE grouping_id = ? AND load_date = ?
+            ORDER BY exchange, nd_sector, nd_industry
+            """,
+            (grouping_id(by), load_date),
+        ).fetchall()
+
+    def test_grouping_id(self):
+        self.assertEqual(grouping_id(), 7)
+        self.assertEqual(grouping_id(("exchange",)), 3)
+        self.assertEqual(grouping_id(("nd_sector", "nd_industry")), 4)
+        self.assertEqual(grouping_id(("nd_industry", "exchange", "nd_sector")), 0)
+        with self.assertRaises(ValueError):
+            grouping_id(("symbol",))
+
+    def test_rebuild(self):
+        written = refresh_sector_breadth(self.con)
+        self.assertEqual(written, self.con.execute("SELECT count(*) FROM sector_breadth").fetchone()[0])
+        self.assertEqual(self.con.execute("SELECT count(DISTINCT grouping_id) FROM sector_breadth").fetchone()[0], 8)
+
+        market = read_sector_breadth(self.con)
+        self.assertEqual(market["symbols"].tolist(), [4, 1])
+        self.assertEqual(market["advancers"].tolist(), [2, 1])
+        self.assertEqual(market["total_volume"].tolist(), [230, 100])
+        # (300 * 2 - 100 * 1 + 100 * 4) / 500, D has no market cap
+        self.assertAlmostEqual(market["cap_weighted_return"][0], 1.8)
+        self.assertAlmostEqual(market["equal_weighted_return"][0], 1.25)
+
+        # C's exchange and sector come from stock_master, an empty pair is a missing sector
+        self.assertEqual(
+            self._cells(("exchange", "nd_sector"))[:3],
+            [
+                ("NASDAQ", "Technology", None, 1, 1, 0, 0, 70, 70, 0, 100.0, 4.0, 4.0),
+                ("NASDAQ", None, None, 1, 0, 0, 1, 10, 0, 0, None, None, 0.0),
+                ("NYSE", "Finance", None, 1, 1, 0, 0, 100, 100, 0, 300.0, 2.0, 2.0),
+            ],
+        )
+        sectors = self._cells(("nd_sector",))
+        self.assertEqual(
+            [(row[1], row[3], row[7]) for row in sectors],
+            [
+                ("Finance", 1, 100),
+                ("Technology", 2, 120),
+                (None, 1, 10),
+            ],
+        )
+
+    def test_incremental_refresh(self):
+        refresh_sector_breadth(self.con)
+        expected = self.con.execute("SELECT * EXCLUDE (created_at) FROM sector_breadth ORDER BY ALL").fetchall()
+
+        self.con.execute("UPDATE ticker_tape SET adv_dec = 1 WHERE load_date = '2025-09-08' AND symbol = 'B'")
+        refresh_sector_breadth(self.con, "2025-09-08")
+        self.assertEqual(read_sector_breadth(self.con)["advancers"].tolist(), [3, 1])
+
+        self.con.execute("UPDATE ticker_tape SET adv_dec = -1 WHERE load_date = '2025-09-08' AND symbol = 'B'")
+        refresh_sector_breadth(self.con, "2025-09-08")
+        self.assertEqual(
+            self.con.execute("SELECT * EXCLUDE (created_at) FROM sector_breadth ORDER BY ALL").fetchall(), expected
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,118 @@
+import os
+import sys
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import duckdb
+
+# Add the src directory to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../src")))
+
+from artha_data.utils import settings as settings_module
+from artha_data.utils.settings import (
+    DEFAULTS,
+    Settings,
+    load_settings,
+    refresh_report_snapshot,
+    scratch_database,
+)
+
+
+class TestSettings(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.config_file = os.path.join(self.tmpdir.name, "artha.ini")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def _write_config(self, text):
+        with open(self.config_file, "w") as f:
+            f.write(text)
+
+    def test_defaults(self):
+        with patch.object(settings_module, "DEFAULT_CONFIG_FILE", self.config_file):
+            settings = load_settings(environ={})
+        self.assertEqual(settings.db_file, DEFAULTS["db_file"])
+        self.assertEqual(settings.report_db_file, settings.db_file)
+        self.assertFalse(settings.has_report_replica)
+        self.assertEqual(settings.duckdb_config(), {})
+        self.assertEqual(settings.configured, frozenset())
+
+    def test_config_file_and_environment(self):
+        self._write_config("[artha]\ndb_file = db/artha.db\nthreads = 2\nmemory_limit = 1GB\n")
+        settings = load_settings(environ={"ARTHA_CONFIG": self.config_file, "ARTHA_MEMORY_LIMIT": "512MB"})
+        # Relative paths in the config file are relative to the file
+        self.assertEqual(settings.db_file, os.path.join(self.tmpdir.name, "db", "artha.db"))
+        self.assertEqual(settings.db_dir, os.path.join(self.tmpdir.name, "db"))
+        # The environment wins over the config file
+        self.assertEqual(settings.duckdb_config(), {"threads": 2, "memory_limit": "512MB"})
+        self.assertEqual(settings.configured, {"db_file", "threads", "memory_limit"})
+
+        settings = load_settings(environ={"ARTHA_DB_FILE": "other.db"}, config_file=self.config_file)
+        self.assertEqual(settings.db_file, os.path.abspath("other.db"))
+
+    def test_invalid_config(self):
+        self._write_config("[artha]\ndatabase = artha.db\n")
+        with self.assertRaises(ValueError):
+            load_settings(environ={}, config_file=self.config_file)
+        with self.assertRaises(FileNotFoundError):
+            load_settings(environ={"ARTHA_CONFIG": os.path.join(self.tmpdir.name, "missing.ini")})
+        with self.assertRaises(ValueError):
+            Settings({"database": "artha.db"})
+
+    def test_connect_applies_duckdb_settings(self):
+        temp_directory = os.path.join(self.tmpdir.name, "spill")
+        settings = Settings({
+            "db_file": os.path.join(self.tmpdir.name, "data", "artha.db"),
+            "threads": "2",
+            "temp_directory": temp_directory,
+        })
+        con = settings.connect()
+        values = con.execute("SELECT current_setting('threads'), current_setting('temp_directory')").fetchone()
+        con.close()
+        self.assertEqual(values, (2, temp_directory))
+        self.assertTrue(os.path.exists(settings.db_file))
+
+    def test_report_snapshot(self):
+        settings = Settings({
+            "db_file": os.path.join(self.tmpdir.name, "artha.db"),
+            "report_db_file": os.path.join(self.tmpdir.name, "report", "artha.db"),
+        })
+        self.assertTrue(settings.has_report_replica)
+        con = settings.connect()
+        con.execute("CREATE TYPE exchange_code AS ENUM ('NASDAQ', 'NYSE')")
+        con.execute("CREATE TABLE t (symbol TEXT PRIMARY KEY, exchange exchange_code)")
+        con.execute("INSERT INTO t VALUES ('A', 'NYSE')")
+        self.assertTrue(refresh_report_snapshot(con, settings))
+
+        # A report can read the snapshot while the loader keeps writing the primary
+        report = settings.connect_report()
+        con.execute("INSERT INTO t VALUES ('B', 'NASDAQ')")
+        self.assertEqual(report.execute("SELECT * FROM t").fetchall(), [("A", "NYSE")])
+        report.close()
+
+        refresh_report_snapshot(con, settings)
+        con.close()
+        report = settings.connect_report()
+        self.assertEqual(report.execute("SELECT count(*) FROM t").fetchone()[0], 2)
+        with self.assertRaises(duckdb.Error):
+            report.execute("INSERT INTO t VALUES ('C', 'NYSE')")
+        report.close()
+
+        self.assertFalse(refresh_report_snapshot(None, Settings({"db_file": settings.db_file})))
+
+    def test_scratch_database(self):
+        settings = Settings({"scratch_dir": os.path.join(self.tmpdir.name, "scratch")})
+        with scratch_database(settings=settings) as db_file:
+            self.assertTrue(db_file.startswith(settings.scratch_dir))
+            con = duckdb.connect(db_file)
+            con.execute("CREATE TABLE t (x INTEGER)")
+            con.close()
+        self.assertFalse(os.path.exists(db_file))
+        self.assertEqual(os.listdir(settings.scratch_dir), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
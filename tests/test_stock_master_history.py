@@ -0,0 +1,107 @@
+import os
+import sys
+import unittest
+from unittest.mock import patch
+
+# Add the src directory to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../src")))
+
+from artha_data.batch.db_init import create_database
+from artha_data.batch.load_ticker_data import load_stock_master_data
+from artha_data.batch.sector_breadth import read_sector_breadth, refresh_sector_breadth
+from artha_data.batch.stock_master_history import (
+    seed_stock_master_history,
+    stock_master_as_of,
+    ticker_tape_as_of,
+)
+
+
+def stock(symbol, sector, name=None):
+    return {"symbol": symbol, "name": name or symbol, "ipoyear": "2000", "industry": f"{sector} Ind", "sector": sector}
+
+
+class TestStockMasterHistory(unittest.TestCase):
+    def setUp(self):
+        self.con = create_database()
+
+    def tearDown(self):
+        self.con.close()
+
+    def _load(self, load_date, data, exchange="NASDAQ"):
+        with patch("builtins.print"):
+            load_stock_master_data(self.con, data, exchange, load_date)
+
+    def _versions(self, symbol):
+        return [
+            (sector, str(valid_from), valid_to and str(valid_to))
+            for sector, valid_from, valid_to in self.con.execute(
+                "SELECT nd_sector, valid_from, valid_to FROM stock_master_history WHERE symbol = ? ORDER BY valid_from",
+                (symbol,),
+            ).fetchall()
+        ]
+
+    def test_versions(self):
+        self._load("2025-09-08", [stock("A", "Technology"), stock("B", "Health Care")])
+        self._load("2025-09-09", [stock("A", "Finance"), stock("B", "Health Care")])
+        self.assertEqual(
+            self._versions("A"), [("Technology", "2025-09-08", "2025-09-09"), ("Finance", "2025-09-09", None)]
+        )
+        self.assertEqual(self._versions("B"), [("Health Care", "2025-09-08", None)])
+
+        # A reloaded date corrects its own version
+        self._load("2025-09-09", [stock("A", "Energy")])
+        self.assertEqual(
+            self._versions("A"), [("Technology", "2025-09-08", "2025-09-09"), ("Energy", "2025-09-09", None)]
+        )
+
+        # An earlier date loaded later ends where the known history starts
+        self._load("2025-09-05", [stock("A", "Utilities"), stock("C", "Finance")])
+        self.assertEqual(
+            self._versions("A"),
+            [
+                ("Utilities", "2025-09-05", "2025-09-08"),
+                ("Technology", "2025-09-08", "2025-09-09"),
+                ("Energy", "2025-09-09", None),
+            ],
+        )
+
+        # Delisted symbols keep their last version, stock_master only has the latest values
+        current = stock_master_as_of(self.con, "2025-09-10")
+        self.assertEqual(current["nd_sector"].tolist(), ["Energy", "Health Care", "Finance"])
+        self.assertTrue(stock_master_as_of(self.con, "2025-09-04").empty)
+        latest = self.con.execute("SELECT nd_sector FROM stock_master WHERE symbol = 'A'").fetchone()[0]
+        self.assertEqual(latest, "Utilities")
+
+    def test_as_of_join_and_sector_rebuild(self):
+        self._load("2025-09-08", [stock("A", "Technology"), stock("B", "Technology")])
+        self._load("2025-09-09", [stock("A", "Finance"), stock("B", "Technology")])
+        # Rows without an industry_id, e.g. loaded before the compact layout
+        self.con.execute("""
+            INSERT INTO ticker_tape (load_date, symbol, pctchange, volume, adv_dec, exchange) VALUES
+                ('2025-09-08', 'A', 1, 10, 1, 'NASDAQ'), ('2025-09-08', 'B', -1, 20, -1, 'NASDAQ'),
+                ('2025-09-09', 'A', 1, 10, 1, 'NASDAQ'), ('2025-09-09', 'B', 1, 20, 1, 'NASDAQ')
+        """)
+        tape = ticker_tape_as_of(self.con, start="2025-09-08", symbols=["A"])
+        self.assertEqual(tape["nd_sector"].tolist(), ["Technology", "Finance"])
+
+        refresh_sector_breadth(self.con)
+        sectors = read_sector_breadth(self.con, by=("nd_sector",))
+        self.assertEqual(
+            [(str(row.load_date.date()), row.nd_sector, row.symbols) for row in sectors.itertuples()],
+            [("2025-09-08", "Technology", 2), ("2025-09-09", "Finance", 1), ("2025-09-09", "Technology", 1)],
+        )
+
+    def test_seed(self):
+        self.con.execute("""
+            INSERT INTO stock_master (symbol, nd_sector, exchange, created_at) VALUES
+                ('A', 'Technology', 'NYSE', '2025-09-10'), ('B', 'Finance', 'NYSE', '2025-09-10')
+        """)
+        self.con.execute("INSERT INTO ticker_tape (load_date, symbol) VALUES ('2025-09-08', 'A'), ('2025-09-09', 'A')")
+        self.assertEqual(seed_stock_master_history(self.con), 2)
+        self.assertEqual(self._versions("A"), [("Technology", "2025-09-08", None)])
+        self.assertEqual(self._versions("B"), [("Finance", "2025-09-10", None)])
+        self.assertEqual(seed_stock_master_history(self.con), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,82 @@
+import os
+import sys
+import tempfile
+import unittest
+
+# Add the src directory to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../src")))
+
+from artha_data.utils.db_helper import DbHelper
+from artha_data.utils.watchlist_helper import WatchlistHelper
+
+
+class TestWatchlistHelperBatch(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.default_db_file = DbHelper.db_file()
+        DbHelper.configure(os.path.join(self.tmpdir.name, "test.db"))
+        with DbHelper.transaction() as con:
+            con.execute("CREATE TABLE stock_master (symbol TEXT PRIMARY KEY)")
+            con.execute("CREATE TABLE watchlist (name TEXT PRIMARY KEY, description TEXT)")
+            con.execute("""
+                CREATE TABLE stocks_lists (
+                    watchlist TEXT,
+                    symbol TEXT,
+                    PRIMARY KEY (watchlist, symbol),
+                    FOREIGN KEY (watchlist) REFERENCES watchlist(name)
+                )
+            """)
+            con.execute("INSERT INTO stock_master VALUES ('AAPL'), ('MSFT'), ('NVDA'), ('XOM')")
+            con.execute("INSERT INTO watchlist (name) VALUES ('Tech')")
+            con.execute("INSERT INTO stocks_lists (watchlist, symbol) VALUES ('Tech', 'AAPL')")
+
+    def tearDown(self):
+        DbHelper.close_all()
+        DbHelper.configure(self.default_db_file)
+        self.tmpdir.cleanup()
+
+    def test_partition_symbols_in_watchlist(self):
+        self.assertEqual(
+            WatchlistHelper.partition_symbols_in_watchlist("Tech", ["MSFT", "AAPL", "ZZZZ"]),
+            (["AAPL"], ["MSFT", "ZZZZ"]),
+        )
+        self.assertEqual(WatchlistHelper.partition_symbols_in_watchlist("Tech", []), ([], []))
+
+    def test_add_symbols_to_watchlist(self):
+        added, duplicates, unknown = WatchlistHelper.add_symbols_to_watchlist(
+            "Tech", ["AAPL", "MSFT", "NVDA", "ZZZZ", "MSFT"]
+        )
+        self.assertEqual((added, duplicates, unknown), (["MSFT", "NVDA"], ["AAPL"], ["ZZZZ"]))
+        self.assertEqual(WatchlistHelper.get_symbols_for_watchlist("Tech"), [("AAPL",), ("MSFT",), ("NVDA",)])
+
+        added, _, unknown = WatchlistHelper.add_symbols_to_watchlist("Tech", ["ZZZZ"], validate=False)
+        self.assertEqual((added, unknown), (["ZZZZ"], []))
+
+    def test_remove_symbols_from_watchlist(self):
+        WatchlistHelper.add_symbols_to_watchlist("Tech", ["MSFT", "XOM"])
+        deleted, missing = WatchlistHelper.remove_symbols_from_watchlist("Tech", ["XOM", "AAPL", "NVDA"])
+        self.assertEqual((deleted, missing), (["XOM", "AAPL"], ["NVDA"]))
+        self.assertEqual(WatchlistHelper.get_symbols_for_watchlist("Tech"), [("MSFT",)])
+
+    def test_get_watchlist_quotes(self):
+        with DbHelper.transaction() as con:
+            con.execute("""
+                CREATE TABLE ticker_tape (
+                    symbol TEXT, load_date DATE, lastsale DOUBLE, pctchange DOUBLE, volume BIGINT, adv_dec INTEGER
+                )
+            """)
+            con.execute("""
+                INSERT INTO ticker_tape VALUES
+                    ('AAPL', '2025-01-02', 240.0, -1.5, 1000, -1),
+                    ('AAPL', '2025-01-03', 243.5, 1.46, 1200, 1),
+                    ('XOM', '2025-01-03', 110.0, 0.0, 500, 0)
+            """)
+        WatchlistHelper.add_symbols_to_watchlist("Tech", ["MSFT"])
+        self.assertEqual(
+            WatchlistHelper.get_watchlist_quotes("Tech"),
+            [("AAPL", 243.5, 1.46, 1200, 1), ("MSFT", None, None, None, None)],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()